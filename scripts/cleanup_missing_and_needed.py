@@ -3,13 +3,17 @@
 Aetherial Platform - Cleanup Script for whats_missing_and_needed
 
 This script moves all remaining files from whats_missing_and_needed to their
-correct locations in the project structure.
+correct locations in the project structure. Moves are planned and executed
+through reorg_engine (renames where possible, with a manifest for --dry-run,
+--resume and --rollback).
 """
 
+import argparse
 import os
-import shutil
 from pathlib import Path
 
+from reorg_engine import Rule, add_arguments, run_rules
+
 # Base directories
 ROOT_DIR = Path(__file__).parent.parent
 SRC_DIR = ROOT_DIR / "whats_missing_and_needed"
@@ -38,55 +42,19 @@ MAPPING = {
     "windsurf_artifacts/": "build/artifacts/"
 }
 
-def ensure_directory(path):
-    """Ensure directory exists, create if it doesn't."""
-    path.mkdir(parents=True, exist_ok=True)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move the remaining whats_missing_and_needed files into place")
+    add_arguments(parser, ROOT_DIR / ".reorg" / "cleanup_missing_and_needed.json")
+    args = parser.parse_args(argv)
 
-def move_item(src, dest):
-    """Move a file or directory from src to dest."""
-    src_path = Path(src)
-    dest_path = Path(dest)
-    
-    if not src_path.exists():
-        print(f"Warning: Source not found: {src_path}")
+    print("Starting cleanup of whats_missing_and_needed...\n")
+
+    # Directories are merged file by file; existing destinations are backed up, not deleted
+    rules = [Rule(SRC_DIR / src_rel, ROOT_DIR / dest_rel, "move") for src_rel, dest_rel in MAPPING.items()]
+    run_rules(rules, args)
+    if args.dry_run or args.rollback or not SRC_DIR.exists():
         return
-        
-    # Ensure parent directory exists
-    ensure_directory(dest_path.parent)
-    
-    # If destination exists, handle accordingly
-    if dest_path.exists():
-        if dest_path.is_dir() and src_path.is_dir():
-            # Merge directories
-            for item in src_path.glob('*'):
-                shutil.move(str(item), str(dest_path / item.name))
-            print(f"Merged directory: {src_path} -> {dest_path}")
-            return
-        else:
-            # Remove existing file/directory
-            if dest_path.is_dir():
-                shutil.rmtree(dest_path)
-            else:
-                dest_path.unlink()
-    
-    # Move the item
-    shutil.move(str(src_path), str(dest_path))
-    print(f"Moved: {src_path} -> {dest_path}")
 
-def main():
-    print("Starting cleanup of whats_missing_and_needed...\n")
-    
-    # Process all items in the mapping
-    for src_rel, dest_rel in MAPPING.items():
-        src = SRC_DIR / src_rel
-        dest = ROOT_DIR / dest_rel
-        
-        if not src.exists():
-            print(f"Warning: Source not found: {src}")
-            continue
-            
-        move_item(src, dest)
-    
     # Remove empty directories
     try:
         for root, dirs, files in os.walk(SRC_DIR, topdown=False):
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Aetherial Platform Reorganization Engine
+
+Shared engine for the reorganization scripts. All copies and moves are
+planned up front into a manifest of per-file operations, then executed:
+
+- files whose destination already has the same size and mtime (or, with
+  verify_hash, the same content) are skipped, so re-runs only touch what
+  changed;
+- moves use a rename when source and destination share a filesystem, and
+  a whole directory moves with a single rename when its destination does
+  not exist yet;
+- copies try a copy-on-write reflink first and fall back to a regular
+  copy, on a thread pool;
+- "replace" rules mirror the source instead of deleting and re-copying
+  the destination tree.
+
+Every file that would be overwritten or deleted is first renamed into a
+backup directory next to the manifest, and each finished operation is
+appended to a journal, so an interrupted run can be resumed and a
+finished one rolled back. Starting a new run discards the previous run's
+journal and backups; dry runs write their plan to a separate file and
+leave both alone.
+"""
+
+import argparse
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl(dest_fd, FICLONE, src_fd) clones file extents on btrfs, XFS and similar
+FICLONE = 0x40049409
+
+MODES = ("copy", "merge", "replace", "move")
+
+
+@dataclass
+class Rule:
+    """Copy, merge, replace (mirror) or move `src` to `dest`."""
+    src: Path
+    dest: Path
+    mode: str = "copy"
+
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode {self.mode}; expected one of {MODES}")
+
+
+@dataclass
+class Operation:
+    """One planned filesystem change."""
+    id: int
+    kind: str  # copy, move, move_tree or delete
+    src: Optional[str]
+    dest: str
+    size: int = 0
+    mtime_ns: int = 0
+    skip: bool = False
+
+
+@dataclass
+class Plan:
+    operations: List[Operation] = field(default_factory=list)
+    directories: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    def add(self, kind: str, src: Optional[str], dest: str, **kwargs) -> Operation:
+        op = Operation(len(self.operations), kind, src, dest, **kwargs)
+        self.operations.append(op)
+        return op
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for op in self.operations:
+            key = "skip" if op.skip else op.kind
+            counts[key] = counts.get(key, 0) + 1
+        counts["bytes"] = sum(op.size for op in self.operations if not op.skip)
+        return counts
+
+
+def _walk_files(root: str) -> Iterable[os.DirEntry]:
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry
+
+
+def _unchanged(src_stat: os.stat_result, dest: str) -> bool:
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_size == src_stat.st_size and dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def _device(path: str) -> int:
+    """Device of `path`, or of its nearest existing ancestor."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.stat(path).st_dev
+
+
+def build_plan(rules: Iterable[Rule]) -> Plan:
+    """Expand rules into per-file operations in rule order, marking unchanged files as skipped."""
+    plan = Plan()
+    directories: Set[str] = set()
+    # (kind, src, dest, kwargs) per rule; replace deletes are resolved once every destination is known
+    expanded: List[List[tuple]] = []
+    mirrors: List[Optional[str]] = []
+    for rule in rules:
+        src, dest = str(rule.src), str(rule.dest)
+        steps: List[tuple] = []
+        expanded.append(steps)
+        mirrors.append(None)
+        if not os.path.exists(src):
+            plan.missing.append(src)
+            continue
+        if os.path.isfile(src):
+            st = os.stat(src)
+            kind = "move" if rule.mode == "move" else "copy"
+            steps.append((kind, src, dest, dict(size=st.st_size, mtime_ns=st.st_mtime_ns,
+                                                skip=kind == "copy" and _unchanged(st, dest))))
+            directories.add(os.path.dirname(dest))
+            continue
+
+        # A directory moving to a fresh location (or over a file) is one rename
+        if rule.mode == "move" and not os.path.isdir(dest):
+            steps.append(("move_tree", src, dest, {}))
+            directories.add(os.path.dirname(dest))
+            continue
+
+        for entry in _walk_files(src):
+            target = os.path.join(dest, os.path.relpath(entry.path, src))
+            st = entry.stat(follow_symlinks=False)
+            kind = "move" if rule.mode == "move" else "copy"
+            steps.append((kind, entry.path, target, dict(size=st.st_size, mtime_ns=st.st_mtime_ns,
+                                                         skip=kind == "copy" and _unchanged(st, target))))
+            directories.add(os.path.dirname(target))
+        if rule.mode == "replace" and os.path.isdir(dest):
+            mirrors[-1] = dest
+
+    # A mirror keeps every file any rule writes into it, not only its own
+    wanted = {os.path.abspath(step[2]) for steps in expanded for step in steps}
+    trees = tuple(path + os.sep for path in wanted)
+    for steps, mirror in zip(expanded, mirrors):
+        for kind, src, dest, kwargs in steps:
+            plan.add(kind, src, dest, **kwargs)
+        if mirror is None:
+            continue
+        for entry in _walk_files(mirror):
+            path = os.path.abspath(entry.path)
+            # Never mirror away the engine itself, or --rollback could not run
+            if path in wanted or path.startswith(trees) or path == os.path.abspath(__file__):
+                continue
+            plan.add("delete", None, entry.path)
+    plan.directories = sorted(directories)
+    return plan
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReorgEngine:
+    """Executes, resumes and rolls back a plan recorded in a manifest."""
+
+    def __init__(self, manifest_path: Path, workers: int = 8, verify_hash: bool = False, verbose: bool = True):
+        self.manifest_path = Path(manifest_path)
+        self.journal_path = self.manifest_path.with_suffix(".journal.jsonl")
+        self.backup_dir = self.manifest_path.with_suffix(".backup")
+        self.plan_path = self.manifest_path.with_suffix(".plan.json")
+        self.run_id: Optional[str] = None
+        self.workers = workers
+        self.verify_hash = verify_hash
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._no_reflink: Set[int] = set()
+        self.stats: Dict[str, int] = {}
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _dump(self, plan: Plan, path: Path, **extra):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ignore = path.parent / ".gitignore"
+        if not ignore.exists():
+            ignore.write_text("*\n")
+        with open(path, "w") as f:
+            json.dump({"created": time.time(), **extra, "directories": plan.directories, "missing": plan.missing,
+                       "operations": [asdict(op) for op in plan.operations]}, f, indent=1)
+
+    def write_plan(self, plan: Plan) -> Path:
+        """Write a dry-run plan next to the manifest, leaving the last run's journal and backups intact."""
+        self._dump(plan, self.plan_path)
+        return self.plan_path
+
+    def write_manifest(self, plan: Plan):
+        """Start a new run: record its plan and discard the previous run's journal and backups."""
+        self.run_id = f"{time.time_ns():x}"
+        self._dump(plan, self.manifest_path, run=self.run_id)
+        self.journal_path.unlink(missing_ok=True)
+        shutil.rmtree(self.backup_dir, ignore_errors=True)
+
+    def load_manifest(self) -> Plan:
+        with open(self.manifest_path) as f:
+            data = json.load(f)
+        self.run_id = data.get("run", "")
+        return Plan([Operation(**op) for op in data["operations"]], data["directories"], data["missing"])
+
+    def journal(self) -> List[Dict]:
+        if not self.journal_path.exists():
+            return []
+        with open(self.journal_path) as f:
+            # A torn last line from a crash is ignored; that operation is simply redone
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+            return entries
+
+    def _record(self, entry: Dict):
+        with self._lock:
+            self.stats[entry["method"]] = self.stats.get(entry["method"], 0) + 1
+            self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+
+    def _backup_path(self, op: Operation) -> Path:
+        return self.backup_dir / self.run_id / str(op.id)
+
+    def _backup(self, op: Operation) -> Optional[str]:
+        """Move an existing destination aside before it is overwritten or deleted."""
+        backup = self._backup_path(op)
+        if backup.exists():
+            return str(backup)  # Backed up by an interrupted earlier attempt
+        if not os.path.lexists(op.dest):
+            return None
+        backup.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(op.dest, backup) if _device(op.dest) == _device(str(backup.parent)) else shutil.move(op.dest, backup)
+        return str(backup)
+
+    def _reflink(self, src: str, dest: str) -> bool:
+        if fcntl is None:
+            return False
+        device = _device(dest)
+        if device in self._no_reflink or device != os.stat(src).st_dev:
+            return False
+        try:
+            with open(src, "rb") as s, open(dest, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError as e:
+            if os.path.exists(dest):
+                os.unlink(dest)
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                self._no_reflink.add(device)
+                return False
+            raise
+        shutil.copystat(src, dest)
+        return True
+
+    def _copy(self, src: str, dest: str) -> str:
+        # Write under a temporary name so an interrupted copy never looks complete
+        tmp = f"{dest}.reorg-tmp"
+        method = "reflink" if self._reflink(src, tmp) else "copy"
+        if method == "copy":
+            shutil.copy2(src, tmp)  # copy_file_range/sendfile on Linux
+        os.replace(tmp, dest)
+        return method
+
+    def _execute(self, op: Operation):
+        if op.kind == "copy" and not op.skip and self.verify_hash and os.path.exists(op.dest) and \
+                os.path.getsize(op.dest) == op.size and _file_hash(op.dest) == _file_hash(op.src):
+            shutil.copystat(op.src, op.dest)
+            op.skip = True
+        if op.skip:
+            self._record({"id": op.id, "method": "skip", "backup": None})
+            return
+        if op.kind in ("move", "move_tree") and not os.path.lexists(op.src) and os.path.lexists(op.dest):
+            # Moved by an interrupted run before it could journal the move
+            backup = self._backup_path(op)
+            self._record({"id": op.id, "method": "rename", "backup": str(backup) if backup.exists() else None})
+            return
+        backup = self._backup(op)
+        if op.kind == "delete":
+            method = "delete"
+        elif op.kind in ("move", "move_tree") and _device(op.src) == _device(os.path.dirname(op.dest)):
+            os.rename(op.src, op.dest)
+            method = "rename"
+        elif op.kind in ("move", "move_tree"):
+            shutil.move(op.src, op.dest)
+            method = "copy"
+        else:
+            method = self._copy(op.src, op.dest)
+        self._record({"id": op.id, "method": method, "backup": backup})
+        self._log(f"{op.kind.replace('_', ' ').capitalize()} ({method}): {op.src or ''} -> {op.dest}")
+
+    def run(self, plan: Plan, resume: bool = False) -> Dict[str, int]:
+        """Execute a plan, skipping operations the journal already records when resuming."""
+        if not resume:
+            self.write_manifest(plan)
+        elif self.run_id is None:
+            self.load_manifest()
+        done = {entry["id"] for entry in self.journal()}
+        pending = [op for op in plan.operations if op.id not in done]
+        created = [d for d in plan.directories if not os.path.isdir(d)]
+        for directory in plan.directories:
+            os.makedirs(directory, exist_ok=True)
+        self.stats = {}
+        with open(self.journal_path, "a") as self._journal:
+            if created:
+                self._record({"id": -1, "method": "mkdir", "directories": created})
+            # Operations run in plan order; each run of consecutive copies goes to the thread pool
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                copies: List[Operation] = []
+                for op in pending + [None]:
+                    if op is not None and op.kind == "copy":
+                        copies.append(op)
+                        continue
+                    for future in [pool.submit(self._execute, copy) for copy in copies]:
+                        future.result()
+                    copies = []
+                    if op is not None:
+                        self._execute(op)
+        self.stats.pop("mkdir", None)
+        return self.stats
+
+    def rollback(self) -> int:
+        """Undo every journaled operation, newest first, restoring backups."""
+        if not self.journal_path.exists():
+            self._log("Nothing to roll back")
+            return 0
+        plan = self.load_manifest()
+        operations = {op.id: op for op in plan.operations}
+        undone = 0
+        for entry in reversed(self.journal()):
+            if entry["method"] == "mkdir":
+                for directory in sorted(entry["directories"], key=len, reverse=True):
+                    try:
+                        os.removedirs(directory)
+                    except OSError:
+                        pass
+                continue
+            op = operations[entry["id"]]
+            if entry["method"] in ("rename", "copy", "reflink") and os.path.lexists(op.dest):
+                if op.kind in ("move", "move_tree"):
+                    os.makedirs(os.path.dirname(op.src), exist_ok=True)
+                    shutil.move(op.dest, op.src)
+                else:
+                    os.unlink(op.dest)
+            if entry.get("backup") and os.path.lexists(entry["backup"]):
+                os.makedirs(os.path.dirname(op.dest), exist_ok=True)
+                shutil.move(entry["backup"], op.dest)
+            undone += entry["method"] != "skip"
+        self.journal_path.unlink(missing_ok=True)
+        shutil.rmtree(self.backup_dir, ignore_errors=True)
+        self._log(f"Rolled back {undone} operations")
+        return undone
+
+
+def add_arguments(parser: argparse.ArgumentParser, default_manifest: Path):
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Write the plan next to the manifest without changing files")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from its manifest")
+    parser.add_argument("--rollback", action="store_true", help="Undo the run recorded in the manifest")
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help="Threads used for copying")
+    parser.add_argument("--verify-hash", action="store_true",
+                        help="Compare contents of same-size files whose mtimes differ before copying")
+    parser.add_argument("--manifest", type=Path, default=default_manifest)
+
+
+def run_rules(rules: List[Rule], args: argparse.Namespace) -> Optional[Plan]:
+    """Plan, dry-run, execute, resume or roll back according to the command-line arguments."""
+    engine = ReorgEngine(args.manifest, args.workers, args.verify_hash)
+    if args.rollback:
+        engine.rollback()
+        return None
+    if args.resume:
+        plan = engine.load_manifest()
+    else:
+        started = time.perf_counter()
+        plan = build_plan(rules)
+        print(f"Planned {len(plan.operations)} operations in {time.perf_counter() - started:.2f}s: {plan.summary()}")
+    for missing in plan.missing:
+        print(f"Warning: Source not found: {missing}")
+    if args.dry_run:
+        plan_path = engine.write_plan(plan)
+        for op in plan.operations:
+            if not op.skip:
+                print(f"Would {op.kind.replace('_', ' ')}: {op.src or ''} -> {op.dest}")
+        print(f"\nDry run; plan written to {plan_path}")
+        return plan
+    started = time.perf_counter()
+    stats = engine.run(plan, resume=args.resume)
+    print(f"\nExecuted in {time.perf_counter() - started:.2f}s: {stats}")
+    print(f"Manifest: {args.manifest} (use --rollback to undo)")
+    return plan
@@ -4,12 +4,15 @@ Aetherial Platform Reorganization Script
 
 This script automates the reorganization of the whats_missing_and_needed directory
 into the main project structure based on predefined mapping rules.
+
+Files are planned and copied through reorg_engine, which skips unchanged
+files and records a manifest; see --dry-run, --resume and --rollback.
 """
 
-import os
-import shutil
+import argparse
 from pathlib import Path
-import yaml
+
+from reorg_engine import Rule, add_arguments, run_rules
 
 # Base directories
 ROOT_DIR = Path(__file__).parent.parent
@@ -61,96 +64,32 @@ SPECIAL_HANDLING = {
     }
 }
 
-def ensure_directory(path):
-    """Ensure directory exists, create if it doesn't."""
-    path.mkdir(parents=True, exist_ok=True)
-
-def copy_file(src, dest):
-    """Copy file from src to dest, creating parent directories if needed."""
-    ensure_directory(dest.parent)
-    shutil.copy2(src, dest)
-    print(f"Copied: {src} -> {dest}")
-
-def merge_directories(src, dest):
-    """Merge contents of src directory into dest directory."""
-    ensure_directory(dest)
-    
-    for item in os.listdir(src):
-        src_path = src / item
-        dest_path = dest / item
-        
-        if src_path.is_dir():
-            if dest_path.exists() and dest_path.is_dir():
-                merge_directories(src_path, dest_path)
-            else:
-                shutil.copytree(src_path, dest_path)
-                print(f"Copied directory: {src_path} -> {dest_path}")
-        else:
-            shutil.copy2(src_path, dest_path)
-            print(f"Copied file: {src_path} -> {dest_path}")
-
-def process_directory_mapping():
-    """Process the directory mapping to reorganize files."""
+def build_rules():
+    """Turn the mappings into engine rules (directories are mirrored unless merged)."""
+    rules = []
     for src_rel, dest_rel in DIRECTORY_MAPPING.items():
-        src = SRC_DIR / src_rel
-        dest = DEST_DIR / dest_rel
-        
-        if not src.exists():
-            print(f"Warning: Source directory not found: {src}")
-            continue
-            
+        dest, mode = dest_rel, "replace"
         if src_rel in SPECIAL_HANDLING:
             handle = SPECIAL_HANDLING[src_rel]
-            dest = DEST_DIR / handle["dest"]
-            if handle.get("merge", False):
-                merge_directories(src, dest)
-            else:
-                if dest.exists():
-                    shutil.rmtree(dest)
-                shutil.copytree(src, dest)
-                print(f"Copied directory with special handling: {src} -> {dest}")
-        else:
-            if dest.exists():
-                shutil.rmtree(dest)
-            shutil.copytree(src, dest)
-            print(f"Copied directory: {src} -> {dest}")
+            dest = handle["dest"]
+            mode = "merge" if handle.get("merge", False) else "replace"
+        rules.append(Rule(SRC_DIR / src_rel, DEST_DIR / dest, mode))
 
-def process_file_mapping():
-    """Process the file mapping to reorganize individual files."""
     for src_file, dest_file in FILE_MAPPING.items():
-        src = SRC_DIR / src_file
-        dest = DEST_DIR / dest_file
-        
-        if not src.exists():
-            print(f"Warning: Source file not found: {src}")
-            continue
-            
-        copy_file(src, dest)
+        rules.append(Rule(SRC_DIR / src_file, DEST_DIR / dest_file))
 
-def process_special_handling():
-    """Process special handling rules."""
     for rel_path, config in SPECIAL_HANDLING.items():
         if "file" in config:  # For file-specific handling if needed
-            src = SRC_DIR / rel_path / config["file"]
-            dest = DEST_DIR / config["dest"]
-            if src.exists():
-                copy_file(src, dest)
+            rules.append(Rule(SRC_DIR / rel_path / config["file"], DEST_DIR / config["dest"]))
+    return rules
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reorganize whats_missing_and_needed into the project structure")
+    add_arguments(parser, ROOT_DIR / ".reorg" / "reorganize_platform.json")
+    args = parser.parse_args(argv)
 
-def main():
     print("Starting Aetherial Platform reorganization...")
-    
-    # Process directory mappings
-    print("\nProcessing directory mappings...")
-    process_directory_mapping()
-    
-    # Process file mappings
-    print("\nProcessing file mappings...")
-    process_file_mapping()
-    
-    # Process special handling
-    print("\nProcessing special handling...")
-    process_special_handling()
-    
+    run_rules(build_rules(), args)
     print("\nReorganization complete!")
 
 if __name__ == "__main__":
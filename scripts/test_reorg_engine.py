@@ -0,0 +1,161 @@
+import argparse
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from reorg_engine import ReorgEngine, Rule, add_arguments, build_plan, run_rules
+
+class InterruptingEngine(ReorgEngine):
+    """Fails after executing `limit` operations, like a run killed part way"""
+
+    def __init__(self, *args, limit=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limit = limit
+
+    def _execute(self, op):
+        if self.limit == 0:
+            raise KeyboardInterrupt
+        self.limit -= 1
+        super()._execute(op)
+
+class ReorgEngineTest(unittest.TestCase):
+    """Tests for planned, resumable reorganization"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.manifest = self.root / "state" / "manifest.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, rel, text):
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        return path
+
+    def _files(self, rel):
+        base = self.root / rel
+        return sorted(str(p.relative_to(base)) for p in base.rglob("*") if p.is_file())
+
+    def _run(self, rules, **kwargs):
+        engine = ReorgEngine(self.manifest, workers=2, verbose=False)
+        return engine.run(build_plan(rules), **kwargs)
+
+    def _args(self, *argv):
+        parser = argparse.ArgumentParser()
+        add_arguments(parser, self.manifest)
+        return parser.parse_args(list(argv) + ["--workers", "2"])
+
+    def test_skips_unchanged_files(self):
+        self._write("src/a.txt", "a")
+        self._write("src/b.txt", "b")
+        rules = [Rule(self.root / "src", self.root / "out")]
+        self.assertEqual(self._run(rules), {"copy": 2})
+        self.assertEqual(self._run(rules), {"skip": 2})
+
+        self._write("src/b.txt", "changed")
+        self.assertEqual(self._run(rules), {"skip": 1, "copy": 1})
+        self.assertEqual((self.root / "out/b.txt").read_text(), "changed")
+
+    def test_move_tree_is_one_rename(self):
+        self._write("src/pkg/a.txt", "a")
+        self._write("src/pkg/sub/b.txt", "b")
+        plan = build_plan([Rule(self.root / "src/pkg", self.root / "dest/pkg", "move")])
+        self.assertEqual([op.kind for op in plan.operations], ["move_tree"])
+        ReorgEngine(self.manifest, verbose=False).run(plan)
+        self.assertFalse((self.root / "src/pkg").exists())
+        self.assertEqual(self._files("dest/pkg"), ["a.txt", "sub/b.txt"])
+
+    def test_replace_mirrors_source(self):
+        self._write("src/a.txt", "a")
+        self._write("out/a.txt", "old")
+        self._write("out/stale.txt", "stale")
+        self._run([Rule(self.root / "src", self.root / "out", "replace")])
+        self.assertEqual(self._files("out"), ["a.txt"])
+        self.assertEqual((self.root / "out/a.txt").read_text(), "a")
+
+    def test_replace_keeps_files_of_later_rules(self):
+        self._write("src/docs/a.md", "a")
+        self._write("src/PLAN.md", "plan")
+        rules = [
+            Rule(self.root / "src/docs", self.root / "docs", "replace"),
+            Rule(self.root / "src/PLAN.md", self.root / "docs/development/PLAN.md"),
+        ]
+        for _ in range(2):
+            self._run(rules)
+            self.assertEqual(self._files("docs"), ["a.md", "development/PLAN.md"])
+        self.assertEqual([op.kind for op in build_plan(rules).operations], ["copy", "copy"])
+
+    def test_resume_after_interrupted_run(self):
+        for name in "abcd":
+            self._write(f"src/{name}.txt", name)
+        self._write("other/moved.txt", "moved")
+        rules = [Rule(self.root / "other/moved.txt", self.root / "out/moved.txt", "move"),
+                 Rule(self.root / "src", self.root / "out")]
+        with self.assertRaises(KeyboardInterrupt):
+            InterruptingEngine(self.manifest, workers=1, verbose=False, limit=2).run(build_plan(rules))
+        journaled = len(ReorgEngine(self.manifest).journal())
+
+        run_rules(rules, self._args("--resume"))
+        journal = [entry["id"] for entry in ReorgEngine(self.manifest).journal() if entry["id"] >= 0]
+        self.assertGreater(journaled, 0)
+        self.assertEqual(sorted(journal), list(range(5)))
+        self.assertEqual(self._files("out"), ["a.txt", "b.txt", "c.txt", "d.txt", "moved.txt"])
+
+    def test_rollback_restores_backups(self):
+        self._write("src/a.txt", "new")
+        self._write("other/moved.txt", "moved")
+        self._write("out/a.txt", "old")
+        self._write("out/stale.txt", "stale")
+        rules = [Rule(self.root / "other/moved.txt", self.root / "elsewhere/moved.txt", "move"),
+                 Rule(self.root / "src", self.root / "out", "replace")]
+        run_rules(rules, self._args())
+        self.assertEqual(self._files("out"), ["a.txt"])
+
+        run_rules(rules, self._args("--rollback"))
+        self.assertEqual((self.root / "out/a.txt").read_text(), "old")
+        self.assertEqual((self.root / "out/stale.txt").read_text(), "stale")
+        self.assertEqual((self.root / "other/moved.txt").read_text(), "moved")
+        self.assertFalse((self.root / "elsewhere").exists())
+
+    def test_rollback_after_dry_run_is_a_no_op(self):
+        self._write("src/a.txt", "a")
+        rules = [Rule(self.root / "src", self.root / "out")]
+        run_rules(rules, self._args("--dry-run"))
+        self.assertEqual(ReorgEngine(self.manifest, verbose=False).rollback(), 0)
+        self.assertFalse((self.root / "out").exists())
+
+    def test_dry_run_keeps_last_run_journal(self):
+        self._write("src/a.txt", "new")
+        self._write("out/a.txt", "old")
+        rules = [Rule(self.root / "src", self.root / "out")]
+        run_rules(rules, self._args())
+        run_rules(rules, self._args("--dry-run"))
+        self.assertTrue(ReorgEngine(self.manifest).plan_path.exists())
+
+        run_rules(rules, self._args("--rollback"))
+        self.assertEqual((self.root / "out/a.txt").read_text(), "old")
+
+    def test_rollback_undoes_only_the_last_run(self):
+        self._write("src/a.txt", "first")
+        self._write("out/a.txt", "old")
+        self._write("out/junk.txt", "junk one")
+        rules = [Rule(self.root / "src", self.root / "out", "replace")]
+        run_rules(rules, self._args())
+
+        self._write("src/a.txt", "second run")
+        self._write("src/extra.txt", "extra")
+        self._write("out/junk.txt", "junk two")
+        run_rules(rules, self._args())
+        self.assertEqual(self._files("out"), ["a.txt", "extra.txt"])
+
+        run_rules(rules, self._args("--rollback"))
+        self.assertEqual(self._files("out"), ["a.txt", "junk.txt"])
+        self.assertEqual((self.root / "out/a.txt").read_text(), "first")
+        self.assertEqual((self.root / "out/junk.txt").read_text(), "junk two")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Aetherial Pre-fork Serving Benchmark
+
+Serves greedy generation from a randomly initialised GPT-2 style model over
+HTTP with 1..N pre-forked workers and measures memory and throughput for
+each way of holding the weights:
+
+- ``per-worker``: every worker loads its own copy (what `uvicorn --workers` does)
+- ``fork``: loaded once before fork, shared copy-on-write
+- ``shm``: loaded once into shared memory
+- ``mmap``: mapped copy-on-write from a safetensors file
+
+Every run gets a fresh master process. Memory is reported as the workers'
+summed RSS (what `ps` shows, counting shared pages once per process) and
+the summed PSS of master and workers (shared pages split between the
+processes mapping them, i.e. the real footprint).
+"""
+
+import http.client
+import json
+import logging
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from prefork import PreforkServer, load_weights, save_weights, share_weights
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%m/%d/%Y %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+MODES = ["per-worker", "fork", "shm", "mmap"]
+
+
+def build_model(hidden_size: int, num_layers: int, vocab_size: int) -> GPT2LMHeadModel:
+    torch.manual_seed(0)
+    config = GPT2Config(n_embd=hidden_size, n_layer=num_layers, n_head=8, vocab_size=vocab_size, n_positions=256)
+    return GPT2LMHeadModel(config).eval()
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Rss and Pss in bytes from /proc/<pid>/smaps_rollup."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0]) * 1024
+    return memory
+
+
+def make_serve(model: Optional[torch.nn.Module], model_args: dict, weights_file: str):
+    def serve(sock, worker_index):
+        worker_model = model
+        if worker_model is None:
+            # Per-worker loading, as when every uvicorn worker imports the app
+            worker_model = build_model(**model_args)
+            worker_model.load_state_dict(load_weights(weights_file))
+            worker_model.tie_weights()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                input_ids = torch.tensor([body["input_ids"]])
+                with torch.no_grad():
+                    output = worker_model.generate(input_ids, attention_mask=torch.ones_like(input_ids),
+                                                   max_new_tokens=body["max_new_tokens"], do_sample=False,
+                                                   pad_token_id=0)
+                payload = json.dumps({"tokens": output.shape[1] - input_ids.shape[1], "worker": worker_index}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer(sock.getsockname(), Handler, bind_and_activate=False)
+        server.socket = sock
+        server.serve_forever()
+    return serve
+
+
+def post_generate(port: int, prompt_tokens: int, new_tokens: int, vocab_size: int) -> dict:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    body = json.dumps({
+        "input_ids": torch.randint(0, vocab_size, (prompt_tokens,)).tolist(),
+        "max_new_tokens": new_tokens,
+    })
+    connection.request("POST", "/generate", body, {"Content-Type": "application/json"})
+    response = json.loads(connection.getresponse().read())
+    connection.close()
+    return response
+
+
+def run_one(mode: str, workers: int, requests: int, model_args: dict, weights_file: str,
+            prompt_tokens: int = 16, new_tokens: int = 16) -> Dict:
+    model = None
+    if mode != "per-worker":
+        model = build_model(**model_args)
+        share_weights(model, mode, weights_file)
+    server = PreforkServer("127.0.0.1", 0, workers)
+    pids = server.start(make_serve(model, model_args, weights_file))
+    try:
+        call = lambda _: post_generate(server.port, prompt_tokens, new_tokens, model_args["vocab_size"])
+        with ThreadPoolExecutor(max_workers=2 * workers) as pool:
+            list(pool.map(call, range(2 * workers)))  # Warm up (and load, for per-worker) every worker
+            started = time.perf_counter()
+            responses = list(pool.map(call, range(requests)))
+            elapsed = time.perf_counter() - started
+        workers_memory = [process_memory(pid) for pid in pids]
+        master = process_memory(os.getpid())
+    finally:
+        server.stop()
+    generated = sum(r["tokens"] for r in responses)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "requests_per_second": requests / elapsed,
+        "tokens_per_second": generated / elapsed,
+        "workers_used": len({r["worker"] for r in responses}),
+        "workers_rss_mb": sum(m["rss"] for m in workers_memory) / 2 ** 20,
+        "workers_pss_mb": sum(m["pss"] for m in workers_memory) / 2 ** 20,
+        "master_pss_mb": master["pss"] / 2 ** 20,
+        "total_pss_mb": (sum(m["pss"] for m in workers_memory) + master["pss"]) / 2 ** 20,
+    }
+
+
+def run_benchmark(worker_counts: List[int], modes: List[str], requests: int = 32, hidden_size: int = 512,
+                  num_layers: int = 8, vocab_size: int = 16384) -> List[Dict]:
+    model_args = dict(hidden_size=hidden_size, num_layers=num_layers, vocab_size=vocab_size)
+    model = build_model(**model_args)
+    weight_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / 2 ** 20
+    logger.info(f"Model weights: {weight_mb:.0f} MiB")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        weights_file = os.path.join(tmp, "model.safetensors")
+        save_weights(model, weights_file)
+        del model
+        for mode in modes:
+            for workers in worker_counts:
+                # A fresh master per run, so its memory holds only this run's model
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as master:
+                    result = master.submit(run_one, mode, workers, requests, model_args, weights_file).result()
+                result["weights_mb"] = weight_mb
+                results.append(result)
+                logger.info(
+                    f"{mode} x{workers}: {result['requests_per_second']:.2f} req/s, "
+                    f"RSS {result['workers_rss_mb']:.0f} MiB, PSS {result['total_pss_mb']:.0f} MiB"
+                )
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function for the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aetherial pre-fork serving benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--requests", type=int, default=32, help="Measured requests per run")
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.workers, args.modes, args.requests, args.hidden_size, args.layers)
+
+    print(f"{'mode':>10} {'workers':>7} {'req/s':>8} {'tokens/s':>9} {'RSS MiB':>8} {'PSS MiB':>8}")
+    for result in results:
+        print(f"{result['mode']:>10} {result['workers']:>7} {result['requests_per_second']:>8.2f} "
+              f"{result['tokens_per_second']:>9.1f} {result['workers_rss_mb']:>8.0f} {result['total_pss_mb']:>8.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
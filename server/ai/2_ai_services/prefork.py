@@ -0,0 +1,229 @@
+"""
+Pre-fork serving with model weights shared between worker processes.
+
+`uvicorn --workers N` imports the app in every worker, so every worker
+loads its own copy of the model. Here the master loads the model once,
+moves the weights into shared memory (or maps them copy-on-write from a
+safetensors file), binds the listening socket and then forks the
+workers, which map the same physical pages and accept on the shared
+socket. Each worker is pinned to its own slice of CPUs with a matching
+`torch.set_num_threads`, so N workers do not oversubscribe the cores.
+"""
+
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+SHARE_MODES = ("shm", "mmap", "fork")
+
+
+def share_weights(model: torch.nn.Module, mode: str = "shm", path: Optional[str] = None) -> torch.nn.Module:
+    """Prepare `model` so forked workers share its weights instead of copying them.
+
+    - ``shm``: parameters and buffers move into shared memory.
+    - ``mmap``: weights are written to (or read from) the safetensors file
+      `path` and re-bound as copy-on-write (MAP_PRIVATE) mappings of it, so
+      unmodified pages live in the page cache and are shared by every
+      process mapping the file.
+    - ``fork``: leave the weights in private memory and rely on
+      copy-on-write after fork.
+    """
+    if mode not in SHARE_MODES:
+        raise ValueError(f"Unknown share mode {mode}; expected one of {SHARE_MODES}")
+    model.eval()
+    model.requires_grad_(False)
+    if mode == "shm":
+        model.share_memory()
+    elif mode == "mmap":
+        if path is None:
+            raise ValueError("mmap sharing needs a safetensors path")
+        if not Path(path).exists():
+            save_weights(model, path)
+        # assign=True rebinds the parameters to the mapped tensors instead of copying into them
+        model.load_state_dict(load_weights(path), strict=False, assign=True)
+        if hasattr(model, "tie_weights"):
+            model.tie_weights()
+    return model
+
+
+def save_weights(model: torch.nn.Module, path: str):
+    """Write the state dict as safetensors, storing tied tensors once and recording their aliases."""
+    from safetensors.torch import save_file
+
+    tensors, aliases, names = {}, {}, {}
+    for name, tensor in model.state_dict().items():
+        key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape))
+        if key in names:
+            aliases[name] = names[key]
+        else:
+            names[key] = name
+            tensors[name] = tensor.contiguous()
+    save_file(tensors, path, metadata={"aliases": json.dumps(aliases)})
+
+
+def load_weights(path: str) -> Dict[str, torch.Tensor]:
+    """Memory-map a safetensors file into a state dict, restoring aliases written by `save_weights`."""
+    from safetensors import safe_open
+    from safetensors.torch import load_file
+
+    with safe_open(path, framework="pt") as f:
+        metadata = f.metadata() or {}
+    state = load_file(path)
+    for alias, name in json.loads(metadata.get("aliases", "{}")).items():
+        state[alias] = state[name]
+    return state
+
+
+def worker_cpu_sets(workers: int, cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """Split the available CPUs into one contiguous slice per worker.
+
+    With more workers than CPUs, workers share single CPUs round-robin.
+    """
+    cpus = sorted(cpus if cpus is not None else os.sched_getaffinity(0))
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    size, extra = divmod(len(cpus), workers)
+    sets, start = [], 0
+    for i in range(workers):
+        end = start + size + (i < extra)
+        sets.append(cpus[start:end])
+        start = end
+    return sets
+
+
+def configure_worker(cpus: List[int], pin: bool = True):
+    """Pin the current process to `cpus` and size torch's thread pools to match."""
+    if pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(len(cpus))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already fixed by earlier parallel work in this process
+
+
+class PreforkServer:
+    """Binds one listening socket and forks workers that all accept on it.
+
+    `serve(sock, worker_index)` runs in each worker and should block
+    serving requests on `sock`. Workers that exit are restarted until
+    `stop()` is called.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = 1,
+                 cpus: Optional[List[int]] = None, pin_cpus: bool = True, backlog: int = 2048):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.cpu_sets = worker_cpu_sets(workers, cpus)
+        self.pin_cpus = pin_cpus
+        self.backlog = backlog
+        self.sock: Optional[socket.socket] = None
+        self.pids: Dict[int, int] = {}  # pid -> worker index
+        self._serve: Optional[Callable[[socket.socket, int], None]] = None
+        self._stopping = False
+
+    def bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = index
+            return
+        # Worker: never return into the master's code
+        status = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            configure_worker(self.cpu_sets[index], self.pin_cpus)
+            self._serve(self.sock, index)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+
+    def start(self, serve: Callable[[socket.socket, int], None]) -> List[int]:
+        """Bind, fork the workers and return their pids without blocking."""
+        self._serve = serve
+        self._stopping = False
+        self.sock = self.bind()
+        # Keep the collector from touching (and so copying) every object page in every worker
+        gc.collect()
+        gc.freeze()
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Started {self.workers} workers on {self.host}:{self.port}: {sorted(self.pids)}")
+        return list(self.pids)
+
+    def supervise(self, poll_seconds: float = 0.5):
+        """Restart workers that die, until `stop()` is called."""
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(poll_seconds)
+                continue
+            index = self.pids.pop(pid, None)
+            if index is not None and not self._stopping:
+                logger.warning(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+                self._spawn(index)
+
+    def stop(self, timeout: float = 10.0):
+        """Terminate the workers and close the listening socket."""
+        self._stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            for pid in list(self.pids):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        self.pids.pop(pid)
+                except ChildProcessError:
+                    self.pids.pop(pid)
+            time.sleep(0.05)
+        for pid in list(self.pids):
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.pids.pop(pid)
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        gc.unfreeze()
+
+    def run(self, serve: Callable[[socket.socket, int], None]):
+        """Start the workers and supervise them until SIGINT/SIGTERM."""
+        def handle_signal(signum, frame):
+            self._stopping = True
+
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+        self.start(serve)
+        try:
+            self.supervise()
+        finally:
+            self.stop()
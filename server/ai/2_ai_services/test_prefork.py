@@ -0,0 +1,77 @@
+import os
+import signal
+import socket
+import tempfile
+import time
+import unittest
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from prefork import PreforkServer, share_weights, worker_cpu_sets
+
+def echo_worker(sock, worker_index):
+    """Answers every connection with the worker index and the weight checksum it sees"""
+    while True:
+        connection, _ = sock.accept()
+        with connection:
+            connection.sendall(f"{worker_index} {os.getpid()} {torch.get_num_threads()}".encode())
+
+def ask(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as connection:
+        index, pid, threads = connection.recv(64).decode().split()
+    return int(index), int(pid), int(threads)
+
+class PreforkTest(unittest.TestCase):
+    """Tests for pre-fork serving with shared weights"""
+
+    def _model(self):
+        torch.manual_seed(0)
+        return GPT2LMHeadModel(GPT2Config(n_layer=1, n_embd=32, n_head=2, vocab_size=100, n_positions=32))
+
+    def test_cpu_sets(self):
+        self.assertEqual(worker_cpu_sets(2, [0, 1, 2, 3, 4]), [[0, 1, 2], [3, 4]])
+        self.assertEqual(worker_cpu_sets(3, [0, 1]), [[0], [1], [0]])
+
+    def test_share_weights_shm(self):
+        model = share_weights(self._model(), "shm")
+        self.assertTrue(all(p.is_shared() for p in model.parameters()))
+        self.assertFalse(any(p.requires_grad for p in model.parameters()))
+
+    def test_share_weights_mmap(self):
+        reference = self._model()
+        input_ids = torch.randint(0, 100, (1, 8))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.safetensors")
+            model = share_weights(self._model(), "mmap", path)
+            self.assertTrue(os.path.exists(path))
+            # A second process-style load from the existing file
+            mapped = share_weights(GPT2LMHeadModel(reference.config), "mmap", path)
+            self.assertIs(mapped.lm_head.weight, mapped.transformer.wte.weight)
+            with torch.no_grad():
+                expected = reference.eval()(input_ids).logits
+                self.assertTrue(torch.allclose(model(input_ids).logits, expected))
+                self.assertTrue(torch.allclose(mapped(input_ids).logits, expected))
+
+    def test_workers_accept_and_restart(self):
+        server = PreforkServer("127.0.0.1", 0, workers=2, cpus=[0], pin_cpus=False)
+        pids = server.start(echo_worker)
+        try:
+            self.assertEqual(len(pids), 2)
+            index, pid, threads = ask(server.port)
+            self.assertIn(pid, pids)
+            self.assertEqual(threads, 1)
+
+            os.kill(pids[0], signal.SIGKILL)
+            os.waitpid(pids[0], 0)
+            server.pids.pop(pids[0])
+            server._spawn(0)
+            self.assertEqual(len(server.pids), 2)
+            seen = {ask(server.port)[1] for _ in range(10)}
+            self.assertTrue(seen <= set(server.pids))
+        finally:
+            server.stop()
+        self.assertEqual(server.pids, {})
+
+if __name__ == '__main__':
+    unittest.main()
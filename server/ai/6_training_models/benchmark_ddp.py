@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Aetherial DDP Scaling Benchmark
+
+Measures data-parallel training throughput on one host at several process
+counts using the same launcher as train.py, on a small synthetic causal LM.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data.distributed import DistributedSampler
+
+from ddp import DistributedConfig, launch
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%m/%d/%Y %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+class TinyCausalLM(nn.Module):
+    """Small transformer LM sized so CPU steps take tens of milliseconds."""
+
+    def __init__(self, vocab_size: int = 4096, hidden_size: int = 256, num_layers: int = 2, num_heads: int = 4):
+        super().__init__()
+        self.embed = nn.Embedding(vocab_size, hidden_size)
+        layer = nn.TransformerEncoderLayer(
+            hidden_size, num_heads, dim_feedforward=4 * hidden_size, batch_first=True
+        )
+        self.encoder = nn.TransformerEncoder(layer, num_layers)
+        self.head = nn.Linear(hidden_size, vocab_size)
+
+    def forward(self, input_ids: torch.Tensor) -> torch.Tensor:
+        seq_len = input_ids.shape[1]
+        mask = nn.Transformer.generate_square_subsequent_mask(seq_len)
+        hidden = self.encoder(self.embed(input_ids), mask=mask, is_causal=True)
+        return self.head(hidden)
+
+
+def _benchmark_worker(local_rank: int, settings: dict, result_path: str):
+    """Train for a fixed number of steps and record global samples/sec on rank 0."""
+    torch.manual_seed(0)
+    distributed = local_rank >= 0
+    world_size = dist.get_world_size() if distributed else 1
+    rank = dist.get_rank() if distributed else 0
+
+    num_samples = settings['steps'] * settings['batch_size'] * settings['max_procs']
+    data = torch.randint(0, settings['vocab_size'], (num_samples, settings['seq_len'] + 1))
+    dataset = TensorDataset(data)
+    sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=True) if distributed else None
+    loader = DataLoader(dataset, batch_size=settings['batch_size'], sampler=sampler, shuffle=sampler is None)
+
+    model = TinyCausalLM(vocab_size=settings['vocab_size'])
+    if distributed:
+        model = DistributedDataParallel(model, bucket_cap_mb=settings['bucket_cap_mb'])
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+
+    steps = 0
+    start = None
+    for (batch,) in loader:
+        if steps == settings['warmup_steps']:
+            if distributed:
+                dist.barrier()
+            start = time.perf_counter()
+        inputs, labels = batch[:, :-1], batch[:, 1:]
+        logits = model(inputs)
+        loss = F.cross_entropy(logits.reshape(-1, logits.shape[-1]), labels.reshape(-1))
+        optimizer.zero_grad(set_to_none=True)
+        loss.backward()
+        optimizer.step()
+        steps += 1
+        if steps >= settings['warmup_steps'] + settings['steps']:
+            break
+
+    if distributed:
+        dist.barrier()
+    elapsed = time.perf_counter() - start
+
+    if rank == 0:
+        measured = steps - settings['warmup_steps']
+        samples = measured * settings['batch_size'] * world_size
+        with open(result_path, 'w') as f:
+            json.dump({
+                'processes': world_size,
+                'steps': measured,
+                'elapsed_seconds': elapsed,
+                'samples_per_second': samples / elapsed,
+                'tokens_per_second': samples * settings['seq_len'] / elapsed,
+                'threads_per_worker': torch.get_num_threads(),
+            }, f)
+
+
+def run_benchmark(process_counts: List[int], steps: int = 20, warmup_steps: int = 3,
+                  batch_size: int = 8, seq_len: int = 128, vocab_size: int = 4096,
+                  bucket_cap_mb: int = 25, master_port: int = 29600) -> List[Dict]:
+    """Run the synthetic workload once per process count and return the results."""
+    settings = dict(
+        steps=steps, warmup_steps=warmup_steps, batch_size=batch_size, seq_len=seq_len,
+        vocab_size=vocab_size, bucket_cap_mb=bucket_cap_mb, max_procs=max(process_counts),
+    )
+    results = []
+    for i, nproc in enumerate(process_counts):
+        dist_config = DistributedConfig(
+            nproc_per_node=nproc, master_port=master_port + i, bucket_cap_mb=bucket_cap_mb
+        )
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+        try:
+            launch(_benchmark_worker, dist_config, args=(settings, result_path))
+            with open(result_path) as f:
+                result = json.load(f)
+        finally:
+            os.unlink(result_path)
+
+        result['speedup'] = result['samples_per_second'] / results[0]['samples_per_second'] if results else 1.0
+        results.append(result)
+        logger.info(
+            f"{nproc} process(es): {result['samples_per_second']:.1f} samples/s, "
+            f"{result['tokens_per_second']:.0f} tokens/s, speedup {result['speedup']:.2f}x"
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function for the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aetherial DDP scaling benchmark")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to measure")
+    parser.add_argument("--steps", type=int, default=20, help="Measured optimizer steps per run")
+    parser.add_argument("--warmup-steps", type=int, default=3, help="Unmeasured warmup steps per run")
+    parser.add_argument("--batch-size", type=int, default=8, help="Per-process batch size")
+    parser.add_argument("--seq-len", type=int, default=128, help="Tokens per sample")
+    parser.add_argument("--bucket-cap-mb", type=int, default=25, help="DDP gradient bucket size")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.procs, steps=args.steps, warmup_steps=args.warmup_steps, batch_size=args.batch_size,
+        seq_len=args.seq_len, bucket_cap_mb=args.bucket_cap_mb,
+    )
+
+    print(f"{'procs':>5} {'samples/s':>12} {'tokens/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for result in results:
+        efficiency = result['speedup'] / result['processes']
+        print(f"{result['processes']:>5} {result['samples_per_second']:>12.1f} "
+              f"{result['tokens_per_second']:>12.0f} {result['speedup']:>7.2f}x {efficiency:>9.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Aetherial Deduplication Benchmark
+
+Runs the MinHash/LSH deduplication stage on a synthetic corpus with known
+exact and near duplicates at several process counts and memory budgets,
+and reports throughput, peak memory of the coordinating process and how
+many of the planted duplicates were found.
+"""
+
+import json
+import logging
+import multiprocessing as mp
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from dedup import Deduplicator
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%m/%d/%Y %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def make_corpus(num_docs: int, words_per_doc: int, duplicate_fraction: float, seed: int = 0):
+    """Unique random documents followed by planted duplicates; returns (texts, planted count).
+
+    Half the duplicates are reformatted exact copies and half have 2% of their words changed.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(50000)]
+    num_duplicates = int(num_docs * duplicate_fraction)
+    docs = [" ".join(rng.choices(vocabulary, k=words_per_doc)) for _ in range(num_docs - num_duplicates)]
+    for i in range(num_duplicates):
+        source = docs[rng.randrange(len(docs))].split()
+        if i % 2:
+            for position in rng.sample(range(words_per_doc), max(1, words_per_doc // 50)):
+                source[position] = rng.choice(vocabulary)
+            docs.append(" ".join(source))
+        else:
+            docs.append("  ".join(source).upper())
+    return docs, num_duplicates
+
+
+def run_one(texts: List[str], num_proc: Optional[int], max_memory_mb: float) -> Dict:
+    from datasets import Dataset
+
+    dataset = Dataset.from_dict({'text': texts})
+    with tempfile.TemporaryDirectory() as tmp:
+        deduplicator = Deduplicator(num_proc=num_proc, max_memory_mb=max_memory_mb, work_dir=tmp)
+        started = time.perf_counter()
+        _, stats = deduplicator.deduplicate(dataset)
+        elapsed = time.perf_counter() - started
+        partitions = deduplicator._num_partitions(len(dataset))
+    stats.update(
+        seconds=elapsed,
+        partitions=partitions,
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+    return stats
+
+
+def run_benchmark(procs: List[int], memory_budgets: List[float], num_docs: int = 20000,
+                  words_per_doc: int = 300, duplicate_fraction: float = 0.2) -> List[Dict]:
+    texts, planted = make_corpus(num_docs, words_per_doc, duplicate_fraction)
+    logger.info(f"Corpus: {len(texts)} documents, {planted} planted duplicates")
+
+    results = []
+    for max_memory_mb in memory_budgets:
+        for num_proc in procs:
+            # A fresh process per run, so peak memory and dataset caches belong to this run only
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                stats = pool.submit(run_one, texts, num_proc if num_proc > 1 else None, max_memory_mb).result()
+            stats.update(
+                processes=num_proc,
+                max_memory_mb=max_memory_mb,
+                planted_duplicates=planted,
+                docs_per_second=len(texts) / stats['seconds'],
+            )
+            results.append(stats)
+            logger.info(
+                f"{num_proc} procs, {max_memory_mb} MiB: {stats['docs_per_second']:.0f} docs/s, "
+                f"removed {stats['documents_removed']}/{planted}, peak RSS {stats['peak_rss_mb']:.0f} MiB"
+            )
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function for the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aetherial deduplication benchmark")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4], help="Process counts to measure")
+    parser.add_argument("--max-memory-mb", type=float, nargs="+", default=[512, 4],
+                        help="Bucket sorting memory budgets to measure")
+    parser.add_argument("--docs", type=int, default=20000, help="Documents in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=300, help="Words per document")
+    parser.add_argument("--duplicate-fraction", type=float, default=0.2, help="Fraction of planted duplicates")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.procs, args.max_memory_mb, args.docs, args.words, args.duplicate_fraction)
+
+    print(f"{'procs':>5} {'budget MiB':>10} {'parts':>5} {'docs/s':>8} {'removed':>8} {'planted':>8} "
+          f"{'tokens removed':>14} {'peak MiB':>8}")
+    for result in results:
+        print(f"{result['processes']:>5} {result['max_memory_mb']:>10g} {result['partitions']:>5} "
+              f"{result['docs_per_second']:>8.0f} {result['documents_removed']:>8} {result['planted_duplicates']:>8} "
+              f"{result['tokens_removed']:>14} {result['peak_rss_mb']:>8.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Aetherial Asynchronous Checkpointing
+
+This module snapshots training state into reusable CPU buffers and writes
+sharded safetensors checkpoints on a background thread, so the training loop
+only stalls for the device-to-host copy. Checkpoints use the Hugging Face
+layout (`model.safetensors.index.json`, `optimizer.pt`, `scheduler.pt`,
+`trainer_state.json`) and can be passed to `Trainer.train(resume_from_checkpoint=...)`.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import TrainerCallback
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+SAFE_WEIGHTS_INDEX_NAME = "model.safetensors.index.json"
+OPTIMIZER_NAME = "optimizer.pt"
+SCHEDULER_NAME = "scheduler.pt"
+RNG_STATE_NAME = "rng_state.pth"
+TRAINER_STATE_NAME = "trainer_state.json"
+CHECKPOINT_PREFIX = "checkpoint"
+
+_CHECKPOINT_RE = re.compile(rf"^{CHECKPOINT_PREFIX}-(\d+)$")
+
+def _sha256(path: Path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path: Path):
+    """Persist directory entries (renames) where the platform supports it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def plan_shards(state_dict: Dict[str, torch.Tensor], max_shard_bytes: int) -> List[Dict[str, torch.Tensor]]:
+    """Greedily split tensors, in order, into shards of at most `max_shard_bytes`."""
+    shards: List[Dict[str, torch.Tensor]] = [{}]
+    shard_bytes = 0
+    for name, tensor in state_dict.items():
+        size = tensor.numel() * tensor.element_size()
+        if shards[-1] and shard_bytes + size > max_shard_bytes:
+            shards.append({})
+            shard_bytes = 0
+        shards[-1][name] = tensor
+        shard_bytes += size
+    return shards
+
+
+def checkpoint_step(path: Path) -> Optional[int]:
+    match = _CHECKPOINT_RE.match(Path(path).name)
+    return int(match.group(1)) if match else None
+
+
+def verify_checkpoint(checkpoint_dir: str, check_hashes: bool = True) -> bool:
+    """Check a checkpoint directory against its integrity manifest."""
+    checkpoint_dir = Path(checkpoint_dir)
+    manifest_path = checkpoint_dir / MANIFEST_NAME
+    if not manifest_path.is_file():
+        return False
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    for name, entry in manifest.get('files', {}).items():
+        path = checkpoint_dir / name
+        if not path.is_file() or path.stat().st_size != entry['size']:
+            return False
+        if check_hashes and _sha256(path) != entry['sha256']:
+            return False
+    return True
+
+
+def find_latest_checkpoint(output_dir: str, check_hashes: bool = False) -> Optional[str]:
+    """Return the newest checkpoint under `output_dir` that passes verification."""
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return None
+    candidates = sorted(
+        (p for p in output_dir.iterdir() if p.is_dir() and checkpoint_step(p) is not None),
+        key=checkpoint_step,
+        reverse=True,
+    )
+    for candidate in candidates:
+        if verify_checkpoint(candidate, check_hashes=check_hashes):
+            return str(candidate)
+        logger.warning(f"Skipping incomplete or corrupt checkpoint {candidate}")
+    return None
+
+
+def load_model_shards(checkpoint_dir: str) -> Dict[str, torch.Tensor]:
+    """Memory-map every model shard of a checkpoint; tensors are paged in on access."""
+    checkpoint_dir = Path(checkpoint_dir)
+    with open(checkpoint_dir / SAFE_WEIGHTS_INDEX_NAME) as f:
+        weight_map = json.load(f)['weight_map']
+
+    state_dict = {}
+    for shard_name in sorted(set(weight_map.values())):
+        with safe_open(str(checkpoint_dir / shard_name), framework="pt", device="cpu") as shard:
+            for key in shard.keys():
+                state_dict[key] = shard.get_tensor(key)
+    return state_dict
+
+
+def rng_state() -> Dict[str, Any]:
+    """Capture RNG states in the format the Trainer restores on resume."""
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "cpu": torch.random.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.random.get_rng_state_all()
+    return state
+
+
+class AsyncCheckpointer:
+    """Writes sharded checkpoints on a background thread.
+
+    `save()` copies every tensor into CPU snapshot buffers that are allocated
+    once (pinned when CUDA is available) and reused across saves, then hands the
+    snapshot to a single writer thread. A save waits for the previous write to
+    finish before overwriting the buffers.
+    """
+
+    def __init__(self, output_dir: str, max_shard_size_mb: int = 2048,
+                 save_total_limit: Optional[int] = None, pin_memory: Optional[bool] = None):
+        self.output_dir = Path(output_dir)
+        self.max_shard_bytes = max_shard_size_mb * 1024 * 1024
+        self.save_total_limit = save_total_limit
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        self.last_save_step: Optional[int] = None
+        self.last_stall_seconds = 0.0
+        self.last_write_seconds = 0.0
+
+        self._buffers: Dict[str, torch.Tensor] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-checkpoint")
+        self._pending: Optional[Future] = None
+
+    def _snapshot_tensor(self, key: str, tensor: torch.Tensor) -> torch.Tensor:
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.shape != tensor.shape or buffer.dtype != tensor.dtype:
+            buffer = torch.empty(tensor.shape, dtype=tensor.dtype, device="cpu", pin_memory=self.pin_memory)
+            self._buffers[key] = buffer
+        buffer.copy_(tensor.detach(), non_blocking=self.pin_memory)
+        return buffer
+
+    def _snapshot(self, obj: Any, key: str) -> Any:
+        if isinstance(obj, torch.Tensor):
+            return self._snapshot_tensor(key, obj)
+        if isinstance(obj, dict):
+            return {k: self._snapshot(v, f"{key}.{k}") for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self._snapshot(v, f"{key}.{i}") for i, v in enumerate(obj))
+        return copy.deepcopy(obj)
+
+    def save(self, step: int, model_state: Dict[str, torch.Tensor],
+             extra_files: Optional[Dict[str, Any]] = None, trainer_state: Any = None) -> Future:
+        """Snapshot state for `step` and schedule it to be written.
+
+        `extra_files` maps file names (e.g. `optimizer.pt`) to picklable state
+        that is saved with `torch.save`. `trainer_state` is an optional object
+        with a `save_to_json(path)` method.
+        """
+        start = time.perf_counter()
+        self.wait()
+
+        # Tied parameters share storage; safetensors stores each storage once
+        seen_storages = set()
+        model_snapshot = {}
+        for name, tensor in model_state.items():
+            storage_key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape))
+            if storage_key in seen_storages:
+                continue
+            seen_storages.add(storage_key)
+            model_snapshot[name] = self._snapshot_tensor(f"model.{name}", tensor)
+
+        extras = {name: self._snapshot(obj, name) for name, obj in (extra_files or {}).items()}
+        trainer_state = copy.deepcopy(trainer_state)
+        if self.pin_memory:
+            torch.cuda.synchronize()
+
+        self.last_save_step = step
+        self.last_stall_seconds = time.perf_counter() - start
+        logger.info(f"Snapshotted checkpoint {step} in {self.last_stall_seconds:.2f}s; writing in background")
+        self._pending = self._executor.submit(self._write, step, model_snapshot, extras, trainer_state)
+        return self._pending
+
+    def _write(self, step: int, model_snapshot: Dict[str, torch.Tensor],
+               extras: Dict[str, Any], trainer_state: Any) -> str:
+        start = time.perf_counter()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.output_dir / f".tmp-{CHECKPOINT_PREFIX}-{step}"
+        final_dir = self.output_dir / f"{CHECKPOINT_PREFIX}-{step}"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir()
+
+        # Model weights as safetensors shards plus the Hugging Face index
+        shards = plan_shards(model_snapshot, self.max_shard_bytes)
+        weight_map = {}
+        total_size = 0
+        for i, shard in enumerate(shards):
+            shard_name = f"model-{i + 1:05d}-of-{len(shards):05d}.safetensors"
+            save_file(shard, str(tmp_dir / shard_name), metadata={"format": "pt"})
+            for name, tensor in shard.items():
+                weight_map[name] = shard_name
+                total_size += tensor.numel() * tensor.element_size()
+        with open(tmp_dir / SAFE_WEIGHTS_INDEX_NAME, 'w') as f:
+            json.dump({"metadata": {"total_size": total_size}, "weight_map": weight_map}, f, indent=2)
+
+        for file_name, obj in extras.items():
+            torch.save(obj, tmp_dir / file_name)
+        if trainer_state is not None:
+            trainer_state.save_to_json(str(tmp_dir / TRAINER_STATE_NAME))
+
+        # Integrity manifest covers every file written above
+        files = {}
+        for path in sorted(tmp_dir.iterdir()):
+            with open(path, 'rb') as f:
+                os.fsync(f.fileno())
+            files[path.name] = {"size": path.stat().st_size, "sha256": _sha256(path)}
+        with open(tmp_dir / MANIFEST_NAME, 'w') as f:
+            json.dump({"step": step, "created": time.time(), "files": files}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(tmp_dir)
+
+        if final_dir.exists():
+            shutil.rmtree(final_dir)
+        os.replace(tmp_dir, final_dir)
+        _fsync_dir(self.output_dir)
+
+        self._rotate()
+        self.last_write_seconds = time.perf_counter() - start
+        logger.info(f"Wrote checkpoint {final_dir} ({len(shards)} shards) in {self.last_write_seconds:.2f}s")
+        return str(final_dir)
+
+    def _rotate(self):
+        if not self.save_total_limit:
+            return
+        checkpoints = sorted(
+            (p for p in self.output_dir.iterdir() if p.is_dir() and checkpoint_step(p) is not None),
+            key=checkpoint_step,
+        )
+        for stale in checkpoints[:-self.save_total_limit]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    def wait(self) -> Optional[str]:
+        """Block until the in-flight write (if any) finishes; re-raises its error."""
+        if self._pending is None:
+            return None
+        pending, self._pending = self._pending, None
+        waited = time.perf_counter()
+        path = pending.result()
+        waited = time.perf_counter() - waited
+        if waited > 0.1:
+            logger.warning(f"Waited {waited:.2f}s for the previous checkpoint write to finish")
+        return path
+
+    def close(self):
+        """Flush the last write and stop the writer thread."""
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+class AsyncCheckpointCallback(TrainerCallback):
+    """Trainer callback that saves every `save_steps` through an AsyncCheckpointer.
+
+    Use with `save_strategy="no"` so the Trainer's own blocking save is disabled.
+    """
+
+    def __init__(self, checkpointer: AsyncCheckpointer, save_steps: int):
+        self.checkpointer = checkpointer
+        self.save_steps = save_steps
+
+    def _save(self, state, model, optimizer, lr_scheduler):
+        extra_files = {RNG_STATE_NAME: rng_state()}
+        if optimizer is not None:
+            extra_files[OPTIMIZER_NAME] = optimizer.state_dict()
+        if lr_scheduler is not None:
+            extra_files[SCHEDULER_NAME] = lr_scheduler.state_dict()
+        self.checkpointer.save(state.global_step, model.state_dict(), extra_files, trainer_state=state)
+
+    def on_step_end(self, args, state, control, model=None, optimizer=None, lr_scheduler=None, **kwargs):
+        if not state.is_world_process_zero or self.save_steps <= 0:
+            return
+        if state.global_step % self.save_steps == 0:
+            self._save(state, model, optimizer, lr_scheduler)
+
+    def on_train_end(self, args, state, control, **kwargs):
+        if state.is_world_process_zero:
+            self.checkpointer.wait()
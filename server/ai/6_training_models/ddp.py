@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Aetherial Distributed Data-Parallel Launcher
+
+This module spawns one training process per worker on a host using the gloo
+backend and wires up the static rendezvous used for multi-node CPU training.
+"""
+
+import os
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Sequence
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DistributedConfig:
+    """Static rendezvous settings for a data-parallel run."""
+    nproc_per_node: int = 1
+    nnodes: int = 1
+    node_rank: int = 0
+    master_addr: str = "127.0.0.1"
+    master_port: int = 29500
+    backend: str = "gloo"
+    bucket_cap_mb: int = 25
+    timeout_seconds: int = 1800
+
+    @classmethod
+    def from_config(cls, config: dict) -> "DistributedConfig":
+        """Build from the `distributed` section of the training config."""
+        section = config.get('distributed', {}) or {}
+        return cls(
+            nproc_per_node=int(section.get('nproc_per_node', 1)),
+            nnodes=int(section.get('nnodes', 1)),
+            node_rank=int(section.get('node_rank', 0)),
+            master_addr=str(section.get('master_addr', "127.0.0.1")),
+            master_port=int(section.get('master_port', 29500)),
+            backend=section.get('backend', "gloo"),
+            bucket_cap_mb=int(section.get('bucket_cap_mb', 25)),
+            timeout_seconds=int(section.get('timeout_seconds', 1800)),
+        )
+
+    @property
+    def world_size(self) -> int:
+        return self.nnodes * self.nproc_per_node
+
+    @property
+    def enabled(self) -> bool:
+        return self.world_size > 1
+
+    def global_rank(self, local_rank: int) -> int:
+        return self.node_rank * self.nproc_per_node + local_rank
+
+    def validate(self):
+        """Raise ValueError if the rendezvous settings are inconsistent."""
+        if self.nproc_per_node < 1 or self.nnodes < 1:
+            raise ValueError("nproc_per_node and nnodes must be at least 1")
+        if not 0 <= self.node_rank < self.nnodes:
+            raise ValueError(f"node_rank {self.node_rank} is outside [0, {self.nnodes})")
+        if self.backend != "gloo" and not torch.cuda.is_available():
+            raise ValueError(f"Backend '{self.backend}' requires CUDA; use 'gloo' for CPU training")
+
+
+def threads_per_worker(nproc_per_node: int) -> int:
+    """Split the host's cores evenly so workers do not oversubscribe them."""
+    return max(1, (os.cpu_count() or 1) // max(1, nproc_per_node))
+
+
+def is_launched_externally() -> bool:
+    """Whether torchrun (or another launcher) already set up the worker env."""
+    return "LOCAL_RANK" in os.environ and "WORLD_SIZE" in os.environ
+
+
+def _worker(local_rank: int, fn: Callable, dist_config: DistributedConfig, args: Sequence[Any]):
+    """Entry point of every spawned process."""
+    rank = dist_config.global_rank(local_rank)
+    os.environ.update({
+        "RANK": str(rank),
+        "LOCAL_RANK": str(local_rank),
+        "WORLD_SIZE": str(dist_config.world_size),
+        "LOCAL_WORLD_SIZE": str(dist_config.nproc_per_node),
+        "MASTER_ADDR": dist_config.master_addr,
+        "MASTER_PORT": str(dist_config.master_port),
+    })
+    torch.set_num_threads(threads_per_worker(dist_config.nproc_per_node))
+
+    dist.init_process_group(
+        backend=dist_config.backend,
+        init_method="env://",
+        rank=rank,
+        world_size=dist_config.world_size,
+        timeout=timedelta(seconds=dist_config.timeout_seconds),
+    )
+    try:
+        fn(local_rank, *args)
+    finally:
+        if dist.is_initialized():
+            dist.destroy_process_group()
+
+
+def launch(fn: Callable, dist_config: DistributedConfig, args: Sequence[Any] = ()):
+    """Run `fn(local_rank, *args)` on every local worker of this node.
+
+    With a world size of one, `fn` is called inline with a local rank of -1.
+    When the environment was prepared by an external launcher, the process
+    group is joined directly instead of spawning new workers.
+    """
+    dist_config.validate()
+
+    if is_launched_externally():
+        local_rank = int(os.environ["LOCAL_RANK"])
+        if not dist.is_initialized():
+            dist.init_process_group(
+                backend=dist_config.backend,
+                timeout=timedelta(seconds=dist_config.timeout_seconds),
+            )
+        try:
+            fn(local_rank, *args)
+        finally:
+            if dist.is_initialized():
+                dist.destroy_process_group()
+        return
+
+    if not dist_config.enabled:
+        fn(-1, *args)
+        return
+
+    logger.info(
+        f"Spawning {dist_config.nproc_per_node} workers on node {dist_config.node_rank}/{dist_config.nnodes} "
+        f"(world size {dist_config.world_size}, {dist_config.backend} @ "
+        f"{dist_config.master_addr}:{dist_config.master_port})"
+    )
+    mp.spawn(_worker, args=(fn, dist_config, tuple(args)), nprocs=dist_config.nproc_per_node, join=True)
+
+
+def get_rank() -> int:
+    """Global rank of this process, or 0 when not distributed."""
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank()
+    return int(os.environ.get("RANK", 0))
+
+
+def get_world_size() -> int:
+    """Number of processes in the group, or 1 when not distributed."""
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_world_size()
+    return int(os.environ.get("WORLD_SIZE", 1))
+
+
+def is_main_process() -> bool:
+    return get_rank() == 0
+
+
+@contextmanager
+def main_process_first():
+    """Let rank 0 run the enclosed block (e.g. dataset caching) before the others."""
+    initialized = dist.is_available() and dist.is_initialized()
+    if initialized and not is_main_process():
+        dist.barrier()
+    try:
+        yield
+    finally:
+        if initialized and is_main_process():
+            dist.barrier()
+
+
+def shard_range(num_samples: int, rank: int, world_size: int) -> range:
+    """Contiguous, near-equal slice of `range(num_samples)` owned by `rank`."""
+    per_rank, remainder = divmod(num_samples, world_size)
+    start = rank * per_rank + min(rank, remainder)
+    stop = start + per_rank + (1 if rank < remainder else 0)
+    return range(start, stop)
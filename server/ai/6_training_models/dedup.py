@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Aetherial Training Data Deduplication
+
+This module removes exact and near-duplicate documents from a dataset before
+tokenization. MinHash signatures over byte shingles are computed with
+vectorized numpy hashing in `datasets.map` worker processes, and candidate
+pairs are found by LSH banding. Band keys are written to hash-partitioned
+files on disk and each partition is sorted on its own, while signatures and
+the union-find forest live in memory-mapped arrays, so memory stays bounded
+by `max_memory_mb` however large the corpus. The first occurrence of every
+duplicate cluster is kept.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+_RECORD = np.dtype([('key', '<u8'), ('doc', '<i8')])
+# Multipliers for the shingle polynomial hash (shingles over 8 bytes) and for mixing band keys
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over the whole word."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace, so formatting differences do not hide duplicates."""
+    return " ".join(text.lower().split())
+
+
+def batch_shingles(texts: List[str], shingle_size: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct 40-bit hashes of the byte `shingle_size`-grams of each normalized text.
+
+    The whole batch is hashed as one concatenated byte array. Returns the
+    hashes and the index of the text each belongs to, sorted by text. Texts
+    shorter than one shingle hash as a single shingle; empty texts have none.
+    """
+    encoded = [normalize(text).encode('utf-8') for text in texts]
+    encoded = [e.ljust(shingle_size, b"\0") if e else e for e in encoded]
+    lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+    counts = np.maximum(lengths - shingle_size + 1, 0)
+    if counts.sum() == 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # Horner's rule over shifted views; up to 8 bytes this packs each shingle exactly
+    base = np.uint64(256) if shingle_size <= 8 else _SHINGLE_BASE
+    num_windows = len(data) - shingle_size + 1
+    hashes = data[:num_windows].copy()
+    with np.errstate(over='ignore'):
+        for offset in range(1, shingle_size):
+            hashes *= base
+            hashes += data[offset:offset + num_windows]
+
+    # Keep windows that lie inside one text, then drop repeats within each text
+    owners = np.repeat(np.arange(len(texts)), counts)
+    first_window = np.cumsum(counts) - counts
+    positions = np.arange(len(owners)) - first_window[owners] + (np.cumsum(lengths) - lengths)[owners]
+    # One sort over (text, 40-bit hash) keys; batches are far smaller than 2**24 texts
+    keys = np.sort((owners.astype(np.uint64) << np.uint64(40)) | (_mix64(hashes[positions]) >> np.uint64(24)))
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return keys & np.uint64((1 << 40) - 1), (keys >> np.uint64(40)).astype(np.int64)
+
+
+def minhash_permutations(num_perm: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Odd multipliers and offsets of the multiply-shift hash family used for MinHash."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 64, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 64, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(shingles: np.ndarray, owners: np.ndarray, num_docs: int, a: np.ndarray, b: np.ndarray,
+                       chunk_size: int = 1 << 13) -> np.ndarray:
+    """MinHash signatures (num_docs, num_perm) from `batch_shingles` output.
+
+    All shingles of the batch are hashed together, `chunk_size` at a time, and
+    reduced per document with `np.minimum.reduceat`. Documents without
+    shingles get an all-max signature.
+    """
+    signatures = np.full((num_docs, len(a)), _MAX_HASH, dtype=np.uint32)
+    if len(shingles) == 0:
+        return signatures
+    # Chunks cut documents into pieces; each piece is reduced and folded into its document's minimum
+    buffer = np.empty((len(a), min(chunk_size, len(shingles))), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for start in range(0, len(shingles), chunk_size):
+            end = min(start + chunk_size, len(shingles))
+            hashed = np.multiply(a[:, None], shingles[None, start:end], out=buffer[:, :end - start])
+            hashed += b[:, None]
+            chunk_owners = owners[start:end]
+            starts = np.flatnonzero(np.r_[True, chunk_owners[1:] != chunk_owners[:-1]])
+            # The shift to the high 32 bits is monotonic, so it can wait until after the minimum
+            piece_min = (np.minimum.reduceat(hashed, starts, axis=1) >> np.uint64(32)).astype(np.uint32).T
+            docs = chunk_owners[starts]
+            signatures[docs] = np.minimum(signatures[docs], piece_min)
+    return signatures
+
+
+def band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """One 64-bit LSH key per (document, band); documents collide in a band when its rows all match."""
+    num_docs, num_perm = signatures.shape
+    rows = signatures.reshape(num_docs, bands, num_perm // bands).astype(np.uint64)
+    keys = np.zeros((num_docs, bands), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for row in range(rows.shape[2]):
+            keys = _mix64(keys ^ rows[:, :, row])
+        # Salt each band so equal rows in different bands do not share a bucket
+        keys = _mix64(keys ^ (np.arange(1, bands + 1, dtype=np.uint64) * _MIX))
+    return keys
+
+
+def _signature_batch(batch: Dict[str, list], text_column: str, shingle_size: int,
+                     a: np.ndarray, b: np.ndarray) -> Dict[str, np.ndarray]:
+    texts = [text or "" for text in batch[text_column]]
+    shingles, owners = batch_shingles(texts, shingle_size)
+    exact = np.array([
+        int.from_bytes(hashlib.blake2b(normalize(text).encode('utf-8'), digest_size=8).digest(), 'little')
+        for text in texts
+    ], dtype=np.uint64)
+    return {'minhash': minhash_signatures(shingles, owners, len(texts), a, b), 'exact': exact}
+
+
+def count_words(texts: List[str]) -> List[int]:
+    """Default token counter: whitespace-separated words."""
+    return [len((text or "").split()) for text in texts]
+
+
+class TokenizerCounter:
+    """Token counter for `Deduplicator.deduplicate` that uses the training tokenizer."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def __call__(self, texts: List[str]) -> List[int]:
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)['input_ids']]
+
+
+class UnionFind:
+    """Union-find over document indices with the parent array memory-mapped on disk.
+
+    Unions always attach the larger root to the smaller, so every cluster's
+    root is its first document.
+    """
+
+    def __init__(self, path: str, size: int, chunk_size: int = 1 << 20):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.parent = np.lib.format.open_memmap(path, mode='w+', dtype=np.int64, shape=(max(size, 1),))
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size)
+            self.parent[start:end] = np.arange(start, end)
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = int(parent[x])
+        return x
+
+    def union(self, x: int, y: int) -> bool:
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        if x > y:
+            x, y = y, x
+        self.parent[y] = x
+        return True
+
+    def roots(self):
+        """Yield (start, roots) chunks, resolving every index to its cluster root."""
+        for start in range(0, self.size, self.chunk_size):
+            end = min(start + self.chunk_size, self.size)
+            roots = np.array(self.parent[start:end])
+            while True:
+                # Pointer jumping; parents always have smaller indices, so this terminates
+                next_roots = np.asarray(self.parent[roots])
+                if np.array_equal(next_roots, roots):
+                    break
+                roots = next_roots
+            self.parent[start:end] = roots
+            yield start, roots
+
+
+class Deduplicator:
+    """Exact and MinHash/LSH near-duplicate removal for `datasets.Dataset` splits.
+
+    Two documents are near duplicates when their estimated Jaccard
+    similarity over byte shingles is at least `threshold`. LSH with
+    `bands` bands of `num_perm // bands` rows proposes candidate pairs,
+    which are then checked against the threshold on their full signatures.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8, shingle_size: int = 5,
+                 num_proc: Optional[int] = None, batch_size: int = 1000, max_memory_mb: float = 512,
+                 work_dir: Optional[str] = None, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_proc = num_proc
+        self.batch_size = batch_size
+        self.max_memory_mb = max_memory_mb
+        self.work_dir = work_dir
+        self.seed = seed
+        self.a, self.b = minhash_permutations(num_perm, seed)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Deduplicator":
+        """Build from the `dataset.dedup` section of the training config."""
+        dataset_config = config.get('dataset', {}) or {}
+        # Keys left empty in YAML load as None and fall back to the defaults
+        section = {key: value for key, value in (dataset_config.get('dedup') or {}).items() if value is not None}
+        work_dir = section.get('work_dir') or os.path.join(dataset_config.get('cache_dir') or ".cache", "dedup")
+        return cls(
+            num_perm=section.get('num_perm', 128),
+            bands=section.get('bands', 16),
+            threshold=float(section.get('threshold', 0.8)),
+            shingle_size=section.get('shingle_size', 5),
+            num_proc=dataset_config.get('preprocessing_num_workers'),
+            max_memory_mb=section.get('max_memory_mb', 512),
+            work_dir=work_dir,
+            seed=config.get('random_seed') or 0,
+        )
+
+    def _settings(self) -> dict:
+        return {key: getattr(self, key) for key in ('num_perm', 'bands', 'threshold', 'shingle_size', 'seed')}
+
+    def signatures(self, dataset, text_column: str):
+        """MinHash signatures and exact-text hashes of every document, computed in `num_proc` processes."""
+        from datasets import Features, Sequence, Value
+
+        features = Features({
+            'minhash': Sequence(Value('uint32'), length=self.num_perm),
+            'exact': Value('uint64'),
+        })
+        return dataset.map(
+            _signature_batch,
+            batched=True,
+            batch_size=self.batch_size,
+            num_proc=self.num_proc,
+            remove_columns=dataset.column_names,
+            features=features,
+            fn_kwargs=dict(text_column=text_column, shingle_size=self.shingle_size, a=self.a, b=self.b),
+            desc="Computing MinHash signatures",
+        )
+
+    def _num_partitions(self, num_docs: int) -> int:
+        # Sorting a partition needs about twice its size in memory
+        partition_bytes = max(int(self.max_memory_mb * 2 ** 20) // 2, 1 << 16)
+        return max(1, math.ceil(num_docs * self.bands * _RECORD.itemsize / partition_bytes))
+
+    def find_duplicates(self, signatures, work_dir: str) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Cluster documents from their signatures; returns the kept indices and duplicate counts."""
+        num_docs = len(signatures)
+        work = Path(work_dir)
+        minhash = np.lib.format.open_memmap(work / "minhash.npy", mode='w+', dtype=np.uint32,
+                                            shape=(max(num_docs, 1), self.num_perm))
+        exact = np.lib.format.open_memmap(work / "exact.npy", mode='w+', dtype=np.uint64, shape=(max(num_docs, 1),))
+
+        # Stream signatures to disk and spill (band key, doc) records into hash partitions
+        num_partitions = self._num_partitions(num_docs)
+        start = 0
+        for batch in signatures.with_format("numpy").iter(batch_size=self.batch_size * 10):
+            batch_minhash = np.asarray(batch['minhash'], dtype=np.uint32).reshape(-1, self.num_perm)
+            end = start + len(batch_minhash)
+            minhash[start:end] = batch_minhash
+            exact[start:end] = batch['exact']
+            records = np.empty((end - start) * self.bands, dtype=_RECORD)
+            records['key'] = band_keys(batch_minhash, self.bands).ravel()
+            records['doc'] = np.repeat(np.arange(start, end), self.bands)
+            partition = records['key'] % np.uint64(num_partitions)
+            order = np.argsort(partition, kind='stable')
+            bounds = np.searchsorted(partition[order], np.arange(num_partitions + 1))
+            # Files are opened per write so the partition count is not limited by open file handles
+            for p in np.flatnonzero(np.diff(bounds)):
+                with open(work / f"buckets-{p:05d}.bin", 'ab') as f:
+                    f.write(records[order[bounds[p]:bounds[p + 1]]].tobytes())
+            start = end
+        minhash.flush()
+
+        # Each bucket's members are checked against its first document and merged if similar enough
+        forest = UnionFind(str(work / "parent.npy"), num_docs)
+        candidates = 0
+        for p in range(num_partitions):
+            path = work / f"buckets-{p:05d}.bin"
+            if not path.exists():
+                continue
+            records = np.fromfile(path, dtype=_RECORD)
+            path.unlink()
+            if len(records) < 2:
+                continue
+            records = records[np.argsort(records['key'], kind='stable')]
+            keys, docs = records['key'], records['doc']
+            group_start = np.r_[True, keys[1:] != keys[:-1]]
+            first = docs[np.maximum.accumulate(np.where(group_start, np.arange(len(docs)), 0))]
+            pairs = np.unique(np.stack([first[~group_start], docs[~group_start]], axis=1), axis=0)
+            del records, keys, docs, first
+            candidates += len(pairs)
+            for chunk in range(0, len(pairs), 4096):
+                pair_chunk = pairs[chunk:chunk + 4096]
+                similarity = (minhash[pair_chunk[:, 0]] == minhash[pair_chunk[:, 1]]).mean(axis=1)
+                for x, y in pair_chunk[similarity >= self.threshold]:
+                    forest.union(int(x), int(y))
+
+        keep, stats = [], {'exact_duplicates': 0, 'near_duplicates': 0}
+        for start, roots in forest.roots():
+            indices = np.arange(start, start + len(roots))
+            duplicate = roots != indices
+            keep.append(indices[~duplicate])
+            # Exact means the same normalized text as the document kept for the cluster
+            same_text = exact[indices[duplicate]] == exact[roots[duplicate]]
+            stats['exact_duplicates'] += int(same_text.sum())
+            stats['near_duplicates'] += int((~same_text).sum())
+        stats['candidate_pairs'] = int(candidates)
+        keep = np.concatenate(keep) if keep else np.empty(0, dtype=np.int64)
+        del minhash, exact, forest
+        return keep, stats
+
+    def _cache_path(self, dataset) -> Optional[Path]:
+        fingerprint = getattr(dataset, '_fingerprint', None)
+        if self.work_dir is None or fingerprint is None:
+            return None
+        digest = hashlib.sha256(json.dumps([fingerprint, self._settings()], sort_keys=True).encode())
+        return Path(self.work_dir) / f"{digest.hexdigest()[:32]}.npz"
+
+    def deduplicate(self, dataset, text_column: str = "text",
+                    count_tokens: Optional[Callable[[List[str]], List[int]]] = None):
+        """Drop duplicates from `dataset`, keeping first occurrences; returns (dataset, stats).
+
+        `stats` counts documents kept and removed (exact and near) and the
+        tokens in removed documents, as counted by `count_tokens` (whitespace
+        words by default). Results are cached in `work_dir` under the
+        dataset's fingerprint, so other ranks and reruns skip the work.
+        """
+        cache_path = self._cache_path(dataset)
+        if cache_path is not None and cache_path.is_file():
+            with np.load(cache_path) as cached:
+                keep = cached['keep']
+                stats = json.loads(str(cached['stats']))
+            logger.info(f"Loaded deduplication results from {cache_path}")
+            return dataset.select(keep), stats
+
+        if self.work_dir is not None:
+            Path(self.work_dir).mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.work_dir, prefix="dedup-") as tmp:
+            keep, stats = self.find_duplicates(self.signatures(dataset, text_column), tmp)
+
+        removed_mask = np.ones(len(dataset), dtype=bool)
+        removed_mask[keep] = False
+        removed = np.flatnonzero(removed_mask)
+        stats.update(documents=len(dataset), documents_kept=len(keep), documents_removed=len(removed),
+                     tokens_removed=self._count_tokens(dataset.select(removed), text_column, count_tokens))
+        if cache_path is not None:
+            tmp_path = cache_path.with_name(f".{cache_path.stem}.tmp.npz")
+            np.savez(tmp_path, keep=keep, stats=json.dumps(stats))
+            os.replace(tmp_path, cache_path)
+        logger.info(
+            f"Deduplication removed {stats['documents_removed']} of {stats['documents']} documents "
+            f"({stats['exact_duplicates']} exact, {stats['near_duplicates']} near) "
+            f"and {stats['tokens_removed']} tokens"
+        )
+        return dataset.select(keep), stats
+
+    def _count_tokens(self, removed, text_column: str,
+                      count_tokens: Optional[Callable[[List[str]], List[int]]]) -> int:
+        if len(removed) == 0:
+            return 0
+        count_tokens = count_tokens or count_words
+        counts = removed.map(
+            lambda batch: {'num_tokens': count_tokens(batch[text_column])},
+            batched=True,
+            batch_size=self.batch_size,
+            num_proc=self.num_proc if self.num_proc and len(removed) >= self.num_proc else None,
+            remove_columns=removed.column_names,
+            desc="Counting removed tokens",
+        )
+        return int(np.sum(counts['num_tokens']))
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Aetherial Evaluation and Prediction
+
+This module evaluates causal LMs with length-bucketed, dynamically padded
+batches. Perplexity and greedy-generation evals can be spread over a pool of
+CPU worker processes that share the model's weights, and results are cached
+on disk keyed by a hash of the checkpoint, the data and the eval settings.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import TrainerCallback
+
+from checkpointing import MANIFEST_NAME
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "training"))
+from eval_pool import EvalWorkerPool, length_bucketed_batches
+
+logger = logging.getLogger(__name__)
+
+def subsample(dataset, max_samples: Optional[int]):
+    """Keep the first `max_samples` examples of a dataset (None keeps all)."""
+    if dataset is None or max_samples is None or max_samples >= len(dataset):
+        return dataset
+    return dataset.select(range(max_samples))
+
+
+def unpadded_sequences(dataset) -> List[np.ndarray]:
+    """Token ids of every example with padding removed (either padding side)."""
+    sequences = []
+    for example in dataset:
+        input_ids = np.asarray(example['input_ids'], dtype=np.int64)
+        attention_mask = example.get('attention_mask')
+        if attention_mask is not None:
+            input_ids = input_ids[np.asarray(attention_mask, dtype=bool)]
+        sequences.append(input_ids)
+    return sequences
+
+
+def pad_sequences(sequences: Sequence[np.ndarray], pad_token_id: int,
+                  left: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Pad to the longest sequence in the batch; returns (input_ids, attention_mask)."""
+    max_len = max(len(s) for s in sequences)
+    input_ids = torch.full((len(sequences), max_len), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), max_len), dtype=torch.long)
+    for i, sequence in enumerate(sequences):
+        if len(sequence) == 0:
+            continue
+        span = slice(max_len - len(sequence), max_len) if left else slice(0, len(sequence))
+        input_ids[i, span] = torch.as_tensor(sequence)
+        attention_mask[i, span] = 1
+    return input_ids, attention_mask
+
+
+@torch.no_grad()
+def batch_nll(model: torch.nn.Module, sequences: Sequence[np.ndarray], pad_token_id: int) -> Tuple[float, int]:
+    """Summed next-token negative log-likelihood and number of scored tokens."""
+    device = next(model.parameters()).device
+    input_ids, attention_mask = pad_sequences(sequences, pad_token_id)
+    input_ids, attention_mask = input_ids.to(device), attention_mask.to(device)
+    logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    labels = input_ids[:, 1:].masked_fill(attention_mask[:, 1:] == 0, -100)
+    nll = F.cross_entropy(
+        logits[:, :-1].reshape(-1, logits.shape[-1]).float(),
+        labels.reshape(-1),
+        ignore_index=-100,
+        reduction="sum",
+    )
+    return nll.item(), int((labels != -100).sum().item())
+
+
+@torch.no_grad()
+def batch_generate(model: torch.nn.Module, prompts: Sequence[np.ndarray], pad_token_id: int,
+                   max_new_tokens: int) -> List[List[int]]:
+    """Greedy continuations of left-padded prompts."""
+    device = next(model.parameters()).device
+    input_ids, attention_mask = pad_sequences(prompts, pad_token_id, left=True)
+    outputs = model.generate(
+        input_ids=input_ids.to(device),
+        attention_mask=attention_mask.to(device),
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        pad_token_id=pad_token_id,
+    )
+    return outputs[:, input_ids.shape[1]:].tolist()
+
+
+def checkpoint_hash(checkpoint_dir: str) -> str:
+    """Content hash of a saved checkpoint.
+
+    Uses the integrity manifest written by AsyncCheckpointer when present,
+    otherwise hashes every weight file.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    digest = hashlib.sha256()
+    manifest_path = checkpoint_dir / MANIFEST_NAME
+    if manifest_path.is_file():
+        with open(manifest_path) as f:
+            files = json.load(f)['files']
+        digest.update(json.dumps({k: v['sha256'] for k, v in files.items()}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    weight_files = sorted(
+        p for p in checkpoint_dir.iterdir() if p.suffix in (".safetensors", ".bin") and p.is_file()
+    )
+    if not weight_files:
+        raise FileNotFoundError(f"No weight files found in {checkpoint_dir}")
+    for path in weight_files:
+        digest.update(path.name.encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EvalCache:
+    """JSON results on disk, one file per cache key."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.cache_dir / f"{key}.json"
+        if not path.is_file():
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f".{key}.json.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, self.cache_dir / f"{key}.json")
+
+
+class Evaluator:
+    """Perplexity and greedy-generation evaluation for causal LMs."""
+
+    def __init__(self, pad_token_id: int, batch_size: int = 8, max_tokens_per_batch: Optional[int] = None,
+                 num_workers: int = 0, cache_dir: Optional[str] = None, generation: Optional[dict] = None):
+        self.pad_token_id = pad_token_id
+        self.batch_size = batch_size
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.num_workers = num_workers
+        self.cache = EvalCache(cache_dir) if cache_dir else None
+        self.generation = {"enabled": True, "num_prompts": 32, "prompt_tokens": 32, "max_new_tokens": 32}
+        self.generation.update(generation or {})
+        self._pool: Optional[EvalWorkerPool] = None
+        self._pool_model = None
+
+    @classmethod
+    def from_config(cls, config: dict, pad_token_id: int) -> "Evaluator":
+        """Build from the `evaluation` section of the training config."""
+        section = config.get('evaluation', {}) or {}
+        return cls(
+            pad_token_id=pad_token_id,
+            batch_size=config.get('per_device_eval_batch_size', 8),
+            max_tokens_per_batch=section.get('max_tokens_per_batch'),
+            num_workers=section.get('num_workers', 0),
+            cache_dir=section.get('cache_dir'),
+            generation=section.get('generation'),
+        )
+
+    def _map(self, model, fn: Callable[..., Any], payloads: List[Any]) -> List[Any]:
+        if self.num_workers > 0 and len(payloads) > 1 and not next(model.parameters()).is_cuda:
+            if self._pool is None or self._pool_model is not model:
+                self.close()
+                self._pool = EvalWorkerPool(model, self.num_workers)
+                self._pool_model = model
+            return self._pool.map(fn, payloads)
+        return [fn(model, *payload) for payload in payloads]
+
+    def _cache_key(self, model_hash: str, sequences: List[np.ndarray], split: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_hash.encode())
+        digest.update(split.encode())
+        digest.update(json.dumps(self.generation, sort_keys=True).encode())
+        for sequence in sequences:
+            digest.update(len(sequence).to_bytes(4, "little"))
+            digest.update(sequence.tobytes())
+        return digest.hexdigest()
+
+    def evaluate(self, model: torch.nn.Module, dataset, split: str = "eval", max_samples: Optional[int] = None,
+                 checkpoint: Optional[str] = None, return_predictions: bool = False) -> Dict[str, Any]:
+        """Compute `{split}_loss`, `{split}_perplexity` and generation accuracy.
+
+        With a cache configured, results for a `checkpoint` are keyed by its
+        content hash. Evals of live weights (no checkpoint, as in periodic
+        evals during training) are not cached, since the weights change
+        between calls and hashing them would cost a full copy each time.
+        """
+        dataset = subsample(dataset, max_samples)
+        sequences = [s for s in unpadded_sequences(dataset) if len(s) > 1]
+        if not sequences:
+            raise ValueError(f"No {split} examples with at least two tokens to evaluate")
+
+        cache_key = None
+        if self.cache is not None and checkpoint:
+            cache_key = self._cache_key(checkpoint_hash(checkpoint), sequences, split)
+            cached = self.cache.get(cache_key)
+            if cached is not None and (not return_predictions or "predictions" in cached):
+                logger.info(f"Using cached {split} results for {checkpoint}")
+                return cached
+
+        was_training = model.training
+        model.eval()
+        try:
+            batches = length_bucketed_batches([len(s) for s in sequences], self.batch_size, self.max_tokens_per_batch)
+            nll_results = self._map(model, batch_nll, [
+                ([sequences[i] for i in batch], self.pad_token_id) for batch in batches
+            ])
+            nll = sum(r[0] for r in nll_results)
+            num_tokens = sum(r[1] for r in nll_results)
+            loss = nll / max(num_tokens, 1)
+            metrics: Dict[str, Any] = {
+                f"{split}_loss": loss,
+                f"{split}_perplexity": math.exp(min(loss, 100)),
+                f"{split}_samples": len(sequences),
+                f"{split}_tokens": num_tokens,
+            }
+            if self.generation.get("enabled"):
+                metrics.update(self._generation_eval(model, sequences, split, return_predictions))
+        finally:
+            model.train(was_training)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, metrics)
+        return metrics
+
+    def _generation_eval(self, model, sequences: List[np.ndarray], split: str,
+                         return_predictions: bool) -> Dict[str, Any]:
+        """Greedy continuation accuracy against each example's own next tokens."""
+        prompt_tokens = self.generation["prompt_tokens"]
+        max_new_tokens = self.generation["max_new_tokens"]
+        candidates = [s for s in sequences if len(s) > prompt_tokens][:self.generation["num_prompts"]]
+        if not candidates:
+            return {}
+        prompts = [s[:prompt_tokens] for s in candidates]
+        references = [s[prompt_tokens:prompt_tokens + max_new_tokens] for s in candidates]
+
+        batches = [list(range(i, min(i + self.batch_size, len(prompts)))) for i in range(0, len(prompts), self.batch_size)]
+        outputs = self._map(model, batch_generate, [
+            ([prompts[i] for i in batch], self.pad_token_id, max_new_tokens) for batch in batches
+        ])
+        generations = [tokens for batch_output in outputs for tokens in batch_output]
+
+        matched = compared = 0
+        for generated, reference in zip(generations, references):
+            length = min(len(generated), len(reference))
+            matched += int(np.sum(np.asarray(generated[:length]) == reference[:length]))
+            compared += len(reference)
+        metrics: Dict[str, Any] = {f"{split}_generation_accuracy": matched / max(compared, 1)}
+        if return_predictions:
+            metrics["predictions"] = [
+                {"prompt": p.tolist(), "generated": g, "reference": r.tolist()}
+                for p, g, r in zip(prompts, generations, references)
+            ]
+        return metrics
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            self._pool_model = None
+
+
+class PeriodicEvalCallback(TrainerCallback):
+    """Evaluates a subsample every `eval_steps` with the batched Evaluator.
+
+    Replaces the Trainer's own evaluation loop (use `evaluation_strategy="no"`).
+    """
+
+    def __init__(self, evaluator: Evaluator, eval_dataset, eval_steps: int, max_samples: Optional[int] = None):
+        self.evaluator = evaluator
+        self.eval_dataset = eval_dataset
+        self.eval_steps = eval_steps
+        self.max_samples = max_samples
+
+    def on_step_end(self, args, state, control, model=None, **kwargs):
+        if not state.is_world_process_zero or self.eval_dataset is None or self.eval_steps <= 0:
+            return
+        if state.global_step % self.eval_steps != 0:
+            return
+        metrics = self.evaluator.evaluate(model, self.eval_dataset, split="eval", max_samples=self.max_samples)
+        state.log_history.append({**metrics, "step": state.global_step})
+        logger.info(f"Step {state.global_step} evaluation: {json.dumps(metrics)}")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self.evaluator.close()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Aetherial Training Step Profiler
+
+This module provides a Trainer callback that breaks every optimizer step into
+data-loading wait, forward, backward, optimizer and checkpoint time, and
+records throughput, an MFU estimate and peak memory. Results are written to
+a local JSONL file so they are available without any experiment tracker. An
+optional `torch.profiler` window captures a Chrome trace for a few steps.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+from transformers import TrainerCallback
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS = ("data_wait", "forward", "backward", "optimizer", "checkpoint", "other")
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def training_flops_per_token(model: torch.nn.Module, seq_len: int) -> float:
+    """Approximate training FLOPs per token (6N plus the attention term)."""
+    num_params = sum(p.numel() for p in model.parameters())
+    flops = 6 * num_params
+    config = getattr(model, "config", None)
+    num_layers = getattr(config, "num_hidden_layers", None)
+    hidden_size = getattr(config, "hidden_size", None)
+    if num_layers and hidden_size:
+        flops += 12 * num_layers * hidden_size * seq_len
+    return float(flops)
+
+
+class StepProfilerCallback(TrainerCallback):
+    """Per-step timing breakdown for `Trainer.train`.
+
+    Add this after any checkpointing callbacks so that their blocking time in
+    `on_step_end` can be attributed to the checkpoint segment.
+    """
+
+    def __init__(self, output_file: str, peak_tflops: Optional[float] = None,
+                 synchronize: bool = True, checkpointer=None,
+                 trace_dir: Optional[str] = None, trace_start_step: int = 10, trace_num_steps: int = 0):
+        self.output_file = Path(output_file)
+        self.peak_tflops = peak_tflops
+        self.synchronize = synchronize and torch.cuda.is_available()
+        self.checkpointer = checkpointer
+        self.trace_dir = Path(trace_dir) if trace_dir else None
+        self.trace_start_step = trace_start_step
+        self.trace_num_steps = trace_num_steps
+
+        self.records: List[Dict] = []
+        self._model = None
+        self._hooks = []
+        self._file = None
+        self._profiler = None
+        self._flops_per_token = None
+        self._pending: Optional[Dict] = None
+        self._reset_step()
+        self._mark = None
+
+    @classmethod
+    def from_config(cls, config: dict, checkpointer=None) -> "StepProfilerCallback":
+        """Build from the `profiling` section of the training config."""
+        section = config.get('profiling', {}) or {}
+        logging_dir = config.get('logging', {}).get('logging_dir', './logs')
+        trace = section.get('torch_profiler', {}) or {}
+        return cls(
+            output_file=section.get('output_file') or os.path.join(logging_dir, "step_profile.jsonl"),
+            peak_tflops=section.get('peak_tflops'),
+            synchronize=section.get('synchronize_cuda', True),
+            checkpointer=checkpointer,
+            trace_dir=trace.get('trace_dir', os.path.join(logging_dir, "traces")) if trace.get('enabled') else None,
+            trace_start_step=trace.get('start_step', 10),
+            trace_num_steps=trace.get('num_steps', 5),
+        )
+
+    def _now(self) -> float:
+        if self.synchronize:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _reset_step(self):
+        self._forward = 0.0
+        self._forward_start = None
+        self._tokens = 0
+        self._seq_len = 0
+        self._step_begin = None
+        self._data_wait = 0.0
+        self._pre_optimizer = None
+        self._post_optimizer = None
+
+    # Forward hooks on the top-level model time each micro-batch forward pass
+    def _forward_pre_hook(self, module, args, kwargs):
+        input_ids = kwargs.get("input_ids", args[0] if args else None)
+        attention_mask = kwargs.get("attention_mask")
+        if attention_mask is not None:
+            self._tokens += int(attention_mask.sum().item())
+        elif isinstance(input_ids, torch.Tensor):
+            self._tokens += input_ids.numel()
+        if isinstance(input_ids, torch.Tensor) and input_ids.dim() > 1:
+            self._seq_len = max(self._seq_len, input_ids.shape[-1])
+        if module.training:
+            self._forward_start = self._now()
+
+    def _forward_hook(self, module, args, output):
+        if self._forward_start is not None:
+            self._forward += self._now() - self._forward_start
+            self._forward_start = None
+
+    def on_train_begin(self, args, state, control, model=None, **kwargs):
+        if not state.is_world_process_zero:
+            return
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.output_file, 'a')
+        if model is not None:
+            self._hooks = [
+                model.register_forward_pre_hook(self._forward_pre_hook, with_kwargs=True),
+                model.register_forward_hook(self._forward_hook),
+            ]
+            self._model = model
+        self._mark = self._now()
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        if self._file is None:
+            return
+        now = self._now()
+        self._flush_pending()
+        self._reset_step()
+        self._step_begin = now
+        self._data_wait = now - self._mark if self._mark is not None else 0.0
+
+        if self.trace_dir is not None and self._profiler is None and state.global_step == self.trace_start_step:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities, record_shapes=True, profile_memory=True)
+            self._profiler.start()
+            logger.info(f"Started torch.profiler window at step {state.global_step} for {self.trace_num_steps} steps")
+
+    def on_pre_optimizer_step(self, args, state, control, **kwargs):
+        if self._file is not None:
+            self._pre_optimizer = self._now()
+
+    def on_optimizer_step(self, args, state, control, **kwargs):
+        if self._file is not None:
+            self._post_optimizer = self._now()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if self._file is None or self._step_begin is None:
+            return
+        now = self._now()
+        pre_optimizer = self._pre_optimizer or now
+        post_optimizer = self._post_optimizer or now
+
+        checkpoint = 0.0
+        if self.checkpointer is not None and getattr(self.checkpointer, "last_save_step", None) == state.global_step:
+            checkpoint = self.checkpointer.last_stall_seconds
+
+        self._pending = {
+            "step": state.global_step,
+            "data_wait": self._data_wait,
+            "forward": self._forward,
+            "backward": max(0.0, pre_optimizer - self._step_begin - self._forward),
+            "optimizer": post_optimizer - pre_optimizer,
+            "checkpoint": checkpoint,
+            "other": max(0.0, now - post_optimizer - checkpoint),
+            "tokens": self._tokens,
+        }
+        self._mark = now
+
+        if self._profiler is not None and state.global_step >= self.trace_start_step + self.trace_num_steps:
+            self._stop_profiler(state.global_step)
+
+    def on_log(self, args, state, control, **kwargs):
+        if self._file is not None:
+            self._mark = self._now()
+
+    def on_evaluate(self, args, state, control, **kwargs):
+        if self._file is not None:
+            self._mark = self._now()
+
+    def on_save(self, args, state, control, **kwargs):
+        # Blocking Trainer saves happen after on_step_end, before this event
+        if self._file is None:
+            return
+        now = self._now()
+        if self._pending is not None:
+            self._pending["checkpoint"] += now - self._mark
+        self._mark = now
+
+    def on_train_end(self, args, state, control, **kwargs):
+        if self._file is None:
+            return
+        self._flush_pending()
+        if self._profiler is not None:
+            self._stop_profiler(state.global_step)
+        for hook in self._hooks:
+            hook.remove()
+        self._hooks = []
+        self._file.close()
+        self._file = None
+
+        summary = self.summary()
+        summary_file = self.output_file.with_suffix(".summary.json")
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Step profile summary ({summary_file}): {json.dumps(summary.get('mean', {}))}")
+
+    def _stop_profiler(self, step: int):
+        self._profiler.stop()
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        trace_file = self.trace_dir / f"trace_step{self.trace_start_step}-{step}.json"
+        self._profiler.export_chrome_trace(str(trace_file))
+        logger.info(f"Wrote torch.profiler trace to {trace_file}")
+        self._profiler = None
+        self.trace_dir = None
+
+    def _flush_pending(self):
+        if self._pending is None:
+            return
+        record = self._pending
+        self._pending = None
+
+        step_time = sum(record[segment] for segment in SEGMENTS)
+        record["step_time"] = step_time
+        record["tokens_per_second"] = record["tokens"] / step_time if step_time > 0 else 0.0
+        record["mfu"] = None
+        if self.peak_tflops and self._seq_len:
+            if self._flops_per_token is None:
+                self._flops_per_token = training_flops_per_token(self._model, self._seq_len)
+            record["mfu"] = record["tokens_per_second"] * self._flops_per_token / (self.peak_tflops * 1e12)
+        record["peak_rss_mb"] = peak_rss_mb()
+        if torch.cuda.is_available():
+            record["peak_cuda_mb"] = torch.cuda.max_memory_allocated() / (1024 * 1024)
+
+        self.records.append(record)
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def summary(self) -> Dict:
+        """Mean, median and p95 of every recorded metric across steps."""
+        if not self.records:
+            return {}
+        keys = SEGMENTS + ("step_time", "tokens_per_second", "mfu", "peak_rss_mb")
+        summary = {"steps": len(self.records), "mean": {}, "p50": {}, "p95": {}}
+        for key in keys:
+            values = np.array([r[key] for r in self.records if r.get(key) is not None], dtype=np.float64)
+            if values.size == 0:
+                continue
+            summary["mean"][key] = float(values.mean())
+            summary["p50"][key] = float(np.percentile(values, 50))
+            summary["p95"][key] = float(np.percentile(values, 95))
+        return summary
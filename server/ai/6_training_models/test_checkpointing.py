@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+import torch.nn as nn
+
+from checkpointing import (
+    MANIFEST_NAME,
+    OPTIMIZER_NAME,
+    AsyncCheckpointer,
+    find_latest_checkpoint,
+    load_model_shards,
+    verify_checkpoint,
+)
+
+class AsyncCheckpointerTest(unittest.TestCase):
+    """Tests for asynchronous sharded checkpointing"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp_dir.name
+        self.model = nn.Sequential(nn.Linear(64, 64), nn.ReLU(), nn.Linear(64, 8))
+        self.optimizer = torch.optim.AdamW(self.model.parameters())
+        self.model(torch.randn(4, 64)).sum().backward()
+        self.optimizer.step()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_with_multiple_shards(self):
+        checkpointer = AsyncCheckpointer(self.output_dir, max_shard_size_mb=0, save_total_limit=2)
+        checkpointer.save(10, self.model.state_dict(), {OPTIMIZER_NAME: self.optimizer.state_dict()})
+        checkpointer.close()
+
+        latest = find_latest_checkpoint(self.output_dir, check_hashes=True)
+        self.assertEqual(os.path.basename(latest), "checkpoint-10")
+        shards = [name for name in os.listdir(latest) if name.endswith(".safetensors")]
+        self.assertEqual(len(shards), 4)
+
+        restored = load_model_shards(latest)
+        for name, tensor in self.model.state_dict().items():
+            self.assertTrue(torch.equal(restored[name], tensor), name)
+        optimizer_state = torch.load(os.path.join(latest, OPTIMIZER_NAME), weights_only=True)
+        self.assertEqual(optimizer_state['state'].keys(), self.optimizer.state_dict()['state'].keys())
+
+    def test_snapshot_is_isolated_from_later_updates(self):
+        checkpointer = AsyncCheckpointer(self.output_dir)
+        expected = {k: v.clone() for k, v in self.model.state_dict().items()}
+        checkpointer.save(1, self.model.state_dict())
+        with torch.no_grad():
+            for param in self.model.parameters():
+                param.add_(1.0)
+        checkpointer.close()
+
+        restored = load_model_shards(os.path.join(self.output_dir, "checkpoint-1"))
+        for name, tensor in expected.items():
+            self.assertTrue(torch.equal(restored[name], tensor), name)
+
+    def test_rotation_and_corruption_fallback(self):
+        checkpointer = AsyncCheckpointer(self.output_dir, save_total_limit=2)
+        for step in (1, 2, 3):
+            checkpointer.save(step, self.model.state_dict())
+        checkpointer.close()
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["checkpoint-2", "checkpoint-3"])
+
+        newest = os.path.join(self.output_dir, "checkpoint-3")
+        with open(os.path.join(newest, MANIFEST_NAME)) as f:
+            shard = next(name for name in json.load(f)['files'] if name.endswith(".safetensors"))
+        with open(os.path.join(newest, shard), 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\x00" if f.read(1) != b"\x00" else b"\x01")
+        self.assertFalse(verify_checkpoint(newest))
+        self.assertTrue(find_latest_checkpoint(self.output_dir, check_hashes=True).endswith("checkpoint-2"))
+
+if __name__ == '__main__':
+    unittest.main()
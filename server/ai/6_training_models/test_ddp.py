@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+import torch
+import torch.distributed as dist
+
+from ddp import DistributedConfig, launch, shard_range
+
+def _all_reduce_worker(local_rank: int, result_dir: str):
+    tensor = torch.tensor([float(dist.get_rank() + 1)])
+    dist.all_reduce(tensor)
+    with open(os.path.join(result_dir, f"rank{dist.get_rank()}"), 'w') as f:
+        f.write(str(tensor.item()))
+
+class DistributedLauncherTest(unittest.TestCase):
+    """Tests for the CPU data-parallel launcher"""
+
+    def test_config_from_yaml_section(self):
+        config = DistributedConfig.from_config({'distributed': {'nproc_per_node': 4, 'nnodes': 2, 'node_rank': 1}})
+        self.assertEqual(config.world_size, 8)
+        self.assertEqual(config.global_rank(2), 6)
+        self.assertTrue(config.enabled)
+
+    def test_invalid_node_rank_rejected(self):
+        with self.assertRaises(ValueError):
+            DistributedConfig(nnodes=2, node_rank=2).validate()
+
+    def test_shard_range_covers_all_samples(self):
+        shards = [shard_range(10, rank, 3) for rank in range(3)]
+        self.assertEqual([len(s) for s in shards], [4, 3, 3])
+        self.assertEqual(sorted(i for s in shards for i in s), list(range(10)))
+
+    def test_spawned_workers_all_reduce(self):
+        with tempfile.TemporaryDirectory() as result_dir:
+            launch(_all_reduce_worker, DistributedConfig(nproc_per_node=2, master_port=29650), args=(result_dir,))
+            for rank in range(2):
+                with open(os.path.join(result_dir, f"rank{rank}")) as f:
+                    self.assertEqual(float(f.read()), 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
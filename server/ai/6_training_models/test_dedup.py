@@ -0,0 +1,92 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+from datasets import Dataset
+
+from dedup import Deduplicator, UnionFind, batch_shingles, minhash_permutations, minhash_signatures
+
+def make_corpus(num_docs=300, seed=0):
+    """Random documents, then 20 reformatted exact copies and 20 copies with one word changed"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(2000)]
+    docs = [" ".join(rng.choices(words, k=120)) for _ in range(num_docs)]
+    exact = ["  " + docs[i].upper() + "\n" for i in range(20)]
+    near = []
+    for i in range(20, 40):
+        tokens = docs[i].split()
+        tokens[60] = "changed"
+        near.append(" ".join(tokens))
+    return docs + exact + near
+
+class DeduplicatorTest(unittest.TestCase):
+    """Tests for exact and near-duplicate removal"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_signatures_estimate_jaccard(self):
+        a, b = minhash_permutations(256)
+        base = " ".join(f"w{i}" for i in range(300))
+        texts = [base, base.replace("w150 ", "x150 "), "", "ab"]
+        shingles, owners = batch_shingles(texts)
+        signatures = minhash_signatures(shingles, owners, len(texts), a, b, chunk_size=100)
+        # Batched, chunked hashing matches one document at a time
+        per_text = [batch_shingles([text])[0] for text in texts]
+        for i, text_shingles in enumerate(per_text):
+            self.assertTrue(np.array_equal(shingles[owners == i], text_shingles))
+            single = minhash_signatures(text_shingles, np.zeros(len(text_shingles), dtype=np.int64), 1, a, b)
+            self.assertTrue(np.array_equal(signatures[i], single[0]))
+        true_jaccard = len(np.intersect1d(per_text[0], per_text[1])) / len(np.union1d(per_text[0], per_text[1]))
+        self.assertAlmostEqual((signatures[0] == signatures[1]).mean(), true_jaccard, delta=0.1)
+        self.assertTrue((signatures[2] == np.iinfo(np.uint32).max).all())
+        self.assertEqual(len(per_text[3]), 1)
+
+    def test_union_find_keeps_first(self):
+        forest = UnionFind(os.path.join(self.tmp_dir.name, "parent.npy"), 10, chunk_size=4)
+        for x, y in [(5, 9), (9, 2), (7, 8)]:
+            forest.union(x, y)
+        roots = np.concatenate([roots for _, roots in forest.roots()])
+        self.assertEqual(roots.tolist(), [0, 1, 2, 3, 4, 2, 6, 7, 7, 2])
+
+    def test_removes_exact_and_near_duplicates(self):
+        dataset = Dataset.from_dict({'text': make_corpus()})
+        deduplicator = Deduplicator(max_memory_mb=0.1, work_dir=self.tmp_dir.name)
+        self.assertGreater(deduplicator._num_partitions(len(dataset)), 1)
+        deduped, stats = deduplicator.deduplicate(dataset)
+        self.assertEqual(deduped['text'], dataset['text'][:300])
+        self.assertEqual(stats['exact_duplicates'], 20)
+        self.assertEqual(stats['near_duplicates'], 20)
+        self.assertEqual(stats['documents_removed'], 40)
+        self.assertEqual(stats['tokens_removed'], 40 * 120)
+
+        # Cached by fingerprint, and the same with worker processes
+        self.assertEqual(deduplicator.deduplicate(dataset)[1], stats)
+        parallel = Deduplicator(num_proc=2, work_dir=None)
+        self.assertEqual(parallel.deduplicate(dataset)[0]['text'], deduped['text'])
+
+    def test_threshold_keeps_dissimilar(self):
+        docs = make_corpus()
+        dataset = Dataset.from_dict({'text': docs[:300] + docs[320:]})
+        deduped, stats = Deduplicator(threshold=1.0, work_dir=None).deduplicate(dataset)
+        self.assertEqual(len(deduped), 320)
+        self.assertEqual(stats['documents_removed'], 0)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            Deduplicator(num_perm=100, bands=16)
+        with self.assertRaises(ValueError):
+            Deduplicator(threshold=1.5)
+
+    def test_from_config_null_values_use_defaults(self):
+        config = {'random_seed': None, 'dataset': {'dedup': {'threshold': None, 'bands': None, 'work_dir': None}}}
+        deduplicator = Deduplicator.from_config(config)
+        self.assertEqual((deduplicator.threshold, deduplicator.bands, deduplicator.seed), (0.8, 16, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+import torch
+from datasets import Dataset
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from evaluation import Evaluator, length_bucketed_batches, pad_sequences, unpadded_sequences
+
+class EvaluatorTest(unittest.TestCase):
+    """Tests for the batched, cached evaluator"""
+
+    @classmethod
+    def setUpClass(cls):
+        torch.manual_seed(0)
+        cls.model = GPT2LMHeadModel(GPT2Config(n_layer=1, n_embd=32, n_head=2, vocab_size=100, n_positions=64))
+        rows = []
+        for length in [5, 40, 12, 33, 8, 50, 21, 3]:
+            ids = torch.randint(1, 100, (length,)).tolist()
+            # Right-padded to 50 like `padding="max_length"` tokenization
+            rows.append({'input_ids': ids + [0] * (50 - length), 'attention_mask': [1] * length + [0] * (50 - length)})
+        cls.dataset = Dataset.from_list(rows)
+
+    def _reference_loss(self, sequences):
+        self.model.eval()
+        nll, count = 0.0, 0
+        for sequence in sequences:
+            input_ids = torch.as_tensor(sequence).unsqueeze(0)
+            loss = self.model(input_ids=input_ids, labels=input_ids).loss.item()
+            nll += loss * (len(sequence) - 1)
+            count += len(sequence) - 1
+        return nll / count
+
+    def test_bucketing_respects_limits(self):
+        lengths = [5, 40, 12, 33, 8, 50, 21, 3]
+        batches = length_bucketed_batches(lengths, batch_size=3, max_tokens_per_batch=100)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(8)))
+        for batch in batches:
+            self.assertLessEqual(len(batch), 3)
+            self.assertLessEqual(len(batch) * max(lengths[i] for i in batch), max(100, max(lengths[i] for i in batch)))
+
+    def test_left_padding(self):
+        input_ids, attention_mask = pad_sequences([torch.tensor([1, 2]).numpy(), torch.tensor([3]).numpy()], 0, left=True)
+        self.assertEqual(input_ids.tolist(), [[1, 2], [0, 3]])
+        self.assertEqual(attention_mask.tolist(), [[1, 1], [0, 1]])
+
+    def test_perplexity_matches_unbatched_loss(self):
+        evaluator = Evaluator(pad_token_id=0, batch_size=3, generation={"enabled": False})
+        metrics = evaluator.evaluate(self.model, self.dataset)
+        expected = self._reference_loss([s for s in unpadded_sequences(self.dataset) if len(s) > 1])
+        self.assertAlmostEqual(metrics['eval_loss'], expected, places=4)
+
+    def test_worker_pool_cache_and_subsampling(self):
+        with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as checkpoint:
+            self.model.save_pretrained(checkpoint)
+            generation = {"num_prompts": 4, "prompt_tokens": 4, "max_new_tokens": 4}
+            inline = Evaluator(pad_token_id=0, batch_size=2, generation=generation)
+            pooled = Evaluator(pad_token_id=0, batch_size=2, num_workers=2, cache_dir=cache_dir, generation=generation)
+            try:
+                expected = inline.evaluate(self.model, self.dataset, split="predict", max_samples=6)
+                metrics = pooled.evaluate(self.model, self.dataset, split="predict", max_samples=6,
+                                          checkpoint=checkpoint)
+                self.assertEqual(metrics['predict_samples'], 6)
+                self.assertAlmostEqual(metrics['predict_loss'], expected['predict_loss'], places=5)
+                self.assertEqual(metrics['predict_generation_accuracy'], expected['predict_generation_accuracy'])
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+                pooled.close()
+                self.assertEqual(pooled.evaluate(self.model, self.dataset, split="predict", max_samples=6,
+                                                 checkpoint=checkpoint), metrics)
+                self.assertIsNone(pooled._pool)
+
+                # Live weights (periodic evals) are never cached
+                pooled.evaluate(self.model, self.dataset, split="eval", max_samples=6)
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+            finally:
+                pooled.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel, Trainer, TrainingArguments
+
+from profiling import SEGMENTS, StepProfilerCallback
+
+class StepProfilerCallbackTest(unittest.TestCase):
+    """Tests for the per-step training profiler"""
+
+    def test_records_step_breakdown_and_trace(self):
+        torch.manual_seed(0)
+        model = GPT2LMHeadModel(GPT2Config(n_layer=1, n_embd=32, n_head=2, vocab_size=100, n_positions=32))
+        data = [{"input_ids": torch.randint(0, 100, (16,)), "labels": torch.randint(0, 100, (16,))}
+                for _ in range(24)]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = StepProfilerCallback(
+                os.path.join(tmp_dir, "step_profile.jsonl"), peak_tflops=1.0,
+                trace_dir=os.path.join(tmp_dir, "traces"), trace_start_step=2, trace_num_steps=2,
+            )
+            args = TrainingArguments(
+                output_dir=tmp_dir, per_device_train_batch_size=4, max_steps=6,
+                save_strategy="no", report_to=[], use_cpu=True,
+            )
+            Trainer(model=model, args=args, train_dataset=data, callbacks=[profiler]).train()
+
+            with open(os.path.join(tmp_dir, "step_profile.jsonl")) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([r["step"] for r in records], list(range(1, 7)))
+            for record in records:
+                for segment in SEGMENTS:
+                    self.assertGreaterEqual(record[segment], 0.0)
+                self.assertEqual(record["tokens"], 4 * 16)
+                self.assertGreater(record["forward"], 0.0)
+                self.assertGreater(record["mfu"], 0.0)
+                self.assertGreater(record["peak_rss_mb"], 0.0)
+
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, "traces"))), 1)
+            with open(os.path.join(tmp_dir, "step_profile.summary.json")) as f:
+                self.assertEqual(json.load(f)["steps"], 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+from training_config import DEFAULT_CONFIG_PATH, check_config, estimate_resources, load_config, validate_config
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class TrainingConfigTest(unittest.TestCase):
+    """Tests for config validation and dry-run estimates"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w') as f:
+            if isinstance(content, str):
+                f.write(content)
+            else:
+                yaml.safe_dump(content, f)
+        return path
+
+    def test_shipped_config_is_valid(self):
+        config = load_config(DEFAULT_CONFIG_PATH)
+        self.assertEqual(config['model_name'], "aetherial/llm-base")
+        errors, _ = validate_config(config)
+        self.assertEqual(errors, [])
+
+    def test_type_and_required_errors(self):
+        config = load_config(DEFAULT_CONFIG_PATH)
+        config['per_device_train_batch_size'] = "eight"
+        config['learning_rate'] = "fast"
+        del config['output']['output_dir']
+        config['dataset']['unexpected'] = 1
+        errors, warnings = validate_config(config)
+        self.assertEqual(len(errors), 3)
+        self.assertIn("Unknown config key dataset.unexpected", warnings)
+
+    def test_distributed_null_values_use_defaults(self):
+        config = load_config(DEFAULT_CONFIG_PATH)
+        config['distributed'].update(node_rank=None, nnodes=None)
+        self.assertEqual(check_config(self._write("null_nodes.yaml", config), estimate=False)['errors'], [])
+        config['distributed'].update(node_rank=1)
+        self.assertEqual(validate_config(config)[0], ["distributed.node_rank must be less than distributed.nnodes"])
+
+    def test_dedup_threshold_range(self):
+        config = load_config(DEFAULT_CONFIG_PATH)
+        for threshold, valid in [(0, False), (1.5, False), (0.5, True), (1, True)]:
+            config['dataset']['dedup'] = {'threshold': threshold}
+            errors, _ = validate_config(config)
+            self.assertEqual(not errors, valid, threshold)
+
+    def test_dedup_null_values_use_defaults(self):
+        config = load_config(DEFAULT_CONFIG_PATH)
+        config['dataset']['dedup'] = {'threshold': None, 'bands': None, 'num_perm': None}
+        path = self._write("null_dedup.yaml", config)
+        report = check_config(path, estimate=False)
+        self.assertEqual(report['errors'], [])
+
+    def test_estimates_from_local_files(self):
+        model_dir = os.path.join(self.tmp_dir.name, "model")
+        os.makedirs(model_dir)
+        with open(os.path.join(model_dir, "config.json"), 'w') as f:
+            json.dump({"n_embd": 64, "n_layer": 2, "n_head": 4, "vocab_size": 1000}, f)
+        train_file = self._write("train.jsonl", "".join('{"text": "x"}\n' for _ in range(100)))
+
+        estimates = estimate_resources({
+            'model_name': model_dir,
+            'per_device_train_batch_size': 4,
+            'gradient_accumulation_steps': 2,
+            'num_train_epochs': 3,
+            'dataset': {'train_file': train_file},
+            'checkpoint': {'save_steps': 5},
+            'distributed': {'nproc_per_node': 2},
+        })
+        self.assertEqual(estimates['effective_batch_size'], 16)
+        self.assertEqual(estimates['steps_per_epoch'], 7)
+        self.assertEqual(estimates['total_steps'], 21)
+        self.assertEqual(estimates['num_checkpoints'], 4)
+        self.assertEqual(estimates['num_params'], 1000 * 64 + 2 * 12 * 64 * 64)
+        self.assertGreater(estimates['memory_gb_per_device'], 0)
+
+    def test_unparseable_file_reports_error(self):
+        report = check_config(self._write("bad.yaml", "model_name: [unclosed"))
+        self.assertFalse(report['valid'])
+
+    def test_validate_cli_skips_heavy_imports(self):
+        bad = self._write("bad.yaml", {'model_name': 1})
+        code = (
+            "import sys, train\n"
+            "sys.argv = ['train.py', '--validate-config', sys.argv[1], sys.argv[2]]\n"
+            "try:\n"
+            "    train.main()\n"
+            "except SystemExit as e:\n"
+            "    heavy = [m for m in ('torch', 'transformers', 'datasets', 'wandb') if m in sys.modules]\n"
+            "    print(e.code, heavy)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code, DEFAULT_CONFIG_PATH, bad],
+            cwd=HERE, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "1 []")
+
+if __name__ == '__main__':
+    unittest.main()
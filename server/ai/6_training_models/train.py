@@ -8,23 +8,12 @@ This script handles training, evaluation, and prediction for Aetherial's AI mode
 import os
 import json
 import logging
-import torch
-import numpy as np
-from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, field
-from transformers import (
-    AutoConfig,
-    AutoModelForCausalLM,
-    AutoTokenizer,
-    TrainingArguments,
-    Trainer,
-    EvalPrediction,
-    set_seed,
-)
-from datasets import load_dataset, Dataset
-import yaml
-import wandb
+
+# torch, transformers, datasets and wandb are imported where they are used so
+# that --help, --dry-run and --validate-config start instantly
+from training_config import check_config, load_config
 
 # Configure logging
 logging.basicConfig(
@@ -130,14 +119,12 @@ class AetherialTrainer:
         self.train_dataset = None
         self.eval_dataset = None
         self.test_dataset = None
+        self.dedup_stats = None
         
-    def _load_config(self, config_path: str = None) -> dict:
+    @staticmethod
+    def _load_config(config_path: str = None) -> dict:
         """Load configuration from YAML file."""
-        if config_path is None:
-            config_path = os.path.join(os.path.dirname(__file__), 'training-config.yaml')
-            
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
         
         # Set environment variables from config
         if 'wandb' in config.get('tracking', {}):
@@ -148,11 +135,15 @@ class AetherialTrainer:
         
     def setup_environment(self):
         """Setup training environment (logging, seed, etc.)."""
+        from transformers import set_seed
+        from ddp import is_main_process
+        
         # Set seed for reproducibility
         set_seed(self.config.get('random_seed', 42))
         
-        # Initialize wandb if enabled
-        if self.config.get('tracking', {}).get('wandb_project'):
+        # Initialize wandb if enabled (only once per distributed run)
+        if self.config.get('tracking', {}).get('wandb_project') and is_main_process():
+            import wandb
             wandb.init(
                 project=self.config['tracking']['wandb_project'],
                 name=self.config['tracking'].get('wandb_run_name'),
@@ -161,6 +152,8 @@ class AetherialTrainer:
     
     def load_model_and_tokenizer(self):
         """Load pretrained model and tokenizer."""
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        
         logger.info(f"Loading model from {self.config['model_name']}")
         
         # Load tokenizer
@@ -182,6 +175,10 @@ class AetherialTrainer:
     
     def load_datasets(self):
         """Load and preprocess datasets."""
+        from datasets import load_dataset
+        from ddp import main_process_first
+        from evaluation import subsample
+        
         data_files = {}
         dataset_args = {}
         
@@ -205,6 +202,16 @@ class AetherialTrainer:
         column_names = raw_datasets["train"].column_names
         text_column_name = "text" if "text" in column_names else column_names[0]
         
+        # Drop exact and near-duplicate training documents before they are tokenized
+        if (self.config['dataset'].get('dedup', {}) or {}).get('enabled', False):
+            from dedup import Deduplicator, TokenizerCounter
+            count_tokens = TokenizerCounter(self.tokenizer) if self.tokenizer is not None else None
+            # Rank 0 computes and caches the result; other ranks then load it
+            with main_process_first():
+                raw_datasets["train"], self.dedup_stats = Deduplicator.from_config(self.config).deduplicate(
+                    raw_datasets["train"], text_column_name, count_tokens
+                )
+        
         def tokenize_function(examples):
             return self.tokenizer(
                 examples[text_column_name],
@@ -214,14 +221,16 @@ class AetherialTrainer:
                 return_special_tokens_mask=True,
             )
             
-        tokenized_datasets = raw_datasets.map(
-            tokenize_function,
-            batched=True,
-            num_proc=self.config['dataset'].get('preprocessing_num_workers', None),
-            remove_columns=column_names,
-            load_from_cache_file=not self.config['dataset'].get('overwrite_cache', False),
-            desc="Running tokenizer on dataset",
-        )
+        # Rank 0 tokenizes and fills the cache; other ranks then load from it
+        with main_process_first():
+            tokenized_datasets = raw_datasets.map(
+                tokenize_function,
+                batched=True,
+                num_proc=self.config['dataset'].get('preprocessing_num_workers', None),
+                remove_columns=column_names,
+                load_from_cache_file=not self.config['dataset'].get('overwrite_cache', False),
+                desc="Running tokenizer on dataset",
+            )
         
         if self.config.get('training', {}).get('group_by_length', False):
             # Group texts together for more efficient training
@@ -241,13 +250,14 @@ class AetherialTrainer:
                 }
                 return result
                 
-            tokenized_datasets = tokenized_datasets.map(
-                group_texts,
-                batched=True,
-                num_proc=self.config['dataset'].get('preprocessing_num_workers', None),
-                load_from_cache_file=not self.config['dataset'].get('overwrite_cache', False),
-                desc=f"Grouping texts in chunks of {self.config['max_seq_length']}",
-            )
+            with main_process_first():
+                tokenized_datasets = tokenized_datasets.map(
+                    group_texts,
+                    batched=True,
+                    num_proc=self.config['dataset'].get('preprocessing_num_workers', None),
+                    load_from_cache_file=not self.config['dataset'].get('overwrite_cache', False),
+                    desc=f"Grouping texts in chunks of {self.config['max_seq_length']}",
+                )
         
         # Set datasets
         if "train" in tokenized_datasets:
@@ -256,19 +266,82 @@ class AetherialTrainer:
             self.eval_dataset = tokenized_datasets["validation"]
         if "test" in tokenized_datasets:
             self.test_dataset = tokenized_datasets["test"]
+        
+        # Optional subsampling for quicker runs (see DataTrainingArguments)
+        dataset_config = self.config['dataset']
+        self.train_dataset = subsample(self.train_dataset, dataset_config.get('max_train_samples'))
+        self.eval_dataset = subsample(self.eval_dataset, dataset_config.get('max_eval_samples'))
+        self.test_dataset = subsample(self.test_dataset, dataset_config.get('max_predict_samples'))
     
     def train(self):
         """Train the model."""
+        from transformers import Trainer, TrainingArguments
+        from checkpointing import AsyncCheckpointCallback, AsyncCheckpointer, find_latest_checkpoint
+        from ddp import DistributedConfig
+        from evaluation import Evaluator, PeriodicEvalCallback
+        from profiling import StepProfilerCallback
+        
         if self.train_dataset is None:
             raise ValueError("Training dataset not loaded. Call load_datasets() first.")
             
+        dist_config = DistributedConfig.from_config(self.config)
+        ddp_kwargs = {}
+        if dist_config.enabled:
+            # The Trainer wraps the model in DDP and shards batches by rank
+            ddp_kwargs = dict(
+                ddp_backend=dist_config.backend,
+                ddp_bucket_cap_mb=dist_config.bucket_cap_mb,
+                ddp_find_unused_parameters=False,
+                ddp_timeout=dist_config.timeout_seconds,
+            )
+            
+        # Asynchronous checkpointing replaces the Trainer's blocking saves
+        checkpoint_config = self.config['checkpoint']
+        output_dir = self.config['output']['output_dir']
+        save_steps = checkpoint_config.get('save_steps', 500)
+        async_save = checkpoint_config.get('async_save', False)
+        callbacks = []
+        checkpointer = None
+        if async_save:
+            checkpointer = AsyncCheckpointer(
+                output_dir,
+                max_shard_size_mb=checkpoint_config.get('max_shard_size_mb', 2048),
+                save_total_limit=checkpoint_config.get('save_total_limit', 3),
+            )
+            callbacks.append(AsyncCheckpointCallback(checkpointer, save_steps))
+            if checkpoint_config.get('load_best_model_at_end', True):
+                logger.warning("load_best_model_at_end is not supported with async_save; disabling it")
+        
+        # Batched evaluator replaces the Trainer's evaluation loop when enabled
+        evaluation_config = self.config.get('evaluation', {}) or {}
+        use_evaluator = evaluation_config.get('use_evaluator', False)
+        evaluator = None
+        if use_evaluator:
+            pad_token_id = self.tokenizer.pad_token_id
+            if pad_token_id is None:
+                pad_token_id = self.tokenizer.eos_token_id
+            evaluator = Evaluator.from_config(self.config, pad_token_id=pad_token_id)
+            if self.eval_dataset is not None:
+                callbacks.append(PeriodicEvalCallback(
+                    evaluator,
+                    self.eval_dataset,
+                    eval_steps=evaluation_config.get('eval_steps', self.config.get('eval_steps', 1000)),
+                    max_samples=evaluation_config.get('periodic_max_samples'),
+                ))
+            if checkpoint_config.get('load_best_model_at_end', True):
+                logger.warning("load_best_model_at_end is not supported with the batched evaluator; disabling it")
+        
+        # Step-time breakdown, written locally whether or not wandb is enabled
+        if self.config.get('profiling', {}).get('enabled', True):
+            callbacks.append(StepProfilerCallback.from_config(self.config, checkpointer=checkpointer))
+            
         # Initialize training arguments
         training_args = TrainingArguments(
             output_dir=self.config['output']['output_dir'],
             overwrite_output_dir=self.config['output'].get('overwrite_output_dir', True),
             do_train=self.config['output'].get('do_train', True),
             do_eval=self.config['output'].get('do_eval', True),
-            evaluation_strategy="steps",
+            evaluation_strategy="no" if use_evaluator else "steps",
             per_device_train_batch_size=self.config.get('per_device_train_batch_size', 8),
             per_device_eval_batch_size=self.config.get('per_device_eval_batch_size', 8),
             gradient_accumulation_steps=self.config.get('gradient_accumulation_steps', 1),
@@ -282,9 +355,12 @@ class AetherialTrainer:
             logging_dir=self.config['logging'].get('logging_dir', './logs'),
             logging_first_step=self.config['logging'].get('logging_first_step', False),
             logging_steps=self.config['logging'].get('logging_steps', 500),
-            save_steps=self.config['checkpoint'].get('save_steps', 500),
-            save_total_limit=self.config['checkpoint'].get('save_total_limit', 3),
-            load_best_model_at_end=self.config['checkpoint'].get('load_best_model_at_end', True),
+            save_strategy="no" if async_save else "steps",
+            save_steps=save_steps,
+            save_total_limit=checkpoint_config.get('save_total_limit', 3),
+            load_best_model_at_end=(
+                checkpoint_config.get('load_best_model_at_end', True) and not async_save and not use_evaluator
+            ),
             metric_for_best_model=self.config['checkpoint'].get('metric_for_best_model', 'loss'),
             greater_is_better=self.config['checkpoint'].get('greater_is_better', False),
             seed=self.config.get('random_seed', 42),
@@ -294,6 +370,7 @@ class AetherialTrainer:
             dataloader_num_workers=self.config.get('dataloader_num_workers', 0),
             group_by_length=self.config.get('group_by_length', False),
             report_to=["wandb"] if self.config.get('tracking', {}).get('wandb_project') else [],
+            **ddp_kwargs,
         )
         
         # Initialize Trainer
@@ -303,24 +380,87 @@ class AetherialTrainer:
             train_dataset=self.train_dataset,
             eval_dataset=self.eval_dataset,
             tokenizer=self.tokenizer,
+            callbacks=callbacks,
         )
         
+        # Resume from an explicit checkpoint path, or the newest verified one
+        resume_from_checkpoint = checkpoint_config.get('resume_from_checkpoint')
+        if resume_from_checkpoint == "latest":
+            resume_from_checkpoint = find_latest_checkpoint(output_dir)
+            if resume_from_checkpoint:
+                logger.info(f"Resuming from {resume_from_checkpoint}")
+        
         # Train the model
-        train_result = trainer.train()
+        try:
+            train_result = trainer.train(resume_from_checkpoint=resume_from_checkpoint)
+        finally:
+            if checkpointer is not None:
+                checkpointer.close()
         trainer.save_model()
         
         # Save tokenizer
         if trainer.is_world_process_zero():
             self.tokenizer.save_pretrained(self.config['output']['output_dir'])
             
-        # Evaluate the model
-        metrics = trainer.evaluate()
+        do_predict = self.config['output'].get('do_predict', False) and self.test_dataset is not None
+        if evaluator is None:
+            # Evaluate the model
+            metrics = trainer.evaluate()
+            
+            # Log metrics
+            trainer.log_metrics("eval", metrics)
+            trainer.save_metrics("eval", metrics)
+            
+            if do_predict:
+                predict_metrics = trainer.predict(self.test_dataset, metric_key_prefix="predict").metrics
+                trainer.log_metrics("predict", predict_metrics)
+                trainer.save_metrics("predict", predict_metrics)
+            return metrics
         
-        # Log metrics
-        trainer.log_metrics("eval", metrics)
-        trainer.save_metrics("eval", metrics)
+        # Final results are cached under the content hash of the saved model
+        metrics = {}
+        try:
+            if trainer.is_world_process_zero():
+                if self.eval_dataset is not None:
+                    metrics = evaluator.evaluate(self.model, self.eval_dataset, split="eval", checkpoint=output_dir)
+                    trainer.log_metrics("eval", metrics)
+                    trainer.save_metrics("eval", metrics)
+                if do_predict:
+                    predict_metrics = dict(evaluator.evaluate(
+                        self.model, self.test_dataset, split="predict", checkpoint=output_dir, return_predictions=True
+                    ))
+                    self._save_predictions(predict_metrics.pop("predictions", []))
+                    trainer.log_metrics("predict", predict_metrics)
+                    trainer.save_metrics("predict", predict_metrics)
+        finally:
+            evaluator.close()
         
         return metrics
+    
+    def _save_predictions(self, predictions: List[dict]):
+        """Write decoded generations for the test set next to the model."""
+        path = os.path.join(self.config['output']['output_dir'], "predictions.jsonl")
+        with open(path, 'w') as f:
+            for prediction in predictions:
+                f.write(json.dumps({
+                    key: self.tokenizer.decode(tokens, skip_special_tokens=True)
+                    for key, tokens in prediction.items()
+                }) + "\n")
+        logger.info(f"Wrote {len(predictions)} predictions to {path}")
+
+def run_training(local_rank: int, config_path: Optional[str], overrides: dict):
+    """Train on one worker; `local_rank` is -1 outside distributed runs."""
+    from ddp import is_main_process
+    
+    trainer = AetherialTrainer(config_path=config_path)
+    trainer.config.setdefault('distributed', {}).update(overrides)
+    trainer.config['distributed']['local_rank'] = local_rank
+    trainer.load_model_and_tokenizer()
+    trainer.load_datasets()
+    metrics = trainer.train()
+    
+    if is_main_process():
+        logger.info(f"Training complete. Final metrics: {metrics}")
 
 def main():
     """Main function for training."""
@@ -328,15 +468,52 @@ def main():
     
     parser = argparse.ArgumentParser(description="Aetherial AI Model Training")
     parser.add_argument("--config", type=str, default=None, help="Path to config file")
+    parser.add_argument("--nproc-per-node", type=int, default=None,
+                        help="Number of data-parallel worker processes to spawn on this host")
+    parser.add_argument("--nnodes", type=int, default=None, help="Number of nodes in a multi-node run")
+    parser.add_argument("--node-rank", type=int, default=None, help="Rank of this node in a multi-node run")
+    parser.add_argument("--master-addr", type=str, default=None, help="Address of the rank 0 node")
+    parser.add_argument("--master-port", type=int, default=None, help="Port of the rank 0 node")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Validate --config, print memory and step estimates as JSON, and exit")
+    parser.add_argument("--validate-config", type=str, nargs="+", metavar="CONFIG", default=None,
+                        help="Validate one or more config files against the schema and exit")
     args = parser.parse_args()
     
-    # Initialize and run trainer
-    trainer = AetherialTrainer(config_path=args.config)
-    trainer.load_model_and_tokenizer()
-    trainer.load_datasets()
-    metrics = trainer.train()
+    # Config checks never import torch/transformers or contact wandb
+    if args.validate_config:
+        invalid = 0
+        for path in args.validate_config:
+            report = check_config(path, estimate=False)
+            if report['valid']:
+                print(f"OK       {path}")
+            else:
+                invalid += 1
+                print(f"INVALID  {path}: {'; '.join(report['errors'])}")
+            for warning in report['warnings']:
+                print(f"         warning: {warning}")
+        parser.exit(1 if invalid else 0)
+    
+    if args.dry_run:
+        report = check_config(args.config)
+        print(json.dumps(report, indent=2))
+        parser.exit(0 if report['valid'] else 1)
+    
+    # Command-line flags override the `distributed` section of the config
+    overrides = {
+        key: value for key, value in {
+            'nproc_per_node': args.nproc_per_node,
+            'nnodes': args.nnodes,
+            'node_rank': args.node_rank,
+            'master_addr': args.master_addr,
+            'master_port': args.master_port,
+        }.items() if value is not None
+    }
+    config = AetherialTrainer._load_config(args.config)
+    config.setdefault('distributed', {}).update(overrides)
     
-    logger.info(f"Training complete. Final metrics: {metrics}")
+    from ddp import DistributedConfig, launch
+    launch(run_training, DistributedConfig.from_config(config), args=(args.config, overrides))
 
 if __name__ == "__main__":
     main()
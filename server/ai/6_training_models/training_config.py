@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Aetherial Training Configuration
+
+This module loads and validates `training-config.yaml` and estimates the
+memory and step counts of a job. It only depends on the standard library and
+PyYAML so job configs can be checked without importing torch or transformers.
+"""
+
+import glob
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'training-config.yaml')
+
+class ConfigError(ValueError):
+    """Raised when a training config fails validation."""
+
+@dataclass
+class ConfigField:
+    """Schema entry for one config key."""
+    type: type
+    required: bool = False
+    minimum: Optional[float] = None
+    choices: Optional[Sequence[Any]] = None
+
+    def check(self, key: str, value: Any) -> Optional[str]:
+        """Return an error message, or None if `value` is acceptable."""
+        if value is None:
+            return f"{key} is required" if self.required else None
+        if self.type is float:
+            # PyYAML reads exponents without a dot (e.g. 2e-5) as strings
+            if isinstance(value, bool):
+                return f"{key} must be a number, got {value!r}"
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return f"{key} must be a number, got {value!r}"
+        elif self.type is int:
+            if isinstance(value, bool) or not isinstance(value, int):
+                return f"{key} must be an integer, got {value!r}"
+        elif not isinstance(value, self.type):
+            return f"{key} must be of type {self.type.__name__}, got {value!r}"
+        if self.minimum is not None and value < self.minimum:
+            return f"{key} must be >= {self.minimum}, got {value!r}"
+        if self.choices is not None and value not in self.choices:
+            return f"{key} must be one of {list(self.choices)}, got {value!r}"
+        return None
+
+
+SCHEMA: Dict[str, Any] = {
+    'model_name': ConfigField(str, required=True),
+    'tokenizer_name': ConfigField(str),
+    'cache_dir': ConfigField(str),
+    'random_seed': ConfigField(int),
+    'learning_rate': ConfigField(float, minimum=0),
+    'weight_decay': ConfigField(float, minimum=0),
+    'adam_epsilon': ConfigField(float, minimum=0),
+    'max_grad_norm': ConfigField(float, minimum=0),
+    'num_train_epochs': ConfigField(float, minimum=0),
+    'warmup_steps': ConfigField(int, minimum=0),
+    'per_device_train_batch_size': ConfigField(int, minimum=1),
+    'per_device_eval_batch_size': ConfigField(int, minimum=1),
+    'gradient_accumulation_steps': ConfigField(int, minimum=1),
+    'max_seq_length': ConfigField(int, minimum=1),
+    'doc_stride': ConfigField(int, minimum=0),
+    'pad_to_max_length': ConfigField(bool),
+    'group_by_length': ConfigField(bool),
+    'dataloader_num_workers': ConfigField(int, minimum=0),
+    'logging_steps': ConfigField(int, minimum=1),
+    'save_steps': ConfigField(int, minimum=1),
+    'eval_steps': ConfigField(int, minimum=1),
+    'save_total_limit': ConfigField(int, minimum=1),
+    'fp16': ConfigField(bool),
+    'fp16_opt_level': ConfigField(str, choices=("O0", "O1", "O2", "O3")),
+    'early_stopping_patience': ConfigField(int, minimum=0),
+    'early_stopping_threshold': ConfigField(float, minimum=0),
+    'dataset': {
+        'train_file': ConfigField(str, required=True),
+        'validation_file': ConfigField(str),
+        'test_file': ConfigField(str),
+        'cache_dir': ConfigField(str),
+        'overwrite_cache': ConfigField(bool),
+        'preprocessing_num_workers': ConfigField(int, minimum=1),
+        'keep_linebreaks': ConfigField(bool),
+        'max_train_samples': ConfigField(int, minimum=1),
+        'max_eval_samples': ConfigField(int, minimum=1),
+        'max_predict_samples': ConfigField(int, minimum=1),
+        'dedup': {
+            'enabled': ConfigField(bool),
+            'num_perm': ConfigField(int, minimum=1),
+            'bands': ConfigField(int, minimum=1),
+            'threshold': ConfigField(float, minimum=0),
+            'shingle_size': ConfigField(int, minimum=1),
+            'max_memory_mb': ConfigField(float, minimum=0),
+            'work_dir': ConfigField(str),
+        },
+    },
+    'evaluation': {
+        'use_evaluator': ConfigField(bool),
+        'eval_steps': ConfigField(int, minimum=1),
+        'periodic_max_samples': ConfigField(int, minimum=1),
+        'num_workers': ConfigField(int, minimum=0),
+        'max_tokens_per_batch': ConfigField(int, minimum=1),
+        'cache_dir': ConfigField(str),
+        'generation': {
+            'enabled': ConfigField(bool),
+            'num_prompts': ConfigField(int, minimum=1),
+            'prompt_tokens': ConfigField(int, minimum=1),
+            'max_new_tokens': ConfigField(int, minimum=1),
+        },
+    },
+    'output': {
+        'output_dir': ConfigField(str, required=True),
+        'overwrite_output_dir': ConfigField(bool),
+        'do_train': ConfigField(bool),
+        'do_eval': ConfigField(bool),
+        'do_predict': ConfigField(bool),
+    },
+    'logging': {
+        'logging_dir': ConfigField(str),
+        'log_level': ConfigField(str, choices=("debug", "info", "warning", "error", "critical", "passive")),
+        'log_level_replica': ConfigField(str, choices=("debug", "info", "warning", "error", "critical", "passive")),
+        'logging_first_step': ConfigField(bool),
+        'logging_steps': ConfigField(int, minimum=1),
+    },
+    'checkpoint': {
+        'save_steps': ConfigField(int, minimum=1),
+        'save_total_limit': ConfigField(int, minimum=1),
+        'load_best_model_at_end': ConfigField(bool),
+        'metric_for_best_model': ConfigField(str),
+        'greater_is_better': ConfigField(bool),
+        'async_save': ConfigField(bool),
+        'max_shard_size_mb': ConfigField(int, minimum=1),
+        'resume_from_checkpoint': ConfigField(str),
+    },
+    'profiling': {
+        'enabled': ConfigField(bool),
+        'output_file': ConfigField(str),
+        'peak_tflops': ConfigField(float, minimum=0),
+        'synchronize_cuda': ConfigField(bool),
+        'torch_profiler': {
+            'enabled': ConfigField(bool),
+            'start_step': ConfigField(int, minimum=0),
+            'num_steps': ConfigField(int, minimum=1),
+            'trace_dir': ConfigField(str),
+        },
+    },
+    'distributed': {
+        'local_rank': ConfigField(int, minimum=-1),
+        'n_gpu': ConfigField(int, minimum=0),
+        'backend': ConfigField(str, choices=("gloo", "nccl", "mpi")),
+        'nproc_per_node': ConfigField(int, minimum=1),
+        'nnodes': ConfigField(int, minimum=1),
+        'node_rank': ConfigField(int, minimum=0),
+        'master_addr': ConfigField(str),
+        'master_port': ConfigField(int, minimum=1),
+        'bucket_cap_mb': ConfigField(int, minimum=1),
+        'timeout_seconds': ConfigField(int, minimum=1),
+        'tpu_num_cores': ConfigField(int, minimum=1),
+        'tpu_metrics_debug': ConfigField(bool),
+    },
+    'tracking': {
+        'wandb_project': ConfigField(str),
+        'wandb_run_name': ConfigField(str),
+        'wandb_watch': ConfigField(str, choices=("gradients", "parameters", "all", "false")),
+        'wandb_log_model': ConfigField(str),
+    },
+}
+
+
+def load_config(config_path: Optional[str] = None) -> dict:
+    """Load a training config, hoisting the `defaults` block to the top level.
+
+    Keys set at the top level take precedence over the same keys in `defaults`.
+    """
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_PATH
+
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    if not isinstance(config, dict):
+        raise ConfigError(f"{config_path} must contain a mapping at the top level")
+
+    defaults = config.pop('defaults', None) or {}
+    return {**defaults, **config}
+
+
+def _validate_section(section: Any, schema: Dict[str, Any], prefix: str,
+                      errors: List[str], warnings: List[str]):
+    if not isinstance(section, dict):
+        errors.append(f"{prefix.rstrip('.')} must be a mapping")
+        return
+    for key, spec in schema.items():
+        value = section.get(key)
+        if isinstance(spec, dict):
+            if value is not None:
+                _validate_section(value, spec, f"{prefix}{key}.", errors, warnings)
+            elif any(isinstance(f, ConfigField) and f.required for f in spec.values()):
+                errors.append(f"{prefix}{key} section is required")
+            continue
+        error = spec.check(f"{prefix}{key}", value)
+        if error:
+            errors.append(error)
+    for key in section:
+        if key not in schema:
+            warnings.append(f"Unknown config key {prefix}{key}")
+
+
+def _set_values(section: Optional[dict]) -> dict:
+    """The keys of a config section that have a value."""
+    return {key: value for key, value in (section or {}).items() if value is not None}
+
+
+def validate_config(config: dict) -> Tuple[List[str], List[str]]:
+    """Check a loaded config against SCHEMA; returns (errors, warnings)."""
+    errors: List[str] = []
+    warnings: List[str] = []
+    _validate_section(config, SCHEMA, "", errors, warnings)
+
+    # Keys left empty in YAML load as None and mean "use the default"
+    distributed = _set_values(config.get('distributed'))
+    if distributed and not errors:
+        if distributed.get('node_rank', 0) >= distributed.get('nnodes', 1):
+            errors.append("distributed.node_rank must be less than distributed.nnodes")
+    dedup = _set_values((config.get('dataset') or {}).get('dedup'))
+    if dedup and not errors:
+        if dedup.get('num_perm', 128) % dedup.get('bands', 16):
+            errors.append("dataset.dedup.num_perm must be divisible by dataset.dedup.bands")
+        if not 0 < float(dedup.get('threshold', 0.8)) <= 1:
+            errors.append("dataset.dedup.threshold must be in (0, 1]")
+    checkpoint = config.get('checkpoint') or {}
+    if isinstance(checkpoint, dict) and checkpoint.get('async_save') and checkpoint.get('load_best_model_at_end'):
+        warnings.append("checkpoint.load_best_model_at_end is ignored when checkpoint.async_save is enabled")
+    return errors, warnings
+
+
+def _count_lines(path: str, chunk_size: int = 16 * 1024 * 1024) -> int:
+    count = 0
+    last = b"\n"
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    return count + (last != b"\n")
+
+
+def _find_model_config(model_name: str, cache_dir: Optional[str] = None) -> Optional[dict]:
+    """Read a model's config.json from a local path or the hub cache, without network access."""
+    candidates = [os.path.join(model_name, 'config.json')]
+    hub_dirs = [cache_dir] if cache_dir else []
+    hub_dirs.append(os.environ.get('HF_HUB_CACHE') or os.path.join(
+        os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface')), 'hub'))
+    repo_dir = "models--" + model_name.replace('/', '--')
+    for hub_dir in hub_dirs:
+        candidates.extend(sorted(glob.glob(os.path.join(hub_dir, repo_dir, 'snapshots', '*', 'config.json'))))
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            with open(candidate) as f:
+                return json.load(f)
+    return None
+
+
+def _model_dims(model_config: dict) -> Dict[str, Optional[int]]:
+    def first(*keys):
+        return next((model_config[k] for k in keys if model_config.get(k) is not None), None)
+
+    hidden = first('hidden_size', 'n_embd', 'd_model')
+    layers = first('num_hidden_layers', 'n_layer', 'num_layers')
+    heads = first('num_attention_heads', 'n_head', 'num_heads')
+    vocab = first('vocab_size')
+    ffn = first('intermediate_size', 'n_inner', 'ffn_dim') or (4 * hidden if hidden else None)
+    num_params = None
+    if hidden and layers and vocab:
+        num_params = vocab * hidden + layers * (4 * hidden * hidden + 2 * hidden * ffn)
+    return {'hidden_size': hidden, 'num_layers': layers, 'num_heads': heads, 'num_params': num_params}
+
+
+def estimate_resources(config: dict) -> Dict[str, Any]:
+    """Estimate optimizer steps and per-device training memory for a config.
+
+    Sample counts come from the local train file and model dimensions from a
+    locally cached config.json; estimates that need either are None when
+    those are unavailable.
+    """
+    distributed = config.get('distributed') or {}
+    world_size = distributed.get('nproc_per_node', 1) * distributed.get('nnodes', 1)
+    batch_size = config.get('per_device_train_batch_size', 8)
+    grad_accum = config.get('gradient_accumulation_steps', 1)
+    seq_len = config.get('max_seq_length', 512)
+    epochs = float(config.get('num_train_epochs', 3))
+    effective_batch = batch_size * grad_accum * world_size
+
+    estimates: Dict[str, Any] = {
+        'world_size': world_size,
+        'effective_batch_size': effective_batch,
+        'num_train_samples': None,
+        'steps_per_epoch': None,
+        'total_steps': None,
+        'num_checkpoints': None,
+        'num_params': None,
+        'memory_gb_per_device': None,
+    }
+
+    dataset = config.get('dataset') or {}
+    train_file = dataset.get('train_file')
+    if train_file and os.path.isfile(train_file):
+        num_samples = _count_lines(train_file)
+        if dataset.get('max_train_samples'):
+            num_samples = min(num_samples, dataset['max_train_samples'])
+        steps_per_epoch = math.ceil(num_samples / effective_batch)
+        total_steps = math.ceil(steps_per_epoch * epochs)
+        save_steps = (config.get('checkpoint') or {}).get('save_steps', config.get('save_steps', 500))
+        estimates.update(
+            num_train_samples=num_samples,
+            steps_per_epoch=steps_per_epoch,
+            total_steps=total_steps,
+            num_checkpoints=total_steps // save_steps,
+        )
+
+    model_config = _find_model_config(config.get('model_name', ''), config.get('cache_dir'))
+    if model_config:
+        dims = _model_dims(model_config)
+        num_params = dims['num_params']
+        if num_params:
+            # fp32 master weights + grads + Adam moments, plus a half-precision copy with fp16
+            bytes_per_param = 16 + (2 if config.get('fp16') else 0)
+            static = num_params * bytes_per_param
+            activations = 0
+            if dims['hidden_size'] and dims['num_layers'] and dims['num_heads']:
+                # Per-layer activation bytes for 16-bit training (Korthikanti et al.)
+                hidden, heads = dims['hidden_size'], dims['num_heads']
+                per_layer = seq_len * batch_size * hidden * (34 + 5 * heads * seq_len / hidden)
+                activations = per_layer * dims['num_layers'] * (1 if config.get('fp16') else 2)
+            estimates.update(
+                num_params=num_params,
+                memory_gb_per_device=round((static + activations) / 1024 ** 3, 3),
+            )
+    return estimates
+
+
+def check_config(config_path: Optional[str] = None, estimate: bool = True) -> Dict[str, Any]:
+    """Load, validate and optionally estimate one config; never raises on invalid content."""
+    report: Dict[str, Any] = {'config': config_path or DEFAULT_CONFIG_PATH, 'valid': False,
+                              'errors': [], 'warnings': []}
+    try:
+        config = load_config(config_path)
+    except (OSError, yaml.YAMLError, ConfigError) as e:
+        report['errors'].append(str(e))
+        return report
+
+    report['errors'], report['warnings'] = validate_config(config)
+    report['valid'] = not report['errors']
+    if estimate and report['valid']:
+        report['estimates'] = estimate_resources(config)
+    return report
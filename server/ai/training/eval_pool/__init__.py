@@ -0,0 +1,105 @@
+"""
+Batching and worker processes shared by the training evaluator and the AI test suites.
+
+Examples are grouped into length-bucketed batches so dynamic padding wastes
+few tokens, and batches can be spread over persistent CPU processes that
+share the model's weights. Only torch and numpy are needed, so callers can
+import this without the training stack.
+"""
+
+import os
+import queue
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+
+def length_bucketed_batches(lengths: Sequence[int], batch_size: int,
+                            max_tokens_per_batch: Optional[int] = None) -> List[List[int]]:
+    """Group indices of similar length so dynamic padding wastes few tokens.
+
+    Batches hold at most `batch_size` examples and, if given, at most
+    `max_tokens_per_batch` padded tokens.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")[::-1]
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for index in order.tolist():
+        # Sorted descending, so the first element sets the padded length
+        padded = lengths[batch[0]] if batch else lengths[index]
+        too_many_tokens = max_tokens_per_batch is not None and (len(batch) + 1) * padded > max_tokens_per_batch
+        if batch and (len(batch) >= batch_size or too_many_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _eval_worker(model, tasks, results, num_threads: int):
+    """Worker loop; `model` shares its weight storage with the parent process."""
+    torch.set_num_threads(num_threads)
+    model.eval()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, fn, payload = task
+        try:
+            results.put((task_id, fn(model, *payload), None))
+        except Exception as e:
+            results.put((task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class EvalWorkerPool:
+    """Persistent CPU processes that evaluate batches against shared weights.
+
+    The model's parameters are moved to shared memory once, so workers see
+    in-place optimizer updates made by the training process.
+    """
+
+    def __init__(self, model: torch.nn.Module, num_workers: int):
+        if next(model.parameters()).is_cuda:
+            raise ValueError("EvalWorkerPool only supports CPU models")
+        model.share_memory()
+        ctx = mp.get_context("spawn")
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        # Split the host's cores evenly so workers do not oversubscribe them
+        num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        self.processes = [
+            ctx.Process(target=_eval_worker, args=(model, self.tasks, self.results, num_threads), daemon=True)
+            for _ in range(num_workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def map(self, fn: Callable[..., Any], payloads: Sequence[Any]) -> List[Any]:
+        """Run the picklable module-level `fn(model, *payload)` on every payload."""
+        for task_id, payload in enumerate(payloads):
+            self.tasks.put((task_id, fn, payload))
+        outputs: List[Any] = [None] * len(payloads)
+        for _ in payloads:
+            while True:
+                try:
+                    task_id, output, error = self.results.get(timeout=5)
+                    break
+                except queue.Empty:
+                    if not all(p.is_alive() for p in self.processes):
+                        raise RuntimeError("An evaluation worker exited unexpectedly")
+            if error is not None:
+                raise RuntimeError(f"Evaluation worker failed: {error}")
+            outputs[task_id] = output
+        return outputs
+
+    def close(self):
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Aetherial KV Cache Quantization Benchmark
+
+Compares the float KV cache with the int8 and int4 `QuantizedKVCache` on a
+randomly initialised Llama-style decoder: KV bytes per sequence at a given
+context length, how many sequences fit in a fixed KV memory budget, and
+greedy decoding throughput with that many concurrent sequences.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+from transformers.cache_utils import DynamicCache
+
+from quantization.kv_cache import QuantizedKVCache
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%m/%d/%Y %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+def make_cache(config, bits: Optional[int]):
+    return DynamicCache(config=config) if bits is None else QuantizedKVCache(config, bits=bits)
+
+
+def cache_bytes(cache) -> int:
+    if isinstance(cache, QuantizedKVCache):
+        return cache.memory_bytes()
+    return sum(layer.keys.numel() * layer.keys.element_size() + layer.values.numel() * layer.values.element_size()
+               for layer in cache.layers if layer.is_initialized)
+
+
+@torch.no_grad()
+def decode(model, config, bits: Optional[int], batch_size: int, prompt_len: int, new_tokens: int) -> Dict:
+    """Prefill `batch_size` prompts, then greedily decode `new_tokens` tokens per sequence."""
+    input_ids = torch.randint(0, config.vocab_size, (batch_size, prompt_len))
+    cache = make_cache(config, bits)
+    started = time.perf_counter()
+    logits = model(input_ids, past_key_values=cache, use_cache=True).logits
+    prefill_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    next_ids = logits[:, -1:].argmax(-1)
+    for _ in range(new_tokens):
+        logits = model(next_ids, past_key_values=cache, use_cache=True).logits
+        next_ids = logits[:, -1:].argmax(-1)
+    decode_seconds = time.perf_counter() - started
+    return {
+        'cache_bytes': cache_bytes(cache),
+        'prefill_seconds': prefill_seconds,
+        'decode_seconds': decode_seconds,
+        'tokens_per_second': batch_size * new_tokens / decode_seconds,
+    }
+
+
+def run_benchmark(budget_mb: float = 64, context: int = 1024, new_tokens: int = 32, max_batch: int = 64,
+                  hidden_size: int = 256, num_layers: int = 4, num_heads: int = 8, num_kv_heads: int = 8,
+                  vocab_size: int = 2048) -> List[Dict]:
+    """Measure each cache mode at a fixed KV memory budget."""
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=vocab_size, hidden_size=hidden_size, intermediate_size=4 * hidden_size,
+        num_hidden_layers=num_layers, num_attention_heads=num_heads, num_key_value_heads=num_kv_heads,
+        max_position_embeddings=context + new_tokens,
+    )
+    model = LlamaForCausalLM(config).eval()
+    budget = int(budget_mb * 2 ** 20)
+
+    results = []
+    for name, bits in (('float32', None), ('int8', 8), ('int4', 4)):
+        # Bytes for one sequence holding the full context
+        per_sequence = decode(model, config, bits, 1, context, 0)['cache_bytes']
+        max_sequences = budget // per_sequence
+        batch_size = max(1, min(max_sequences, max_batch))
+        run = decode(model, config, bits, batch_size, context - new_tokens, new_tokens)
+        result = {
+            'cache': name,
+            'context': context,
+            'bytes_per_sequence': per_sequence,
+            'budget_bytes': budget,
+            'max_concurrent_sequences': max_sequences,
+            'batch_size': batch_size,
+            **run,
+        }
+        if results:
+            result['sequences_vs_float'] = max_sequences / max(results[0]['max_concurrent_sequences'], 1)
+            result['throughput_vs_float'] = run['tokens_per_second'] / results[0]['tokens_per_second']
+        results.append(result)
+        logger.info(
+            f"{name}: {per_sequence / 2 ** 20:.2f} MiB/sequence, {max_sequences} sequences in "
+            f"{budget_mb:g} MiB, {run['tokens_per_second']:.0f} tokens/s at batch {batch_size}"
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function for the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aetherial KV cache quantization benchmark")
+    parser.add_argument("--budget-mb", type=float, default=64, help="KV cache memory budget")
+    parser.add_argument("--context", type=int, default=1024, help="Tokens per sequence (prompt + generated)")
+    parser.add_argument("--new-tokens", type=int, default=32, help="Greedy decoding steps measured")
+    parser.add_argument("--max-batch", type=int, default=64, help="Cap on concurrent sequences actually run")
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--heads", type=int, default=8)
+    parser.add_argument("--kv-heads", type=int, default=8)
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.budget_mb, context=args.context, new_tokens=args.new_tokens, max_batch=args.max_batch,
+        hidden_size=args.hidden_size, num_layers=args.layers, num_heads=args.heads, num_kv_heads=args.kv_heads,
+    )
+
+    print(f"{'cache':>8} {'MiB/seq':>8} {'max seqs':>9} {'batch':>6} {'tokens/s':>10}")
+    for result in results:
+        print(f"{result['cache']:>8} {result['bytes_per_sequence'] / 2 ** 20:>8.2f} "
+              f"{result['max_concurrent_sequences']:>9} {result['batch_size']:>6} {result['tokens_per_second']:>10.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
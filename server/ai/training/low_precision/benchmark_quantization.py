@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Aetherial Quantization Microbenchmarks
+
+Measures the quantization module on transformer layer shapes:
+
+- `Quantizer.forward` in every bit-width mode, in training (EMA update) and eval
+- allocations per QAT step of the fused `Quantizer` (plain, reused output,
+  in place) against the unfused implementation it replaced
+- `QuantizedLinear` forward and forward+backward at several token counts
+- int4 pack/unpack and per-token int8/int4 quantize/dequantize of KV-sized tensors
+
+Each case records the median time, the tensors allocated per call (counted
+at the ATen dispatch level, so it works on CPU and GPU alike) and the
+quantization error relative to the float result. Results are written as
+JSON; `--baseline` compares against an earlier run and exits non-zero on
+regressions.
+"""
+
+import json
+import logging
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils._python_dispatch import TorchDispatchMode
+from torch.utils._pytree import tree_leaves
+
+from quantization import Quantizer, QuantizedLinear
+from quantization.kv_cache import dequantize_per_token, pack_int4, quantize_per_token, unpack_int4
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%m/%d/%Y %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+# (name, hidden size, MLP size); the weight shapes of one transformer block
+LAYER_SHAPES = {
+    'small': [('gpt2-small', 768, 3072)],
+    'default': [('gpt2-small', 768, 3072), ('gpt2-medium', 1024, 4096)],
+    'full': [('gpt2-small', 768, 3072), ('gpt2-medium', 1024, 4096), ('llama-7b', 4096, 11008)],
+}
+BIT_WIDTHS = [32, 16, 8, 4, 2, 1]
+
+
+class AllocationCounter(TorchDispatchMode):
+    """Counts tensors allocated by ATen ops run under it.
+
+    An op output counts as an allocation when its storage is not one of
+    the op's inputs, so views, in-place ops and `out=` variants are free.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self.bytes = 0
+        self.ops: Counter = Counter()
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        result = func(*args, **kwargs)
+        inputs = {t.untyped_storage().data_ptr() for t in tree_leaves((args, kwargs)) if isinstance(t, torch.Tensor)}
+        seen = set()
+        for tensor in tree_leaves(result):
+            if not isinstance(tensor, torch.Tensor):
+                continue
+            storage = tensor.untyped_storage()
+            ptr = storage.data_ptr()
+            if storage.nbytes() and ptr not in inputs and ptr not in seen:
+                seen.add(ptr)
+                self.count += 1
+                self.bytes += storage.nbytes()
+                self.ops[func.__name__] += 1
+        return result
+
+
+def count_allocations(fn: Callable[[], object]) -> AllocationCounter:
+    counter = AllocationCounter()
+    with counter:
+        fn()
+    return counter
+
+
+def time_fn(fn: Callable[[], object], repeats: int = 20, warmup: int = 3) -> float:
+    """Median wall time of `fn` in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        started = time.perf_counter()
+        fn()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        samples.append((time.perf_counter() - started) * 1e3)
+    return statistics.median(samples)
+
+
+def relative_error(approx: torch.Tensor, exact: torch.Tensor) -> float:
+    exact = exact.detach().float()
+    return ((approx.detach().float() - exact).norm() / exact.norm().clamp_min(1e-12)).item()
+
+
+def measure(name: str, fn: Callable[[], object], repeats: int, error: Optional[float] = None, **info) -> Dict:
+    fn()  # Steady state: lazily created buffers are not counted
+    allocations = count_allocations(fn)
+    result = {
+        'name': name,
+        **info,
+        'median_ms': time_fn(fn, repeats),
+        'allocations': allocations.count,
+        'allocated_bytes': allocations.bytes,
+        'error': error,
+    }
+    logger.info(f"{name} {info}: {result['median_ms']:.3f} ms, {allocations.count} allocations "
+                f"({allocations.bytes / 2 ** 20:.2f} MiB)" + (f", error {error:.4f}" if error is not None else ""))
+    return result
+
+
+class LegacyQuantizer(nn.Module):
+    """The unfused Quantizer.forward, kept as the baseline for `bench_quantizer_variants`."""
+
+    def __init__(self, num_bits: int = 8, symmetric: bool = True, ema_decay: float = 0.999):
+        super().__init__()
+        self.num_bits = num_bits
+        self.symmetric = symmetric
+        self.ema_decay = ema_decay
+        self.register_buffer('scale', torch.tensor(1.0))
+        self.register_buffer('zero_point', torch.tensor(0, dtype=torch.int32))
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        stats = x.detach()
+        if self.symmetric:
+            max_val = stats.abs().max()
+            min_val = -max_val
+        else:
+            min_val, max_val = stats.min(), stats.max()
+        if self.training:
+            scale = (max_val - min_val) / (2 ** self.num_bits - 1)
+            zero_point = torch.round(-min_val / scale)
+            self.scale = self.ema_decay * self.scale + (1 - self.ema_decay) * scale
+            self.zero_point = self.ema_decay * self.zero_point + (1 - self.ema_decay) * zero_point
+        if self.num_bits == 32:
+            return x.to(torch.float32)
+        if self.num_bits == 16:
+            return x.to(torch.bfloat16)
+        if self.num_bits in (2, 1):
+            return torch.sign(x) * self.scale
+        low, high = (-8, 7) if self.num_bits == 8 else (-4, 3)
+        return torch.clamp(torch.round(x / self.scale), low, high) * self.scale
+
+
+def bench_quantizer_variants(shapes, device: str, repeats: int) -> List[Dict]:
+    """Allocations and time of one QAT training-mode call: unfused vs fused, reused output and in-place."""
+    results = []
+    for model, hidden, mlp in shapes:
+        weight = torch.randn(mlp, hidden, device=device) * hidden ** -0.5
+        for bits in (8, 4, 1):
+            variants = {
+                'legacy': (LegacyQuantizer(bits).to(device), {}),
+                'fused': (Quantizer(bits).to(device), {}),
+                'reuse_output': (Quantizer(bits, reuse_output=True).to(device), {}),
+                'inplace': (Quantizer(bits).to(device), {'inplace': True}),
+            }
+            for variant, (quantizer, kwargs) in variants.items():
+                x = weight.clone()
+                # In-place calls overwrite their input, so they get a fresh copy each time outside the count
+                call = (lambda: quantizer(x, **kwargs)) if not kwargs else (lambda: quantizer(x.copy_(weight), **kwargs))
+                with torch.no_grad():
+                    results.append(measure('quantizer_train_step', call, repeats, model=model,
+                                           shape=[mlp, hidden], bits=bits, variant=variant))
+    return results
+
+
+def bench_quantizer(shapes, device: str, repeats: int) -> List[Dict]:
+    results = []
+    for model, hidden, mlp in shapes:
+        weight = torch.randn(mlp, hidden, device=device) * hidden ** -0.5
+        for bits in BIT_WIDTHS:
+            for mode in ('train', 'eval'):
+                quantizer = Quantizer(num_bits=bits).to(device).train(mode == 'train')
+                error = relative_error(quantizer(weight), weight)
+                with torch.no_grad():
+                    results.append(measure('quantizer_forward', lambda: quantizer(weight), repeats, error,
+                                           model=model, shape=[mlp, hidden], bits=bits, mode=mode))
+    return results
+
+
+def bench_linear(shapes, token_counts: List[int], device: str, repeats: int) -> List[Dict]:
+    results = []
+    for model, hidden, mlp in shapes:
+        for bits in (8, 4):
+            layer = QuantizedLinear(hidden, mlp, weight_bits=bits).to(device)
+            for tokens in token_counts:
+                x = torch.randn(tokens, hidden, device=device)
+                error = relative_error(layer(x), F.linear(x, layer.weight, layer.bias))
+                info = dict(model=model, shape=[mlp, hidden], bits=bits, tokens=tokens)
+
+                with torch.no_grad():
+                    results.append(measure('linear_forward', lambda: layer(x), repeats, error, **info))
+
+                def forward_backward():
+                    layer.zero_grad(set_to_none=True)
+                    layer(x).sum().backward()
+                results.append(measure('linear_forward_backward', forward_backward, repeats, error, **info))
+    return results
+
+
+def bench_kv_packing(batch_sizes: List[int], context: int, heads: int, head_dim: int,
+                     device: str, repeats: int) -> List[Dict]:
+    results = []
+    for batch in batch_sizes:
+        states = torch.randn(batch, heads, context, head_dim, device=device)
+        info = dict(shape=list(states.shape))
+        for bits in (8, 4):
+            codes, scale = quantize_per_token(states, bits)
+            error = relative_error(dequantize_per_token(codes, scale, bits), states)
+            out = torch.empty_like(states)
+            results.append(measure('kv_quantize', lambda: quantize_per_token(states, bits), repeats, error,
+                                   bits=bits, **info))
+            results.append(measure('kv_dequantize', lambda: dequantize_per_token(codes, scale, bits, out=out),
+                                   repeats, error, bits=bits, **info))
+        values = torch.randint(-8, 8, states.shape, dtype=torch.int8, device=device)
+        packed = pack_int4(values)
+        results.append(measure('int4_pack', lambda: pack_int4(values), repeats, **info))
+        results.append(measure('int4_unpack', lambda: unpack_int4(packed), repeats, **info))
+    return results
+
+
+def case_key(result: Dict) -> Tuple:
+    return tuple((k, json.dumps(v)) for k, v in sorted(result.items())
+                 if k not in ('median_ms', 'allocations', 'allocated_bytes', 'error'))
+
+
+def compare(results: List[Dict], baseline: List[Dict], time_tolerance: float = 0.25,
+            error_tolerance: float = 1e-3) -> List[str]:
+    """Regressions of `results` against `baseline`: slower, more allocations or larger error."""
+    previous = {case_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        label = f"{result['name']} " + ", ".join(f"{k}={v}" for k, v in case_key(result) if k != 'name')
+        if result['median_ms'] > old['median_ms'] * (1 + time_tolerance):
+            regressions.append(f"{label}: {old['median_ms']:.3f} -> {result['median_ms']:.3f} ms")
+        if result['allocations'] > old['allocations']:
+            regressions.append(f"{label}: {old['allocations']} -> {result['allocations']} allocations")
+        if result['error'] is not None and old['error'] is not None and \
+                result['error'] > old['error'] + error_tolerance:
+            regressions.append(f"{label}: error {old['error']:.4f} -> {result['error']:.4f}")
+    return regressions
+
+
+def run_benchmark(preset: str = 'default', token_counts: Optional[List[int]] = None,
+                  kv_batch_sizes: Optional[List[int]] = None, kv_context: int = 1024,
+                  repeats: int = 20, device: Optional[str] = None) -> Dict:
+    device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+    torch.manual_seed(0)
+    shapes = LAYER_SHAPES[preset]
+    return {
+        'device': device,
+        'torch': torch.__version__,
+        'threads': torch.get_num_threads(),
+        'results': (
+            bench_quantizer(shapes, device, repeats)
+            + bench_quantizer_variants(shapes, device, repeats)
+            + bench_linear(shapes, token_counts or [1, 128, 512], device, repeats)
+            + bench_kv_packing(kv_batch_sizes or [1, 8], kv_context, 12, 64, device, repeats)
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function for the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aetherial quantization microbenchmarks")
+    parser.add_argument("--preset", choices=sorted(LAYER_SHAPES), default="default", help="Layer shapes to run")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1, 128, 512], help="Token counts for QuantizedLinear")
+    parser.add_argument("--kv-batch-sizes", type=int, nargs="+", default=[1, 8], help="Sequences for KV packing")
+    parser.add_argument("--kv-context", type=int, default=1024, help="Tokens per sequence for KV packing")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed calls per case")
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier JSON results to check for regressions")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.preset, args.tokens, args.kv_batch_sizes, args.kv_context,
+                           args.repeats, args.device)
+
+    print(f"{'case':<24} {'bits':>4} {'mode':>12} {'shape':>22} {'tokens':>6} {'ms':>9} {'allocs':>6} {'error':>8}")
+    for result in report['results']:
+        error = f"{result['error']:.4f}" if result['error'] is not None else '-'
+        print(f"{result['name']:<24} {result.get('bits', '-'):>4} {result.get('mode', result.get('variant', '-')):>12} "
+              f"{str(result['shape']):>22} {result.get('tokens', '-'):>6} {result['median_ms']:>9.3f} "
+              f"{result['allocations']:>6} {error:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline['results'], args.time_tolerance)
+        for regression in regressions:
+            logger.warning(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,37 @@ Quantization module for low-precision training.
 Supports FP32, BF16, FP8, FP4, FP2, and binary quantization.
 """
 
+import math
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from typing import Union, Tuple, Optional
 
 class Quantizer(nn.Module):
+    """Fake-quantizes tensors with an EMA-tracked scale and zero point.
+
+    The forward pass is fused to avoid temporaries: min/max come from one
+    `aminmax` pass into preallocated scalars, the EMA buffers are updated in
+    place, and the quantized values are written into a single output tensor.
+    With `reuse_output=True` that output is one buffer reused across calls
+    (each result must be consumed before the next call), and `forward(x,
+    inplace=True)` overwrites `x` when it does not need gradients. Gradients
+    pass straight through the rounding.
+    """
     def __init__(self, 
                  num_bits: int = 8,
                  symmetric: bool = True,
                  dynamic: bool = True,
-                 ema_decay: float = 0.999):
+                 ema_decay: float = 0.999,
+                 reuse_output: bool = False):
         super().__init__()
         self.num_bits = num_bits
         self.symmetric = symmetric
         self.dynamic = dynamic
         self.ema_decay = ema_decay
+        self.reuse_output = reuse_output
+        self._output = None
         
         if num_bits == 32:
             self.quantize_fn = self._quantize_fp32
@@ -35,65 +50,120 @@ class Quantizer(nn.Module):
         else:
             raise ValueError(f"Unsupported number of bits: {num_bits}")
             
-        # Register buffers for scale and zero point
+        # Register buffers for scale and zero point (the zero point is a float EMA, so it is stored as one)
         self.register_buffer('scale', torch.tensor(1.0))
-        self.register_buffer('zero_point', torch.tensor(0, dtype=torch.int32))
+        self.register_buffer('zero_point', torch.tensor(0.0))
+        # Scratch scalars: min, max, step scale, step zero point
+        self.register_buffer('_stats', torch.zeros(4), persistent=False)
         
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        if not self.training and not self.dynamic:
-            return self.quantize_fn(x)
-            
-        # Calculate min/max for dynamic quantization
-        if self.symmetric:
-            max_val = x.abs().max()
-            min_val = -max_val if self.symmetric else x.min()
+    def forward(self, x: torch.Tensor, inplace: bool = False) -> torch.Tensor:
+        # Statistics are only consumed by the EMA update, so eval mode skips them
+        if self.training:
+            self._update_statistics(x.detach())
+        if self.num_bits == 32:
+            return self._quantize_fp32(x)
+        if x.requires_grad and torch.is_grad_enabled():
+            return _FakeQuantizeSTE.apply(x, self)
+        return self.quantize_fn(x, self._output_for(x, inplace))
+
+    @torch.no_grad()
+    def _update_statistics(self, x: torch.Tensor):
+        min_val, max_val, scale, zero_point = self._stats.unbind()
+        if x.dtype == self._stats.dtype:
+            torch.aminmax(x, out=(min_val, max_val))
         else:
-            min_val, max_val = x.min(), x.max()
+            min_val.copy_(x.min())
+            max_val.copy_(x.max())
+        if self.symmetric:
+            # max |x| = max(max, -min), and the range is symmetric around it
+            torch.maximum(max_val, min_val.neg_(), out=max_val)
+            torch.neg(max_val, out=min_val)
             
         # Update scale and zero point using EMA
-        if self.training:
-            scale = (max_val - min_val) / (2 ** self.num_bits - 1)
-            zero_point = torch.round(-min_val / scale)
-            
-            # Update with EMA
-            self.scale = self.ema_decay * self.scale + (1 - self.ema_decay) * scale
-            self.zero_point = self.ema_decay * self.zero_point + (1 - self.ema_decay) * zero_point
-        
-        return self.quantize_fn(x)
+        torch.sub(max_val, min_val, out=scale).div_(2 ** self.num_bits - 1)
+        torch.div(min_val, scale, out=zero_point).neg_().round_()
+        self.scale.mul_(self.ema_decay).add_(scale, alpha=1 - self.ema_decay)
+        self.zero_point.mul_(self.ema_decay).add_(zero_point, alpha=1 - self.ema_decay)
+
+    def _output_for(self, x: torch.Tensor, inplace: bool = False) -> Optional[torch.Tensor]:
+        dtype = torch.bfloat16 if self.num_bits == 16 else x.dtype
+        if inplace and dtype == x.dtype and not x.requires_grad:
+            return x
+        if not self.reuse_output:
+            return None
+        out = self._output
+        if out is None or out.shape != x.shape or out.dtype != dtype or out.device != x.device:
+            out = self._output = torch.empty(x.shape, dtype=dtype, device=x.device)
+        return out
     
-    def _quantize_fp32(self, x: torch.Tensor) -> torch.Tensor:
+    def _quantize_fp32(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
         return x.to(torch.float32)
         
-    def _quantize_bf16(self, x: torch.Tensor) -> torch.Tensor:
-        return x.to(torch.bfloat16)
+    def _quantize_bf16(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+        if out is None:
+            return x.to(torch.bfloat16)
+        return out.copy_(x)
+
+    def _fake_quantize(self, x: torch.Tensor, out: Optional[torch.Tensor], qmin: int, qmax: int) -> torch.Tensor:
+        out = torch.div(x, self.scale, out=out)
+        return out.round_().clamp_(qmin, qmax).mul_(self.scale)
         
-    def _quantize_fp8(self, x: torch.Tensor) -> torch.Tensor:
+    def _quantize_fp8(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
         # FP8 emulation (E4M3 format)
-        scale = self.scale if hasattr(self, 'scale') else x.abs().max() / 15.0
-        x_q = torch.clamp(torch.round(x / scale), -8, 7)
-        return x_q * scale
+        return self._fake_quantize(x, out, -8, 7)
         
-    def _quantize_fp4(self, x: torch.Tensor) -> torch.Tensor:
+    def _quantize_fp4(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
         # FP4 emulation (E2M1 format)
-        scale = self.scale if hasattr(self, 'scale') else x.abs().max() / 3.0
-        x_q = torch.clamp(torch.round(x / scale), -4, 3)
-        return x_q * scale
+        return self._fake_quantize(x, out, -4, 3)
         
-    def _quantize_fp2(self, x: torch.Tensor) -> torch.Tensor:
+    def _quantize_fp2(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
         # FP2 emulation (E1M0 format)
-        scale = self.scale if hasattr(self, 'scale') else x.abs().max()
-        x_q = torch.sign(x) * scale
-        return x_q
+        return torch.sign(x, out=out).mul_(self.scale)
         
-    def _quantize_binary(self, x: torch.Tensor) -> torch.Tensor:
+    def _quantize_binary(self, x: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
         # Binary quantization (1-bit)
-        return torch.sign(x) * self.scale if hasattr(self, 'scale') else torch.sign(x)
+        return torch.sign(x, out=out).mul_(self.scale)
+
+
+class _FakeQuantizeSTE(torch.autograd.Function):
+    """Runs a Quantizer's fused kernel without recording it, passing gradients straight through."""
+    @staticmethod
+    def forward(ctx, x, quantizer):
+        ctx.dtype = x.dtype
+        return quantizer.quantize_fn(x, quantizer._output_for(x))
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        return grad_output.to(ctx.dtype), None
+
+
+def quantize_activations(x: torch.Tensor, num_bits: int = 8) -> torch.Tensor:
+    """Per-token symmetric fake quantization, with the scale taken from each row's absmax."""
+    qmax = 2 ** (num_bits - 1) - 1
+    scale = x.detach().abs().amax(dim=-1, keepdim=True).clamp_min(1e-8) / qmax
+    return torch.clamp(torch.round(x / scale), -qmax, qmax) * scale
+
+
+class DynamicActivationQuantizer(nn.Module):
+    """Dynamic (per-call, per-token) int quantization of layer inputs.
+
+    Activations change with every input, so unlike `Quantizer` no scale is
+    tracked; gradients pass straight through.
+    """
+    def __init__(self, num_bits: int = 8):
+        super().__init__()
+        if not 2 <= num_bits <= 8:
+            raise ValueError(f"Unsupported activation bits: {num_bits}")
+        self.num_bits = num_bits
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return ste_quantize(x, lambda t: quantize_activations(t, self.num_bits))
 
 
 class QuantizedLinear(nn.Module):
     def __init__(self, in_features: int, out_features: int, 
                  weight_bits: int = 8, bias_bits: int = 32,
-                 symmetric: bool = True):
+                 symmetric: bool = True, activation_bits: Optional[int] = None):
         super().__init__()
         self.in_features = in_features
         self.out_features = out_features
@@ -105,6 +175,7 @@ class QuantizedLinear(nn.Module):
         # Quantizers
         self.weight_quantizer = Quantizer(num_bits=weight_bits, symmetric=symmetric)
         self.bias_quantizer = Quantizer(num_bits=bias_bits, symmetric=symmetric)
+        self.input_quantizer = DynamicActivationQuantizer(activation_bits) if activation_bits else None
         
         # Initialize parameters
         self.reset_parameters()
@@ -121,6 +192,9 @@ class QuantizedLinear(nn.Module):
         weight_q = self.weight_quantizer(self.weight)
         bias_q = self.bias_quantizer(self.bias) if self.bias is not None else None
         
+        if self.input_quantizer is not None:
+            x = self.input_quantizer(x)
+
         # Linear transformation
         return F.linear(x, weight_q, bias_q)
 
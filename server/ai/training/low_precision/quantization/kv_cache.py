@@ -0,0 +1,214 @@
+"""
+Quantized key/value cache for memory-bound decoding.
+
+During long-context generation the KV cache, not the weights, dominates
+memory. `QuantizedKVCache` stores keys and values as int8 (or packed
+int4) codes with one symmetric scale per (sequence, head, token), so
+each new token is quantized once when appended and never re-quantized.
+Attention still runs in the model dtype: a layer's cache is dequantized
+on each update, so the float copy only lives while that layer runs.
+
+It is a drop-in `transformers` cache:
+
+    cache = QuantizedKVCache(model.config, bits=8)
+    model.generate(input_ids, past_key_values=cache, ...)
+"""
+
+from typing import Optional, Tuple
+
+import torch
+from transformers.cache_utils import Cache, DynamicLayer
+
+# Scales are kept in bfloat16: fp32 range at half the size
+SCALE_DTYPE = torch.bfloat16
+
+
+def pack_int4(q: torch.Tensor) -> torch.Tensor:
+    """Pack int8 values in [-8, 7] two per byte along the last dimension (which must be even)."""
+    lo, hi = q[..., 0::2], q[..., 1::2]
+    return (hi << 4) | (lo & 0x0F)
+
+
+def unpack_int4(packed: torch.Tensor) -> torch.Tensor:
+    """Inverse of `pack_int4`; returns int8 values in [-8, 7]."""
+    lo = (packed << 4) >> 4  # Arithmetic shift sign-extends the low nibble
+    hi = packed >> 4
+    return torch.stack((lo, hi), dim=-1).flatten(-2)
+
+
+def quantize_per_token(x: torch.Tensor, bits: int = 8) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Symmetric quantization with one scale per vector along the last dimension.
+
+    Returns int8 codes (packed two per byte for 4 bits) and scales of
+    shape `x.shape[:-1] + (1,)`.
+    """
+    if bits not in (4, 8):
+        raise ValueError(f"Unsupported KV cache bits: {bits}")
+    qmax = 2 ** (bits - 1) - 1
+    scale = (x.abs().amax(dim=-1, keepdim=True).float() / qmax).clamp_min(1e-12).to(SCALE_DTYPE)
+    codes = torch.clamp(torch.round(x.float() / scale.float()), -qmax, qmax).to(torch.int8)
+    return (pack_int4(codes) if bits == 4 else codes), scale
+
+
+def dequantize_per_token(codes: torch.Tensor, scale: torch.Tensor, bits: int = 8,
+                         dtype: torch.dtype = torch.float32, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Inverse of `quantize_per_token`, optionally writing into `out`."""
+    scale = scale.to(dtype)
+    if bits == 8:
+        return torch.mul(codes, scale, out=out)
+    if out is None:
+        out = torch.empty(codes.shape[:-1] + (2 * codes.shape[-1],), dtype=dtype, device=codes.device)
+    # Scale each nibble straight into its interleaved slot of the output
+    pairs = out.unflatten(-1, (-1, 2))
+    torch.mul((codes << 4) >> 4, scale, out=pairs[..., 0])
+    torch.mul(codes >> 4, scale, out=pairs[..., 1])
+    return out
+
+
+class QuantizedKVLayer(DynamicLayer):
+    """One layer of a `QuantizedKVCache`.
+
+    Codes and scales live in buffers of shape [batch, heads, capacity, ...]
+    that grow by `block_size` tokens, so appending a token does not copy
+    the whole cache.
+    """
+
+    def __init__(self, bits: int = 8, block_size: int = 256):
+        super().__init__()
+        if bits not in (4, 8):
+            raise ValueError(f"Unsupported KV cache bits: {bits}")
+        self.bits = bits
+        self.block_size = block_size
+        self.length = 0
+
+    def lazy_initialization(self, key_states: torch.Tensor, value_states: torch.Tensor) -> None:
+        self.dtype, self.device = key_states.dtype, key_states.device
+        if self.bits == 4 and (key_states.shape[-1] % 2 or value_states.shape[-1] % 2):
+            raise ValueError("int4 KV cache needs an even head dimension")
+        # Empty placeholders so the base-class helpers that look at keys/values keep working
+        self.keys = torch.tensor([], dtype=self.dtype, device=self.device)
+        self.values = torch.tensor([], dtype=self.dtype, device=self.device)
+        self._storage = {name: self._allocate(states, 0) for name, states in
+                         (('keys', key_states), ('values', value_states))}
+        self.length = 0
+        self.is_initialized = True
+
+    def _allocate(self, states: torch.Tensor, capacity: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        batch, heads, _, dim = states.shape
+        code_dim = dim // 2 if self.bits == 4 else dim
+        codes = torch.empty(batch, heads, capacity, code_dim, dtype=torch.int8, device=self.device)
+        scales = torch.empty(batch, heads, capacity, 1, dtype=SCALE_DTYPE, device=self.device)
+        return codes, scales
+
+    def _reserve(self, needed: int, key_states: torch.Tensor, value_states: torch.Tensor):
+        capacity = self._storage['keys'][0].shape[2]
+        if needed <= capacity:
+            return
+        capacity = -(-needed // self.block_size) * self.block_size
+        for name, states in (('keys', key_states), ('values', value_states)):
+            codes, scales = self._allocate(states, capacity)
+            old_codes, old_scales = self._storage[name]
+            codes[:, :, :self.length] = old_codes[:, :, :self.length]
+            scales[:, :, :self.length] = old_scales[:, :, :self.length]
+            self._storage[name] = (codes, scales)
+
+    def _append_and_read(self, name: str, states: torch.Tensor) -> torch.Tensor:
+        codes, scales = self._storage[name]
+        start, new = self.length, states.shape[-2]
+        new_codes, new_scales = quantize_per_token(states, self.bits)
+        codes[:, :, start:start + new] = new_codes
+        scales[:, :, start:start + new] = new_scales
+
+        # Older tokens come back dequantized; the tokens just added are returned exactly
+        batch, heads, _, dim = states.shape
+        out = torch.empty(batch, heads, start + new, dim, dtype=states.dtype, device=states.device)
+        if start:
+            dequantize_per_token(codes[:, :, :start], scales[:, :, :start], self.bits,
+                                 states.dtype, out=out[:, :, :start])
+        out[:, :, start:] = states
+        return out
+
+    def update(self, key_states: torch.Tensor, value_states: torch.Tensor, *args, **kwargs
+               ) -> Tuple[torch.Tensor, torch.Tensor]:
+        if not self.is_initialized:
+            self.lazy_initialization(key_states, value_states)
+        self._reserve(self.length + key_states.shape[-2], key_states, value_states)
+        keys = self._append_and_read('keys', key_states)
+        values = self._append_and_read('values', value_states)
+        self.length += key_states.shape[-2]
+        return keys, values
+
+    def get_seq_length(self) -> int:
+        return self.length if self.is_initialized else 0
+
+    def reset(self) -> None:
+        self.keys = self.values = None
+        self._storage = {}
+        self.length = 0
+        self.is_initialized = False
+
+    def crop(self, tokens_to_remove: int) -> None:
+        if tokens_to_remove > 0:
+            raise ValueError("Pass a negative number of tokens to remove from the cache")
+        self.length = max(0, self.length + tokens_to_remove)
+
+    def _map_batch(self, fn):
+        if self.is_initialized:
+            self._storage = {name: (fn(codes), fn(scales)) for name, (codes, scales) in self._storage.items()}
+
+    def reorder_cache(self, beam_idx: torch.LongTensor) -> None:
+        self._map_batch(lambda t: t.index_select(0, beam_idx.to(t.device)))
+
+    def batch_repeat_interleave(self, repeats: int) -> None:
+        self._map_batch(lambda t: t.repeat_interleave(repeats, dim=0))
+
+    def batch_select_indices(self, indices: torch.Tensor) -> None:
+        self._map_batch(lambda t: t[indices, ...])
+
+    def offload(self):
+        self._map_batch(lambda t: t.to('cpu', non_blocking=True))
+
+    def prefetch(self):
+        self._map_batch(lambda t: t.to(self.device, non_blocking=True))
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the quantized storage, including unused reserved capacity."""
+        if not self.is_initialized:
+            return 0
+        return sum(t.numel() * t.element_size() for pair in self._storage.values() for t in pair)
+
+
+class QuantizedKVCache(Cache):
+    """`transformers` cache storing every attention layer's keys and values as int8 or int4.
+
+    Args:
+        config: model config (used for the number of layers), or None with `num_layers`.
+        bits: 8 or 4.
+        block_size: tokens reserved at a time per layer.
+    """
+
+    def __init__(self, config=None, bits: int = 8, block_size: int = 256, num_layers: Optional[int] = None):
+        if num_layers is None:
+            if config is None:
+                raise ValueError("QuantizedKVCache needs a model config or num_layers")
+            num_layers = config.get_text_config(decoder=True).num_hidden_layers
+        self.bits = bits
+        super().__init__(layers=[QuantizedKVLayer(bits, block_size) for _ in range(num_layers)])
+
+    def memory_bytes(self) -> int:
+        return sum(layer.memory_bytes() for layer in self.layers)
+
+
+def kv_bytes_per_token(config, bits: Optional[int] = None, dtype: torch.dtype = torch.float32) -> int:
+    """KV cache bytes per token of one sequence, across all layers.
+
+    `bits=None` means an unquantized cache in `dtype`.
+    """
+    config = config.get_text_config(decoder=True)
+    heads = getattr(config, 'num_key_value_heads', None) or config.num_attention_heads
+    head_dim = getattr(config, 'head_dim', None) or config.hidden_size // config.num_attention_heads
+    if bits is None:
+        per_head = head_dim * torch.finfo(dtype).bits // 8
+    else:
+        per_head = head_dim * bits // 8 + torch.finfo(SCALE_DTYPE).bits // 8
+    return 2 * config.num_hidden_layers * heads * per_head
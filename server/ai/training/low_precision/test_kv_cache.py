@@ -0,0 +1,84 @@
+import unittest
+
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+from transformers.cache_utils import DynamicCache
+
+from quantization import DynamicActivationQuantizer, quantize_activations
+from quantization.kv_cache import (QuantizedKVCache, dequantize_per_token, kv_bytes_per_token, pack_int4,
+                                   quantize_per_token, unpack_int4)
+
+class KVCacheQuantizationTest(unittest.TestCase):
+    """Tests for the int8/int4 KV cache and dynamic activation quantization"""
+
+    @classmethod
+    def setUpClass(cls):
+        torch.manual_seed(0)
+        cls.config = LlamaConfig(
+            vocab_size=128, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256,
+        )
+        cls.model = LlamaForCausalLM(cls.config).eval()
+
+    def test_int4_pack_round_trip(self):
+        values = torch.randint(-8, 8, (3, 4, 10), dtype=torch.int8)
+        packed = pack_int4(values)
+        self.assertEqual(packed.shape, (3, 4, 5))
+        self.assertTrue(torch.equal(unpack_int4(packed), values))
+
+    def test_per_token_error_bounds(self):
+        x = torch.randn(2, 4, 16, 32) * torch.logspace(-3, 2, 16).view(1, 1, 16, 1)
+        for bits in (8, 4):
+            codes, scale = quantize_per_token(x, bits)
+            restored = dequantize_per_token(codes, scale, bits)
+            # Every token is within half a step of its own scale, whatever its magnitude
+            step = x.abs().amax(-1, keepdim=True) / (2 ** (bits - 1) - 1)
+            self.assertTrue(((restored - x).abs() <= step * 0.51).all(), bits)
+
+    def test_generation_matches_float_cache(self):
+        input_ids = torch.randint(0, 128, (2, 12))
+        attention_mask = torch.ones_like(input_ids)
+        with torch.no_grad():
+            expected = self.model.generate(input_ids, attention_mask=attention_mask, max_new_tokens=20,
+                                           do_sample=False, past_key_values=DynamicCache(config=self.config))
+            for bits in (8, 4):
+                cache = QuantizedKVCache(self.config, bits=bits, block_size=8)
+                output = self.model.generate(input_ids, attention_mask=attention_mask, max_new_tokens=20,
+                                             do_sample=False, past_key_values=cache)
+                self.assertEqual(cache.get_seq_length(), 31)
+                self.assertGreaterEqual((output == expected).float().mean().item(), 0.9, bits)
+
+    def test_next_token_logits_close(self):
+        input_ids = torch.randint(0, 128, (2, 40))
+        step = torch.randint(0, 128, (2, 1))
+        with torch.no_grad():
+            float_cache = DynamicCache(config=self.config)
+            self.model(input_ids, past_key_values=float_cache)
+            expected = self.model(step, past_key_values=float_cache).logits
+            for bits, tolerance in ((8, 0.01), (4, 0.1)):
+                cache = QuantizedKVCache(self.config, bits=bits)
+                self.model(input_ids, past_key_values=cache)
+                logits = self.model(step, past_key_values=cache).logits
+                self.assertLess((logits - expected).abs().max().item(), tolerance, bits)
+
+    def test_memory_is_smaller_than_float(self):
+        input_ids = torch.randint(0, 128, (1, 64))
+        with torch.no_grad():
+            cache = QuantizedKVCache(self.config, bits=8, block_size=64)
+            self.model(input_ids, past_key_values=cache)
+        self.assertEqual(cache.memory_bytes(), 64 * kv_bytes_per_token(self.config, 8))
+        float_bytes = 64 * kv_bytes_per_token(self.config, None, torch.float32)
+        self.assertLess(cache.memory_bytes() * 3, float_bytes)
+
+    def test_dynamic_activation_quantization(self):
+        x = torch.randn(4, 16, 64, requires_grad=True)
+        quantizer = DynamicActivationQuantizer(8)
+        y = quantizer(x)
+        step = x.detach().abs().amax(-1, keepdim=True) / 127
+        self.assertTrue(((y - x).abs() <= step * 0.51).all())
+        self.assertTrue(torch.equal(y.detach(), quantize_activations(x.detach(), 8)))
+        y.sum().backward()
+        self.assertTrue(torch.equal(x.grad, torch.ones_like(x)))
+
+if __name__ == '__main__':
+    unittest.main()
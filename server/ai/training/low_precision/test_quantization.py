@@ -0,0 +1,83 @@
+import unittest
+
+import torch
+
+from benchmark_quantization import LegacyQuantizer, compare, count_allocations
+from quantization import QuantizedLinear, Quantizer
+
+class QuantizationTest(unittest.TestCase):
+    """Tests for the quantization module and its benchmark helpers"""
+
+    def test_quantizer_modes(self):
+        x = torch.randn(64, 32)
+        for bits, dtype in ((32, torch.float32), (16, torch.bfloat16), (8, torch.float32), (4, torch.float32),
+                            (2, torch.float32), (1, torch.float32)):
+            for training in (True, False):
+                y = Quantizer(num_bits=bits).train(training)(x)
+                self.assertEqual((y.shape, y.dtype), (x.shape, dtype), bits)
+        with self.assertRaises(ValueError):
+            Quantizer(num_bits=3)
+
+    def test_fused_forward_matches_unfused(self):
+        torch.manual_seed(0)
+        for bits in (16, 8, 4, 2, 1):
+            for symmetric in (True, False):
+                fused = Quantizer(num_bits=bits, symmetric=symmetric, ema_decay=0.5)
+                legacy = LegacyQuantizer(num_bits=bits, symmetric=symmetric, ema_decay=0.5)
+                for _ in range(3):
+                    x = torch.randn(32, 16) + 0.3
+                    self.assertTrue(torch.allclose(fused(x), legacy(x), atol=1e-6), (bits, symmetric))
+                self.assertTrue(torch.allclose(fused.scale, legacy.scale))
+                self.assertTrue(torch.allclose(fused.zero_point, legacy.zero_point.float()))
+
+    def test_training_step_is_allocation_free(self):
+        x = torch.randn(64, 32)
+        for bits in (8, 4, 1):
+            reused = Quantizer(num_bits=bits, reuse_output=True)
+            first = reused(x)
+            self.assertEqual(count_allocations(lambda: reused(x)).count, 0)
+            self.assertIs(reused(x), first)
+            inplace = Quantizer(num_bits=bits)
+            y = x.clone()
+            self.assertEqual(count_allocations(lambda: inplace(y, inplace=True)).count, 0)
+            plain = Quantizer(num_bits=bits)
+            self.assertEqual(count_allocations(lambda: plain(x)).count, 1)
+
+    def test_gradients_pass_straight_through(self):
+        weight = torch.randn(8, 4, requires_grad=True)
+        out = Quantizer(num_bits=4, reuse_output=True)(weight, inplace=True)
+        (out * 3).sum().backward()
+        self.assertTrue(torch.equal(weight.grad, torch.full_like(weight, 3.0)))
+
+    def test_quantized_linear_trains_repeatedly(self):
+        torch.manual_seed(0)
+        layer = QuantizedLinear(16, 8, activation_bits=8)
+        optimizer = torch.optim.SGD(layer.parameters(), lr=0.1)
+        x = torch.randn(4, 16)
+        for _ in range(3):
+            optimizer.zero_grad()
+            layer(x).pow(2).mean().backward()
+            optimizer.step()
+        self.assertFalse(layer.weight_quantizer.scale.requires_grad)
+        self.assertTrue(torch.isfinite(layer.weight).all())
+
+    def test_allocation_counter(self):
+        x = torch.randn(128)
+        out = torch.empty_like(x)
+        self.assertEqual(count_allocations(lambda: x * 2).count, 1)
+        self.assertEqual(count_allocations(lambda: torch.mul(x, 2, out=out)).count, 0)
+        self.assertEqual(count_allocations(lambda: out.mul_(2).view(8, 16)).count, 0)
+        counter = count_allocations(lambda: (x.abs() + 1).sum())
+        self.assertEqual(counter.count, 3)
+        self.assertEqual(counter.bytes, 2 * 128 * 4 + 4)
+
+    def test_compare_flags_regressions(self):
+        baseline = [{'name': 'quantizer_forward', 'bits': 8, 'median_ms': 1.0, 'allocations': 4, 'error': 0.01}]
+        same = [dict(baseline[0], median_ms=1.1)]
+        self.assertEqual(compare(same, baseline), [])
+        slower = [dict(baseline[0], median_ms=2.0, allocations=6, error=0.05)]
+        self.assertEqual(len(compare(slower, baseline)), 3)
+        self.assertEqual(compare([dict(baseline[0], bits=4, median_ms=9.0)], baseline), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,296 @@
+"""
+Batched trajectory planning for the robot arm.
+
+Plans joint-space moves to many Cartesian targets at once: damped
+least-squares inverse kinematics runs over the whole batch as stacked
+NumPy arrays, a spatial cache reuses joint solutions of neighbouring
+targets as IK seeds, and every move gets a time-optimal rest-to-rest
+trapezoidal or jerk-limited S-curve profile synchronised across joints.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+PROFILES = ('trapezoid', 's_curve')
+
+
+@dataclass
+class ArmModel:
+    """Three-joint articulated arm: base yaw, shoulder pitch and elbow pitch.
+
+    Joint angles are in radians; shoulder pitch is measured from horizontal
+    and the elbow relative to the upper arm. Lengths are in metres.
+    """
+    base_height: float = 0.3
+    upper_arm: float = 0.4
+    forearm: float = 0.35
+    joint_min: np.ndarray = field(default_factory=lambda: np.array([-np.pi, -0.5 * np.pi, -2.8]))
+    joint_max: np.ndarray = field(default_factory=lambda: np.array([np.pi, 0.5 * np.pi, 0.0]))
+    max_velocity: np.ndarray = field(default_factory=lambda: np.array([1.5, 1.2, 1.8]))
+    max_acceleration: np.ndarray = field(default_factory=lambda: np.array([4.0, 3.0, 5.0]))
+    max_jerk: np.ndarray = field(default_factory=lambda: np.array([30.0, 20.0, 40.0]))
+    home: np.ndarray = field(default_factory=lambda: np.array([0.0, 0.8, -1.6]))
+
+    def forward_kinematics(self, q: np.ndarray) -> np.ndarray:
+        """End-effector positions (N, 3) for joint angles (N, 3)."""
+        yaw, shoulder, elbow = q[:, 0], q[:, 1], q[:, 2]
+        reach = self.upper_arm * np.cos(shoulder) + self.forearm * np.cos(shoulder + elbow)
+        height = self.base_height + self.upper_arm * np.sin(shoulder) + self.forearm * np.sin(shoulder + elbow)
+        return np.stack([reach * np.cos(yaw), reach * np.sin(yaw), height], axis=1)
+
+    def jacobian(self, q: np.ndarray) -> np.ndarray:
+        """Positional Jacobians (N, 3, 3) for joint angles (N, 3)."""
+        yaw, shoulder, elbow = q[:, 0], q[:, 1], q[:, 2]
+        c_yaw, s_yaw = np.cos(yaw), np.sin(yaw)
+        s1, c1 = np.sin(shoulder), np.cos(shoulder)
+        s12, c12 = np.sin(shoulder + elbow), np.cos(shoulder + elbow)
+        reach = self.upper_arm * c1 + self.forearm * c12
+        d_reach = np.stack([-self.upper_arm * s1 - self.forearm * s12, -self.forearm * s12], axis=1)
+        d_height = np.stack([self.upper_arm * c1 + self.forearm * c12, self.forearm * c12], axis=1)
+
+        jac = np.zeros((len(q), 3, 3))
+        jac[:, 0, 0] = -reach * s_yaw
+        jac[:, 1, 0] = reach * c_yaw
+        jac[:, 0, 1:] = d_reach * c_yaw[:, None]
+        jac[:, 1, 1:] = d_reach * s_yaw[:, None]
+        jac[:, 2, 1:] = d_height
+        return jac
+
+    def default_seeds(self, targets: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """IK seeds from `start` with the base already turned towards each target.
+
+        Fixing the base yaw leaves a planar two-link problem that damped least
+        squares solves in a handful of iterations.
+        """
+        seeds = np.array(start, dtype=np.float64)
+        seeds[:, 0] = np.arctan2(targets[:, 1], targets[:, 0])
+        return seeds
+
+
+def solve_ik(arm: ArmModel, targets: np.ndarray, seeds: np.ndarray, tolerance: float = 1e-4,
+             max_iterations: int = 100, damping: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Damped least-squares IK for a batch of targets.
+
+    Returns (joints, converged, iterations); only unconverged rows are updated
+    on each iteration.
+    """
+    q = np.clip(np.array(seeds, dtype=np.float64), arm.joint_min, arm.joint_max)
+    iterations = np.zeros(len(targets), dtype=np.int64)
+    active = np.arange(len(targets))
+    eye = np.eye(3) * damping ** 2
+    for _ in range(max_iterations):
+        error = targets[active] - arm.forward_kinematics(q[active])
+        still_active = np.linalg.norm(error, axis=1) > tolerance
+        active, error = active[still_active], error[still_active]
+        if not active.size:
+            break
+        jac = arm.jacobian(q[active])
+        # dq = J^T (J J^T + lambda^2 I)^-1 e
+        solved = np.linalg.solve(jac @ jac.transpose(0, 2, 1) + eye, error[:, :, None])
+        step = (jac.transpose(0, 2, 1) @ solved)[:, :, 0]
+        q[active] = np.clip(q[active] + step, arm.joint_min, arm.joint_max)
+        iterations[active] += 1
+    converged = np.linalg.norm(targets - arm.forward_kinematics(q), axis=1) <= tolerance
+    return q, converged, iterations
+
+
+class IKSeedCache:
+    """Joint solutions keyed by quantized target position, used to seed nearby targets.
+
+    Cell keys are packed into one int64 and kept sorted, so a whole batch is
+    looked up with `np.searchsorted` instead of per-target dict probes.
+    """
+
+    _BITS = 21
+    _BIAS = 1 << 20
+    # The target's own cell, then the six sharing a face; probing all 26
+    # neighbours costs more lookup passes than the IK iterations it saves
+    _OFFSETS = [(0, 0, 0), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+    def __init__(self, cell_size: float = 0.05, max_entries: int = 100_000):
+        self.cell_size = cell_size
+        self.max_entries = max_entries
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._joints = np.zeros((0, 3))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _cells(self, targets: np.ndarray) -> np.ndarray:
+        return np.floor(targets / self.cell_size).astype(np.int64)
+
+    def _pack(self, cells: np.ndarray) -> np.ndarray:
+        biased = cells + self._BIAS
+        return (biased[:, 0] << (2 * self._BITS)) | (biased[:, 1] << self._BITS) | biased[:, 2]
+
+    def seeds(self, targets: np.ndarray, default: np.ndarray) -> np.ndarray:
+        """Seed per target: the cached solution of its cell, else of a neighbouring cell, else `default`."""
+        seeds = np.array(np.broadcast_to(default, targets.shape))
+        pending = np.arange(len(targets))
+        if len(self._keys):
+            cells = self._cells(targets)
+            for offset in self._OFFSETS:
+                keys = self._pack(cells[pending] + offset)
+                index = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+                found = self._keys[index] == keys
+                seeds[pending[found]] = self._joints[index[found]]
+                pending = pending[~found]
+                if not pending.size:
+                    break
+        self.hits += len(targets) - len(pending)
+        self.misses += len(pending)
+        return seeds
+
+    def store(self, targets: np.ndarray, joints: np.ndarray):
+        new_keys = self._pack(self._cells(targets))
+        if len(self._keys) + len(new_keys) > self.max_entries:
+            self._keys, self._joints = self._keys[:0], self._joints[:0]
+        # New entries go first so np.unique keeps them over stale ones for the same cell
+        keys = np.concatenate([new_keys, self._keys])
+        self._keys, first = np.unique(keys, return_index=True)
+        self._joints = np.concatenate([joints, self._joints])[first]
+
+
+def profile_timing(velocity: np.ndarray, acceleration: np.ndarray, jerk: Optional[np.ndarray] = None):
+    """Rest-to-rest timing for a unit-length move under per-move limits.
+
+    Returns arrays (jerk_time, accel_time, cruise_time, peak_accel, peak_velocity);
+    `jerk=None` gives a trapezoidal profile (jerk_time 0).
+    """
+    v, a = np.asarray(velocity, dtype=np.float64), np.asarray(acceleration, dtype=np.float64)
+    if jerk is None:
+        t_jerk = np.zeros_like(v)
+        cruise = v * v / a <= 1.0
+        t_acc = np.where(cruise, v / a, np.sqrt(1.0 / a))
+        peak_accel = a
+    else:
+        j = np.asarray(jerk, dtype=np.float64)
+        # Cruise-velocity reached: is the acceleration limit reached on the way?
+        a_reached = v * j >= a * a
+        t_jerk = np.where(a_reached, a / j, np.sqrt(v / j))
+        t_acc = np.where(a_reached, t_jerk + v / a, 2.0 * t_jerk)
+        cruise = 1.0 / v - t_acc >= 0.0
+        # No cruise: the peak velocity is below the limit
+        a_reached_short = 1.0 >= 2.0 * a ** 3 / (j * j)
+        tj_short = np.where(a_reached_short, a / j, np.cbrt(1.0 / (2.0 * j)))
+        ta_short = np.where(a_reached_short, (tj_short + np.sqrt(tj_short ** 2 + 4.0 / a)) / 2.0, 2.0 * tj_short)
+        t_jerk = np.where(cruise, t_jerk, tj_short)
+        t_acc = np.where(cruise, t_acc, ta_short)
+        peak_accel = j * t_jerk
+    peak_velocity = peak_accel * (t_acc - t_jerk) if jerk is not None else a * t_acc
+    t_cruise = np.where(cruise, 1.0 / np.where(cruise, peak_velocity, 1.0) - t_acc, 0.0)
+    return t_jerk, t_acc, t_cruise, peak_accel, peak_velocity
+
+
+def _accel_phase_position(t, t_jerk, t_acc, peak_accel, peak_velocity):
+    """Distance covered t seconds into the acceleration phase, extended by cruise after it."""
+    safe_tj = np.where(t_jerk > 0, t_jerk, 1.0)
+    jerk_in = peak_accel * t ** 3 / (6.0 * safe_tj)
+    dt = t - t_jerk
+    constant = peak_accel * t_jerk ** 2 / 6.0 + peak_accel * t_jerk * dt / 2.0 + peak_accel * dt ** 2 / 2.0
+    remaining = t_acc - t
+    jerk_out = peak_velocity * t_acc / 2.0 - peak_velocity * remaining + peak_accel * remaining ** 3 / (6.0 * safe_tj)
+    cruise = peak_velocity * t_acc / 2.0 + peak_velocity * (t - t_acc)
+    return np.where(t <= t_jerk, jerk_in,
+                    np.where(t <= t_acc - t_jerk, constant,
+                             np.where(t <= t_acc, jerk_out, cruise)))
+
+
+@dataclass
+class PlanBatch:
+    """Planned moves to a batch of targets."""
+    targets: np.ndarray
+    start: np.ndarray
+    joints: np.ndarray
+    feasible: np.ndarray
+    durations: np.ndarray
+    ik_iterations: np.ndarray
+    planning_seconds: float
+    timing: Tuple[np.ndarray, ...]
+
+    @property
+    def latency_per_target(self) -> float:
+        return self.planning_seconds / max(len(self.targets), 1)
+
+    def progress(self, times: np.ndarray) -> np.ndarray:
+        """Normalised path position s in [0, 1] for every move (N, T) at `times` (T,)."""
+        t_jerk, t_acc, _, peak_accel, peak_velocity = (x[:, None] for x in self.timing)
+        duration = self.durations[:, None]
+        t = np.clip(np.asarray(times, dtype=np.float64)[None, :], 0.0, duration)
+        first_half = t <= duration / 2.0
+        forward = _accel_phase_position(t, t_jerk, t_acc, peak_accel, peak_velocity)
+        mirrored = 1.0 - _accel_phase_position(duration - t, t_jerk, t_acc, peak_accel, peak_velocity)
+        s = np.where(first_half, forward, mirrored)
+        return np.where(duration > 0, s, 1.0)
+
+    def sample(self, times: np.ndarray) -> np.ndarray:
+        """Joint positions (N, T, 3) along every planned move at `times`."""
+        s = self.progress(times)
+        return self.start[:, None, :] + s[:, :, None] * (self.joints - self.start)[:, None, :]
+
+
+class TrajectoryPlanner:
+    """Plans synchronised joint-space moves for batches of Cartesian targets."""
+
+    def __init__(self, arm: Optional[ArmModel] = None, profile: str = 's_curve',
+                 seed_cache: Optional[IKSeedCache] = None, cache_seeds: bool = True,
+                 tolerance: float = 1e-4, max_iterations: int = 100):
+        if profile not in PROFILES:
+            raise ValueError(f"profile must be one of {PROFILES}")
+        self.arm = arm or ArmModel()
+        self.profile = profile
+        self.seed_cache = (seed_cache or IKSeedCache()) if cache_seeds else None
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    def plan(self, targets: Sequence, start: Optional[np.ndarray] = None, velocity_scale: float = 1.0) -> PlanBatch:
+        """Solve IK for every target and time a move to it from `start` (default: home)."""
+        began = time.perf_counter()
+        targets = np.atleast_2d(np.asarray(targets, dtype=np.float64))
+        start = np.broadcast_to(self.arm.home if start is None else np.asarray(start, dtype=np.float64),
+                                targets.shape).copy()
+
+        default_seeds = self.arm.default_seeds(targets, start)
+        seeds = self.seed_cache.seeds(targets, default_seeds) if self.seed_cache is not None else default_seeds
+        joints, converged, iterations = solve_ik(self.arm, targets, seeds, self.tolerance, self.max_iterations)
+        if self.seed_cache is not None and not converged.all():
+            # A neighbour's solution can sit against a joint limit; retry those from the default seed
+            retry = np.flatnonzero(~converged)
+            q, ok, extra = solve_ik(self.arm, targets[retry], default_seeds[retry], self.tolerance, self.max_iterations)
+            joints[retry[ok]], converged[retry[ok]] = q[ok], True
+            iterations[retry] += extra
+        if self.seed_cache is not None and converged.any():
+            self.seed_cache.store(targets[converged], joints[converged])
+
+        # Move along a straight joint-space line; the path parameter inherits the
+        # tightest per-joint limit scaled by that joint's share of the motion
+        delta = np.abs(joints - start)
+        moving = delta > 1e-12
+        with np.errstate(divide='ignore'):
+            scale = np.where(moving, 1.0 / np.where(moving, delta, 1.0), np.inf)
+        velocity = np.min(self.arm.max_velocity * velocity_scale * scale, axis=1)
+        acceleration = np.min(self.arm.max_acceleration * scale, axis=1)
+        jerk = np.min(self.arm.max_jerk * scale, axis=1) if self.profile == 's_curve' else None
+        stationary = ~moving.any(axis=1)
+        velocity[stationary] = acceleration[stationary] = 1.0
+        if jerk is not None:
+            jerk[stationary] = 1.0
+
+        timing = profile_timing(velocity, acceleration, jerk)
+        _, t_acc, t_cruise = timing[:3]
+        durations = np.where(stationary, 0.0, 2.0 * t_acc + t_cruise)
+        return PlanBatch(
+            targets=targets,
+            start=start,
+            joints=joints,
+            feasible=converged,
+            durations=durations,
+            ik_iterations=iterations,
+            planning_seconds=time.perf_counter() - began,
+            timing=timing,
+        )
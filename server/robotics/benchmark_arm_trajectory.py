@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Arm trajectory planning latency benchmark.
+
+Generates candidate grasps clustered around a few objects (as a pick-and-place
+cell would) and plans them per cycle, batched and one target at a time, each
+with a warm IK seed cache and without one. A batch runs until its slowest
+target converges, so the cache mostly pays off for one-at-a-time planning.
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from arm_trajectory import TrajectoryPlanner
+
+def grasp_candidates(num_objects: int, per_object: int, rng: np.random.Generator) -> np.ndarray:
+    """Grasp positions scattered within a few centimetres of objects on a table in front of the arm."""
+    angles = rng.uniform(-1.2, 1.2, num_objects)
+    distances = rng.uniform(0.35, 0.6, num_objects)
+    objects = np.stack([distances * np.cos(angles), distances * np.sin(angles), rng.uniform(0.05, 0.3, num_objects)], axis=1)
+    return (objects[:, None, :] + rng.normal(0.0, 0.03, (num_objects, per_object, 3))).reshape(-1, 3)
+
+
+def run_benchmark(batch_sizes=(1, 10, 100, 500), cycles: int = 20, profile: str = 's_curve', seed: int = 0) -> Dict:
+    rng = np.random.default_rng(seed)
+    results = {}
+    for batch in batch_sizes:
+        per_object = max(batch // 5, 1)
+        num_objects = max(batch // per_object, 1)
+        warm_planner = TrajectoryPlanner(profile=profile)
+        cold_planner = TrajectoryPlanner(profile=profile, cache_seeds=False)
+        sequential_planner = TrajectoryPlanner(profile=profile)
+        timings = {'batched_warm': [], 'batched_cold': [], 'sequential_warm': [], 'sequential_cold': []}
+        iterations = {'batched_warm': [], 'batched_cold': []}
+        feasible = 0
+        # Objects stay put between cycles while the grasp candidates are resampled around them
+        base = grasp_candidates(num_objects, 1, rng)
+        for cycle in range(cycles):
+            targets = np.repeat(base, per_object, axis=0) + rng.normal(0.0, 0.03, (num_objects * per_object, 3))
+            warm = warm_planner.plan(targets)
+            cold = cold_planner.plan(targets)
+            sequential = {}
+            for name, planner in (('sequential_warm', sequential_planner), ('sequential_cold', cold_planner)):
+                start = time.perf_counter()
+                for target in targets:
+                    planner.plan(target)
+                sequential[name] = (time.perf_counter() - start) / len(targets)
+            if cycle == 0:
+                continue  # warm-up cycle fills the seed cache
+            timings['batched_warm'].append(warm.latency_per_target)
+            timings['batched_cold'].append(cold.latency_per_target)
+            for name, seconds in sequential.items():
+                timings[name].append(seconds)
+            iterations['batched_warm'].append(warm.ik_iterations.mean())
+            iterations['batched_cold'].append(cold.ik_iterations.mean())
+            feasible += int(warm.feasible.sum())
+        results[str(len(targets))] = {
+            **{f'{name}_us_per_target': float(np.median(values) * 1e6) for name, values in timings.items()},
+            **{f'{name}_ik_iterations': float(np.mean(values)) for name, values in iterations.items()},
+            'feasible_fraction': feasible / ((cycles - 1) * len(targets)),
+            'seed_cache_hit_rate': warm_planner.seed_cache.hits / max(warm_planner.seed_cache.hits + warm_planner.seed_cache.misses, 1),
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Batched arm trajectory planning benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 500], help="Targets planned per cycle")
+    parser.add_argument("--cycles", type=int, default=20, help="Planning cycles per batch size")
+    parser.add_argument("--profile", choices=['trapezoid', 's_curve'], default='s_curve')
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(batch_sizes=args.batch_sizes, cycles=args.cycles, profile=args.profile)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
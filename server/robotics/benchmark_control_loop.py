@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Control-loop timing benchmark on the wall clock.
+
+Runs the mock sensors and actuators from RoboticsIntegrationTest as fixed-rate
+tasks (IMU 200 Hz, lidar 10 Hz, wheels 50 Hz, arm 100 Hz), fires e-stops from a
+separate thread at random moments, and reports per-task release jitter,
+deadline misses and the worst-case stop and drain latency.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from control_loop import ControlLoopExecutor, MonotonicClock
+from test_robotics_integration import RoboticsIntegrationTest
+
+def run_benchmark(duration: float = 5.0, estops: int = 20, seed: int = 0) -> Dict:
+    test = RoboticsIntegrationTest('test_emergency_stop')
+    test.setUp()
+    executor = ControlLoopExecutor(MonotonicClock())
+    executor.add_task('imu', test.sensors['imu'], 200, kind='sensor')
+    executor.add_task('lidar', test.sensors['lidar'], 10, kind='sensor')
+    executor.add_task('wheels', lambda: test.actuators['wheels']([0.2, 0, 0], [0, 0, 0.1]), 50)
+    executor.add_task('arm', lambda: test.actuators['arm']([0.5, 0.2, 0.3]), 100)
+    executor.add_stop_handler(lambda: test.actuators['wheels']([0, 0, 0], [0, 0, 0]))
+
+    rng = random.Random(seed)
+
+    def trigger():
+        interval = duration / (estops + 1)
+        for _ in range(estops):
+            time.sleep(interval * rng.uniform(0.5, 1.0))
+            executor.estop("benchmark")
+            # Let in-flight commands drain before releasing the latch for the next round
+            time.sleep(interval * 0.25)
+            executor.reset_estop()
+
+    executor.start()
+    trigger_thread = threading.Thread(target=trigger)
+    trigger_thread.start()
+    trigger_thread.join()
+    time.sleep(max(0.0, duration - (time.perf_counter() - executor.start_time)))
+    executor.stop()
+
+    report = executor.report()
+    drains = [r['drain_latency_ms'] for r in report['estops'] if r['drain_latency_ms'] is not None]
+    return {
+        'tasks': report['tasks'],
+        'estops': len(report['estops']),
+        'worst_stop_latency_ms': report['worst_stop_latency_ms'],
+        'worst_drain_latency_ms': max(drains, default=0.0),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Control-loop jitter and e-stop latency benchmark")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run the loop")
+    parser.add_argument("--estops", type=int, default=20, help="E-stops to trigger during the run")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(duration=args.duration, estops=args.estops)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Frame transport benchmark: shared-memory FrameBus vs multiprocessing.Queue.
+
+A producer process publishes camera/depth/lidar frames shaped like the mocks
+in RoboticsIntegrationTest; a consumer process receives every frame, touches
+it and records end-to-end latency. Both transports run lossless (the bus
+publishes with backpressure) so the frame counts match.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from frame_bus import FrameBus, FrameReader
+from test_robotics_integration import RoboticsIntegrationTest
+
+def make_frames(pool_size: int) -> List[Dict[str, np.ndarray]]:
+    test = RoboticsIntegrationTest('test_sensor_fusion')
+    test.setUp()
+    frames = []
+    for _ in range(pool_size):
+        camera = test.sensors['camera']()
+        frames.append({
+            'rgb': camera['rgb'],
+            'depth': camera['depth'].astype(np.float32),
+            'lidar': test.sensors['lidar'](),
+        })
+    return frames
+
+
+def _touch(arrays) -> float:
+    # Strided reads so the consumer actually touches every transferred array
+    return float(arrays['rgb'][::16, ::16].sum() + arrays['depth'][::16, ::16].sum() + arrays['lidar'].sum())
+
+
+def _queue_producer(queue, num_frames: int, pool_size: int):
+    frames = make_frames(pool_size)
+    for i in range(num_frames):
+        queue.put((time.perf_counter(), frames[i % pool_size]))
+    queue.put(None)
+
+
+def _queue_consumer(queue, results):
+    latencies = []
+    while True:
+        item = queue.get()
+        if item is None:
+            break
+        sent, arrays = item
+        _touch(arrays)
+        latencies.append(time.perf_counter() - sent)
+    results.put(latencies)
+
+
+def _bus_producer(name: str, num_frames: int, pool_size: int, ready):
+    frames = make_frames(pool_size)
+    bus = FrameBus(name=name, slots=8)
+    ready.set()
+    try:
+        # Wait for the consumer to register its cursor so backpressure applies from frame one
+        while not bus.active_readers:
+            time.sleep(0.001)
+        for i in range(num_frames):
+            bus.publish(time.perf_counter(), block=True, timeout=30.0, **frames[i % pool_size])
+        # Leave the segment up until the consumer has read the last frame
+        while bus.active_readers:
+            time.sleep(0.001)
+    finally:
+        bus.close()
+
+
+def _bus_consumer(name: str, num_frames: int, ready, results):
+    ready.wait()
+    latencies = []
+    with FrameReader(name, start='oldest') as reader:
+        while len(latencies) < num_frames:
+            frame = reader.wait_next(timeout=30.0)
+            if frame is None:
+                break
+            _touch(frame.arrays)
+            latencies.append(time.perf_counter() - frame.timestamp)
+        dropped = reader.dropped
+    results.put((latencies, dropped))
+
+
+def _summarize(latencies: List[float], elapsed: float, frame_bytes: int, dropped: int = 0) -> Dict:
+    ms = np.array(latencies) * 1e3
+    return {
+        'frames': len(latencies),
+        'dropped': dropped,
+        'frames_per_second': len(latencies) / elapsed,
+        'mb_per_second': len(latencies) * frame_bytes / elapsed / 1e6,
+        'latency_ms_p50': float(np.percentile(ms, 50)),
+        'latency_ms_p99': float(np.percentile(ms, 99)),
+    }
+
+
+def run_benchmark(num_frames: int = 300, pool_size: int = 4) -> Dict:
+    frame_bytes = sum(a.nbytes for a in make_frames(1)[0].values())
+    ctx = mp.get_context('spawn')
+    results = {'frame_bytes': frame_bytes}
+
+    queue, out = ctx.Queue(maxsize=8), ctx.Queue()
+    consumer = ctx.Process(target=_queue_consumer, args=(queue, out))
+    producer = ctx.Process(target=_queue_producer, args=(queue, num_frames, pool_size))
+    start = time.perf_counter()
+    consumer.start()
+    producer.start()
+    latencies = out.get()
+    elapsed = time.perf_counter() - start
+    producer.join()
+    consumer.join()
+    results['queue'] = _summarize(latencies, elapsed, frame_bytes)
+
+    name = f"frame_bus_bench_{mp.current_process().pid}"
+    ready = ctx.Event()
+    consumer = ctx.Process(target=_bus_consumer, args=(name, num_frames, ready, out))
+    producer = ctx.Process(target=_bus_producer, args=(name, num_frames, pool_size, ready))
+    start = time.perf_counter()
+    consumer.start()
+    producer.start()
+    latencies, dropped = out.get()
+    elapsed = time.perf_counter() - start
+    producer.join()
+    consumer.join()
+    results['shared_memory'] = _summarize(latencies, elapsed, frame_bytes, dropped)
+    results['speedup'] = results['shared_memory']['frames_per_second'] / results['queue']['frames_per_second']
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Shared-memory frame bus throughput benchmark")
+    parser.add_argument("--frames", type=int, default=300, help="Frames to transfer per transport")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(num_frames=args.frames)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
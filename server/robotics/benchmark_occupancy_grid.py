@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Occupancy-grid mapping throughput benchmark.
+
+Integrates scans shaped like the lidar mock in RoboticsIntegrationTest (uniform
+ranges up to 10 m) while the robot drives a straight line, so the local window
+slides over the tiled global map during the run. Reports scans/sec per beam
+count together with the map's memory footprint.
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from occupancy_grid import OccupancyGridMapper
+
+def run_benchmark(beam_counts=(360, 1080), num_scans: int = 500, speed: float = 0.05,
+                  resolution: float = 0.05, seed: int = 0) -> Dict:
+    """Integrate `num_scans` scans per beam count; the robot moves `speed` metres per scan."""
+    rng = np.random.default_rng(seed)
+    results = {}
+    for beams in beam_counts:
+        scans = rng.random((32, beams)) * 10
+        mapper = OccupancyGridMapper(resolution=resolution)
+        mapper.integrate(scans[0])  # warm up beam tables
+        start = time.perf_counter()
+        for i in range(num_scans):
+            mapper.integrate(scans[i % len(scans)], (i * speed, 0.0, 0.01 * i))
+        elapsed = time.perf_counter() - start
+        mapper.flush()
+        results[str(beams)] = {
+            'scans_per_second': num_scans / elapsed,
+            'ms_per_scan': elapsed / num_scans * 1e3,
+            'recenters': mapper.recenters,
+            'tiles': len(mapper.global_map.tiles),
+            'map_mb': mapper.nbytes / 1e6,
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Occupancy-grid mapping benchmark")
+    parser.add_argument("--beams", type=int, nargs="+", default=[360, 1080], help="Beam counts to benchmark")
+    parser.add_argument("--scans", type=int, default=500, help="Scans to integrate per beam count")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(beam_counts=args.beams, num_scans=args.scans)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Sensor fusion latency benchmark.
+
+Replays readings from the mock generators in RoboticsIntegrationTest on a
+simulated timeline (IMU 200 Hz, camera 30 Hz, lidar 10 Hz) and times every
+push and fusion step, reporting latency percentiles, the sustainable fusion
+rate and heap growth during the measured loop.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from sensor_fusion import SensorFusion
+from test_robotics_integration import RoboticsIntegrationTest
+
+def mock_sensors() -> Dict:
+    """The `self.sensors` dict of a set-up RoboticsIntegrationTest."""
+    test = RoboticsIntegrationTest('test_sensor_fusion')
+    test.setUp()
+    return test.sensors
+
+
+def run_benchmark(duration: float = 10.0, fusion_hz: float = 100.0, imu_hz: float = 200.0,
+                  camera_hz: float = 30.0, lidar_hz: float = 10.0, pool_size: int = 8) -> Dict:
+    """Fuse `duration` simulated seconds of data and return latency statistics."""
+    sensors = mock_sensors()
+    # Mock generation allocates fresh arrays; pregenerate so only fusion is timed
+    cameras = [sensors['camera']() for _ in range(pool_size)]
+    scans = [sensors['lidar']() for _ in range(pool_size)]
+    imus = [sensors['imu']() for _ in range(pool_size * 4)]
+
+    events = []
+    for name, hz in (('imu', imu_hz), ('camera', camera_hz), ('lidar', lidar_hz), ('fuse', fusion_hz)):
+        events.extend((t, name) for t in np.arange(0.0, duration, 1.0 / hz))
+    # Sensors arriving at the same instant are pushed before that fusion step
+    events.sort(key=lambda e: (e[0], e[1] == 'fuse'))
+
+    fusion = SensorFusion()
+    push_latency: List[float] = []
+    fuse_latency: List[float] = []
+    counters = {'imu': 0, 'camera': 0, 'lidar': 0}
+    warmup = len(events) // 10
+
+    for i, (timestamp, name) in enumerate(events):
+        if i == warmup:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if name == 'fuse':
+            fusion.fuse(timestamp)
+        elif name == 'imu':
+            fusion.push_imu(timestamp, imus[counters['imu'] % len(imus)])
+        elif name == 'camera':
+            fusion.push_camera(timestamp, cameras[counters['camera'] % len(cameras)])
+        else:
+            fusion.push_lidar(timestamp, scans[counters['lidar'] % len(scans)])
+        elapsed = time.perf_counter() - start
+        if name != 'fuse':
+            counters[name] += 1
+        if i >= warmup:
+            (fuse_latency if name == 'fuse' else push_latency).append(elapsed)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fuse_ms = np.array(fuse_latency) * 1e3
+    push_ms = np.array(push_latency) * 1e3
+    # Wall time needed per simulated second, for all pushes plus all fusion steps
+    busy_per_second = (fuse_ms.sum() + push_ms.sum()) / 1e3 / (duration * 0.9)
+    return {
+        'fusion_steps': len(fuse_latency),
+        'fuse_ms_p50': float(np.percentile(fuse_ms, 50)),
+        'fuse_ms_p99': float(np.percentile(fuse_ms, 99)),
+        'fuse_ms_max': float(fuse_ms.max()),
+        'push_ms_p50': float(np.percentile(push_ms, 50)),
+        'push_ms_p99': float(np.percentile(push_ms, 99)),
+        'cpu_utilization_at_target_rate': float(busy_per_second),
+        'max_fusion_hz': float(1e3 / fuse_ms.mean()),
+        'heap_peak_bytes_during_loop': heap_peak,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sensor fusion latency benchmark")
+    parser.add_argument("--duration", type=float, default=10.0, help="Simulated seconds of sensor data")
+    parser.add_argument("--fusion-hz", type=float, default=100.0, help="Fusion step rate")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(duration=args.duration, fusion_hz=args.fusion_hz)
+    for key, value in results.items():
+        print(f"{key:>32}: {value:.4f}" if isinstance(value, float) else f"{key:>32}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
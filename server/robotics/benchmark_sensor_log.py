@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Sensor log write and replay benchmark.
+
+Records the mock sensors from RoboticsIntegrationTest (IMU 200 Hz, camera
+30 Hz, lidar 10 Hz) for each compression setting, then replays the log as
+fast as possible and reports file size, write throughput and replay rate.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from sensor_log import COMPRESSIONS, DEFAULT_RATES, SensorLog, record_sensors, replay
+from test_robotics_integration import RoboticsIntegrationTest
+
+def run_benchmark(duration: float = 2.0, seed: int = 0) -> Dict:
+    test = RoboticsIntegrationTest('test_sensor_fusion')
+    test.setUp()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for compression in COMPRESSIONS:
+            path = os.path.join(tmp, f"{compression}.slog")
+            np.random.seed(seed)
+            start = time.perf_counter()
+            records = record_sensors(path, test.sensors, duration, DEFAULT_RATES, compression=compression,
+                                     field_dtypes={'camera.depth': 'float32'})
+            write_seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+            touched = []
+            with SensorLog(path) as log:
+                start = time.perf_counter()
+                replay(log, lambda t, stream, reading: touched.append(t), speed=None)
+                replay_seconds = time.perf_counter() - start
+            results[compression] = {
+                'records': records,
+                'file_mb': size / 1e6,
+                'write_mb_per_second': size / write_seconds / 1e6,
+                'replay_records_per_second': len(touched) / replay_seconds,
+                'replay_speed_vs_real_time': duration / replay_seconds,
+            }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sensor log write/replay benchmark")
+    parser.add_argument("--duration", type=float, default=2.0, help="Simulated seconds to record")
+    parser.add_argument("--output", type=str, default=None, help="Optional path for JSON results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(duration=args.duration)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""
+Fixed-rate control-loop executor for sensor reads and actuator commands.
+
+Every task runs on its own thread and is released on a fixed period from
+an absolute schedule, so timing errors do not accumulate. Each release
+records its jitter (start minus scheduled release) and whether the task
+finished within its deadline. After an overrun the next release runs late,
+and releases more than a whole period overdue are skipped rather than run
+back to back.
+
+The emergency stop is handled outside the schedule: `estop()` latches a
+flag that gates every actuator task and runs the stop handlers immediately
+on the calling thread, so stopping never waits for the next period. Stop
+latency and the time until in-flight actuator commands have drained are
+recorded per e-stop.
+
+All timing goes through a clock object. `MonotonicClock` is wall time;
+`SimulatedClock` is a discrete-event clock that only advances when every
+task thread is asleep, which makes schedules, jitter and deadline misses
+reproducible on a loaded CI machine.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TASK_KINDS = ('sensor', 'actuator')
+
+
+class MonotonicClock:
+    """Wall-clock time with a short spin before each deadline for sub-millisecond release accuracy."""
+
+    def __init__(self, spin_seconds: float = 0.0002):
+        self.spin_seconds = spin_seconds
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep_until(self, deadline: float):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_seconds:
+            time.sleep(remaining - self.spin_seconds)
+        while time.perf_counter() < deadline:
+            pass
+
+    def sleep(self, seconds: float):
+        self.sleep_until(self.now() + seconds)
+
+    def register(self):
+        pass
+
+    def unregister(self):
+        pass
+
+    def release_all(self):
+        pass
+
+
+class SimulatedClock:
+    """Deterministic clock shared by a fixed set of registered threads.
+
+    Time stands still while any registered thread is running. `advance_to`
+    (called from a driver thread) repeatedly waits until every registered
+    thread is blocked in `sleep_until`, then jumps to the earliest wake-up
+    time and releases exactly the threads due at that instant. Work inside
+    a task is simulated with `sleep`.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._cond = threading.Condition()
+        self._participants = 0
+        self._sleepers: Dict[int, float] = {}
+        self._released = False
+
+    def now(self) -> float:
+        return self._now
+
+    def register(self):
+        with self._cond:
+            self._participants += 1
+            self._cond.notify_all()
+
+    def unregister(self):
+        with self._cond:
+            self._participants -= 1
+            self._cond.notify_all()
+
+    def sleep_until(self, deadline: float):
+        ident = threading.get_ident()
+        with self._cond:
+            if deadline <= self._now or self._released:
+                return
+            self._sleepers[ident] = deadline
+            self._cond.notify_all()
+            # The driver removes our entry when it advances time past the deadline
+            self._cond.wait_for(lambda: ident not in self._sleepers)
+
+    def sleep(self, seconds: float):
+        self.sleep_until(self._now + seconds)
+
+    def _all_asleep(self) -> bool:
+        return len(self._sleepers) >= self._participants
+
+    def advance_to(self, target: float, timeout: float = 10.0):
+        """Run the simulation until `target`, releasing sleepers in deadline order."""
+        with self._cond:
+            while True:
+                if not self._cond.wait_for(self._all_asleep, timeout):
+                    raise TimeoutError("Simulated clock: a registered thread did not block in sleep_until")
+                due = min(self._sleepers.values(), default=np.inf)
+                if due > target:
+                    self._now = max(self._now, target)
+                    return
+                self._now = due
+                for ident in [i for i, deadline in self._sleepers.items() if deadline <= due]:
+                    del self._sleepers[ident]
+                self._cond.notify_all()
+
+    def advance(self, seconds: float, timeout: float = 10.0):
+        self.advance_to(self._now + seconds, timeout)
+
+    def release_all(self):
+        """Wake every sleeper now and stop blocking later sleeps, for shutdown."""
+        with self._cond:
+            self._released = True
+            self._sleepers.clear()
+            self._cond.notify_all()
+
+    def settle(self, timeout: float = 10.0):
+        """Wait, without advancing time, until every registered thread is asleep or has exited."""
+        with self._cond:
+            if not self._cond.wait_for(self._all_asleep, timeout):
+                raise TimeoutError("Simulated clock: a registered thread did not block in sleep_until")
+
+
+class TaskStats:
+    """Timing statistics for one task, with a fixed-size window of recent samples."""
+
+    def __init__(self, window: int = 4096):
+        self.releases = 0
+        self.deadline_misses = 0
+        self.skipped_releases = 0
+        self.max_jitter = 0.0
+        self.max_execution = 0.0
+        self._jitter = np.zeros(window)
+        self._execution = np.zeros(window)
+
+    def record(self, jitter: float, execution: float, missed: bool):
+        slot = self.releases % len(self._jitter)
+        self._jitter[slot] = jitter
+        self._execution[slot] = execution
+        self.releases += 1
+        self.deadline_misses += missed
+        self.max_jitter = max(self.max_jitter, jitter)
+        self.max_execution = max(self.max_execution, execution)
+
+    def summary(self) -> Dict[str, float]:
+        count = min(self.releases, len(self._jitter))
+        jitter, execution = self._jitter[:count], self._execution[:count]
+        return {
+            'releases': self.releases,
+            'deadline_misses': self.deadline_misses,
+            'skipped_releases': self.skipped_releases,
+            'jitter_p50_ms': float(np.percentile(jitter, 50) * 1e3) if count else 0.0,
+            'jitter_p99_ms': float(np.percentile(jitter, 99) * 1e3) if count else 0.0,
+            'jitter_max_ms': self.max_jitter * 1e3,
+            'execution_p99_ms': float(np.percentile(execution, 99) * 1e3) if count else 0.0,
+            'execution_max_ms': self.max_execution * 1e3,
+        }
+
+
+@dataclass
+class ControlTask:
+    """A callback released at a fixed rate.
+
+    Sensor tasks store their return value in `ControlLoopExecutor.latest`;
+    actuator tasks are gated by the e-stop. `deadline` defaults to the
+    period. With `estop_on_miss` a deadline miss triggers the e-stop.
+    """
+    name: str
+    callback: Callable[[], Any]
+    rate_hz: float
+    kind: str = 'actuator'
+    deadline: Optional[float] = None
+    estop_on_miss: bool = False
+    stats: TaskStats = field(default_factory=TaskStats)
+
+    def __post_init__(self):
+        if self.kind not in TASK_KINDS:
+            raise ValueError(f"kind must be one of {TASK_KINDS}")
+        if self.rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.period = 1.0 / self.rate_hz
+        if self.deadline is None:
+            self.deadline = self.period
+        self.in_flight = False
+
+
+@dataclass
+class EStopRecord:
+    """Timing of one emergency stop, in clock seconds."""
+    reason: str
+    requested_at: float
+    handlers_done_at: float
+    drained_at: Optional[float] = None
+
+    @property
+    def stop_latency(self) -> float:
+        return self.handlers_done_at - self.requested_at
+
+    @property
+    def drain_latency(self) -> Optional[float]:
+        return None if self.drained_at is None else self.drained_at - self.requested_at
+
+
+class ControlLoopExecutor:
+    """Runs ControlTasks on dedicated threads against a shared clock."""
+
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.tasks: Dict[str, ControlTask] = {}
+        self.latest: Dict[str, Any] = {}
+        self.estop_records: List[EStopRecord] = []
+        self._stop_handlers: List[Callable[[], Any]] = []
+        self._estopped = threading.Event()
+        self._running = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.start_time: Optional[float] = None
+
+    def add_task(self, name: str, callback: Callable[[], Any], rate_hz: float, **kwargs) -> ControlTask:
+        if self._running.is_set():
+            raise RuntimeError("Tasks must be added before start()")
+        task = self.tasks[name] = ControlTask(name, callback, rate_hz, **kwargs)
+        return task
+
+    def add_stop_handler(self, handler: Callable[[], Any]):
+        """Register a callable run immediately on e-stop, e.g. zeroing wheel velocities."""
+        self._stop_handlers.append(handler)
+
+    @property
+    def estopped(self) -> bool:
+        return self._estopped.is_set()
+
+    def start(self):
+        self._running.set()
+        self.start_time = self.clock.now()
+        for task in self.tasks.values():
+            # Register before the thread starts so a simulated clock never sees it missing
+            self.clock.register()
+            thread = threading.Thread(target=self._run_task, args=(task,), name=f"control-{task.name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop scheduling releases and join the task threads."""
+        self._running.clear()
+        self.clock.release_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run_task(self, task: ControlTask):
+        clock = self.clock
+        index = 0
+        release = self.start_time
+        try:
+            while True:
+                clock.sleep_until(release)
+                if not self._running.is_set():
+                    return
+                started = clock.now()
+                # Checked under the e-stop lock so no command can start after a stop is latched
+                with self._lock:
+                    gated = task.kind == 'actuator' and self._estopped.is_set()
+                    task.in_flight = not gated
+                if not gated:
+                    try:
+                        result = task.callback()
+                    except Exception:
+                        logger.exception(f"Control task {task.name} failed")
+                        result = None
+                    finally:
+                        task.in_flight = False
+                    if task.kind == 'sensor':
+                        self.latest[task.name] = result
+                    elif self._estopped.is_set():
+                        self._note_drained()
+                finished = clock.now()
+                missed = finished - release > task.deadline
+                task.stats.record(started - release, finished - started, missed)
+                if missed and task.estop_on_miss:
+                    self.estop(f"{task.name} missed its {task.deadline * 1e3:.1f} ms deadline")
+
+                # A late release still runs (with jitter); releases a whole period
+                # overdue are skipped instead of bursting to catch up
+                index += 1
+                overdue = clock.now() - (self.start_time + index * task.period)
+                if overdue >= task.period:
+                    skipped = int(overdue // task.period)
+                    task.stats.skipped_releases += skipped
+                    index += skipped
+                release = self.start_time + index * task.period
+        finally:
+            clock.unregister()
+
+    def estop(self, reason: str = "requested") -> EStopRecord:
+        """Latch the e-stop, gate all actuator tasks and run stop handlers on this thread."""
+        requested = self.clock.now()
+        with self._lock:
+            first = not self._estopped.is_set()
+            self._estopped.set()
+        for handler in self._stop_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("E-stop handler failed")
+        record = EStopRecord(reason=reason, requested_at=requested, handlers_done_at=self.clock.now())
+        if not first:
+            return record
+        logger.warning(f"Emergency stop: {reason}")
+        self.estop_records.append(record)
+        self._note_drained()
+        return record
+
+    def _note_drained(self):
+        """Mark the e-stop drained once no actuator command is still executing."""
+        with self._lock:
+            if not self.estop_records or self.estop_records[-1].drained_at is not None:
+                return
+            if not any(t.in_flight for t in self.tasks.values() if t.kind == 'actuator'):
+                self.estop_records[-1].drained_at = self.clock.now()
+
+    def reset_estop(self):
+        """Release the e-stop latch; actuator tasks resume at their next release."""
+        self._estopped.clear()
+
+    @property
+    def worst_stop_latency(self) -> float:
+        return max((r.stop_latency for r in self.estop_records), default=0.0)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'tasks': {name: task.stats.summary() for name, task in self.tasks.items()},
+            'estops': [
+                {'reason': r.reason, 'stop_latency_ms': r.stop_latency * 1e3,
+                 'drain_latency_ms': None if r.drain_latency is None else r.drain_latency * 1e3}
+                for r in self.estop_records
+            ],
+            'worst_stop_latency_ms': self.worst_stop_latency * 1e3,
+        }
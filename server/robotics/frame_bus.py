@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame bus for camera, depth and lidar data.
+
+A single writer publishes frames into a fixed ring of slots in one
+`multiprocessing.shared_memory` segment. Each slot carries a sequence number
+used as a seqlock, so readers in other processes get NumPy views straight into
+the segment (no pickling, no copies) and can detect when the writer has lapped
+them. Reader cursors also live in the segment, which lets the writer apply
+backpressure when a lossless hand-off is wanted.
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+HEADER_BYTES = 4096
+ALIGNMENT = 64
+
+# Matches the mock sensors in test_robotics_integration.py; depth is stored as
+# float32 like the SensorFusion depth ring
+DEFAULT_CHANNELS = {
+    'rgb': ((480, 640, 3), 'uint8'),
+    'depth': ((480, 640), 'float32'),
+    'lidar': ((360,), 'float64'),
+}
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Map an existing segment without registering it with the resource tracker.
+
+    The writer owns the segment; a tracked reader would unlink it on exit
+    (bpo-39959), and unregistering afterwards breaks trackers shared with the
+    writer's process.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class FrameBusError(RuntimeError):
+    """Raised when the bus cannot satisfy a publish or read request."""
+
+
+@dataclass
+class Frame:
+    """A frame read from the bus.
+
+    `arrays` are views into shared memory. They stay intact until the writer
+    reuses the slot; call `FrameReader.still_valid(frame)` after processing to
+    confirm the data was not overwritten mid-read.
+    """
+    sequence: int
+    timestamp: float
+    arrays: Dict[str, np.ndarray]
+    dropped: int = 0
+
+    def __getitem__(self, channel: str) -> np.ndarray:
+        return self.arrays[channel]
+
+
+class _Layout:
+    """Byte layout of the shared segment, serialised into its header."""
+
+    def __init__(self, channels: Dict[str, Tuple[Tuple[int, ...], str]], slots: int, max_readers: int):
+        self.channels = {name: (tuple(shape), np.dtype(dtype).str) for name, (shape, dtype) in channels.items()}
+        self.slots = slots
+        self.max_readers = max_readers
+
+        offset = HEADER_BYTES
+        self.head_offset = offset                       # int64: last published sequence
+        offset += 8
+        self.cursor_offset = offset                     # int64[max_readers]: released through this sequence, -1 inactive
+        offset += 8 * max_readers
+        self.sequence_offset = _align(offset)           # int64[slots]: seqlock per slot
+        offset = self.sequence_offset + 8 * slots
+        self.timestamp_offset = offset                  # float64[slots]
+        offset += 8 * slots
+
+        self.channel_offsets = {}
+        for name, (shape, dtype) in self.channels.items():
+            slot_bytes = _align(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            offset = _align(offset)
+            self.channel_offsets[name] = (offset, slot_bytes)
+            offset += slot_bytes * slots
+        self.size = offset
+
+    def to_bytes(self) -> bytes:
+        encoded = json.dumps({
+            'channels': {name: [list(shape), dtype] for name, (shape, dtype) in self.channels.items()},
+            'slots': self.slots,
+            'max_readers': self.max_readers,
+        }).encode()
+        if len(encoded) + 8 > HEADER_BYTES:
+            raise FrameBusError("Channel description does not fit in the bus header")
+        return len(encoded).to_bytes(8, 'little') + encoded
+
+    @classmethod
+    def from_buffer(cls, buf) -> '_Layout':
+        length = int.from_bytes(bytes(buf[:8]), 'little')
+        spec = json.loads(bytes(buf[8:8 + length]).decode())
+        channels = {name: (tuple(shape), dtype) for name, (shape, dtype) in spec['channels'].items()}
+        return cls(channels, spec['slots'], spec['max_readers'])
+
+
+class _BusView:
+    """NumPy views over a mapped segment, shared by writer and readers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: _Layout):
+        self.shm = shm
+        self.layout = layout
+        buf = shm.buf
+        self.head = np.ndarray((1,), np.int64, buf, layout.head_offset)
+        self.cursors = np.ndarray((layout.max_readers,), np.int64, buf, layout.cursor_offset)
+        self.sequences = np.ndarray((layout.slots,), np.int64, buf, layout.sequence_offset)
+        self.timestamps = np.ndarray((layout.slots,), np.float64, buf, layout.timestamp_offset)
+        self.slots = {}
+        for name, (shape, dtype) in layout.channels.items():
+            offset, slot_bytes = layout.channel_offsets[name]
+            strides = (slot_bytes,) + np.empty(shape, dtype).strides
+            self.slots[name] = np.ndarray((layout.slots,) + shape, dtype, buf, offset, strides)
+
+    def release(self):
+        # Views must be dropped before the mapping can be closed
+        self.head = self.cursors = self.sequences = self.timestamps = None
+        self.slots = {}
+        self.shm.close()
+
+
+class FrameBus:
+    """Single-writer ring of frame slots in shared memory."""
+
+    def __init__(self, name: Optional[str] = None, channels: Optional[Dict] = None,
+                 slots: int = 8, max_readers: int = 4):
+        if slots < 2:
+            raise ValueError("A frame bus needs at least two slots")
+        layout = _Layout(channels or DEFAULT_CHANNELS, slots, max_readers)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=layout.size)
+        header = layout.to_bytes()
+        shm.buf[:len(header)] = header
+        self._view = _BusView(shm, layout)
+        self._view.head[0] = 0
+        self._view.cursors[:] = -1
+        self._view.sequences[:] = 0
+        self._pending: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return self._view.shm.name
+
+    @property
+    def slots(self) -> int:
+        return self._view.layout.slots
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the most recently published frame (0 before any)."""
+        return int(self._view.head[0])
+
+    @property
+    def active_readers(self) -> int:
+        """Number of readers currently attached with a registered cursor."""
+        return int((self._view.cursors >= 0).sum())
+
+    def _wait_for_readers(self, sequence: int, timeout: Optional[float]):
+        """Block until every active reader has consumed the frame about to be overwritten."""
+        oldest_needed = sequence - self.slots
+        deadline = None if timeout is None else time.monotonic() + timeout
+        cursors = self._view.cursors
+        while True:
+            active = cursors[cursors >= 0]
+            if active.size == 0 or active.min() >= oldest_needed:
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                raise FrameBusError(f"Reader did not release slot for frame {sequence} within {timeout}s")
+            time.sleep(0.0001)
+
+    def claim(self, block: bool = False, timeout: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Reserve the next slot and return writable views for the producer to fill in place.
+
+        Finish with `commit(timestamp)`. With `block=True` the call waits until
+        all registered readers have consumed the slot's previous frame.
+        """
+        if self._pending is not None:
+            raise FrameBusError("Previous claim was not committed")
+        sequence = self.sequence + 1
+        if block:
+            self._wait_for_readers(sequence, timeout)
+        slot = (sequence - 1) % self.slots
+        # Negative sequence marks the slot as mid-rewrite; readers only accept the positive one
+        self._view.sequences[slot] = -sequence
+        self._pending = sequence
+        return {name: views[slot] for name, views in self._view.slots.items()}
+
+    def commit(self, timestamp: float) -> int:
+        """Publish the claimed slot and return its sequence number."""
+        if self._pending is None:
+            raise FrameBusError("commit() called without claim()")
+        sequence, self._pending = self._pending, None
+        slot = (sequence - 1) % self.slots
+        self._view.timestamps[slot] = timestamp
+        self._view.sequences[slot] = sequence
+        self._view.head[0] = sequence
+        return sequence
+
+    def publish(self, timestamp: float, block: bool = False, timeout: Optional[float] = None,
+                **arrays: np.ndarray) -> int:
+        """Copy `arrays` (by channel name) into the next slot and publish it.
+
+        Channels not given keep whatever the slot held before.
+        """
+        views = self.claim(block=block, timeout=timeout)
+        try:
+            for name, array in arrays.items():
+                np.copyto(views[name], array, casting='same_kind')
+        except Exception:
+            self._pending = None
+            raise
+        return self.commit(timestamp)
+
+    def close(self):
+        """Release and unlink the segment. Readers keep their mappings until they close."""
+        shm = self._view.shm
+        self._view.release()
+        shm.unlink()
+
+    def __enter__(self) -> 'FrameBus':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameReader:
+    """Reader attached to an existing FrameBus by name.
+
+    `reader_id` selects the reader's cursor slot in the segment; it must be
+    unique among concurrent readers and below the bus's `max_readers`.
+    """
+
+    def __init__(self, name: str, reader_id: int = 0, start: str = 'latest'):
+        shm = _attach(name)
+        layout = _Layout.from_buffer(shm.buf)
+        if not 0 <= reader_id < layout.max_readers:
+            shm.close()
+            raise ValueError(f"reader_id must be in [0, {layout.max_readers})")
+        self._view = _BusView(shm, layout)
+        self.reader_id = reader_id
+        self.dropped = 0
+        head = int(self._view.head[0])
+        self.cursor = head if start == 'latest' else max(0, head - layout.slots)
+        self._view.cursors[reader_id] = self.cursor
+
+    @property
+    def channels(self) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+        return self._view.layout.channels
+
+    def _frame(self, sequence: int, dropped: int) -> Optional[Frame]:
+        view = self._view
+        slot = (sequence - 1) % view.layout.slots
+        if view.sequences[slot] != sequence:
+            return None
+        return Frame(
+            sequence=sequence,
+            timestamp=float(view.timestamps[slot]),
+            arrays={name: views[slot] for name, views in view.slots.items()},
+            dropped=dropped,
+        )
+
+    def still_valid(self, frame: Frame) -> bool:
+        """True if the frame's slot has not been reused since it was read."""
+        slot = (frame.sequence - 1) % self._view.layout.slots
+        return int(self._view.sequences[slot]) == frame.sequence
+
+    def read_next(self) -> Optional[Frame]:
+        """Next unread frame in order, or None if the reader is caught up.
+
+        If the writer lapped this reader, skips to the oldest frame still in
+        the ring and reports the gap in `Frame.dropped`.
+        """
+        head = int(self._view.head[0])
+        sequence = self.cursor + 1
+        if sequence > head:
+            return None
+        dropped = 0
+        oldest = head - self._view.layout.slots + 1
+        if sequence < oldest:
+            dropped = oldest - sequence
+            sequence = oldest
+        while True:
+            frame = self._frame(sequence, dropped)
+            if frame is not None:
+                break
+            # Slot was reused after head was read; the slot after the newest
+            # frame may be mid-write, so resume two past the ring's start
+            head = int(self._view.head[0])
+            next_sequence = max(sequence + 1, head - self._view.layout.slots + 2)
+            dropped += next_sequence - sequence
+            sequence = next_sequence
+        self._advance(sequence, dropped)
+        return frame
+
+    def read_latest(self) -> Optional[Frame]:
+        """Most recent frame if it has not been read yet, skipping any backlog."""
+        while True:
+            head = int(self._view.head[0])
+            if head <= self.cursor:
+                return None
+            frame = self._frame(head, head - self.cursor - 1)
+            if frame is not None:
+                self._advance(head, frame.dropped)
+                return frame
+
+    def wait_next(self, timeout: Optional[float] = None, poll: float = 0.0001) -> Optional[Frame]:
+        """Poll `read_next` until a frame arrives or `timeout` elapses."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frame = self.read_next()
+            if frame is not None:
+                return frame
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(poll)
+
+    def _advance(self, sequence: int, dropped: int):
+        self.cursor = sequence
+        self.dropped += dropped
+        # Marks the previous frame as released for a blocking writer: the
+        # returned frame's slot stays reserved until the next read
+        self._view.cursors[self.reader_id] = sequence - 1
+
+    def close(self):
+        if self._view.cursors is None:
+            return
+        self._view.cursors[self.reader_id] = -1
+        self._view.release()
+
+    def __enter__(self) -> 'FrameReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
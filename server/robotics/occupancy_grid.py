@@ -0,0 +1,198 @@
+"""
+Occupancy-grid mapping from planar lidar scans.
+
+Scans are integrated as log-odds updates into a dense local window centred
+on the robot. Ray casting is a DDA over every beam at once: each beam is
+sampled once per cell along its major axis, producing a (beams, steps)
+array of traversed cells with no per-beam Python loop. When the robot
+drifts towards the window edge the window is written back to a sparse,
+tiled global map and re-centred, so memory stays bounded by the window
+plus the tiles that were actually observed.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Log-odds increments for a beam endpoint (occupied) and the cells it crossed (free)
+LOG_ODDS_HIT = 0.85
+LOG_ODDS_MISS = -0.4
+LOG_ODDS_MIN = -4.0
+LOG_ODDS_MAX = 4.0
+
+
+def log_odds_to_probability(log_odds: np.ndarray) -> np.ndarray:
+    return 1.0 - 1.0 / (1.0 + np.exp(log_odds))
+
+
+class TiledGridMap:
+    """Sparse global map stored as square float32 log-odds tiles keyed by tile index."""
+
+    def __init__(self, tile_size: int = 128):
+        self.tile_size = tile_size
+        self.tiles: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def _tile_spans(self, origin: Tuple[int, int], shape: Tuple[int, int]):
+        """Yield (tile key, window slice, tile slice) for every tile overlapping a window."""
+        size = self.tile_size
+        (row0, col0), (rows, cols) = origin, shape
+        for tile_row in range(row0 // size, (row0 + rows - 1) // size + 1):
+            r_start = max(row0, tile_row * size)
+            r_end = min(row0 + rows, (tile_row + 1) * size)
+            for tile_col in range(col0 // size, (col0 + cols - 1) // size + 1):
+                c_start = max(col0, tile_col * size)
+                c_end = min(col0 + cols, (tile_col + 1) * size)
+                window = (slice(r_start - row0, r_end - row0), slice(c_start - col0, c_end - col0))
+                tile = (slice(r_start - tile_row * size, r_end - tile_row * size),
+                        slice(c_start - tile_col * size, c_end - tile_col * size))
+                yield (tile_row, tile_col), window, tile
+
+    def read(self, origin: Tuple[int, int], out: np.ndarray) -> np.ndarray:
+        """Fill `out` with the map region whose top-left global cell is `origin`."""
+        out.fill(0.0)
+        for key, window, tile in self._tile_spans(origin, out.shape):
+            data = self.tiles.get(key)
+            if data is not None:
+                out[window] = data[tile]
+        return out
+
+    def write(self, origin: Tuple[int, int], window_data: np.ndarray):
+        """Store a window back into the tiles, creating tiles only where it holds information."""
+        for key, window, tile in self._tile_spans(origin, window_data.shape):
+            block = window_data[window]
+            data = self.tiles.get(key)
+            if data is None:
+                if not block.any():
+                    continue
+                data = self.tiles[key] = np.zeros((self.tile_size, self.tile_size), dtype=np.float32)
+            data[tile] = block
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    def to_dense(self) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Dense copy of every stored tile and the global cell of its top-left corner."""
+        if not self.tiles:
+            return np.zeros((0, 0), dtype=np.float32), (0, 0)
+        keys = np.array(list(self.tiles))
+        (row_min, col_min), (row_max, col_max) = keys.min(axis=0), keys.max(axis=0)
+        size = self.tile_size
+        dense = np.zeros(((row_max - row_min + 1) * size, (col_max - col_min + 1) * size), dtype=np.float32)
+        for (row, col), data in self.tiles.items():
+            r, c = (row - row_min) * size, (col - col_min) * size
+            dense[r:r + size, c:c + size] = data
+        return dense, (int(row_min) * size, int(col_min) * size)
+
+
+class OccupancyGridMapper:
+    """Integrates lidar scans into a sliding local window over a tiled global map.
+
+    Cells are indexed (row, col) = (floor(y / resolution), floor(x / resolution))
+    in the world frame; beam i of an N-beam scan points at angle 2*pi*i/N
+    counter-clockwise from the robot's heading, matching LidarProjector.
+    """
+
+    def __init__(self, resolution: float = 0.05, window_cells: int = 512, tile_size: int = 128,
+                 max_range: float = 10.0, min_range: float = 0.05):
+        max_range_cells = int(np.ceil(max_range / resolution))
+        if window_cells < 2 * max_range_cells + 2:
+            raise ValueError(f"window_cells must be at least {2 * max_range_cells + 2} to hold a full scan")
+        self.resolution = resolution
+        self.max_range = max_range
+        self.min_range = min_range
+        self.window_cells = window_cells
+        self.global_map = TiledGridMap(tile_size)
+        self.window = np.zeros((window_cells, window_cells), dtype=np.float32)
+        # Re-centre once the robot is closer to an edge than one full beam
+        self._margin = max_range_cells + 1
+        self.origin = (-window_cells // 2, -window_cells // 2)
+        self.scans = 0
+        self.recenters = 0
+
+        # Sample fractions along a ray, one per cell of the longest possible beam
+        self._steps = np.arange(max_range_cells + 1, dtype=np.float64)
+        self._beam_angles: Dict[int, np.ndarray] = {}
+
+    def _angles(self, num_beams: int) -> np.ndarray:
+        angles = self._beam_angles.get(num_beams)
+        if angles is None:
+            angles = self._beam_angles[num_beams] = np.linspace(0.0, 2.0 * np.pi, num_beams, endpoint=False)
+        return angles
+
+    def _world_to_window(self, x, y):
+        row = np.floor(y / self.resolution).astype(np.int64) - self.origin[0]
+        col = np.floor(x / self.resolution).astype(np.int64) - self.origin[1]
+        return row, col
+
+    def _ensure_window(self, x: float, y: float):
+        """Slide the window so the robot cell keeps a full beam of margin on every side."""
+        row, col = self._world_to_window(x, y)
+        if self._margin <= row < self.window_cells - self._margin and \
+                self._margin <= col < self.window_cells - self._margin:
+            return
+        self.global_map.write(self.origin, self.window)
+        half = self.window_cells // 2
+        self.origin = (int(np.floor(y / self.resolution)) - half, int(np.floor(x / self.resolution)) - half)
+        self.global_map.read(self.origin, self.window)
+        self.recenters += 1
+
+    def integrate(self, ranges: np.ndarray, pose: Tuple[float, float, float] = (0.0, 0.0, 0.0)):
+        """Apply one scan taken at world pose (x, y, yaw)."""
+        x, y, yaw = pose
+        self._ensure_window(x, y)
+        angles = self._angles(len(ranges))
+        ranges = np.asarray(ranges, dtype=np.float64)
+
+        # inf means no return: the beam clears free space out to max_range
+        valid = ~np.isnan(ranges) & (ranges >= self.min_range)
+        ranges = ranges[valid]
+        hit = ranges < self.max_range
+        ranges = np.minimum(ranges, self.max_range)
+        beam_angles = angles[valid] + yaw
+
+        # Continuous start and end positions in window cell units
+        start_row = y / self.resolution - self.origin[0]
+        start_col = x / self.resolution - self.origin[1]
+        end_row = start_row + ranges * np.sin(beam_angles) / self.resolution
+        end_col = start_col + ranges * np.cos(beam_angles) / self.resolution
+        d_row, d_col = end_row - start_row, end_col - start_col
+
+        # DDA: one sample per cell along each beam's major axis, padded to the longest beam
+        lengths = np.ceil(np.maximum(np.abs(d_row), np.abs(d_col))).astype(np.int64)
+        steps = self._steps[:max(int(lengths.max(initial=0)), 1)]
+        fractions = steps[None, :] / np.maximum(lengths, 1)[:, None]
+        free_mask = steps[None, :] < lengths[:, None]
+        rows = np.floor(start_row + fractions * d_row[:, None]).astype(np.int64)
+        cols = np.floor(start_col + fractions * d_col[:, None]).astype(np.int64)
+
+        width = self.window_cells
+        flat = self.window.reshape(-1)
+        free = (rows * width + cols)[free_mask]
+        end_rows = np.floor(end_row[hit]).astype(np.int64)
+        end_cols = np.floor(end_col[hit]).astype(np.int64)
+        occupied = end_rows * width + end_cols
+
+        # Fancy assignment writes duplicates once, so each cell gets at most one
+        # update per scan; occupied cells are computed from pre-scan values so a
+        # hit overrides a pass-through by a neighbouring beam
+        occupied_values = flat[occupied] + LOG_ODDS_HIT
+        flat[free] = np.clip(flat[free] + LOG_ODDS_MISS, LOG_ODDS_MIN, LOG_ODDS_MAX)
+        flat[occupied] = np.clip(occupied_values, LOG_ODDS_MIN, LOG_ODDS_MAX)
+        self.scans += 1
+
+    def flush(self):
+        """Write the local window into the global map."""
+        self.global_map.write(self.origin, self.window)
+
+    def local_probabilities(self) -> np.ndarray:
+        return log_odds_to_probability(self.window)
+
+    def global_log_odds(self) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Dense log-odds of the whole observed map and the global cell of its top-left corner."""
+        self.flush()
+        return self.global_map.to_dense()
+
+    @property
+    def nbytes(self) -> int:
+        return self.window.nbytes + self.global_map.nbytes
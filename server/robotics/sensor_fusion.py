@@ -0,0 +1,361 @@
+"""
+Real-time sensor fusion for the robot's lidar, camera and IMU streams.
+
+Every stream is timestamped into a preallocated NumPy ring buffer. Each
+fusion step aligns the streams to a common time, runs a complementary
+orientation filter over the IMU samples received since the previous step,
+and projects the nearest lidar scan into the camera image. All working
+arrays are allocated up front so the steady-state loop does not allocate
+per frame.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+IMU_FIELDS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z')
+
+# Lidar frame (x forward, y left, z up) to camera optical frame (x right, y down, z forward)
+LIDAR_TO_CAMERA_ROTATION = np.array([
+    [0.0, -1.0, 0.0],
+    [0.0, 0.0, -1.0],
+    [1.0, 0.0, 0.0],
+])
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of timestamped samples with a fixed shape and dtype.
+
+    Timestamps must be pushed in non-decreasing order. Samples are copied into
+    preallocated slots, so readers get views that stay valid until the slot is
+    overwritten `capacity` pushes later.
+    """
+
+    def __init__(self, capacity: int, shape: Tuple[int, ...], dtype=np.float64):
+        self.capacity = capacity
+        self.data = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.timestamps = np.full(capacity, -np.inf)
+        self.count = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def push(self, timestamp: float, sample) -> int:
+        """Copy `sample` into the next slot and return the slot index."""
+        if self.count and timestamp < self.timestamps[(self._next - 1) % self.capacity]:
+            raise ValueError("RingBuffer timestamps must be non-decreasing")
+        slot = self._next
+        np.copyto(self.data[slot], sample, casting='same_kind')
+        self.timestamps[slot] = timestamp
+        self._next = (slot + 1) % self.capacity
+        self.count += 1
+        return slot
+
+    def _slot(self, logical_index: int) -> int:
+        """Slot of the i-th oldest retained sample."""
+        oldest = self._next if self.count >= self.capacity else 0
+        return (oldest + logical_index) % self.capacity
+
+    def latest_slot(self) -> Optional[int]:
+        return (self._next - 1) % self.capacity if self.count else None
+
+    def _count_at_or_before(self, timestamp: float) -> int:
+        """Number of retained samples with a timestamp <= `timestamp` (binary search)."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._slot(mid)] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slot_at_or_before(self, timestamp: float) -> Optional[int]:
+        """Slot of the newest sample with a timestamp <= `timestamp`."""
+        count = self._count_at_or_before(timestamp)
+        return self._slot(count - 1) if count else None
+
+    def nearest_slot(self, timestamp: float) -> Optional[int]:
+        """Slot of the sample closest in time to `timestamp`."""
+        if not len(self):
+            return None
+        count = self._count_at_or_before(timestamp)
+        if count == 0:
+            return self._slot(0)
+        before = self._slot(count - 1)
+        if count == len(self):
+            return before
+        after = self._slot(count)
+        if self.timestamps[after] - timestamp < timestamp - self.timestamps[before]:
+            return after
+        return before
+
+    def copy_range(self, start_time: float, end_time: float, out: np.ndarray,
+                   out_timestamps: np.ndarray) -> int:
+        """Copy samples with start_time < t <= end_time into `out`, oldest first.
+
+        At most `len(out)` of the newest matching samples are copied; returns
+        how many were.
+        """
+        first = self._count_at_or_before(start_time)
+        last = self._count_at_or_before(end_time)
+        first = max(first, last - len(out))
+        n = max(0, last - first)
+        for i in range(n):
+            slot = self._slot(first + i)
+            out[i] = self.data[slot]
+            out_timestamps[i] = self.timestamps[slot]
+        return n
+
+
+@dataclass
+class CameraIntrinsics:
+    """Pinhole intrinsics; the defaults match the 640x480 mock camera."""
+    fx: float = 525.0
+    fy: float = 525.0
+    cx: float = 319.5
+    cy: float = 239.5
+    width: int = 640
+    height: int = 480
+
+
+@dataclass
+class FusedFrame:
+    """Result of one fusion step.
+
+    Arrays are views into the fusion's preallocated buffers and are only valid
+    until the next call to `SensorFusion.fuse`.
+    """
+    timestamp: float
+    orientation: np.ndarray          # roll, pitch, yaw in radians
+    angular_velocity: np.ndarray     # rad/s, mean over the step's IMU samples
+    camera_slot: Optional[int]
+    lidar_slot: Optional[int]
+    lidar_pixels: np.ndarray         # (num_visible, 2) integer u, v
+    lidar_ranges: np.ndarray         # (num_visible,) lidar depth along the camera axis
+    camera_depth: np.ndarray         # (num_visible,) camera depth at the same pixels
+    imu_samples: int
+    time_skew: Dict[str, float] = field(default_factory=dict)
+
+
+class ComplementaryFilter:
+    """Roll/pitch/yaw from gyro integration corrected by the accelerometer's gravity vector.
+
+    `update` processes a whole batch of samples at once: the filter is a linear
+    recurrence, so the final state is a weighted sum with geometric weights.
+    Gyro rates are treated as Euler-angle rates (small-angle approximation).
+    """
+
+    def __init__(self, alpha: float = 0.98, max_batch: int = 256):
+        self.alpha = alpha
+        self.max_batch = max_batch
+        self.orientation = np.zeros(3)
+        self.angular_velocity = np.zeros(3)
+        self._acc_angles = np.zeros((max_batch, 2))
+        self._tmp = np.zeros(max_batch)
+        self._tmp2 = np.zeros(max_batch)
+        self._increments = np.zeros((max_batch, 3))
+        # _powers[k] = alpha ** k
+        self._powers = alpha ** np.arange(max_batch + 1, dtype=np.float64)
+        self._initialized = False
+
+    def update(self, imu: np.ndarray, dt: np.ndarray) -> np.ndarray:
+        """Fold `n` samples (rows of accel xyz, gyro xyz) with per-sample `dt` into the state."""
+        n = len(imu)
+        if n == 0:
+            return self.orientation
+        if n > self.max_batch:
+            raise ValueError(f"Batch of {n} IMU samples exceeds max_batch={self.max_batch}")
+        ax, ay, az = imu[:, 0], imu[:, 1], imu[:, 2]
+        acc = self._acc_angles[:n]
+        tmp, tmp2 = self._tmp[:n], self._tmp2[:n]
+
+        # Gravity-referenced roll and pitch for every sample
+        np.arctan2(ay, az, out=acc[:, 0])
+        np.multiply(ay, ay, out=tmp)
+        np.multiply(az, az, out=tmp2)
+        np.add(tmp, tmp2, out=tmp)
+        np.sqrt(tmp, out=tmp)
+        np.negative(ax, out=tmp2)
+        np.arctan2(tmp2, tmp, out=acc[:, 1])
+
+        if not self._initialized:
+            self.orientation[:2] = acc[0]
+            self._initialized = True
+
+        increments = self._increments[:n]
+        np.multiply(imu[:, 3:6], dt[:, None], out=increments)
+        # Reversed powers: the newest sample gets weight alpha^0 on its correction
+        weights = self._powers[n - 1::-1]
+        decay = self._powers[n]
+        for axis in range(2):
+            gyro_term = self.alpha * np.dot(weights, increments[:, axis])
+            acc_term = (1.0 - self.alpha) * np.dot(weights, acc[:, axis])
+            self.orientation[axis] = decay * self.orientation[axis] + gyro_term + acc_term
+        # No absolute yaw reference: integrate the gyro only
+        self.orientation[2] += increments[:, 2].sum()
+        np.mean(imu[:, 3:6], axis=0, out=self.angular_velocity)
+        return self.orientation
+
+
+class LidarProjector:
+    """Projects a planar lidar scan into camera pixels with precomputed beam tables."""
+
+    def __init__(self, num_beams: int = 360, intrinsics: Optional[CameraIntrinsics] = None,
+                 rotation: Optional[np.ndarray] = None, translation: Optional[np.ndarray] = None,
+                 depth_dtype=np.float32):
+        self.num_beams = num_beams
+        self.intrinsics = intrinsics or CameraIntrinsics()
+        self.rotation = LIDAR_TO_CAMERA_ROTATION.copy() if rotation is None else np.asarray(rotation, dtype=np.float64)
+        self.translation = np.zeros(3) if translation is None else np.asarray(translation, dtype=np.float64)
+
+        angles = np.linspace(0.0, 2.0 * np.pi, num_beams, endpoint=False)
+        # Unit beam directions in the lidar frame (z = 0 plane), then in the camera frame
+        directions = np.stack([np.cos(angles), np.sin(angles), np.zeros(num_beams)])
+        self._camera_directions = self.rotation @ directions
+
+        self._points = np.zeros((3, num_beams))
+        self._u = np.zeros(num_beams)
+        self._v = np.zeros(num_beams)
+        self._valid = np.zeros(num_beams, dtype=bool)
+        self._scratch = np.zeros(num_beams, dtype=bool)
+        self._visible_u = np.zeros(num_beams)
+        self._visible_v = np.zeros(num_beams)
+        self._pixels = np.zeros((num_beams, 2), dtype=np.int64)
+        self._flat_index = np.zeros(num_beams, dtype=np.int64)
+        self._ranges = np.zeros(num_beams)
+        self._camera_depth = np.zeros(num_beams, dtype=depth_dtype)
+
+    def empty(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Zero-length results, for steps before the first scan arrives."""
+        return self._pixels[:0], self._ranges[:0], self._camera_depth[:0]
+
+    def project(self, ranges: np.ndarray, depth_image: Optional[np.ndarray] = None
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (pixels, lidar depth, camera depth) for beams that land in the image."""
+        k = self.intrinsics
+        points = self._points
+        np.multiply(self._camera_directions, ranges, out=points)
+        points += self.translation[:, None]
+        x, y, z = points
+
+        valid = self._valid
+        np.greater(z, 1e-6, out=valid)
+        # Avoid dividing by ~0 for beams behind the camera; they are masked out anyway
+        np.copyto(self._u, 1.0)
+        np.divide(x, z, out=self._u, where=valid)
+        np.multiply(self._u, k.fx, out=self._u)
+        self._u += k.cx
+        np.copyto(self._v, 1.0)
+        np.divide(y, z, out=self._v, where=valid)
+        np.multiply(self._v, k.fy, out=self._v)
+        self._v += k.cy
+
+        scratch = self._scratch
+        for coordinate, limit in ((self._u, k.width), (self._v, k.height)):
+            np.greater_equal(coordinate, 0.0, out=scratch)
+            valid &= scratch
+            np.less(coordinate, limit - 0.5, out=scratch)
+            valid &= scratch
+
+        # Gather visible beams with np.compress into preallocated outputs
+        n = int(np.count_nonzero(valid))
+        u, v = self._visible_u[:n], self._visible_v[:n]
+        np.compress(valid, self._u, out=u)
+        np.compress(valid, self._v, out=v)
+        np.rint(u, out=u)
+        np.rint(v, out=v)
+        pixels = self._pixels[:n]
+        pixels[:, 0] = u
+        pixels[:, 1] = v
+        ranges = self._ranges[:n]
+        np.compress(valid, z, out=ranges)
+
+        camera_depth = self._camera_depth[:n]
+        if depth_image is not None and n:
+            flat_index = self._flat_index[:n]
+            np.multiply(pixels[:, 1], depth_image.shape[1], out=flat_index)
+            flat_index += pixels[:, 0]
+            np.take(depth_image.reshape(-1), flat_index, out=camera_depth)
+        else:
+            camera_depth.fill(np.nan)
+        return pixels, ranges, camera_depth
+
+
+class SensorFusion:
+    """Time-aligned fusion of lidar, camera and IMU streams."""
+
+    def __init__(self, num_beams: int = 360, image_shape: Tuple[int, int] = (480, 640),
+                 lidar_capacity: int = 16, camera_capacity: int = 8, imu_capacity: int = 1024,
+                 alpha: float = 0.98, intrinsics: Optional[CameraIntrinsics] = None):
+        height, width = image_shape
+        if intrinsics is None:
+            intrinsics = CameraIntrinsics(cx=(width - 1) / 2, cy=(height - 1) / 2, width=width, height=height)
+        self.lidar = RingBuffer(lidar_capacity, (num_beams,), np.float64)
+        self.rgb = RingBuffer(camera_capacity, (height, width, 3), np.uint8)
+        self.depth = RingBuffer(camera_capacity, (height, width), np.float32)
+        self.imu = RingBuffer(imu_capacity, (len(IMU_FIELDS),), np.float64)
+
+        self.filter = ComplementaryFilter(alpha=alpha, max_batch=imu_capacity)
+        self.projector = LidarProjector(num_beams, intrinsics)
+
+        self._imu_row = np.zeros(len(IMU_FIELDS))
+        self._imu_batch = np.zeros((imu_capacity, len(IMU_FIELDS)))
+        self._imu_times = np.zeros(imu_capacity)
+        self._imu_dt = np.zeros(imu_capacity)
+        self._last_fused = -np.inf
+        self._last_imu_time: Optional[float] = None
+
+    def push_lidar(self, timestamp: float, ranges: np.ndarray):
+        self.lidar.push(timestamp, ranges)
+
+    def push_camera(self, timestamp: float, reading: Dict):
+        """Store a camera reading (`rgb` and `depth` arrays, as from the mock camera)."""
+        self.rgb.push(timestamp, reading['rgb'])
+        self.depth.push(timestamp, reading['depth'])
+
+    def push_imu(self, timestamp: float, reading: Dict[str, float]):
+        """Store an IMU reading given as a dict of IMU_FIELDS."""
+        row = self._imu_row
+        for i, name in enumerate(IMU_FIELDS):
+            row[i] = reading[name]
+        self.imu.push(timestamp, row)
+
+    def fuse(self, timestamp: float) -> FusedFrame:
+        """Align all streams to `timestamp` and return the fused state."""
+        n = self.imu.copy_range(self._last_fused, timestamp, self._imu_batch, self._imu_times)
+        if n:
+            dt = self._imu_dt[:n]
+            dt[0] = self._imu_times[0] - self._last_imu_time if self._last_imu_time is not None else 0.0
+            if n > 1:
+                np.subtract(self._imu_times[1:n], self._imu_times[:n - 1], out=dt[1:])
+            self.filter.update(self._imu_batch[:n], dt)
+            self._last_imu_time = self._imu_times[n - 1]
+        self._last_fused = timestamp
+
+        camera_slot = self.rgb.slot_at_or_before(timestamp)
+        lidar_slot = self.lidar.nearest_slot(timestamp)
+        time_skew = {}
+        if lidar_slot is not None:
+            depth_image = self.depth.data[camera_slot] if camera_slot is not None else None
+            pixels, ranges, camera_depth = self.projector.project(self.lidar.data[lidar_slot], depth_image)
+            time_skew['lidar'] = float(self.lidar.timestamps[lidar_slot] - timestamp)
+        else:
+            pixels, ranges, camera_depth = self.projector.empty()
+        if camera_slot is not None:
+            time_skew['camera'] = float(self.rgb.timestamps[camera_slot] - timestamp)
+
+        return FusedFrame(
+            timestamp=timestamp,
+            orientation=self.filter.orientation,
+            angular_velocity=self.filter.angular_velocity,
+            camera_slot=camera_slot,
+            lidar_slot=lidar_slot,
+            lidar_pixels=pixels,
+            lidar_ranges=ranges,
+            camera_depth=camera_depth,
+            imu_samples=n,
+            time_skew=time_skew,
+        )
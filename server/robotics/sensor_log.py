@@ -0,0 +1,452 @@
+"""
+Binary sensor log format and replay for the robotics tests.
+
+A log holds any number of named streams (lidar, camera, imu, ...). Records
+of one stream are grouped into chunks stored column by column: every field
+of the stream's schema is laid out contiguously across the chunk's records,
+then the chunk is optionally zlib-compressed. A footer written on close
+indexes every chunk by stream and time range, so readers can seek to a
+timestamp without scanning the file.
+
+Layout::
+
+    MAGIC
+    chunk*                      (column blocks, compressed or raw)
+    index                       (JSON: schemas and chunk table)
+    uint64 index offset, MAGIC
+
+Readers memory-map the file. Uncompressed chunks are decoded as NumPy views
+straight into the mapping; compressed chunks are inflated once and kept in a
+small per-stream cache. Replay merges streams in timestamp order and paces
+them against a clock at real time, N times real time or as fast as possible.
+`ReplaySensors` exposes a log as callables compatible with the
+`self.sensors` dict in RoboticsIntegrationTest.
+"""
+
+import argparse
+import heapq
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from control_loop import MonotonicClock
+
+MAGIC = b'AESLOG01'
+COMPRESSIONS = ('zlib', 'none')
+_FOOTER = struct.Struct('<Q8s')
+
+# Field kinds in a stream schema
+ARRAY, SCALAR, JSON = 'array', 'scalar', 'json'
+_VALUE = ''  # field name used when a record is a bare array rather than a dict
+
+
+class SensorLogError(ValueError):
+    """Raised for malformed logs and records that do not match their stream schema."""
+
+
+def infer_schema(reading: Any) -> Dict[str, Dict[str, Any]]:
+    """Schema of a reading: a bare array, or a dict of arrays, numbers and JSON values."""
+    if isinstance(reading, np.ndarray):
+        return {_VALUE: {'kind': ARRAY, 'dtype': reading.dtype.str, 'shape': list(reading.shape)}}
+    if not isinstance(reading, dict):
+        raise SensorLogError(f"Cannot log a reading of type {type(reading).__name__}")
+    schema = {}
+    for name, value in reading.items():
+        if isinstance(value, np.ndarray):
+            schema[name] = {'kind': ARRAY, 'dtype': value.dtype.str, 'shape': list(value.shape)}
+        elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            schema[name] = {'kind': SCALAR}
+        else:
+            schema[name] = {'kind': JSON}
+    return schema
+
+
+@dataclass
+class ChunkInfo:
+    stream: str
+    offset: int
+    length: int
+    raw_length: int
+    count: int
+    first_time: float
+    last_time: float
+
+
+class _ChunkBuffer:
+    """Records of one stream waiting to be written as a chunk."""
+
+    def __init__(self, schema: Dict[str, Dict[str, Any]]):
+        self.schema = schema
+        self.timestamps: List[float] = []
+        self.columns: Dict[str, List[Any]] = {name: [] for name in schema}
+        self.nbytes = 0
+
+    def add(self, timestamp: float, reading: Any):
+        fields = {_VALUE: reading} if _VALUE in self.schema else reading
+        if set(fields) != set(self.schema):
+            raise SensorLogError(f"Record fields {sorted(fields)} do not match schema {sorted(self.schema)}")
+        for name, spec in self.schema.items():
+            value = fields[name]
+            if spec['kind'] == ARRAY:
+                value = np.asarray(value)
+                if list(value.shape) != spec['shape']:
+                    raise SensorLogError(f"Field {name!r} has shape {value.shape}, expected {tuple(spec['shape'])}")
+                self.nbytes += value.nbytes
+            self.columns[name].append(value)
+        self.timestamps.append(float(timestamp))
+
+    def encode(self) -> bytes:
+        """Timestamps, then each field as one contiguous column."""
+        parts = [np.asarray(self.timestamps, dtype=np.float64).tobytes()]
+        for name, spec in self.schema.items():
+            column = self.columns[name]
+            if spec['kind'] == ARRAY:
+                parts.append(np.stack(column).astype(spec['dtype'], copy=False).tobytes())
+            elif spec['kind'] == SCALAR:
+                parts.append(np.asarray(column, dtype=np.float64).tobytes())
+            else:
+                encoded = [json.dumps(value).encode() for value in column]
+                parts.append(np.asarray([len(e) for e in encoded], dtype=np.uint32).tobytes())
+                parts.append(b''.join(encoded))
+        return b''.join(parts)
+
+
+class SensorLogWriter:
+    """Appends timestamped readings to a log file, one chunk per stream at a time.
+
+    `field_dtypes` narrows stored array fields, keyed "stream.field" (or just
+    "stream" for bare-array streams), e.g. {"camera.depth": "float32"}.
+    """
+
+    def __init__(self, path: str, compression: str = 'zlib', level: int = 1,
+                 chunk_records: int = 64, chunk_bytes: int = 8 << 20,
+                 field_dtypes: Optional[Dict[str, str]] = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}")
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.chunk_records = chunk_records
+        self.chunk_bytes = chunk_bytes
+        self.field_dtypes = field_dtypes or {}
+        self.schemas: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.chunks: List[ChunkInfo] = []
+        self._buffers: Dict[str, _ChunkBuffer] = {}
+        self._last_time: Dict[str, float] = {}
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def write(self, stream: str, timestamp: float, reading: Any):
+        """Add one reading; timestamps must not decrease within a stream."""
+        if timestamp < self._last_time.get(stream, -np.inf):
+            raise SensorLogError(f"Timestamps for stream {stream!r} must be non-decreasing")
+        self._last_time[stream] = timestamp
+        buffer = self._buffers.get(stream)
+        if buffer is None:
+            schema = self.schemas.get(stream)
+            if schema is None:
+                schema = self.schemas[stream] = infer_schema(reading)
+                for name, spec in schema.items():
+                    dtype = self.field_dtypes.get(f"{stream}.{name}" if name else stream)
+                    if dtype is not None and spec['kind'] == ARRAY:
+                        spec['dtype'] = np.dtype(dtype).str
+            buffer = self._buffers[stream] = _ChunkBuffer(schema)
+        buffer.add(timestamp, reading)
+        if len(buffer.timestamps) >= self.chunk_records or buffer.nbytes >= self.chunk_bytes:
+            self._flush(stream)
+
+    def _flush(self, stream: str):
+        buffer = self._buffers.pop(stream, None)
+        if buffer is None or not buffer.timestamps:
+            return
+        raw = buffer.encode()
+        payload = zlib.compress(raw, self.level) if self.compression == 'zlib' else raw
+        offset = self._file.tell()
+        self._file.write(payload)
+        self.chunks.append(ChunkInfo(stream, offset, len(payload), len(raw), len(buffer.timestamps),
+                                     buffer.timestamps[0], buffer.timestamps[-1]))
+
+    def close(self):
+        if self._file.closed:
+            return
+        for stream in list(self._buffers):
+            self._flush(stream)
+        index = json.dumps({
+            'compression': self.compression,
+            'schemas': self.schemas,
+            'chunks': [[c.stream, c.offset, c.length, c.raw_length, c.count, c.first_time, c.last_time]
+                       for c in self.chunks],
+        }).encode()
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> 'SensorLogWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Chunk:
+    """Decoded columns of one chunk."""
+
+    def __init__(self, buffer, schema: Dict[str, Dict[str, Any]], count: int):
+        self.timestamps = np.frombuffer(buffer, np.float64, count, 0)
+        offset = 8 * count
+        self.columns: Dict[str, Any] = {}
+        for name, spec in schema.items():
+            if spec['kind'] == ARRAY:
+                dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+                size = int(np.prod(shape)) * count
+                self.columns[name] = np.frombuffer(buffer, dtype, size, offset).reshape((count,) + shape)
+                offset += size * dtype.itemsize
+            elif spec['kind'] == SCALAR:
+                self.columns[name] = np.frombuffer(buffer, np.float64, count, offset)
+                offset += 8 * count
+            else:
+                lengths = np.frombuffer(buffer, np.uint32, count, offset)
+                offset += 4 * count
+                values = []
+                for length in lengths.tolist():
+                    values.append(json.loads(bytes(buffer[offset:offset + length])))
+                    offset += length
+                self.columns[name] = values
+
+    def record(self, schema: Dict[str, Dict[str, Any]], i: int) -> Any:
+        if _VALUE in schema:
+            return self.columns[_VALUE][i]
+        return {
+            name: float(self.columns[name][i]) if spec['kind'] == SCALAR else self.columns[name][i]
+            for name, spec in schema.items()
+        }
+
+
+class SensorLog:
+    """Memory-mapped reader for a sensor log.
+
+    Arrays returned from uncompressed logs are read-only views into the
+    mapping; copy them before modifying.
+    """
+
+    def __init__(self, path: str, cache_chunks: int = 2):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC or len(self._map) < len(MAGIC) + _FOOTER.size:
+            raise SensorLogError(f"{path} is not a sensor log")
+        index_offset, magic = _FOOTER.unpack(self._map[-_FOOTER.size:])
+        if magic != MAGIC:
+            raise SensorLogError(f"{path} has no index; the writer was not closed")
+        index = json.loads(self._map[index_offset:len(self._map) - _FOOTER.size])
+        self.compression = index['compression']
+        self.schemas = index['schemas']
+        self.cache_chunks = cache_chunks
+        self._cache: Dict[str, OrderedDict] = {stream: OrderedDict() for stream in self.schemas}
+
+        chunks = [ChunkInfo(*row) for row in index['chunks']]
+        self.chunks = {stream: [c for c in chunks if c.stream == stream] for stream in self.schemas}
+        self._chunk_starts = {s: np.array([c.first_time for c in cs]) for s, cs in self.chunks.items()}
+        self._record_starts = {s: np.cumsum([0] + [c.count for c in cs]) for s, cs in self.chunks.items()}
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self.schemas)
+
+    def __len__(self) -> int:
+        return int(sum(starts[-1] for starts in self._record_starts.values()))
+
+    def count(self, stream: str) -> int:
+        return int(self._record_starts[stream][-1])
+
+    @property
+    def time_range(self) -> Tuple[float, float]:
+        all_chunks = [c for cs in self.chunks.values() for c in cs]
+        if not all_chunks:
+            return 0.0, 0.0
+        return min(c.first_time for c in all_chunks), max(c.last_time for c in all_chunks)
+
+    def _chunk(self, stream: str, index: int) -> _Chunk:
+        cache = self._cache[stream]
+        chunk = cache.get(index)
+        if chunk is not None:
+            cache.move_to_end(index)
+            return chunk
+        info = self.chunks[stream][index]
+        view = memoryview(self._map)[info.offset:info.offset + info.length]
+        buffer = zlib.decompress(view) if self.compression == 'zlib' else view
+        chunk = cache[index] = _Chunk(buffer, self.schemas[stream], info.count)
+        while len(cache) > self.cache_chunks:
+            cache.popitem(last=False)
+        return chunk
+
+    def read(self, stream: str, i: int) -> Tuple[float, Any]:
+        """The stream's i-th record as (timestamp, reading)."""
+        starts = self._record_starts[stream]
+        if not 0 <= i < starts[-1]:
+            raise IndexError(f"Record {i} out of range for stream {stream!r}")
+        chunk_index = int(np.searchsorted(starts, i, side='right')) - 1
+        chunk = self._chunk(stream, chunk_index)
+        row = i - int(starts[chunk_index])
+        return float(chunk.timestamps[row]), chunk.record(self.schemas[stream], row)
+
+    def index_at(self, stream: str, timestamp: float) -> int:
+        """Index of the last record at or before `timestamp` (-1 if none)."""
+        chunk_index = int(np.searchsorted(self._chunk_starts[stream], timestamp, side='right')) - 1
+        if chunk_index < 0:
+            return -1
+        chunk = self._chunk(stream, chunk_index)
+        row = int(np.searchsorted(chunk.timestamps, timestamp, side='right')) - 1
+        return int(self._record_starts[stream][chunk_index]) + row
+
+    def iter_stream(self, stream: str, start: float = -np.inf, end: float = np.inf) -> Iterator[Tuple[float, Any]]:
+        i = max(self.index_at(stream, start), 0)
+        for i in range(i, self.count(stream)):
+            timestamp, reading = self.read(stream, i)
+            if timestamp < start:
+                continue
+            if timestamp > end:
+                return
+            yield timestamp, reading
+
+    def messages(self, streams: Optional[List[str]] = None, start: float = -np.inf,
+                 end: float = np.inf) -> Iterator[Tuple[float, str, Any]]:
+        """All records of `streams` merged in timestamp order as (timestamp, stream, reading)."""
+        iterators = [
+            ((timestamp, stream, reading) for timestamp, reading in self.iter_stream(stream, start, end))
+            for stream in (streams or self.streams)
+        ]
+        return heapq.merge(*iterators, key=lambda message: message[0])
+
+    def close(self):
+        self._cache = {stream: OrderedDict() for stream in self.schemas}
+        try:
+            self._map.close()
+        except BufferError:
+            # Views handed out from an uncompressed log still reference the mapping
+            pass
+        self._file.close()
+
+    def __enter__(self) -> 'SensorLog':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(log: SensorLog, callback: Callable[[float, str, Any], Any], speed: Optional[float] = 1.0,
+           clock=None, streams: Optional[List[str]] = None, start: float = -np.inf, end: float = np.inf) -> int:
+    """Deliver records to `callback(timestamp, stream, reading)` in time order.
+
+    `speed` 1.0 is real time, 4.0 four times faster, None as fast as possible.
+    Returns the number of records delivered.
+    """
+    clock = clock or MonotonicClock()
+    delivered = 0
+    wall_start = log_start = None
+    for timestamp, stream, reading in log.messages(streams, start, end):
+        if speed is not None:
+            if wall_start is None:
+                wall_start, log_start = clock.now(), timestamp
+            clock.sleep_until(wall_start + (timestamp - log_start) / speed)
+        callback(timestamp, stream, reading)
+        delivered += 1
+    return delivered
+
+
+class ReplaySensors:
+    """Sensor callables backed by a log, for `self.sensors` in the robotics tests.
+
+    With `speed=None` each call returns the stream's next record (wrapping
+    around at the end when `loop` is set). With a speed, calls return the
+    latest record at the current replay time, like polling a live sensor.
+    """
+
+    def __init__(self, log: SensorLog, speed: Optional[float] = None, loop: bool = True, clock=None):
+        self.log = log
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock or MonotonicClock()
+        self._cursors = {stream: 0 for stream in log.streams}
+        self._wall_start: Optional[float] = None
+        self._log_start = log.time_range[0]
+
+    def replay_time(self) -> float:
+        if self._wall_start is None:
+            self._wall_start = self.clock.now()
+        return self._log_start + (self.clock.now() - self._wall_start) * self.speed
+
+    def read(self, stream: str) -> Any:
+        if self.speed is None:
+            i = self._cursors[stream]
+            if i >= self.log.count(stream):
+                if not self.loop:
+                    raise EOFError(f"Stream {stream!r} exhausted")
+                i = 0
+            self._cursors[stream] = i + 1
+        else:
+            i = self.log.index_at(stream, self.replay_time())
+            if i < 0:
+                i = 0
+            if self.loop and i == self.log.count(stream) - 1:
+                self._wall_start = None
+        return self.log.read(stream, i)[1]
+
+    def sensors(self) -> Dict[str, Callable[[], Any]]:
+        return {stream: (lambda stream=stream: self.read(stream)) for stream in self.log.streams}
+
+
+def record_sensors(path: str, sensors: Dict[str, Callable[[], Any]], duration: float,
+                   rates: Dict[str, float], **writer_kwargs) -> int:
+    """Sample sensor callables on a simulated timeline and write them to a log."""
+    events = sorted((t, name) for name, hz in rates.items() for t in np.arange(0.0, duration, 1.0 / hz))
+    with SensorLogWriter(path, **writer_kwargs) as writer:
+        for timestamp, name in events:
+            writer.write(name, float(timestamp), sensors[name]())
+    return len(events)
+
+
+DEFAULT_RATES = {'imu': 200.0, 'camera': 30.0, 'lidar': 10.0}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Record and inspect robotics sensor logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record = subparsers.add_parser("record", help="Record the mock sensors from RoboticsIntegrationTest")
+    record.add_argument("path")
+    record.add_argument("--duration", type=float, default=5.0, help="Simulated seconds to record")
+    record.add_argument("--compression", choices=COMPRESSIONS, default='zlib')
+    record.add_argument("--seed", type=int, default=0, help="NumPy seed for the mock sensors")
+    info = subparsers.add_parser("info", help="Print streams, record counts and sizes")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from test_robotics_integration import RoboticsIntegrationTest
+        np.random.seed(args.seed)
+        test = RoboticsIntegrationTest('test_sensor_fusion')
+        test.setUp()
+        count = record_sensors(args.path, test.sensors, args.duration, DEFAULT_RATES, compression=args.compression)
+        print(f"Recorded {count} readings to {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+    else:
+        with SensorLog(args.path) as log:
+            first, last = log.time_range
+            print(f"{args.path}: {len(log)} records, {first:.3f}-{last:.3f} s, compression={log.compression}")
+            for stream in log.streams:
+                chunks = log.chunks[stream]
+                stored = sum(c.length for c in chunks)
+                raw = sum(c.raw_length for c in chunks)
+                print(f"  {stream}: {log.count(stream)} records in {len(chunks)} chunks, "
+                      f"{stored / 1e6:.2f} MB stored ({raw / max(stored, 1):.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from arm_trajectory import ArmModel, TrajectoryPlanner, profile_timing, solve_ik
+
+class ArmTrajectoryTest(unittest.TestCase):
+    """Tests for batched IK and time-optimal arm trajectories"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.arm = ArmModel()
+        rng = np.random.default_rng(0)
+        cls.joints = rng.uniform(cls.arm.joint_min + [0, 0, 0.2], cls.arm.joint_max - [0, 0, 0.2], (200, 3))
+        cls.targets = cls.arm.forward_kinematics(cls.joints)
+
+    def test_batched_ik_reaches_targets(self):
+        seeds = self.arm.default_seeds(self.targets, np.tile(self.arm.home, (200, 1)))
+        joints, converged, _ = solve_ik(self.arm, self.targets, seeds)
+        self.assertTrue(converged.all())
+        np.testing.assert_allclose(self.arm.forward_kinematics(joints), self.targets, atol=1e-4)
+        self.assertTrue(np.all((joints >= self.arm.joint_min) & (joints <= self.arm.joint_max)))
+
+    def test_unreachable_target_is_infeasible(self):
+        plan = TrajectoryPlanner().plan([[0.5, 0.2, 0.3], [2.0, 0.0, 0.3]])
+        self.assertEqual(plan.feasible.tolist(), [True, False])
+
+    def test_profile_timing(self):
+        # Cruise: 0.5 s accelerating, 0.5 s cruising, 0.5 s braking
+        _, t_acc, t_cruise, _, peak_velocity = profile_timing(np.array([1.0]), np.array([2.0]))
+        self.assertAlmostEqual(2 * t_acc[0] + t_cruise[0], 1.5)
+        # Triangular: velocity limit never reached
+        _, t_acc, t_cruise, _, peak_velocity = profile_timing(np.array([2.0]), np.array([1.0]))
+        self.assertAlmostEqual(2 * t_acc[0] + t_cruise[0], 2.0)
+        self.assertAlmostEqual(peak_velocity[0], 1.0)
+
+    def test_profiles_respect_joint_limits(self):
+        for profile in ('trapezoid', 's_curve'):
+            plan = TrajectoryPlanner(profile=profile).plan(self.targets[:50])
+            times = np.linspace(0.0, plan.durations.max(), 4000)
+            dt = times[1] - times[0]
+            path = plan.sample(times)
+            np.testing.assert_allclose(path[:, 0], plan.start)
+            np.testing.assert_allclose(path[:, -1], plan.joints, atol=1e-9)
+            velocity = np.diff(path, axis=1) / dt
+            acceleration = np.diff(velocity, axis=1) / dt
+            self.assertTrue(np.all(np.abs(velocity).max(axis=(0, 1)) <= self.arm.max_velocity * 1.001))
+            self.assertTrue(np.all(np.abs(acceleration).max(axis=(0, 1)) <= self.arm.max_acceleration * 1.01))
+        trapezoid = TrajectoryPlanner(profile='trapezoid').plan(self.targets[:50])
+        s_curve = TrajectoryPlanner(profile='s_curve').plan(self.targets[:50])
+        self.assertTrue(np.all(s_curve.durations >= trapezoid.durations))
+
+    def test_seed_cache_speeds_up_neighbouring_targets(self):
+        planner = TrajectoryPlanner()
+        planner.plan(self.targets)
+        nearby = self.targets + np.random.default_rng(1).normal(0, 0.003, self.targets.shape)
+        warm = planner.plan(nearby)
+        cold = TrajectoryPlanner(cache_seeds=False).plan(nearby)
+        np.testing.assert_array_equal(warm.feasible, cold.feasible)
+        self.assertGreater(planner.seed_cache.hits, 0)
+        self.assertLess(np.median(warm.ik_iterations), np.median(cold.ik_iterations))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from control_loop import ControlLoopExecutor, MonotonicClock, SimulatedClock
+
+class ControlLoopTest(unittest.TestCase):
+    """Tests for the fixed-rate control-loop executor on a simulated clock"""
+
+    def setUp(self):
+        self.clock = SimulatedClock()
+        self.executor = ControlLoopExecutor(self.clock)
+        self.commands = []
+
+    def tearDown(self):
+        self.executor.stop()
+
+    def actuator(self, name, work):
+        def command():
+            self.commands.append((name, round(self.clock.now(), 6)))
+            self.clock.sleep(work(self.clock.now()) if callable(work) else work)
+        return command
+
+    def test_fixed_rate_releases(self):
+        self.executor.add_task('imu', self.clock.now, 200, kind='sensor')
+        self.executor.add_task('arm', self.actuator('arm', 0.004), 100)
+        self.executor.start()
+        self.clock.advance_to(0.0995)
+        self.assertEqual([t for name, t in self.commands], [round(0.01 * i, 6) for i in range(10)])
+        self.assertAlmostEqual(self.executor.latest['imu'], 0.095)
+        stats = self.executor.tasks['arm'].stats.summary()
+        self.assertEqual((stats['releases'], stats['deadline_misses'], stats['jitter_max_ms']), (10, 0, 0.0))
+        self.assertAlmostEqual(stats['execution_max_ms'], 4.0)
+
+    def test_overrun_records_jitter_misses_and_skips(self):
+        # One 25 ms iteration in a 10 ms loop starting at t = 0.05
+        work = lambda now: 0.025 if abs(now - 0.05) < 1e-9 else 0.001
+        self.executor.add_task('wheels', self.actuator('wheels', work), 100)
+        self.executor.start()
+        self.clock.advance_to(0.1)
+        stats = self.executor.tasks['wheels'].stats
+        self.assertEqual(stats.deadline_misses, 1)
+        self.assertEqual(stats.skipped_releases, 1)
+        self.assertAlmostEqual(stats.max_jitter, 0.005)
+        self.assertIn(('wheels', 0.075), self.commands)
+        self.assertIn(('wheels', 0.08), self.commands)
+
+    def test_estop_preempts_actuators(self):
+        stopped = []
+        self.executor.add_task('arm', self.actuator('arm', 0.004), 100)
+        self.executor.add_task('wheels', self.actuator('wheels', 0.002), 50)
+        self.executor.add_stop_handler(lambda: stopped.append(self.clock.now()))
+        self.executor.start()
+        self.clock.advance_to(0.1025)
+        record = self.executor.estop("obstacle")
+        self.clock.advance_to(0.2)
+
+        # Handlers ran at the request time, not at the next release
+        self.assertEqual(stopped, [0.1025])
+        self.assertEqual(record.stop_latency, 0.0)
+        # The arm command in flight at 0.1 finishes at 0.104; nothing starts afterwards
+        self.assertAlmostEqual(self.executor.estop_records[0].drain_latency, 0.0015)
+        self.assertFalse([t for _, t in self.commands if t > 0.1025])
+
+        self.executor.reset_estop()
+        self.clock.advance_to(0.215)
+        self.assertIn(('arm', 0.21), self.commands)
+
+    def test_deadline_miss_triggers_estop(self):
+        work = lambda now: 0.015 if now >= 0.03 else 0.001
+        self.executor.add_task('arm', self.actuator('arm', work), 100, estop_on_miss=True)
+        self.executor.start()
+        self.clock.advance_to(0.1)
+        self.assertTrue(self.executor.estopped)
+        self.assertIn("missed", self.executor.estop_records[0].reason)
+        self.assertEqual(self.commands[-1], ('arm', 0.03))
+
+    def test_wall_clock_stop_latency(self):
+        executor = ControlLoopExecutor(MonotonicClock())
+        executor.add_task('wheels', lambda: None, 500)
+        executor.add_stop_handler(lambda: None)
+        executor.start()
+        try:
+            MonotonicClock().sleep(0.02)
+            executor.estop()
+        finally:
+            executor.stop()
+        self.assertLess(executor.worst_stop_latency, 0.05)
+        self.assertGreater(executor.tasks['wheels'].stats.releases, 0)
+
+if __name__ == '__main__':
+    unittest.main()
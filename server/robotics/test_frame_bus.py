@@ -0,0 +1,79 @@
+import multiprocessing as mp
+import unittest
+
+import numpy as np
+
+from frame_bus import FrameBus, FrameBusError, FrameReader
+
+CHANNELS = {'image': ((4, 6), 'uint8'), 'ranges': ((8,), 'float32')}
+
+def _read_one(name, out):
+    with FrameReader(name, start='oldest') as reader:
+        frame = reader.wait_next(timeout=10.0)
+        out.put((frame.sequence, frame['image'].tolist(), reader.still_valid(frame)))
+
+
+class FrameBusTest(unittest.TestCase):
+    """Tests for the shared-memory frame bus"""
+
+    def setUp(self):
+        self.bus = FrameBus(channels=CHANNELS, slots=4)
+        self.reader = FrameReader(self.bus.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.bus.close()
+
+    def test_publish_and_read_in_place(self):
+        image = np.arange(24, dtype=np.uint8).reshape(4, 6)
+        sequence = self.bus.publish(1.5, image=image, ranges=np.ones(8))
+        frame = self.reader.read_next()
+        self.assertEqual((frame.sequence, frame.timestamp), (sequence, 1.5))
+        np.testing.assert_array_equal(frame['image'], image)
+        self.assertEqual(frame['ranges'].dtype, np.float32)
+        self.assertIsNone(self.reader.read_next())
+
+        # Frames alias their slot; filling the slot in place on the next lap shows through
+        for i in range(3):
+            self.bus.publish(2.0 + i)
+        self.assertTrue(self.reader.still_valid(frame))
+        views = self.bus.claim()
+        views['image'][:] = 7
+        self.assertFalse(self.reader.still_valid(frame))
+        self.bus.commit(5.0)
+        self.assertEqual(frame['image'][0, 0], 7)
+
+    def test_lapped_reader_skips_and_counts_drops(self):
+        for i in range(10):
+            self.bus.publish(float(i), image=np.full((4, 6), i, dtype=np.uint8))
+        frame = self.reader.read_next()
+        self.assertEqual(frame.sequence, 7)
+        self.assertEqual(frame.dropped, 6)
+        self.assertEqual(self.reader.read_latest().sequence, 10)
+        self.assertEqual(self.reader.dropped, 8)
+
+    def test_blocking_publish_waits_for_reader(self):
+        for i in range(4):
+            self.bus.publish(float(i), block=True)
+        with self.assertRaises(FrameBusError):
+            self.bus.publish(4.0, block=True, timeout=0.01)
+        self.reader.read_next()
+        self.reader.read_next()
+        self.assertEqual(self.bus.publish(4.0, block=True, timeout=0.01), 5)
+
+    def test_reader_in_other_process(self):
+        image = np.full((4, 6), 42, dtype=np.uint8)
+        self.bus.publish(0.0, image=image)
+        ctx = mp.get_context('spawn')
+        out = ctx.Queue()
+        process = ctx.Process(target=_read_one, args=(self.bus.name, out))
+        process.start()
+        sequence, received, valid = out.get(timeout=30)
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(sequence, 1)
+        self.assertEqual(received, image.tolist())
+        self.assertTrue(valid)
+
+if __name__ == '__main__':
+    unittest.main()
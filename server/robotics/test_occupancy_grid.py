@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from occupancy_grid import LOG_ODDS_MAX, OccupancyGridMapper, TiledGridMap
+
+def room_scan(num_beams, x=0.0, y=0.0, half_width=4.0):
+    """Ranges from (x, y) with zero heading to the walls of a square room centred on the origin."""
+    angles = np.linspace(0.0, 2.0 * np.pi, num_beams, endpoint=False)
+    c, s = np.cos(angles), np.sin(angles)
+    with np.errstate(divide='ignore'):
+        to_x = np.where(c > 0, (half_width - x) / c, np.where(c < 0, (-half_width - x) / c, np.inf))
+        to_y = np.where(s > 0, (half_width - y) / s, np.where(s < 0, (-half_width - y) / s, np.inf))
+    return np.minimum(to_x, to_y)
+
+
+class OccupancyGridTest(unittest.TestCase):
+    """Tests for vectorized occupancy-grid mapping"""
+
+    def cell(self, mapper, x, y):
+        return mapper.window[int(np.floor(y / mapper.resolution)) - mapper.origin[0],
+                             int(np.floor(x / mapper.resolution)) - mapper.origin[1]]
+
+    def test_room_walls_and_free_space(self):
+        mapper = OccupancyGridMapper(resolution=0.05, window_cells=512)
+        for _ in range(3):
+            mapper.integrate(room_scan(1080))
+        self.assertGreater(self.cell(mapper, 4.01, 0.0), 2.0)
+        self.assertGreater(self.cell(mapper, 0.0, -3.99), 2.0)
+        self.assertLess(self.cell(mapper, 2.0, 1.0), -1.0)
+        self.assertEqual(self.cell(mapper, 6.0, 0.0), 0.0)
+        self.assertLessEqual(mapper.window.max(), LOG_ODDS_MAX)
+
+    def test_one_update_per_cell_per_scan(self):
+        mapper = OccupancyGridMapper(resolution=0.05, window_cells=512)
+        mapper.integrate(np.full(1080, 3.0))
+        # Many beams cross the cells next to the robot; each still moves once
+        self.assertAlmostEqual(float(self.cell(mapper, 0.01, 0.01)), -0.4, places=5)
+
+    def test_out_of_range_beams_clear_without_marking(self):
+        mapper = OccupancyGridMapper(resolution=0.1, window_cells=256, max_range=5.0)
+        mapper.integrate(np.array([np.inf, 7.0, np.nan, 0.0]))
+        self.assertLess(self.cell(mapper, 4.5, 0.0), 0.0)
+        self.assertEqual(self.cell(mapper, 5.0, 0.0), 0.0)
+        self.assertLess(self.cell(mapper, 0.0, 4.5), 0.0)
+        self.assertEqual(self.cell(mapper, -1.0, 0.0), 0.0)
+
+    def test_window_slides_over_tiled_map(self):
+        mapper = OccupancyGridMapper(resolution=0.1, window_cells=128, tile_size=32, max_range=5.0)
+        mapper.integrate(room_scan(360))
+        before = float(self.cell(mapper, 4.01, 0.0))
+        mapper.integrate(np.full(360, np.inf), (40.0, 0.0, 0.0))
+        self.assertEqual(mapper.recenters, 1)
+        self.assertLess(self.cell(mapper, 42.0, 0.0), 0.0)
+        mapper.integrate(room_scan(360))
+        self.assertEqual(mapper.recenters, 2)
+        self.assertGreater(self.cell(mapper, 4.01, 0.0), before)
+
+        dense, (row0, col0) = mapper.global_log_odds()
+        self.assertGreater(dense[int(np.floor(0.0 / 0.1)) - row0, int(np.floor(4.01 / 0.1)) - col0], before)
+        # Nothing between the two visits was observed, so no tiles exist there
+        self.assertFalse(any(col == int(20.0 / 0.1) // 32 for _, col in mapper.global_map.tiles))
+
+    def test_tiled_map_round_trip(self):
+        tiles = TiledGridMap(tile_size=8)
+        data = np.arange(20 * 20, dtype=np.float32).reshape(20, 20)
+        tiles.write((-5, 3), data)
+        out = np.zeros((20, 20), dtype=np.float32)
+        np.testing.assert_array_equal(tiles.read((-5, 3), out), data)
+        tiles.write((100, 100), np.zeros((8, 8), dtype=np.float32))
+        self.assertNotIn((12, 12), tiles.tiles)
+
+if __name__ == '__main__':
+    unittest.main()
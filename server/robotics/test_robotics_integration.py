@@ -1,7 +1,13 @@
+import os
 import unittest
 import numpy as np
 from typing import Dict, Any
 
+from arm_trajectory import TrajectoryPlanner
+from control_loop import ControlLoopExecutor, SimulatedClock
+from sensor_fusion import ComplementaryFilter, RingBuffer, SensorFusion
+from sensor_log import ReplaySensors, SensorLog
+
 class RoboticsIntegrationTest(unittest.TestCase):
     """Robotics system integration testing framework"""
     
@@ -12,12 +18,19 @@ class RoboticsIntegrationTest(unittest.TestCase):
             'camera': self.mock_camera_reading,
             'imu': self.mock_imu_reading
         }
+        log_path = os.environ.get('ROBOTICS_SENSOR_LOG')
+        if log_path:
+            # Replay a recorded session (see sensor_log.py) instead of random mock data
+            sensor_log = SensorLog(log_path)
+            self.addCleanup(sensor_log.close)
+            self.sensors.update(ReplaySensors(sensor_log).sensors())
         
         self.actuators = {
             'arm': self.mock_arm_control,
             'wheels': self.mock_wheel_control,
             'gripper': self.mock_gripper_control
         }
+        self.arm_planner = TrajectoryPlanner()
         
     def mock_lidar_reading(self) -> np.ndarray:
         """Generate mock LIDAR sensor data"""
@@ -44,12 +57,9 @@ class RoboticsIntegrationTest(unittest.TestCase):
     
     def mock_arm_control(self, position: list, speed: float = 0.5) -> bool:
         """Mock control of robotic arm"""
-        # Simulate movement time based on distance and speed
-        target = np.array(position)
-        current = np.zeros_like(target)
-        distance = np.linalg.norm(target - current)
-        movement_time = distance / speed
-        return movement_time < 5.0  # Timeout after 5s
+        # Plan a time-optimal move from the home pose; speed scales the joint velocity limits
+        plan = self.arm_planner.plan([position], velocity_scale=speed)
+        return bool(plan.feasible[0] and plan.durations[0] < 5.0)  # Timeout after 5s
     
     def mock_wheel_control(self, linear: list, angular: list) -> bool:
         """Mock control of wheel motors"""
@@ -77,17 +87,84 @@ class RoboticsIntegrationTest(unittest.TestCase):
         self.assertIn('accel_x', imu_data)
         self.assertIsInstance(imu_data['accel_x'], float)
     
+    def test_sensor_fusion_pipeline(self):
+        """Test time alignment and projection of the fused sensor streams"""
+        fusion = SensorFusion()
+        for step in range(40):
+            fusion.push_imu(step * 0.005, self.sensors['imu']())
+        for t in (0.0, 0.1):
+            fusion.push_lidar(t, self.sensors['lidar']())
+        for t in (0.0, 0.033, 0.066):
+            fusion.push_camera(t, self.sensors['camera']())
+
+        frame = fusion.fuse(0.09)
+        self.assertEqual(frame.imu_samples, 19)
+        self.assertAlmostEqual(frame.time_skew['lidar'], 0.01)
+        self.assertAlmostEqual(frame.time_skew['camera'], -0.024)
+        self.assertGreater(len(frame.lidar_pixels), 0)
+        u, v = frame.lidar_pixels[:, 0], frame.lidar_pixels[:, 1]
+        self.assertTrue(np.all((u >= 0) & (u < 640) & (v >= 0) & (v < 480)))
+        self.assertEqual(frame.camera_depth.shape, frame.lidar_ranges.shape)
+        self.assertLess(np.abs(frame.orientation[:2]).max(), 0.1)
+
+        # Only samples newer than the previous step are integrated
+        self.assertEqual(fusion.fuse(0.1).imu_samples, 2)
+
+    def test_complementary_filter_batch_matches_sequential(self):
+        """Test that batched IMU integration equals sample-by-sample updates"""
+        rng = np.random.default_rng(0)
+        imu = rng.normal(0, 0.1, (50, 6))
+        imu[:, 2] += 9.81
+        dt = np.full(50, 0.005)
+        batched = ComplementaryFilter(alpha=0.98).update(imu, dt).copy()
+        sequential = ComplementaryFilter(alpha=0.98)
+        for i in range(50):
+            sequential.update(imu[i:i + 1], dt[i:i + 1])
+        np.testing.assert_allclose(batched, sequential.orientation, atol=1e-12)
+
+    def test_ring_buffer_wraparound(self):
+        """Test timestamp lookup after the ring buffer overwrites old samples"""
+        ring = RingBuffer(4, (1,))
+        for t in range(10):
+            ring.push(float(t), [t])
+        self.assertEqual(len(ring), 4)
+        self.assertIsNone(ring.slot_at_or_before(5.5))
+        self.assertEqual(ring.data[ring.slot_at_or_before(7.5)][0], 7)
+        self.assertEqual(ring.data[ring.nearest_slot(100.0)][0], 9)
+
     def test_arm_movement(self):
         """Test robotic arm movement"""
         target_position = [0.5, 0.2, 0.3]  # x, y, z in meters
         success = self.actuators['arm'](target_position)
         self.assertTrue(success, "Arm movement failed")
+        # Out of reach for the arm
+        self.assertFalse(self.actuators['arm']([2.0, 0.0, 0.3]))
     
     def test_emergency_stop(self):
         """Test emergency stop functionality"""
         # Simulate emergency stop
         success = self.actuators['wheels']([0, 0, 0], [0, 0, 0])  # Zero velocity
         self.assertTrue(success, "Emergency stop failed")
+
+        # Stop through the control loop while sensor and actuator tasks are running
+        clock = SimulatedClock()
+        executor = ControlLoopExecutor(clock)
+        commands, stops = [], []
+        executor.add_task('imu', self.sensors['imu'], 200, kind='sensor')
+        executor.add_task('wheels', lambda: commands.append(clock.now()) or self.actuators['wheels']([0.2, 0, 0], [0, 0, 0.1]), 50)
+        executor.add_task('arm', lambda: self.actuators['arm']([0.5, 0.2, 0.3]), 10)
+        executor.add_stop_handler(lambda: stops.append(self.actuators['wheels']([0, 0, 0], [0, 0, 0])))
+        executor.start()
+        try:
+            clock.advance_to(0.505)
+            executor.estop("test")
+            clock.advance_to(1.0)
+        finally:
+            executor.stop()
+        self.assertEqual(stops, [True])
+        self.assertLessEqual(max(commands), 0.505)
+        self.assertIn('accel_x', executor.latest['imu'])
+        self.assertEqual(executor.tasks['wheels'].stats.deadline_misses, 0)
     
     def test_gripper_operation(self):
         """Test gripper open/close functionality"""
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from sensor_log import ReplaySensors, SensorLog, SensorLogError, SensorLogWriter, replay
+
+class FakeClock:
+    """Clock whose sleeps jump time forward, recording each deadline."""
+
+    def __init__(self):
+        self.time = 100.0
+        self.deadlines = []
+
+    def now(self):
+        return self.time
+
+    def sleep_until(self, deadline):
+        self.deadlines.append(deadline)
+        self.time = max(self.time, deadline)
+
+
+class SensorLogTest(unittest.TestCase):
+    """Tests for the chunked sensor log format and replay"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.default_rng(0)
+        self.scans = self.rng.random((25, 360)) * 10
+        self.images = self.rng.integers(0, 255, (5, 48, 64, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_log(self, compression='zlib', **kwargs):
+        path = os.path.join(self.tmp.name, f"{compression}.slog")
+        with SensorLogWriter(path, compression=compression, chunk_records=4, **kwargs) as writer:
+            for i in range(25):
+                writer.write('lidar', i * 0.1, self.scans[i])
+                writer.write('imu', i * 0.1 + 0.05, {'accel_x': float(i), 'gyro_z': -float(i)})
+                if i % 5 == 0:
+                    writer.write('camera', i * 0.1, {'rgb': self.images[i // 5], 'objects': [{'class': 'person', 'id': i}]})
+        return path
+
+    def test_round_trip(self):
+        for compression in ('zlib', 'none'):
+            with SensorLog(self.write_log(compression)) as log:
+                self.assertEqual(log.streams, ['lidar', 'imu', 'camera'])
+                self.assertEqual((log.count('lidar'), log.count('camera'), len(log)), (25, 5, 55))
+                timestamp, scan = log.read('lidar', 13)
+                self.assertAlmostEqual(timestamp, 1.3)
+                np.testing.assert_array_equal(scan, self.scans[13])
+                _, camera = log.read('camera', 3)
+                np.testing.assert_array_equal(camera['rgb'], self.images[3])
+                self.assertEqual(camera['objects'], [{'class': 'person', 'id': 15}])
+                imu = log.read('imu', 7)[1]
+                self.assertEqual(imu, {'accel_x': 7.0, 'gyro_z': -7.0})
+                self.assertIsInstance(imu['accel_x'], float)
+
+    def test_timestamp_index(self):
+        with SensorLog(self.write_log()) as log:
+            self.assertEqual(log.index_at('lidar', 0.95), 9)
+            self.assertEqual(log.index_at('lidar', -1.0), -1)
+            self.assertEqual([t for t, _ in log.iter_stream('camera', start=0.6, end=1.6)], [1.0, 1.5])
+            messages = list(log.messages(start=0.0, end=0.5))
+            self.assertEqual([t for t, _, _ in messages], sorted(t for t, _, _ in messages))
+            self.assertEqual(len(messages), 6 + 5 + 2)
+
+    def test_field_dtypes_and_chunking(self):
+        path = self.write_log(field_dtypes={'lidar': 'float16'})
+        with SensorLog(path) as log:
+            self.assertEqual(len(log.chunks['lidar']), 7)
+            scan = log.read('lidar', 0)[1]
+            self.assertEqual(scan.dtype, np.float16)
+            np.testing.assert_allclose(scan, self.scans[0], rtol=1e-3)
+
+    def test_replay_pacing(self):
+        clock = FakeClock()
+        with SensorLog(self.write_log()) as log:
+            received = []
+            count = replay(log, lambda t, stream, reading: received.append((t, stream)), speed=2.0,
+                           clock=clock, streams=['lidar'])
+        self.assertEqual(count, 25)
+        # Deadlines are wall start + log offset / speed
+        np.testing.assert_allclose(clock.deadlines, 100.0 + np.arange(25) * 0.05)
+        self.assertEqual(received[0], (0.0, 'lidar'))
+
+    def test_replay_sensors(self):
+        with SensorLog(self.write_log()) as log:
+            sensors = ReplaySensors(log, loop=True).sensors()
+            scans = [sensors['lidar']() for _ in range(26)]
+            np.testing.assert_array_equal(scans[25], self.scans[0])
+
+            clock = FakeClock()
+            paced = ReplaySensors(log, speed=1.0, clock=clock).sensors()
+            paced['lidar']()
+            clock.time += 0.72
+            np.testing.assert_array_equal(paced['lidar'](), self.scans[7])
+
+            with self.assertRaises(EOFError):
+                once = ReplaySensors(log, loop=False).sensors()
+                for _ in range(6):
+                    once['camera']()
+
+    def test_invalid_logs(self):
+        path = os.path.join(self.tmp.name, 'open.slog')
+        writer = SensorLogWriter(path)
+        writer.write('lidar', 0.0, self.scans[0])
+        with self.assertRaises(SensorLogError):
+            writer.write('lidar', 1.0, self.scans[0][:10])
+        with self.assertRaises(SensorLogError):
+            writer.write('lidar', -1.0, self.scans[0])
+        writer._file.flush()
+        with self.assertRaises(SensorLogError):
+            SensorLog(path)
+        writer.close()
+
+if __name__ == '__main__':
+    unittest.main()
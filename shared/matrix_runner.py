@@ -0,0 +1,352 @@
+"""
+Sharded runner for the cross-platform browser/viewport/device matrix.
+
+The matrix is split into groups that share a driver session (all
+viewports of one browser, or one mobile device); groups are balanced
+across worker processes, and each worker opens one session per group and
+resizes it between viewports instead of starting a new browser per cell.
+
+Drivers are chosen with environment variables:
+
+* ``XPLAT_DRIVER`` - ``local`` (default, Selenium-managed browsers),
+  ``remote`` (a WebDriver/Selenium Grid URL) or ``mock`` (the in-process
+  `MockDriver` stand-in, which needs no browser).
+* ``XPLAT_WEBDRIVER_URL`` / ``XPLAT_WEBDRIVER_URL_<BROWSER>`` - remote
+  driver server(s) for ``remote``.
+* ``XPLAT_APPIUM_URL`` - Appium server (default ``http://localhost:4723/wd/hub``).
+* ``XPLAT_HEADLESS`` - run local browsers headless (default on).
+* ``XPLAT_APP_URL`` / ``XPLAT_APP`` - web app URL and mobile app path.
+* ``XPLAT_WORKERS`` - worker processes (default: one per CPU, at most one per group).
+"""
+
+import json
+import multiprocessing as mp
+import os
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_APPIUM_URL = 'http://localhost:4723/wd/hub'
+DEFAULT_APP_URL = 'https://your-app-url.com'
+
+
+@dataclass(frozen=True)
+class MatrixCell:
+    kind: str  # 'web' or 'mobile'
+    target: str  # browser name or device name
+    viewport: Optional[Tuple[int, int]] = None
+    device: Optional[Tuple[Tuple[str, str], ...]] = None
+
+    @property
+    def label(self) -> str:
+        if self.viewport:
+            return f"{self.target}@{self.viewport[0]}x{self.viewport[1]}"
+        return self.target
+
+    @property
+    def session_key(self) -> Tuple[str, str]:
+        return self.kind, self.target
+
+
+@dataclass
+class CellResult:
+    label: str
+    kind: str
+    worker: int
+    session_seconds: float  # Driver start-up charged to this cell (0 when the session was reused)
+    seconds: float
+    reused_session: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class MatrixReport:
+    workers: int
+    seconds: float = 0.0
+    cells: List[CellResult] = field(default_factory=list)
+
+    @property
+    def failures(self) -> List[CellResult]:
+        return [cell for cell in self.cells if cell.error]
+
+    @property
+    def sessions(self) -> int:
+        return sum(not cell.reused_session for cell in self.cells)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'seconds': self.seconds,
+            'sessions': self.sessions,
+            'serial_seconds': sum(c.session_seconds + c.seconds for c in self.cells),
+            'failures': len(self.failures),
+            'cells': [asdict(cell) for cell in self.cells],
+        }
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def build_matrix(config: Dict[str, Any]) -> List[MatrixCell]:
+    cells = [MatrixCell('web', browser, tuple(viewport))
+             for browser in config['web']['browsers'] for viewport in config['web']['viewports']]
+    cells += [MatrixCell('mobile', device['deviceName'], device=tuple(sorted(device.items())))
+              for device in config['mobile']['devices']]
+    return cells
+
+
+def shard(cells: List[MatrixCell], workers: int) -> List[List[MatrixCell]]:
+    """Split cells into at most `workers` shards, keeping each session's cells together.
+
+    When there are fewer sessions than workers, the largest session groups
+    are split (each part opens its own session) so every worker has work.
+    """
+    groups: Dict[Tuple[str, str], List[MatrixCell]] = {}
+    for cell in cells:
+        groups.setdefault(cell.session_key, []).append(cell)
+    parts = list(groups.values())
+    while len(parts) < workers:
+        parts.sort(key=len, reverse=True)
+        if len(parts[0]) < 2:
+            break
+        largest = parts.pop(0)
+        half = len(largest) // 2
+        parts += [largest[:half], largest[half:]]
+
+    # Longest-first greedy assignment to the least loaded shard
+    shards: List[List[MatrixCell]] = [[] for _ in range(min(workers, len(parts)))]
+    for part in sorted(parts, key=len, reverse=True):
+        min(shards, key=len).extend(part)
+    return [s for s in shards if s]
+
+
+class MockElement:
+    def __init__(self, driver: 'MockDriver', element_id: str, href: Optional[str] = None):
+        self.driver = driver
+        self.id = element_id
+        self.text = element_id
+        self.href = href
+
+    def is_displayed(self) -> bool:
+        width = self.driver.window_size[0]
+        if self.id == 'mobile-menu':
+            return width < 768
+        if self.id == 'desktop-menu':
+            return width >= 768
+        if self.id == 'mobile-nav':
+            return self.driver.menu_open
+        return True
+
+    def click(self):
+        if self.href:
+            self.driver.get(self.href)
+        elif self.id == 'hamburger-menu':
+            self.driver.menu_open = not self.driver.menu_open
+
+
+class MockDriver:
+    """In-process stand-in for a Selenium/Appium session serving a responsive test page.
+
+    Implements the subset of the WebDriver API the cross-platform checks
+    use. `startup_seconds` simulates driver start-up cost.
+    """
+
+    PAGE_IDS = ('mobile-menu', 'desktop-menu', 'hamburger-menu', 'mobile-nav')
+
+    def __init__(self, name: str, startup_seconds: float = 0.0):
+        time.sleep(startup_seconds)
+        self.name = name
+        self.window_size = (1024, 768)
+        self.current_url = 'about:blank'
+        self.history: List[str] = []
+        self.menu_open = False
+        self.orientation = 'PORTRAIT'
+        self.closed = False
+
+    def set_window_size(self, width: int, height: int):
+        self.window_size = (width, height)
+
+    def get(self, url: str):
+        if self.current_url != 'about:blank':
+            self.history.append(self.current_url)
+        self.current_url = url
+        self.menu_open = False
+
+    def back(self):
+        if self.history:
+            self.current_url = self.history.pop()
+
+    def find_elements(self, by: str, value: str) -> List[MockElement]:
+        if (by, value) == ('css selector', 'nav a'):
+            base = self.current_url.rstrip('/')
+            return [MockElement(self, name, f"{base}/{name}") for name in ('home', 'about', 'contact')]
+        if by == 'id' and value in self.PAGE_IDS:
+            return [MockElement(self, value)]
+        return []
+
+    def find_element(self, by: str, value: str) -> MockElement:
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise LookupError(f"No element {by}={value!r}")
+        return elements[0]
+
+    def quit(self):
+        self.closed = True
+
+
+def _web_driver(browser: str, mode: str):
+    from selenium import webdriver
+
+    headless = os.environ.get('XPLAT_HEADLESS', '1') != '0'
+    options = None
+    if browser == 'chrome':
+        options = webdriver.ChromeOptions()
+        if headless:
+            options.add_argument('--headless=new')
+    elif browser == 'firefox':
+        options = webdriver.FirefoxOptions()
+        if headless:
+            options.add_argument('-headless')
+    elif browser == 'safari':
+        options = webdriver.SafariOptions()  # Safari has no headless mode
+    else:
+        raise ValueError(f"Unsupported browser: {browser}")
+
+    if mode == 'remote':
+        url = os.environ.get(f'XPLAT_WEBDRIVER_URL_{browser.upper()}') or os.environ.get('XPLAT_WEBDRIVER_URL')
+        if not url:
+            raise RuntimeError(f"Set XPLAT_WEBDRIVER_URL or XPLAT_WEBDRIVER_URL_{browser.upper()} for remote drivers")
+        return webdriver.Remote(command_executor=url, options=options)
+    return {'chrome': webdriver.Chrome, 'firefox': webdriver.Firefox, 'safari': webdriver.Safari}[browser](options=options)
+
+
+def _mobile_driver(device: Dict[str, str]):
+    from appium import webdriver as appium_driver
+
+    capabilities = {
+        'platformName': device['platformName'],
+        'platformVersion': device['platformVersion'],
+        'deviceName': device['deviceName'],
+        'automationName': 'XCUITest' if device['platformName'].lower() == 'ios' else 'UiAutomator2',
+        'app': os.environ.get('XPLAT_APP', '/path/to/your/app'),
+    }
+    return appium_driver.Remote(os.environ.get('XPLAT_APPIUM_URL', DEFAULT_APPIUM_URL), capabilities)
+
+
+def start_driver(cell: MatrixCell, mode: Optional[str] = None):
+    """Open a driver session for `cell` using the configured driver mode."""
+    mode = mode or os.environ.get('XPLAT_DRIVER', 'local')
+    if mode == 'mock':
+        return MockDriver(cell.target, float(os.environ.get('XPLAT_MOCK_STARTUP_SECONDS', '0')))
+    if cell.kind == 'mobile':
+        return _mobile_driver(dict(cell.device))
+    return _web_driver(cell.target, mode)
+
+
+def check_navigation(driver):
+    """Every navigation link leads somewhere and back works."""
+    for link in driver.find_elements('css selector', 'nav a'):
+        text = link.text
+        link.click()
+        assert driver.current_url != 'about:blank', f"Navigation to {text} failed"
+        driver.back()
+
+
+def check_layout(driver, width: int):
+    """The mobile menu shows below 768px and the desktop menu above."""
+    if width < 768:
+        menu = driver.find_element('id', 'mobile-menu')
+        assert menu.is_displayed(), "Mobile menu should be visible on small screens"
+    else:
+        menu = driver.find_element('id', 'desktop-menu')
+        assert menu.is_displayed(), "Desktop menu should be visible on larger screens"
+
+
+def check_mobile_navigation(driver):
+    driver.find_element('id', 'hamburger-menu').click()
+    menu = driver.find_element('id', 'mobile-nav')
+    assert menu.is_displayed(), "Mobile menu should expand when hamburger is clicked"
+
+
+def check_orientation_change(driver):
+    new_orientation = 'LANDSCAPE' if driver.orientation == 'PORTRAIT' else 'PORTRAIT'
+    driver.orientation = new_orientation
+    assert driver.orientation == new_orientation, f"Failed to change orientation to {new_orientation}"
+
+
+def check_cell(driver, cell: MatrixCell):
+    """Default checks for a cell: responsive layout for web, navigation and rotation for mobile."""
+    if cell.kind == 'web':
+        width, height = cell.viewport
+        driver.set_window_size(width, height)
+        driver.get(os.environ.get('XPLAT_APP_URL', DEFAULT_APP_URL))
+        check_navigation(driver)
+        check_layout(driver, width)
+    else:
+        check_mobile_navigation(driver)
+        check_orientation_change(driver)
+
+
+def run_shard(cells: List[MatrixCell], worker: int = 0, check: Callable = check_cell,
+              mode: Optional[str] = None) -> List[CellResult]:
+    """Run cells in order, reusing a session while consecutive cells share one."""
+    results = []
+    driver, key = None, None
+    try:
+        for cell in cells:
+            session_seconds, reused, error = 0.0, True, None
+            if cell.session_key != key or driver is None:
+                if driver is not None:
+                    driver.quit()
+                    driver = None
+                key, reused = cell.session_key, False
+                started = time.perf_counter()
+                try:
+                    driver = start_driver(cell, mode)
+                except Exception as e:
+                    error = f"driver start failed: {type(e).__name__}: {e}"
+                session_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            if error is None:
+                try:
+                    check(driver, cell)
+                except AssertionError as e:
+                    error = str(e) or 'assertion failed'
+                except Exception:
+                    error = traceback.format_exc(limit=3)
+            results.append(CellResult(cell.label, cell.kind, worker, session_seconds,
+                                      time.perf_counter() - started, reused, error))
+    finally:
+        if driver is not None:
+            driver.quit()
+    return results
+
+
+def default_workers(cells: List[MatrixCell]) -> int:
+    if os.environ.get('XPLAT_WORKERS'):
+        return int(os.environ['XPLAT_WORKERS'])
+    return max(1, min(os.cpu_count() or 1, len({cell.session_key for cell in cells})))
+
+
+def run_matrix(cells: List[MatrixCell], workers: Optional[int] = None, check: Callable = check_cell,
+               mode: Optional[str] = None) -> MatrixReport:
+    """Shard the matrix and run it; `workers=1` runs in-process.
+
+    `check` must be picklable (a module-level function) when workers > 1.
+    """
+    workers = default_workers(cells) if workers is None else workers
+    shards = shard(cells, workers)
+    report = MatrixReport(len(shards))
+    started = time.perf_counter()
+    if len(shards) <= 1:
+        for s in shards:
+            report.cells += run_shard(s, 0, check, mode)
+    else:
+        ctx = mp.get_context('spawn')
+        with ctx.Pool(len(shards)) as pool:
+            for results in pool.starmap(run_shard, [(s, i, check, mode) for i, s in enumerate(shards)]):
+                report.cells += results
+    report.seconds = time.perf_counter() - started
+    return report
@@ -2,9 +2,8 @@ import unittest
 import platform
 import sys
 import os
-from selenium import webdriver
-from appium import webdriver as appium_driver
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+from matrix_runner import build_matrix, run_matrix
 
 class CrossPlatformTest(unittest.TestCase):
     """Cross-platform testing framework"""
@@ -30,37 +29,30 @@ class CrossPlatformTest(unittest.TestCase):
             }
         }
     
+    def _run_matrix(self, kind):
+        """Run one kind of matrix cell through the sharded runner and report each cell as a subtest"""
+        cells = [cell for cell in build_matrix(self.test_config) if cell.kind == kind]
+        report = run_matrix(cells)
+        if os.environ.get('XPLAT_REPORT'):
+            report.write(f"{os.environ['XPLAT_REPORT']}.{kind}.json")
+        for cell in report.cells:
+            with self.subTest(cell=cell.label):
+                print(f"{cell.label}: {cell.session_seconds + cell.seconds:.2f}s "
+                      f"(worker {cell.worker}, {'reused session' if cell.reused_session else 'new session'})")
+                if cell.error:
+                    self.fail(cell.error)
+        return report
+
     def test_web_responsiveness(self):
-        """Test web responsiveness across different viewports"""
-        for browser in self.test_config['web']['browsers']:
-            for width, height in self.test_config['web']['viewports']:
-                with self.subTest(browser=browser, viewport=f"{width}x{height}"):
-                    driver = self._get_web_driver(browser)
-                    try:
-                        driver.set_window_size(width, height)
-                        # Test your web application's URL
-                        driver.get("https://your-app-url.com")
-                        
-                        # Add responsive test cases
-                        self._test_navigation(driver)
-                        self._test_layout(driver, width)
-                        
-                    finally:
-                        driver.quit()
-    
+        """Test web responsiveness across different browsers and viewports"""
+        report = self._run_matrix('web')
+        self.assertLessEqual(report.sessions, max(report.workers, len(self.test_config['web']['browsers'])),
+                             "Browser sessions should be reused across viewports")
+
     def test_mobile_app(self):
         """Test mobile app on different devices"""
-        for device in self.test_config['mobile']['devices']:
-            with self.subTest(device=device['deviceName']):
-                driver = self._get_mobile_driver(device)
-                try:
-                    # Test mobile-specific functionality
-                    self._test_mobile_navigation(driver)
-                    self._test_orientation_change(driver)
-                    
-                finally:
-                    driver.quit()
-    
+        self._run_matrix('mobile')
+
     def test_desktop_app(self):
         """Test desktop application on different OS"""
         # This is a simplified example - actual implementation would use platform-specific test frameworks
@@ -74,75 +66,6 @@ class CrossPlatformTest(unittest.TestCase):
         elif current_os == 'linux':
             self._test_linux_specific_features()
     
-    def _get_web_driver(self, browser):
-        """Initialize WebDriver for the specified browser"""
-        if browser == 'chrome':
-            options = webdriver.ChromeOptions()
-            return webdriver.Chrome(options=options)
-        elif browser == 'firefox':
-            return webdriver.Firefox()
-        elif browser == 'safari':
-            return webdriver.Safari()
-        else:
-            raise ValueError(f"Unsupported browser: {browser}")
-    
-    def _get_mobile_driver(self, device):
-        """Initialize Appium driver for mobile testing"""
-        capabilities = {
-            'platformName': device['platformName'],
-            'platformVersion': device['platformVersion'],
-            'deviceName': device['deviceName'],
-            'automationName': 'XCUITest' if device['platformName'].lower() == 'ios' else 'UiAutomator2',
-            'app': '/path/to/your/app'  # Path to your app or app URL
-        }
-        return appium_driver.Remote('http://localhost:4723/wd/hub', capabilities)
-    
-    def _test_navigation(self, driver):
-        """Test navigation functionality"""
-        # Example: Test that all navigation links work
-        nav_links = driver.find_elements_by_css_selector('nav a')
-        for link in nav_links:
-            try:
-                link.click()
-                self.assertTrue(driver.current_url != "about:blank", 
-                              f"Navigation to {link.text} failed")
-                driver.back()
-            except Exception as e:
-                self.fail(f"Navigation test failed: {str(e)}")
-    
-    def _test_layout(self, driver, width):
-        """Test responsive layout"""
-        # Example: Check if layout changes based on viewport width
-        if width < 768:  # Mobile
-            menu = driver.find_element_by_id('mobile-menu')
-            self.assertTrue(menu.is_displayed(), "Mobile menu should be visible on small screens")
-        else:  # Desktop
-            menu = driver.find_element_by_id('desktop-menu')
-            self.assertTrue(menu.is_displayed(), "Desktop menu should be visible on larger screens")
-    
-    def _test_mobile_navigation(self, driver):
-        """Test mobile-specific navigation"""
-        # Example: Test hamburger menu
-        hamburger = driver.find_element_by_id('hamburger-menu')
-        hamburger.click()
-        
-        # Check if menu is expanded
-        menu = driver.find_element_by_id('mobile-nav')
-        self.assertTrue(menu.is_displayed(), "Mobile menu should expand when hamburger is clicked")
-    
-    def _test_orientation_change(self, driver):
-        """Test orientation change handling"""
-        # Get current orientation
-        current_orientation = driver.orientation
-        
-        # Change orientation
-        new_orientation = 'LANDSCAPE' if current_orientation == 'PORTRAIT' else 'PORTRAIT'
-        driver.orientation = new_orientation
-        
-        # Verify orientation changed
-        self.assertEqual(driver.orientation, new_orientation, 
-                        f"Failed to change orientation to {new_orientation}")
-    
     # Platform-specific test methods
     def _test_windows_specific_features(self):
         """Test Windows-specific functionality"""
@@ -0,0 +1,74 @@
+import unittest
+
+from matrix_runner import MatrixCell, build_matrix, run_matrix, run_shard, shard
+
+CONFIG = {
+    'web': {
+        'browsers': ['chrome', 'firefox', 'safari'],
+        'viewports': [(1920, 1080), (375, 667), (414, 896)]
+    },
+    'mobile': {
+        'devices': [
+            {'platformName': 'iOS', 'platformVersion': '15.0', 'deviceName': 'iPhone 13'},
+            {'platformName': 'Android', 'platformVersion': '12.0', 'deviceName': 'Pixel 6'}
+        ]
+    },
+}
+
+
+def failing_layout_check(driver, cell):
+    """Fails only on narrow viewports, to check per-cell error reporting"""
+    assert cell.viewport[0] >= 768, f"layout broken at {cell.viewport[0]}px"
+
+
+class MatrixRunnerTest(unittest.TestCase):
+    """Tests for the sharded cross-platform matrix runner"""
+
+    def setUp(self):
+        self.cells = build_matrix(CONFIG)
+
+    def test_build_matrix(self):
+        self.assertEqual(len(self.cells), 11)
+        self.assertEqual(self.cells[0].label, 'chrome@1920x1080')
+        self.assertEqual(self.cells[-1].label, 'Pixel 6')
+
+    def test_shards_keep_sessions_together(self):
+        shards = shard(self.cells, 3)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(sorted(map(len, shards)), [3, 4, 4])
+        owners = {}
+        for index, cells in enumerate(shards):
+            for cell in cells:
+                owners.setdefault(cell.session_key, set()).add(index)
+        self.assertTrue(all(len(o) == 1 for o in owners.values()))
+
+    def test_splits_sessions_when_workers_exceed_groups(self):
+        web = [cell for cell in self.cells if cell.kind == 'web']
+        shards = shard(web, 6)
+        self.assertEqual(len(shards), 6)
+        self.assertEqual(sum(map(len, shards)), 9)
+        self.assertEqual(len(shard(web[:1], 4)), 1)
+
+    def test_session_reused_across_viewports(self):
+        web = [cell for cell in self.cells if cell.kind == 'web']
+        results = run_shard(web, mode='mock')
+        self.assertEqual([r.reused_session for r in results], [False, True, True] * 3)
+        self.assertTrue(all(r.error is None for r in results))
+
+    def test_failures_reported_per_cell(self):
+        cells = [MatrixCell('web', 'chrome', (1920, 1080)), MatrixCell('web', 'chrome', (375, 667))]
+        results = run_shard(cells, check=failing_layout_check, mode='mock')
+        self.assertIsNone(results[0].error)
+        self.assertIn('layout broken at 375px', results[1].error)
+
+    def test_parallel_matrix(self):
+        report = run_matrix(self.cells, workers=2, mode='mock')
+        self.assertEqual(report.workers, 2)
+        self.assertEqual(sorted(c.label for c in report.cells), sorted(c.label for c in self.cells))
+        self.assertEqual({c.worker for c in report.cells}, {0, 1})
+        self.assertEqual(report.sessions, 5)
+        self.assertEqual(report.failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
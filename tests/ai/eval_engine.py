@@ -0,0 +1,212 @@
+"""
+Batched, cached generation engine for the AI capability tests.
+
+Prompts are tokenized once, sorted by length and grouped into left-padded
+batches so each `generate` call wastes little compute on padding. Batches
+run in-process or on the `EvalWorkerPool` shared with the training
+evaluator, whose CPU workers share the model's weights. Every generation is
+cached in SQLite under a key of (model weight hash, prompt, generation
+parameters), so re-running the suite against an unchanged model skips
+generation entirely. Per-suite timings are collected into a report.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+# Length bucketing and the worker pool are shared with the training evaluator
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "server" / "ai" / "training"))
+from eval_pool import EvalWorkerPool, length_bucketed_batches
+
+logger = logging.getLogger(__name__)
+
+
+def model_hash(model: torch.nn.Module) -> str:
+    """Content hash of a model's current weights."""
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().view(torch.uint8).numpy().tobytes())
+    return digest.hexdigest()
+
+
+@torch.no_grad()
+def generate_batch(model: torch.nn.Module, prompts: Sequence[List[int]], pad_token_id: int,
+                   max_new_tokens: int, generate_kwargs: Dict[str, Any]) -> List[List[int]]:
+    """Generated token ids (prompt excluded) for a batch of left-padded prompts."""
+    device = next(model.parameters()).device
+    width = max(len(p) for p in prompts)
+    input_ids = torch.full((len(prompts), width), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(prompts), width), dtype=torch.long)
+    for row, prompt in enumerate(prompts):
+        input_ids[row, width - len(prompt):] = torch.as_tensor(prompt)
+        attention_mask[row, width - len(prompt):] = 1
+    outputs = model.generate(
+        input_ids=input_ids.to(device),
+        attention_mask=attention_mask.to(device),
+        max_new_tokens=max_new_tokens,
+        pad_token_id=pad_token_id,
+        **generate_kwargs,
+    )
+    eos = model.generation_config.eos_token_id
+    stop_ids = set(eos if isinstance(eos, list) else [eos]) - {None}
+    return [_trim(row, stop_ids, pad_token_id) for row in outputs[:, width:].tolist()]
+
+
+def _trim(tokens: List[int], stop_ids: set, pad_token_id: int) -> List[int]:
+    """Cut a batched row where an unbatched `generate` would have stopped."""
+    for i, token in enumerate(tokens):
+        if token in stop_ids:
+            return tokens[:i + 1]
+    while tokens and tokens[-1] == pad_token_id:
+        tokens = tokens[:-1]
+    return tokens
+
+
+class GenerationCache:
+    """Generated token ids in a SQLite table keyed by request hash."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS generations (key TEXT PRIMARY KEY, tokens TEXT)")
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[int]]:
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT key, tokens FROM generations WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((key, json.loads(tokens)) for key, tokens in rows)
+        return found
+
+    def put_many(self, items: Dict[str, List[int]]):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO generations VALUES (?, ?)",
+                                        [(key, json.dumps(tokens)) for key, tokens in items.items()])
+
+    def close(self):
+        self.connection.close()
+
+
+class GenerationEngine:
+    """Batched greedy generation with caching and per-suite timing.
+
+    `cache_dir=None` disables the cache; `num_workers=0` generates in-process.
+    Cache keys use `weights_id` (e.g. a checkpoint or snapshot hash) when
+    given, otherwise a hash of the weights computed once; call
+    `invalidate_weights()` after changing the model in place.
+    """
+
+    def __init__(self, model: torch.nn.Module, tokenizer, batch_size: int = 16,
+                 max_tokens_per_batch: Optional[int] = None, num_workers: int = 0,
+                 cache_dir: Optional[str] = None, weights_id: Optional[str] = None):
+        self.model = model
+        self.weights_id = weights_id
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.num_workers = num_workers
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.cache = GenerationCache(os.path.join(cache_dir, "generations.sqlite")) if cache_dir else None
+        self._pool: Optional[EvalWorkerPool] = None
+        self.suites: Dict[str, Dict[str, float]] = {}
+
+    def invalidate_weights(self):
+        """Forget the weight hash so the next cache lookup rehashes the model."""
+        self.weights_id = None
+
+    def _request_key(self, weights: str, prompt: List[int], params: Dict[str, Any]) -> str:
+        payload = json.dumps({'model': weights, 'prompt': prompt, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _run(self, payloads: List[Any]) -> List[List[List[int]]]:
+        if self.num_workers > 0:
+            if self._pool is None:
+                self._pool = EvalWorkerPool(self.model, self.num_workers)
+            return self._pool.map(generate_batch, payloads)
+        self.model.eval()
+        return [generate_batch(self.model, *payload) for payload in payloads]
+
+    def generate_tokens(self, prompts: Sequence[str], max_new_tokens: int, suite: str = "default",
+                        **generate_kwargs) -> List[List[int]]:
+        """Generated token ids for every prompt, in input order."""
+        encoded = [self.tokenizer(prompt)['input_ids'] for prompt in prompts]
+        return self._generate_ids(encoded, max_new_tokens, suite, generate_kwargs)
+
+    def _generate_ids(self, encoded: List[List[int]], max_new_tokens: int, suite: str,
+                      generate_kwargs: Dict[str, Any]) -> List[List[int]]:
+        started = time.perf_counter()
+        generate_kwargs.setdefault('do_sample', False)
+        if generate_kwargs['do_sample']:
+            raise ValueError("GenerationEngine caches results, so generation must be deterministic")
+        params = {'max_new_tokens': max_new_tokens, **generate_kwargs}
+
+        keys = [None] * len(encoded)
+        results: List[Optional[List[int]]] = [None] * len(encoded)
+        if self.cache is not None:
+            if self.weights_id is None:
+                self.weights_id = model_hash(self.model)
+            weights = self.weights_id
+            keys = [self._request_key(weights, ids, params) for ids in encoded]
+            cached = self.cache.get_many(keys)
+            results = [cached.get(key) for key in keys]
+        todo = [i for i, result in enumerate(results) if result is None]
+
+        batches = length_bucketed_batches([len(encoded[i]) for i in todo], self.batch_size, self.max_tokens_per_batch)
+        batches = [[todo[i] for i in batch] for batch in batches]
+        payloads = [([encoded[i] for i in batch], self.pad_token_id, max_new_tokens, generate_kwargs)
+                    for batch in batches]
+        for batch, outputs in zip(batches, self._run(payloads)):
+            for i, tokens in zip(batch, outputs):
+                results[i] = tokens
+        if self.cache is not None and todo:
+            self.cache.put_many({keys[i]: results[i] for i in todo})
+
+        stats = self.suites.setdefault(suite, {'prompts': 0, 'cache_hits': 0, 'batches': 0,
+                                               'generated_tokens': 0, 'seconds': 0.0})
+        stats['prompts'] += len(encoded)
+        stats['cache_hits'] += len(encoded) - len(todo)
+        stats['batches'] += len(batches)
+        stats['generated_tokens'] += sum(len(results[i]) for i in todo)
+        stats['seconds'] += time.perf_counter() - started
+        return results
+
+    def generate(self, prompts: Sequence[str], max_new_tokens: int, suite: str = "default",
+                 **generate_kwargs) -> List[str]:
+        """Decoded prompt plus continuation for every prompt, like decoding `generate` output."""
+        encoded = [self.tokenizer(prompt)['input_ids'] for prompt in prompts]
+        tokens = self._generate_ids(encoded, max_new_tokens, suite, generate_kwargs)
+        return [self.tokenizer.decode(ids + new, skip_special_tokens=True) for ids, new in zip(encoded, tokens)]
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for suite, stats in self.suites.items():
+            seconds = max(stats['seconds'], 1e-9)
+            report[suite] = {
+                **stats,
+                'prompts_per_second': stats['prompts'] / seconds,
+                'tokens_per_second': stats['generated_tokens'] / seconds,
+            }
+        return report
+
+    def write_report(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f"Wrote generation timing report to {path}")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
@@ -0,0 +1,287 @@
+"""
+Statistical latency and memory gates for the AI test suites.
+
+A single timing sample or RSS delta is too noisy to compare against a
+fixed threshold. Instead each measurement runs repeated trials, drops
+outliers by median absolute deviation, and compares the result to
+baselines recorded on earlier passing runs of the same model on the same
+machine. A test fails only when the slowdown (or memory growth) is both
+larger than a minimum effect size and statistically significant under a
+one-sided Mann-Whitney U test against the stored baseline samples.
+
+Peak memory is sampled on a background thread (process RSS) together with
+tracemalloc's peak for Python-level allocations, or the CUDA allocator's
+peak on GPU.
+
+Baselines live in a JSON file (AI_PERF_BASELINES, default
+tests/ai/.perf/baselines.json) keyed by model, device and metric. They
+are machine-specific and not version controlled. AI_PERF_UPDATE_BASELINE=0
+compares without recording.
+"""
+
+import json
+import math
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import psutil
+import torch
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".perf", "baselines.json")
+
+# Modified z-score above which a sample is an outlier (Iglewicz and Hoaglin)
+OUTLIER_Z = 3.5
+
+
+def reject_outliers(samples: np.ndarray, z: float = OUTLIER_Z) -> np.ndarray:
+    """Samples whose modified z-score, based on the median absolute deviation, is within `z`."""
+    samples = np.asarray(samples, dtype=np.float64)
+    median = np.median(samples)
+    mad = np.median(np.abs(samples - median))
+    if mad == 0:
+        return samples
+    return samples[0.6745 * np.abs(samples - median) / mad <= z]
+
+
+def mann_whitney_greater(current: np.ndarray, baseline: np.ndarray) -> float:
+    """One-sided p-value that `current` tends to be larger than `baseline` (normal approximation)."""
+    n1, n2 = len(current), len(baseline)
+    combined = np.concatenate([current, baseline])
+    order = np.argsort(combined, kind='mergesort')
+    ranks = np.empty(len(combined))
+    ranks[order] = np.arange(1, len(combined) + 1)
+    # Average the ranks of ties
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, weights=ranks) / counts)[inverse]
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    tie_term = ((counts ** 3 - counts).sum()) / ((n1 + n2) * (n1 + n2 - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n1 + n2 + 1) - tie_term))
+    if sigma == 0:
+        return 0.5
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+@dataclass
+class TrialStats:
+    """Repeated measurements of one metric, after outlier rejection."""
+    metric: str
+    samples: List[float]
+    rejected: int = 0
+
+    @property
+    def median(self) -> float:
+        return float(np.median(self.samples))
+
+    @property
+    def mad(self) -> float:
+        return float(np.median(np.abs(np.asarray(self.samples) - self.median)))
+
+    def summary(self) -> Dict[str, Any]:
+        samples = np.asarray(self.samples)
+        return {
+            'metric': self.metric,
+            'trials': len(self.samples) + self.rejected,
+            'rejected': self.rejected,
+            'median': self.median,
+            'mad': self.mad,
+            'mean': float(samples.mean()),
+            'p95': float(np.percentile(samples, 95)),
+        }
+
+
+def _trial_stats(metric: str, samples: List[float]) -> TrialStats:
+    kept = reject_outliers(np.asarray(samples))
+    return TrialStats(metric, kept.tolist(), len(samples) - len(kept))
+
+
+def measure_latency(fn: Callable[[], Any], trials: int = 15, warmup: int = 3, metric: str = 'latency_s') -> TrialStats:
+    """Wall-clock seconds per call of `fn` over repeated trials."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(trials):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return _trial_stats(metric, samples)
+
+
+class PeakMemorySampler:
+    """Context manager recording peak memory above the level at entry.
+
+    RSS is polled on a background thread every `interval` seconds;
+    `python_peak` is tracemalloc's peak and `cuda_peak` the CUDA
+    allocator's peak when a GPU is in use.
+    """
+
+    def __init__(self, interval: float = 0.001, cuda: Optional[bool] = None):
+        self.interval = interval
+        self.cuda = torch.cuda.is_available() if cuda is None else cuda
+        self.process = psutil.Process()
+        self.rss_peak = 0
+        self.python_peak = 0
+        self.cuda_peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _poll(self, start_rss: int):
+        peak = start_rss
+        while not self._stop.is_set():
+            peak = max(peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+        self.rss_peak = max(peak, self.process.memory_info().rss) - start_rss
+
+    def __enter__(self):
+        if self.cuda:
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            self._cuda_start = torch.cuda.memory_allocated()
+        self._tracing = tracemalloc.is_tracing()
+        if not self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._python_start = tracemalloc.get_traced_memory()[0]
+        self._thread = threading.Thread(target=self._poll, args=(self.process.memory_info().rss,),
+                                        name="peak-memory-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.python_peak = tracemalloc.get_traced_memory()[1] - self._python_start
+        if not self._tracing:
+            tracemalloc.stop()
+        if self.cuda:
+            torch.cuda.synchronize()
+            self.cuda_peak = torch.cuda.max_memory_allocated() - self._cuda_start
+        return False
+
+    @property
+    def peak(self) -> int:
+        """Peak bytes of the memory that matters for the device: CUDA allocator on GPU, RSS otherwise."""
+        return self.cuda_peak if self.cuda else self.rss_peak
+
+
+def measure_peak_memory(fn: Callable[[], Any], trials: int = 5, warmup: int = 1,
+                        metric: str = 'peak_memory_bytes') -> Dict[str, TrialStats]:
+    """Peak memory above the starting level per call of `fn`: device peak and Python-heap peak."""
+    for _ in range(warmup):
+        fn()
+    peaks, python_peaks = [], []
+    for _ in range(trials):
+        with PeakMemorySampler() as sampler:
+            fn()
+        peaks.append(float(sampler.peak))
+        python_peaks.append(float(sampler.python_peak))
+    return {metric: _trial_stats(metric, peaks),
+            'python_peak_bytes': _trial_stats('python_peak_bytes', python_peaks)}
+
+
+@dataclass
+class GateResult:
+    """Outcome of comparing a measurement against its baseline."""
+    key: str
+    metric: str
+    current: Dict[str, Any]
+    baseline_median: Optional[float] = None
+    p_value: Optional[float] = None
+    regressed: bool = False
+    reason: str = ''
+
+    def message(self) -> str:
+        if self.baseline_median is None:
+            return f"{self.key}/{self.metric}: no baseline yet (median {self.current['median']:.4g})"
+        return (f"{self.key}/{self.metric}: median {self.current['median']:.4g} vs baseline "
+                f"{self.baseline_median:.4g} (p={self.p_value:.3g}); {self.reason}")
+
+
+@dataclass
+class RegressionGate:
+    """Decides whether a measurement regressed against stored baseline samples.
+
+    A regression needs the median to grow by more than both
+    `min_relative` (fraction of the baseline) and `min_absolute`, and the
+    one-sided Mann-Whitney p-value to be below `alpha` when both sides
+    have at least `min_samples` samples.
+    """
+    min_relative: float = 0.15
+    min_absolute: float = 0.0
+    alpha: float = 0.01
+    min_samples: int = 5
+
+    def evaluate(self, key: str, stats: TrialStats, baseline: Optional[List[float]]) -> GateResult:
+        result = GateResult(key, stats.metric, stats.summary())
+        if not baseline:
+            return result
+        result.baseline_median = float(np.median(baseline))
+        growth = stats.median - result.baseline_median
+        threshold = max(self.min_relative * result.baseline_median, self.min_absolute)
+        enough = len(stats.samples) >= self.min_samples and len(baseline) >= self.min_samples
+        result.p_value = mann_whitney_greater(np.asarray(stats.samples), np.asarray(baseline)) if enough else 0.0
+        if growth <= threshold:
+            result.reason = f"growth {growth:.4g} within {threshold:.4g}"
+        elif enough and result.p_value >= self.alpha:
+            result.reason = f"growth {growth:.4g} not significant"
+        else:
+            result.regressed = True
+            result.reason = f"growth {growth:.4g} exceeds {threshold:.4g}"
+        return result
+
+
+class BaselineStore:
+    """Baseline samples per (model, device, metric) in a JSON file.
+
+    Each entry keeps the samples of the last `window` passing runs, so the
+    baseline follows gradual, accepted changes but a regressing run never
+    becomes the reference.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = 5):
+        self.path = path or os.environ.get('AI_PERF_BASELINES', DEFAULT_BASELINES)
+        self.window = window
+        self.update = os.environ.get('AI_PERF_UPDATE_BASELINE', '1') != '0'
+        self.data: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.data = json.load(f)
+
+    @staticmethod
+    def key(model_name: str, device: str) -> str:
+        return f"{model_name}|{device}|{platform.machine()}|torch-{torch.__version__}"
+
+    def samples(self, key: str, metric: str) -> List[float]:
+        runs = self.data.get(key, {}).get(metric, [])
+        return [sample for run in runs for sample in run['samples']]
+
+    def record(self, key: str, stats: TrialStats):
+        runs = self.data.setdefault(key, {}).setdefault(stats.metric, [])
+        runs.append({'time': time.time(), 'samples': stats.samples})
+        del runs[:-self.window]
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        ignore = os.path.join(directory, '.gitignore')
+        if not os.path.exists(ignore):
+            with open(ignore, 'w') as f:
+                f.write('*\n')
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def check(self, key: str, stats: TrialStats, gate: Optional[RegressionGate] = None) -> GateResult:
+        """Compare against the baseline and record the run if it did not regress."""
+        result = (gate or RegressionGate()).evaluate(key, stats, self.samples(key, stats.metric))
+        if self.update and not result.regressed:
+            self.record(key, stats)
+        return result
@@ -0,0 +1,269 @@
+"""
+Offline snapshots of the models and dataset slices used by the AI test suites.
+
+`python snapshot_store.py snapshot` downloads every model and dataset slice
+the suites need once and stores them in a local content-addressed store:
+
+    <root>/objects/ab/abcdef...   file contents, named by their sha256
+    <root>/refs/<kind>/<name>     hash of the manifest blob for a snapshot
+    <root>/views/<manifest hash>/ hard links to the objects under their file names
+
+Models are stored as safetensors and dataset slices as Arrow files, so both
+are memory-mapped on load rather than parsed. Identical files (e.g. a
+tokenizer shared between snapshots) are stored once. The test suites load
+through `load_causal_lm` / `load_dataset_split`, which read from the store
+when a snapshot exists and only fall back to the hub otherwise; with
+AI_SNAPSHOT_OFFLINE=1 a missing snapshot is an error instead.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots")
+
+# Everything the AI suites load from the hub
+SUITE_MODELS = ["gpt2", "aetherial/llm-base"]
+SUITE_DATASETS = [
+    ("squad_v2", "validation[:10]"),
+    ("allenai/real-toxicity-prompts", "train[:100]"),
+]
+
+
+class SnapshotError(Exception):
+    """Missing or corrupt snapshot."""
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ref_name(name: str, split: Optional[str] = None) -> str:
+    ref = name if split is None else f"{name}@{split}"
+    return ref.replace('/', '--')
+
+
+class SnapshotStore:
+    """Content-addressed store of model and dataset snapshots."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.environ.get('AI_SNAPSHOT_DIR', DEFAULT_ROOT)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _ref_path(self, kind: str, ref: str) -> str:
+        return os.path.join(self.root, 'refs', kind, ref)
+
+    def put_file(self, path: str) -> str:
+        """Add a file's contents to the store and return its hash."""
+        digest = _sha256_file(path)
+        target = self._object_path(digest)
+        if not os.path.exists(target):
+            ignore = os.path.join(self.root, '.gitignore')
+            if not os.path.exists(ignore):
+                # Keep snapshots out of version control, like .pytest_cache
+                os.makedirs(self.root, exist_ok=True)
+                with open(ignore, 'w') as f:
+                    f.write('*\n')
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.tmp{os.getpid()}"
+            shutil.copyfile(path, tmp)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, target)
+        return digest
+
+    def _put_directory(self, kind: str, ref: str, directory: str, metadata: Dict[str, Any]) -> str:
+        files = {}
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                files[os.path.relpath(path, directory)] = self.put_file(path)
+        manifest = {'kind': kind, 'files': dict(sorted(files.items())), **metadata}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        try:
+            manifest_hash = self.put_file(f.name)
+        finally:
+            os.unlink(f.name)
+        ref_path = self._ref_path(kind, ref)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        with open(ref_path, 'w') as f:
+            f.write(manifest_hash)
+        logger.info(f"Snapshot {kind}/{ref} -> {manifest_hash[:12]} ({len(files)} files)")
+        return manifest_hash
+
+    def manifest(self, kind: str, ref: str) -> Tuple[str, Dict[str, Any]]:
+        try:
+            with open(self._ref_path(kind, ref)) as f:
+                manifest_hash = f.read().strip()
+            with open(self._object_path(manifest_hash)) as f:
+                return manifest_hash, json.load(f)
+        except FileNotFoundError:
+            raise SnapshotError(f"No {kind} snapshot for {ref} in {self.root}") from None
+
+    def has(self, kind: str, ref: str) -> bool:
+        return os.path.exists(self._ref_path(kind, ref))
+
+    def view(self, kind: str, ref: str) -> str:
+        """Directory holding a snapshot's files under their original names."""
+        manifest_hash, manifest = self.manifest(kind, ref)
+        view = os.path.join(self.root, 'views', manifest_hash)
+        if os.path.isdir(view):
+            return view
+        os.makedirs(os.path.dirname(view), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(view))
+        for name, digest in manifest['files'].items():
+            source, target = self._object_path(digest), os.path.join(tmp, name)
+            if not os.path.exists(source):
+                raise SnapshotError(f"Snapshot {kind}/{ref} is missing object {digest} for {name}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                os.symlink(source, target)
+        try:
+            os.rename(tmp, view)
+        except OSError:
+            # Another process built the same view first
+            shutil.rmtree(tmp, ignore_errors=True)
+        return view
+
+    def put_model(self, name: str, model, tokenizer=None) -> str:
+        with tempfile.TemporaryDirectory() as tmp:
+            model.save_pretrained(tmp, safe_serialization=True)
+            if tokenizer is not None:
+                tokenizer.save_pretrained(tmp)
+            return self._put_directory('models', _ref_name(name), tmp, {'name': name})
+
+    def put_dataset(self, name: str, split: str, dataset) -> str:
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset.save_to_disk(tmp)
+            return self._put_directory('datasets', _ref_name(name, split), tmp,
+                                       {'name': name, 'split': split, 'rows': len(dataset)})
+
+    def load_model(self, name: str, **model_kwargs):
+        """(model, tokenizer) from a snapshot; weights are memory-mapped from safetensors."""
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        view = self.view('models', _ref_name(name))
+        tokenizer = AutoTokenizer.from_pretrained(view, local_files_only=True)
+        model = AutoModelForCausalLM.from_pretrained(view, local_files_only=True, **model_kwargs)
+        return model, tokenizer
+
+    def load_dataset(self, name: str, split: str):
+        """A dataset slice memory-mapped from its Arrow files."""
+        from datasets import load_from_disk
+        return load_from_disk(self.view('datasets', _ref_name(name, split)))
+
+    def entries(self) -> List[Dict[str, Any]]:
+        found = []
+        for kind in ('models', 'datasets'):
+            directory = os.path.join(self.root, 'refs', kind)
+            for ref in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+                manifest_hash, manifest = self.manifest(kind, ref)
+                size = sum(os.path.getsize(self._object_path(d)) for d in manifest['files'].values()
+                           if os.path.exists(self._object_path(d)))
+                found.append({'kind': kind, 'ref': ref, 'manifest': manifest_hash, 'bytes': size})
+        return found
+
+    def verify(self) -> List[str]:
+        """Hashes of objects whose contents no longer match their name."""
+        corrupt = []
+        objects = os.path.join(self.root, 'objects')
+        for dirpath, _, filenames in os.walk(objects):
+            for filename in filenames:
+                if _sha256_file(os.path.join(dirpath, filename)) != filename:
+                    corrupt.append(filename)
+        return corrupt
+
+
+def _offline() -> bool:
+    return os.environ.get('AI_SNAPSHOT_OFFLINE', '0') == '1'
+
+
+def load_causal_lm(name: str, store: Optional[SnapshotStore] = None, **model_kwargs):
+    """(model, tokenizer) from the snapshot store, falling back to the hub when no snapshot exists."""
+    store = store or SnapshotStore()
+    started = time.perf_counter()
+    if store.has('models', _ref_name(name)):
+        model, tokenizer = store.load_model(name, **model_kwargs)
+        logger.info(f"Loaded {name} from snapshot in {time.perf_counter() - started:.2f}s")
+        return model, tokenizer
+    if _offline():
+        raise SnapshotError(f"No snapshot of {name}; run `python snapshot_store.py snapshot --model {name}`")
+    logger.warning(f"No snapshot of {name}, loading from the hub")
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    return AutoModelForCausalLM.from_pretrained(name, **model_kwargs), AutoTokenizer.from_pretrained(name)
+
+
+def load_dataset_split(name: str, split: str, store: Optional[SnapshotStore] = None):
+    """A dataset slice from the snapshot store, falling back to the hub when no snapshot exists."""
+    store = store or SnapshotStore()
+    if store.has('datasets', _ref_name(name, split)):
+        return store.load_dataset(name, split)
+    if _offline():
+        raise SnapshotError(f"No snapshot of {name} [{split}]; "
+                            f"run `python snapshot_store.py snapshot --dataset {name}:{split}`")
+    logger.warning(f"No snapshot of {name} [{split}], loading from the hub")
+    from datasets import load_dataset
+    return load_dataset(name, split=split)
+
+
+def snapshot(store: SnapshotStore, models: List[str], datasets: List[Tuple[str, str]]):
+    """Download models and dataset slices from the hub into the store."""
+    from datasets import load_dataset
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    for name in models:
+        store.put_model(name, AutoModelForCausalLM.from_pretrained(name), AutoTokenizer.from_pretrained(name))
+    for name, split in datasets:
+        dataset = load_dataset(name, split=split)
+        # Flatten slices into their own Arrow file instead of an index over the full split
+        store.put_dataset(name, split, dataset.flatten_indices())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manage offline snapshots for the AI test suites")
+    parser.add_argument('--root', default=None, help="Store directory (default: $AI_SNAPSHOT_DIR or tests/ai/.snapshots)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    take = commands.add_parser('snapshot', help="Download models and datasets into the store")
+    take.add_argument('--model', action='append', default=None, help="Model name (repeatable)")
+    take.add_argument('--dataset', action='append', default=None, help="name:split (repeatable)")
+    commands.add_parser('list', help="List snapshots")
+    commands.add_parser('verify', help="Re-hash every stored object")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    store = SnapshotStore(args.root)
+    if args.command == 'snapshot':
+        models = args.model if args.model or args.dataset else SUITE_MODELS
+        # Split on the first colon only; slices such as validation[:10] contain colons too
+        datasets = [tuple(d.split(':', 1)) for d in args.dataset] if args.dataset else \
+            ([] if args.model else SUITE_DATASETS)
+        if any(len(d) != 2 for d in datasets):
+            parser.error("--dataset must be name:split")
+        snapshot(store, models or [], datasets)
+    elif args.command == 'list':
+        print(json.dumps(store.entries(), indent=2))
+    elif args.command == 'verify':
+        corrupt = store.verify()
+        for digest in corrupt:
+            print(f"corrupt object {digest}")
+        return 1 if corrupt else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
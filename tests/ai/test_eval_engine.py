@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+from eval_engine import GenerationEngine, model_hash
+
+
+def tiny_model_and_tokenizer():
+    """A small random GPT-2 and word-level tokenizer, so the engine can be tested offline."""
+    words = "the a capital of france is paris nurse doctor said that quick brown fox jumps over lazy dog".split()
+    vocab = {"<eos>": 0, "<unk>": 1}
+    for word in words:
+        vocab.setdefault(word, len(vocab))
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>", unk_token="<unk>")
+    torch.manual_seed(0)
+    config = GPT2Config(n_layer=2, n_embd=32, n_head=2, n_positions=64, vocab_size=len(vocab),
+                        bos_token_id=0, eos_token_id=0)
+    return GPT2LMHeadModel(config).eval(), tokenizer
+
+
+PROMPTS = [
+    "the capital of france is",
+    "the nurse said that",
+    "the quick brown fox jumps over the lazy dog",
+    "a",
+    "the doctor said that the",
+]
+
+
+class GenerationEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model, self.tokenizer = tiny_model_and_tokenizer()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batched_matches_unbatched(self):
+        batched = GenerationEngine(self.model, self.tokenizer, batch_size=3).generate_tokens(PROMPTS, 8)
+        for prompt, tokens in zip(PROMPTS, batched):
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            with torch.no_grad():
+                outputs = self.model.generate(**inputs, max_new_tokens=8, do_sample=False, pad_token_id=0)
+            self.assertEqual(tokens, outputs[0, inputs['input_ids'].shape[1]:].tolist())
+
+    def test_cache_reuse_and_invalidation(self):
+        engine = GenerationEngine(self.model, self.tokenizer, batch_size=2, cache_dir=self.tmp.name)
+        first = engine.generate(PROMPTS, 6, suite='first')
+        engine.close()
+
+        engine = GenerationEngine(self.model, self.tokenizer, batch_size=2, cache_dir=self.tmp.name)
+        self.assertEqual(engine.generate(PROMPTS, 6, suite='rerun'), first)
+        self.assertEqual(engine.report()['rerun']['cache_hits'], len(PROMPTS))
+        self.assertEqual(engine.report()['rerun']['batches'], 0)
+
+        # Different parameters and changed weights both miss the cache
+        engine.generate(PROMPTS, 7, suite='params')
+        self.assertEqual(engine.report()['params']['cache_hits'], 0)
+        weights = model_hash(self.model)
+        with torch.no_grad():
+            self.model.lm_head.weight.add_(0.01)
+        self.assertNotEqual(model_hash(self.model), weights)
+        engine.invalidate_weights()
+        engine.generate(PROMPTS, 6, suite='changed')
+        self.assertEqual(engine.report()['changed']['cache_hits'], 0)
+        engine.close()
+
+        # An explicit weights id keys the cache without hashing the model
+        engine = GenerationEngine(self.model, self.tokenizer, batch_size=2, cache_dir=self.tmp.name,
+                                  weights_id=weights)
+        self.assertEqual(engine.generate(PROMPTS, 6, suite='by_id'), first)
+        self.assertEqual(engine.report()['by_id']['cache_hits'], len(PROMPTS))
+        engine.close()
+
+    def test_worker_pool_matches_in_process(self):
+        expected = GenerationEngine(self.model, self.tokenizer, batch_size=2).generate_tokens(PROMPTS, 5)
+        engine = GenerationEngine(self.model, self.tokenizer, batch_size=2, num_workers=2)
+        try:
+            self.assertEqual(engine.generate_tokens(PROMPTS, 5), expected)
+        finally:
+            engine.close()
+
+    def test_report(self):
+        engine = GenerationEngine(self.model, self.tokenizer, batch_size=4)
+        engine.generate(PROMPTS, 4, suite='toxicity')
+        path = os.path.join(self.tmp.name, 'report.json')
+        engine.write_report(path)
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(set(report), {'toxicity'})
+        self.assertEqual(report['toxicity']['prompts'], len(PROMPTS))
+        self.assertEqual(report['toxicity']['batches'], 2)
+        self.assertGreater(report['toxicity']['tokens_per_second'], 0)
+        self.assertRaises(ValueError, engine.generate, PROMPTS, 4, do_sample=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
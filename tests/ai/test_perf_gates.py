@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from perf_gates import (BaselineStore, PeakMemorySampler, RegressionGate, TrialStats, mann_whitney_greater,
+                        measure_latency, measure_peak_memory, reject_outliers)
+
+
+class StatisticsTest(unittest.TestCase):
+
+    def test_reject_outliers(self):
+        samples = np.array([1.0, 1.1, 0.9, 1.05, 0.95, 1.02, 9.0])
+        kept = reject_outliers(samples)
+        self.assertEqual(len(kept), 6)
+        self.assertNotIn(9.0, kept)
+        self.assertEqual(len(reject_outliers(np.ones(5))), 5)
+
+    def test_mann_whitney(self):
+        rng = np.random.default_rng(0)
+        baseline = rng.normal(1.0, 0.05, 30)
+        self.assertLess(mann_whitney_greater(rng.normal(1.2, 0.05, 15), baseline), 1e-4)
+        self.assertGreater(mann_whitney_greater(rng.normal(1.0, 0.05, 15), baseline), 0.01)
+        self.assertGreater(mann_whitney_greater(rng.normal(0.8, 0.05, 15), baseline), 0.99)
+
+    def test_measure_latency(self):
+        stats = measure_latency(lambda: time.sleep(0.002), trials=8, warmup=1)
+        self.assertEqual(stats.summary()['trials'], 8)
+        self.assertGreaterEqual(stats.median, 0.002)
+
+    def test_peak_memory_sampler(self):
+        def allocate():
+            block = np.ones(64 * 1024 * 1024 // 8)
+            time.sleep(0.02)
+            return block.sum()
+
+        with PeakMemorySampler(cuda=False) as sampler:
+            allocate()
+        self.assertGreater(sampler.peak, 48 * 1024 * 1024)
+        stats = measure_peak_memory(allocate, trials=3)
+        self.assertEqual(set(stats), {'peak_memory_bytes', 'python_peak_bytes'})
+
+
+class BaselineGateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'perf', 'baselines.json')
+        self.rng = np.random.default_rng(1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stats(self, mean):
+        return TrialStats('latency_s', self.rng.normal(mean, mean * 0.03, 15).tolist())
+
+    def test_regression_detected_and_not_recorded(self):
+        store = BaselineStore(self.path, window=3)
+        key = BaselineStore.key('tiny', 'cpu')
+        first = store.check(key, self.stats(0.1))
+        self.assertIsNone(first.baseline_median)
+        self.assertFalse(first.regressed)
+        self.assertFalse(store.check(key, self.stats(0.1)).regressed)
+        self.assertFalse(store.check(key, self.stats(0.105)).regressed)  # within min_relative
+
+        slow = store.check(key, self.stats(0.15))
+        self.assertTrue(slow.regressed, slow.message())
+        self.assertLess(slow.p_value, 0.01)
+        # The regressing run is not recorded and old runs roll out of the window
+        reloaded = BaselineStore(self.path, window=3)
+        self.assertEqual(len(reloaded.samples(key, 'latency_s')), 45)
+        self.assertLess(np.median(reloaded.samples(key, 'latency_s')), 0.11)
+
+    def test_insignificant_growth_passes(self):
+        gate = RegressionGate(min_relative=0.1)
+        baseline = [1.0, 2.0, 1.0, 2.0, 1.0, 2.0]
+        result = gate.evaluate('k', TrialStats('m', [1.0, 2.0, 2.0, 1.0, 2.0, 2.0]), baseline)
+        self.assertFalse(result.regressed, result.message())
+        self.assertIn('not significant', result.reason)
+
+    def test_update_can_be_disabled(self):
+        with mock.patch.dict(os.environ, {'AI_PERF_UPDATE_BASELINE': '0'}):
+            store = BaselineStore(self.path)
+        store.check('k', self.stats(0.1))
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+from datasets import Dataset
+
+from snapshot_store import SnapshotError, SnapshotStore, load_causal_lm, load_dataset_split, main
+from test_eval_engine import tiny_model_and_tokenizer
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(self.tmp.name)
+        self.model, self.tokenizer = tiny_model_and_tokenizer()
+        self.dataset = Dataset.from_dict({
+            'prompt': [f"prompt {i}" for i in range(20)],
+            'label': list(range(20)),
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_model_round_trip(self):
+        self.store.put_model("org/tiny", self.model, self.tokenizer)
+        model, tokenizer = self.store.load_model("org/tiny")
+        for name, tensor in self.model.state_dict().items():
+            torch.testing.assert_close(model.state_dict()[name], tensor)
+        self.assertEqual(tokenizer("the capital of france")['input_ids'],
+                         self.tokenizer("the capital of france")['input_ids'])
+
+    def test_dataset_slice_round_trip(self):
+        self.store.put_dataset("org/data", "train[:5]", self.dataset.select(range(5)).flatten_indices())
+        loaded = self.store.load_dataset("org/data", "train[:5]")
+        self.assertEqual(loaded['prompt'], [f"prompt {i}" for i in range(5)])
+        self.assertEqual(self.store.entries()[0]['ref'], "org--data@train[:5]")
+
+    def test_identical_content_is_stored_once(self):
+        first = self.store.put_model("a", self.model, self.tokenizer)
+        second = self.store.put_model("b", self.model, self.tokenizer)
+        self.assertNotEqual(first, second)  # the manifests record different names
+        objects = [f for _, _, files in os.walk(os.path.join(self.tmp.name, 'objects')) for f in files]
+        # Weights, config and tokenizer files are shared; only the two manifests differ
+        self.assertEqual(len(objects), len(self.store.manifest('models', 'a')[1]['files']) + 2)
+
+    def test_verify_detects_corruption(self):
+        manifest_hash = self.store.put_dataset("data", "all", self.dataset)
+        self.assertEqual(self.store.verify(), [])
+        files = self.store.manifest('datasets', 'data@all')[1]['files']
+        arrow = next(d for name, d in files.items() if name.endswith('.arrow'))
+        path = self.store._object_path(arrow)
+        os.chmod(path, 0o644)
+        with open(path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'\x00' if f.read(1) != b'\x00' else b'\x01')
+        self.assertEqual(self.store.verify(), [arrow])
+        self.assertEqual(main(['--root', self.tmp.name, 'verify']), 1)
+        self.assertNotEqual(manifest_hash, arrow)
+
+    def test_snapshot_cli_parses_split_slices(self):
+        with mock.patch('snapshot_store.snapshot') as take:
+            main(['--root', self.tmp.name, 'snapshot', '--dataset', 'squad_v2:validation[:10]'])
+        self.assertEqual(take.call_args.args[1:], ([], [('squad_v2', 'validation[:10]')]))
+        with self.assertRaises(SystemExit):
+            main(['--root', self.tmp.name, 'snapshot', '--dataset', 'squad_v2'])
+
+    def test_loaders_prefer_snapshots_and_respect_offline(self):
+        self.store.put_model("tiny", self.model, self.tokenizer)
+        self.store.put_dataset("data", "train", self.dataset)
+        with mock.patch.dict(os.environ, {'AI_SNAPSHOT_OFFLINE': '1', 'HF_HUB_OFFLINE': '1'}):
+            model, _ = load_causal_lm("tiny", store=self.store)
+            self.assertEqual(model.config.n_layer, 2)
+            self.assertEqual(len(load_dataset_split("data", "train", store=self.store)), 20)
+            with self.assertRaises(SnapshotError):
+                load_causal_lm("missing", store=self.store)
+            with self.assertRaises(SnapshotError):
+                load_dataset_split("data", "test", store=self.store)
+
+    def test_store_root_is_ignored_by_git(self):
+        self.store.put_dataset("data", "train", self.dataset)
+        with open(os.path.join(self.tmp.name, '.gitignore')) as f:
+            self.assertEqual(f.read().strip(), '*')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import random
+import re
+import unittest
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertForSequenceClassification
+
+from test_eval_engine import tiny_model_and_tokenizer
+from text_scorers import ClassifierScorer, PhraseMatcher, ScoringPipeline
+
+PHRASES = {
+    'toxic': ['hate*', 'kill', 'die', 'kill you'],
+    'male': ['he', 'his', 'him'],
+    'female': ['she', 'her'],
+    'chemistry': ['h2o', 'h₂o'],
+}
+
+
+def reference_counts(text, phrase_sets):
+    """Per-category counts using one word-boundary regex per phrase."""
+    counts = []
+    for phrases in phrase_sets.values():
+        total = 0
+        for phrase in phrases:
+            tail = '' if phrase.endswith('*') else r'(?!\w)'
+            total += len(re.findall(r'(?<!\w)(?=' + re.escape(phrase.rstrip('*')) + tail + ')', text.casefold()))
+        counts.append(total)
+    return counts
+
+
+class PhraseMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = PhraseMatcher(PHRASES)
+
+    def test_word_boundaries(self):
+        matches = self.matcher.find("The diet: he HATED her, then she died. Kill you! H₂O")
+        phrases = [phrase for _, _, phrase, _ in matches]
+        self.assertEqual(phrases, ['he', 'hate', 'her', 'she', 'kill', 'kill you', 'h₂o'])
+        self.assertEqual(self.matcher.find("he said")[0][:2], (0, 2))
+
+    def test_batch_matches_reference(self):
+        random.seed(0)
+        words = "the he she hate hated kill you diet die his him her hers h2o theme shed killer".split()
+        texts = [" ".join(random.choice(words) for _ in range(random.randint(0, 20))) + random.choice(["", ".", "!"])
+                 for _ in range(500)]
+        counts = self.matcher.count_batch(texts)
+        self.assertEqual(counts.shape, (500, 4))
+        for text, row in zip(texts, counts):
+            self.assertEqual(list(row), reference_counts(text, PHRASES), text)
+
+    def test_distinct_and_shared_phrases(self):
+        matcher = PhraseMatcher({'a': ['he', 'she'], 'b': ['he']})
+        self.assertEqual(matcher.count_batch(["he he she", "no"]).tolist(), [[3, 2], [0, 0]])
+        self.assertEqual(matcher.count_batch(["he he she", "no"], distinct=True).tolist(), [[2, 1], [0, 0]])
+        scores = matcher.score_batch(["he", "she"])
+        self.assertEqual(scores['b'].tolist(), [1, 0])
+        self.assertEqual(matcher.contains_any(["she", "x"], categories=['b']).tolist(), [False, False])
+
+    def test_without_word_boundaries(self):
+        matcher = PhraseMatcher({'x': ['die']}, word_boundary=False)
+        self.assertTrue(matcher.contains_any(["a diet"])[0])
+        self.assertEqual(self.matcher.count_batch([]).shape, (0, 4))
+
+
+class ClassifierScorerTest(unittest.TestCase):
+
+    def test_batched_scores_and_pipeline(self):
+        _, tokenizer = tiny_model_and_tokenizer()
+        tokenizer.pad_token = tokenizer.eos_token
+        torch.manual_seed(0)
+        model = BertForSequenceClassification(BertConfig(
+            vocab_size=len(tokenizer), hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+            intermediate_size=32, id2label={0: 'ok', 1: 'toxic'}, label2id={'ok': 0, 'toxic': 1}))
+        texts = ["the nurse said that", "a", "the quick brown fox jumps over the lazy dog", "she said"]
+        scorer = ClassifierScorer(model, tokenizer, labels=['toxic'], batch_size=3)
+        batched = scorer.score_batch(texts)['toxic']
+        single = np.concatenate([scorer.score_batch([text])['toxic'] for text in texts])
+        np.testing.assert_allclose(batched, single, atol=1e-5)
+
+        pipeline = ScoringPipeline({'phrases': PhraseMatcher(PHRASES), 'model': scorer}, chunk_size=2)
+        scores = pipeline.score(texts)
+        self.assertEqual(set(scores), {'phrases.toxic', 'phrases.male', 'phrases.female',
+                                       'phrases.chemistry', 'model.toxic'})
+        self.assertEqual(scores['phrases.female'].tolist(), [0, 0, 0, 1])
+        np.testing.assert_allclose(scores['model.toxic'], batched, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
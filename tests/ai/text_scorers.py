@@ -0,0 +1,212 @@
+"""
+Batch scorers for generated text used by the AI safety and capability tests.
+
+`PhraseMatcher` compiles any number of named phrase lists into one
+Aho-Corasick automaton, so a text is scanned once no matter how many
+phrases there are, and only reports matches that start and end on word
+boundaries ("die" does not match "diet", "he" does not match "the"). A
+trailing "*" makes a phrase a word prefix, so "kill*" also matches
+"killed" and "killing". A batch of texts is joined and scanned in a single pass, giving a
+(texts, categories) count matrix.
+
+Model-based scorers implement the same `score_batch(texts)` interface and
+can be combined with phrase scorers in a `ScoringPipeline`, which feeds
+texts through every scorer in fixed-size chunks.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+# Joins a batch into one string; never part of a phrase and always a word boundary
+_SEPARATOR = '\x00'
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class PhraseMatcher:
+    """Aho-Corasick matcher over named phrase lists with word-boundary checks.
+
+    Matching is case-insensitive unless `case_sensitive` is set; spans
+    returned by `find` index into the case-folded text.
+    """
+
+    def __init__(self, phrase_sets: Dict[str, Sequence[str]], word_boundary: bool = True,
+                 case_sensitive: bool = False):
+        self.categories = list(phrase_sets)
+        self.word_boundary = word_boundary
+        self.case_sensitive = case_sensitive
+
+        self.phrases: List[str] = []
+        self.phrase_categories: List[List[int]] = []
+        prefixes: List[bool] = []
+        phrase_ids: Dict[Tuple[str, bool], int] = {}
+        for category, phrases in enumerate(phrase_sets.values()):
+            for phrase in phrases:
+                prefix = phrase.endswith('*')
+                phrase = self._normalize(phrase[:-1] if prefix else phrase)
+                if not phrase or _SEPARATOR in phrase:
+                    raise ValueError(f"Invalid phrase {phrase!r}")
+                if (phrase, prefix) not in phrase_ids:
+                    phrase_ids[phrase, prefix] = len(self.phrases)
+                    self.phrases.append(phrase)
+                    self.phrase_categories.append([])
+                    prefixes.append(prefix)
+                if category not in self.phrase_categories[phrase_ids[phrase, prefix]]:
+                    self.phrase_categories[phrase_ids[phrase, prefix]].append(category)
+        # Boundary checks only apply at phrase ends that are themselves word characters
+        self._check_start = [word_boundary and _is_word_char(p[0]) for p in self.phrases]
+        self._check_end = [word_boundary and not prefix and _is_word_char(p[-1])
+                           for p, prefix in zip(self.phrases, prefixes)]
+        self._build()
+
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.casefold()
+
+    def _build(self):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for phrase_id, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(phrase_id)
+
+        # Breadth-first failure links (depth-one states fail to the root); each
+        # state inherits the outputs of its failure state
+        fail = [0] * len(goto)
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in goto[state].items():
+                pending.append(nxt)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+        self._goto, self._fail, self._outputs = goto, fail, [tuple(o) for o in outputs]
+
+    def _scan(self, text: str) -> List[Tuple[int, int]]:
+        """(end index, phrase id) for every boundary-respecting match in a normalized text."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        phrases, check_start, check_end = self.phrases, self._check_start, self._check_end
+        last = len(text) - 1
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                for phrase_id in outputs[state]:
+                    start = i - len(phrases[phrase_id]) + 1
+                    if check_start[phrase_id] and start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if check_end[phrase_id] and i < last and _is_word_char(text[i + 1]):
+                        continue
+                    matches.append((i, phrase_id))
+        return matches
+
+    def find(self, text: str) -> List[Tuple[int, int, str, List[str]]]:
+        """(start, end, phrase, categories) for every match in `text`."""
+        normalized = self._normalize(text)
+        return [(end - len(self.phrases[p]) + 1, end + 1, self.phrases[p],
+                 [self.categories[c] for c in self.phrase_categories[p]])
+                for end, p in self._scan(normalized)]
+
+    def count_batch(self, texts: Sequence[str], distinct: bool = False) -> np.ndarray:
+        """Match counts with shape (len(texts), len(categories)).
+
+        With `distinct` each phrase counts at most once per text.
+        """
+        counts = np.zeros((len(texts), len(self.categories)), dtype=np.int64)
+        if not texts or not self.phrases:
+            return counts
+        normalized = [self._normalize(text) for text in texts]
+        # Scan the whole batch in one pass; the separator is a boundary so no match spans two texts
+        starts = np.cumsum([0] + [len(text) + 1 for text in normalized[:-1]])
+        matches = self._scan(_SEPARATOR.join(normalized))
+        if not matches:
+            return counts
+        ends, phrase_ids = np.array(matches, dtype=np.int64).T
+        rows = np.searchsorted(starts, ends, side='right') - 1
+        if distinct:
+            rows, phrase_ids = np.unique(np.stack([rows, phrase_ids]), axis=1)
+        for phrase_id in np.unique(phrase_ids):
+            selected = rows[phrase_ids == phrase_id]
+            for category in self.phrase_categories[phrase_id]:
+                np.add.at(counts[:, category], selected, 1)
+        return counts
+
+    def score_batch(self, texts: Sequence[str], distinct: bool = False) -> Dict[str, np.ndarray]:
+        """Per-category match counts for every text."""
+        counts = self.count_batch(texts, distinct)
+        return {category: counts[:, i] for i, category in enumerate(self.categories)}
+
+    def contains_any(self, texts: Sequence[str], categories: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Boolean per text: whether any phrase from `categories` (default all) matched."""
+        counts = self.count_batch(texts)
+        if categories is not None:
+            counts = counts[:, [self.categories.index(c) for c in categories]]
+        return counts.any(axis=1)
+
+
+class ClassifierScorer:
+    """Batched scores from a sequence-classification model, e.g. a toxicity classifier.
+
+    Returns the probability of each label in `labels` (default: all of the
+    model's labels) for every text.
+    """
+
+    def __init__(self, model, tokenizer, labels: Optional[Sequence[str]] = None, batch_size: int = 64,
+                 max_length: int = 256, device: Optional[str] = None):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device or next(model.parameters()).device
+        id2label = model.config.id2label
+        self.labels = list(labels) if labels is not None else [id2label[i] for i in sorted(id2label)]
+        label_ids = {label: i for i, label in id2label.items()}
+        self.label_ids = [label_ids[label] for label in self.labels]
+
+    def score_batch(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        probabilities = []
+        with torch.no_grad():
+            for start in range(0, len(texts), self.batch_size):
+                inputs = self.tokenizer(list(texts[start:start + self.batch_size]), padding=True, truncation=True,
+                                        max_length=self.max_length, return_tensors='pt').to(self.device)
+                logits = self.model(**inputs).logits
+                probabilities.append(logits.softmax(dim=-1)[:, self.label_ids].float().cpu().numpy())
+        stacked = np.concatenate(probabilities) if probabilities else np.zeros((0, len(self.labels)))
+        return {label: stacked[:, i] for i, label in enumerate(self.labels)}
+
+
+class ScoringPipeline:
+    """Runs named scorers over texts in chunks and merges their outputs.
+
+    Output keys are "<scorer name>.<score name>".
+    """
+
+    def __init__(self, scorers: Dict[str, object], chunk_size: int = 4096):
+        self.scorers = scorers
+        self.chunk_size = chunk_size
+
+    def score(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        chunks: Dict[str, List[np.ndarray]] = {}
+        for start in range(0, len(texts), self.chunk_size):
+            chunk = texts[start:start + self.chunk_size]
+            for name, scorer in self.scorers.items():
+                for key, values in scorer.score_batch(chunk).items():
+                    chunks.setdefault(f"{name}.{key}", []).append(np.asarray(values))
+        return {key: np.concatenate(values) for key, values in chunks.items()}
@@ -0,0 +1,103 @@
+"""
+Cached Solidity compilation for the DApp tests.
+
+Compiling with solc takes seconds, so compiled artifacts (ABI and
+bytecode per contract) are stored on disk under a key of the source
+text, compiler version and compiler settings. A suite only invokes solc
+when a contract's source or the compiler changes; every other run loads
+the artifact JSON. py-solc-x is only imported on a cache miss.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".artifacts")
+DEFAULT_SOLC_VERSION = os.environ.get('DAPP_SOLC_VERSION', '0.8.19')
+OUTPUT_VALUES = ('abi', 'bin')
+
+# Compiler signature: (source, version, settings) -> {'<stdin>:Name': {'abi': ..., 'bin': ...}}
+Compiler = Callable[[str, str, Dict[str, Any]], Dict[str, Dict[str, Any]]]
+
+
+class ArtifactError(Exception):
+    """Contract could not be compiled or found in the compiled output."""
+
+
+def solcx_compiler(source: str, version: str, settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Compile with py-solc-x, installing the requested solc version on first use."""
+    try:
+        import solcx
+    except ImportError:
+        raise ArtifactError("py-solc-x is required to compile contracts that are not cached "
+                            "(pip install py-solc-x)") from None
+    if version not in [str(v) for v in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(version)
+    return solcx.compile_source(source, output_values=list(OUTPUT_VALUES), solc_version=version, **settings)
+
+
+class ArtifactStore:
+    """Compiled contract artifacts on disk, keyed by source, compiler version and settings."""
+
+    def __init__(self, cache_dir: Optional[str] = None, solc_version: str = DEFAULT_SOLC_VERSION,
+                 compiler: Compiler = solcx_compiler, **settings):
+        self.cache_dir = cache_dir or os.environ.get('DAPP_ARTIFACT_DIR', DEFAULT_CACHE_DIR)
+        self.solc_version = solc_version
+        self.compiler = compiler
+        self.settings = settings
+        self._memory: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: str) -> str:
+        payload = json.dumps({'source': source, 'solc': self.solc_version, 'settings': self.settings,
+                              'outputs': OUTPUT_VALUES}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def compile_source(self, source: str) -> Dict[str, Dict[str, Any]]:
+        """Every contract in `source`, as {'<stdin>:Name': {'abi': [...], 'bin': '...'}}."""
+        key = self.key(source)
+        if key in self._memory:
+            self.hits += 1
+            return self._memory[key]
+        path = self._path(key)
+        if os.path.exists(path):
+            with open(path) as f:
+                compiled = json.load(f)
+            self.hits += 1
+        else:
+            compiled = {name: {value: output[value] for value in OUTPUT_VALUES}
+                        for name, output in self.compiler(source, self.solc_version, self.settings).items()}
+            self._write(path, compiled)
+            self.misses += 1
+        self._memory[key] = compiled
+        return compiled
+
+    def _write(self, path: str, compiled: Dict[str, Dict[str, Any]]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        ignore = os.path.join(self.cache_dir, '.gitignore')
+        if not os.path.exists(ignore):
+            with open(ignore, 'w') as f:
+                f.write('*\n')
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump(compiled, f)
+        os.replace(tmp, path)
+
+    def contract(self, source: str, name: str) -> Dict[str, Any]:
+        """ABI and bytecode of one contract in `source`."""
+        compiled = self.compile_source(source)
+        for key in (name, f"<stdin>:{name}"):
+            if key in compiled:
+                return compiled[key]
+        raise ArtifactError(f"Contract {name} not found in compiled output ({', '.join(compiled)})")
+
+    def contract_file(self, path: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """ABI and bytecode of contract `name` (default: the file's stem) from a .sol file."""
+        with open(path) as f:
+            source = f.read()
+        return self.contract(source, name or os.path.splitext(os.path.basename(path))[0])
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the contract event indexer.
+
+Two backends:
+
+* ``synthetic`` - an in-memory log source producing Transfer (and
+  occasional Paused) logs for a token, with a per-request result cap like
+  public RPC nodes; measures fetch/decode/insert throughput and query
+  latency at high volume without a node.
+* ``eth-tester`` - deploys the SimpleToken test contract on eth-tester,
+  sends transfers and indexes the resulting chain (needs web3, eth-tester
+  and py-solc-x or a cached artifact).
+
+Also reports the cost of an incremental resume (indexing only new blocks),
+per-log decode time and query latency on the index.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from event_indexer import EventDecoderCache, LogIndexer, Web3LogSource, keccak256
+
+TOKEN_EVENTS_ABI = [
+    {'type': 'event', 'name': 'Transfer', 'anonymous': False, 'inputs': [
+        {'name': 'from', 'type': 'address', 'indexed': True},
+        {'name': 'to', 'type': 'address', 'indexed': True},
+        {'name': 'value', 'type': 'uint256', 'indexed': False},
+    ]},
+    {'type': 'event', 'name': 'Paused', 'anonymous': False, 'inputs': [
+        {'name': 'account', 'type': 'address', 'indexed': False},
+    ]},
+]
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+class SyntheticLogSource:
+    """Deterministic token logs served through a get_logs-style filter API."""
+
+    def __init__(self, address: str, blocks: int, logs_per_block: int, accounts: int = 64,
+                 pause_every: int = 1000, max_results: int = 10000, seed: int = 0):
+        self.address = address.lower()
+        self.head = blocks - 1
+        self.logs_per_block = logs_per_block
+        self.max_results = max_results
+        self.pause_every = pause_every
+        self.seed = seed
+        self.transfer_topic = keccak256(b'Transfer(address,address,uint256)')
+        self.paused_topic = keccak256(b'Paused(address)')
+        rng = random.Random(seed)
+        self.accounts = [rng.getrandbits(160).to_bytes(20, 'big') for _ in range(accounts)]
+        self.requests = 0
+
+    def block_number(self) -> int:
+        return self.head
+
+    def extend(self, blocks: int):
+        self.head += blocks
+
+    def _block_logs(self, block: int) -> List[Dict[str, Any]]:
+        rng = random.Random(self.seed * 1_000_003 + block)
+        logs = []
+        for index in range(self.logs_per_block):
+            sender, receiver = rng.sample(self.accounts, 2)
+            logs.append({
+                'address': self.address, 'blockNumber': block, 'logIndex': index,
+                'transactionHash': _word(block << 20 | index),
+                'topics': [self.transfer_topic, b'\0' * 12 + sender, b'\0' * 12 + receiver],
+                'data': _word(rng.randrange(1, 10 ** 21)),
+            })
+        if self.pause_every and block % self.pause_every == 0:
+            logs.append({
+                'address': self.address, 'blockNumber': block, 'logIndex': len(logs),
+                'transactionHash': _word(block << 20 | len(logs)),
+                'topics': [self.paused_topic], 'data': b'\0' * 12 + self.accounts[0],
+            })
+        return logs
+
+    def get_logs(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.requests += 1
+        start, end = params['fromBlock'], min(params['toBlock'], self.head)
+        expected = (end - start + 1) * self.logs_per_block
+        if expected > self.max_results:
+            raise ValueError(f"query returned more than {self.max_results} results")
+        addresses = params.get('address')
+        addresses = {a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses or [])}
+        wanted = None
+        if params.get('topics'):
+            wanted = {bytes.fromhex(t[2:]) for t in params['topics'][0]}
+        logs = []
+        for block in range(start, end + 1):
+            for log in self._block_logs(block):
+                if addresses and log['address'] not in addresses:
+                    continue
+                if wanted is not None and log['topics'][0] not in wanted:
+                    continue
+                logs.append(log)
+        return logs
+
+
+def _timed(fn, repeats: int = 20) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run_synthetic(blocks: int, logs_per_block: int, resume_blocks: int, db_path: str) -> Dict[str, Any]:
+    address = '0x' + '11' * 20
+    source = SyntheticLogSource(address, blocks, logs_per_block)
+    decoders = EventDecoderCache([TOKEN_EVENTS_ABI])
+    indexer = LogIndexer(db_path, source, decoders, [address], events=['Transfer', 'Paused'])
+
+    started = time.perf_counter()
+    indexed = indexer.index()
+    full_seconds = time.perf_counter() - started
+
+    source.extend(resume_blocks)
+    started = time.perf_counter()
+    resumed = indexer.index()
+    resume_seconds = time.perf_counter() - started
+
+    sample = source.get_logs({'fromBlock': 0, 'toBlock': min(blocks - 1, 9999 // logs_per_block),
+                              'address': address})
+    started = time.perf_counter()
+    for log in sample:
+        decoders.decode(log)
+    per_log = (time.perf_counter() - started) / len(sample)
+
+    query = {
+        'pause_events_ms': _timed(lambda: indexer.events('Paused', address)) * 1e3,
+        'last_100_blocks_ms': _timed(lambda: indexer.events('Transfer', address, from_block=blocks - 100)) * 1e3,
+        'count_ms': _timed(lambda: indexer.count('Transfer'), repeats=5) * 1e3,
+    }
+    result = {
+        'backend': 'synthetic',
+        'blocks': blocks,
+        'logs_per_block': logs_per_block,
+        'indexed_logs': indexed,
+        'full_index_seconds': full_seconds,
+        'logs_per_second': indexed / full_seconds,
+        'rpc_requests': source.requests,
+        'failed_requests': indexer.stats['failed_requests'],
+        'resume_blocks': resume_blocks,
+        'resume_logs': resumed,
+        'resume_seconds': resume_seconds,
+        'decode_us_per_log': per_log * 1e6,
+        'query': query,
+        'db_bytes': os.path.getsize(db_path),
+    }
+    indexer.close()
+    return result
+
+
+def run_eth_tester(transfers: int, contract: str, db_path: str) -> Dict[str, Any]:
+    from eth_tester import EthereumTester, PyEVMBackend
+    from web3 import Web3
+    from web3.providers.eth_tester import EthereumTesterProvider
+
+    from artifact_store import ArtifactStore
+
+    w3 = Web3(EthereumTesterProvider(EthereumTester(PyEVMBackend())))
+    interface = ArtifactStore().contract_file(contract)
+    owner, *others = w3.eth.accounts
+    tx_hash = w3.eth.contract(abi=interface['abi'], bytecode=interface['bin']).constructor().transact({'from': owner})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash) if hasattr(w3.eth, 'wait_for_transaction_receipt') \
+        else w3.eth.waitForTransactionReceipt(tx_hash)
+    token = w3.eth.contract(address=receipt['contractAddress'], abi=interface['abi'])
+
+    started = time.perf_counter()
+    for i in range(transfers):
+        token.functions.transfer(others[i % len(others)], 1).transact({'from': owner})
+    send_seconds = time.perf_counter() - started
+
+    indexer = LogIndexer(db_path, Web3LogSource(w3), EventDecoderCache([interface['abi']]),
+                         [receipt['contractAddress']], batch_blocks=500)
+    started = time.perf_counter()
+    indexed = indexer.index()
+    index_seconds = time.perf_counter() - started
+    result = {
+        'backend': 'eth-tester',
+        'transfers': transfers,
+        'send_seconds': send_seconds,
+        'indexed_logs': indexed,
+        'index_seconds': index_seconds,
+        'logs_per_second': indexed / max(index_seconds, 1e-9),
+        'rpc_requests': indexer.stats['batches'] + indexer.stats['failed_requests'],
+    }
+    indexer.close()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=['synthetic', 'eth-tester'], default='synthetic')
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--logs-per-block', type=int, default=10)
+    parser.add_argument('--resume-blocks', type=int, default=500)
+    parser.add_argument('--transfers', type=int, default=2000)
+    parser.add_argument('--contract', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SimpleToken.sol'))
+    parser.add_argument('--output', help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'events.sqlite')
+        if args.backend == 'synthetic':
+            report = run_synthetic(args.blocks, args.logs_per_block, args.resume_blocks, db_path)
+        else:
+            report = run_eth_tester(args.transfers, args.contract, db_path)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
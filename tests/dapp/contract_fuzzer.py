@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Property-based fuzzer for token contract security properties.
+
+Random transaction sequences are generated from the contract ABI (boundary
+values for integers, the test accounts and the zero address for
+addresses, any account as sender) and executed against a deployed
+contract. After every transaction the contract state is observed and a set
+of invariants is checked:
+
+* balance conservation - the tracked balances sum to totalSupply
+* paused state - no transfer succeeds while the contract is paused
+* owner-only calls - administrative functions revert for other senders
+
+A violating sequence is shrunk by removing chunks of transactions and
+simplifying arguments while it still fails. Each sequence starts from a
+revert to the post-deployment snapshot, so sequences are independent.
+
+Workers each build their own chain from a picklable target factory and run
+in a process pool; the report gives executed transactions per second for
+sizing fuzz budgets. Run as a script to fuzz the in-memory reference token
+or the SimpleToken contract on eth-tester.
+"""
+
+import argparse
+import copy
+import functools
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ZERO_ADDRESS = '0x' + '00' * 20
+
+TRANSFER_FUNCTIONS = ('transfer', 'transferFrom')
+OWNER_ONLY_FUNCTIONS = ('pause', 'unpause', 'mint', 'transferOwnership', 'renounceOwnership')
+
+
+@dataclass
+class FunctionSpec:
+    """A state-changing contract function and its argument types."""
+    name: str
+    inputs: List[str]
+
+
+@dataclass
+class Action:
+    """One transaction: `function(*args)` sent from `sender`."""
+    function: str
+    args: List[Any]
+    sender: str
+
+    def __str__(self):
+        return f"{self.function}({', '.join(map(str, self.args))}) from {self.sender}"
+
+
+@dataclass
+class Outcome:
+    ok: bool
+    error: Optional[str] = None
+
+
+def functions_from_abi(abi: List[Dict[str, Any]]) -> List[FunctionSpec]:
+    return [FunctionSpec(entry['name'], [i['type'] for i in entry.get('inputs', [])])
+            for entry in abi
+            if entry.get('type') == 'function' and entry.get('stateMutability') not in ('view', 'pure')
+            and not entry.get('constant')]
+
+
+# Invariants take (pre-state, action, outcome, post-state) and return a violation message or None
+
+def balance_conservation(pre, action, outcome, post) -> Optional[str]:
+    if post.get('total_supply') is None or post.get('balances') is None:
+        return None
+    total = sum(post['balances'].values())
+    if total != post['total_supply']:
+        return f"balances sum to {total} but totalSupply is {post['total_supply']}"
+    return None
+
+
+def paused_blocks_transfers(pre, action, outcome, post) -> Optional[str]:
+    if pre.get('paused') and action.function in TRANSFER_FUNCTIONS and outcome.ok:
+        return f"{action.function} succeeded while paused"
+    return None
+
+
+def owner_only(pre, action, outcome, post) -> Optional[str]:
+    owner = pre.get('owner')
+    if owner and action.function in OWNER_ONLY_FUNCTIONS and action.sender.lower() != owner.lower() and outcome.ok:
+        return f"{action.function} succeeded for non-owner {action.sender}"
+    return None
+
+
+DEFAULT_INVARIANTS: Dict[str, Callable] = {
+    'balance_conservation': balance_conservation,
+    'paused_blocks_transfers': paused_blocks_transfers,
+    'owner_only': owner_only,
+}
+
+
+class SequenceGenerator:
+    """Random transaction sequences biased towards boundary values."""
+
+    def __init__(self, functions: Sequence[FunctionSpec], accounts: Sequence[str], rng: random.Random):
+        self.functions = list(functions)
+        self.accounts = list(accounts)
+        self.rng = rng
+
+    def value(self, abi_type: str):
+        rng = self.rng
+        if abi_type.startswith('uint'):
+            bits = int(abi_type[4:] or 256)
+            top = 2 ** bits - 1
+            return rng.choice([0, 1, 2, rng.randrange(1000), rng.randrange(10 ** 6), rng.randrange(10 ** 24),
+                               top, top // 2 + 1]) % (top + 1)
+        if abi_type.startswith('int'):
+            bits = int(abi_type[3:] or 256)
+            return rng.choice([0, 1, -1, 2 ** (bits - 1) - 1, -2 ** (bits - 1), rng.randrange(-1000, 1000)])
+        if abi_type == 'address':
+            return rng.choice(self.accounts + [ZERO_ADDRESS])
+        if abi_type == 'bool':
+            return rng.random() < 0.5
+        if abi_type.startswith('bytes') and abi_type != 'bytes':
+            return bytes(rng.getrandbits(8) for _ in range(int(abi_type[5:])))
+        if abi_type == 'bytes':
+            return bytes(rng.getrandbits(8) for _ in range(rng.randrange(64)))
+        if abi_type == 'string':
+            return ''.join(rng.choice('abc xyz') for _ in range(rng.randrange(16)))
+        raise ValueError(f"Unsupported ABI type {abi_type}")
+
+    def action(self) -> Action:
+        spec = self.rng.choice(self.functions)
+        return Action(spec.name, [self.value(t) for t in spec.inputs], self.rng.choice(self.accounts))
+
+    def sequence(self, max_length: int) -> List[Action]:
+        return [self.action() for _ in range(self.rng.randint(1, max_length))]
+
+
+@dataclass
+class Failure:
+    invariant: str
+    message: str
+    sequence: List[str]
+    original_length: int
+    seed: int
+
+
+@dataclass
+class FuzzReport:
+    sequences: int = 0
+    transactions: int = 0
+    reverted: int = 0
+    shrink_runs: int = 0
+    seconds: float = 0.0
+    failures: List[Failure] = field(default_factory=list)
+
+    @property
+    def transactions_per_second(self) -> float:
+        return self.transactions / self.seconds if self.seconds else 0.0
+
+    def merge(self, other: 'FuzzReport'):
+        self.sequences += other.sequences
+        self.transactions += other.transactions
+        self.reverted += other.reverted
+        self.shrink_runs += other.shrink_runs
+        self.failures.extend(other.failures)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**{k: v for k, v in asdict(self).items() if k != 'failures'},
+                'transactions_per_second': self.transactions_per_second,
+                'failures': [asdict(f) for f in self.failures]}
+
+
+class Fuzzer:
+    """Runs, checks and shrinks sequences against one target.
+
+    A target provides `accounts`, `functions`, `snapshot()`,
+    `revert(snapshot)`, `call(function, args, sender) -> Outcome` and
+    `observe() -> dict` (balances, total_supply, paused, owner).
+    """
+
+    def __init__(self, target, invariants: Optional[Dict[str, Callable]] = None, max_shrink_runs: int = 300):
+        self.target = target
+        self.invariants = invariants or DEFAULT_INVARIANTS
+        self.max_shrink_runs = max_shrink_runs
+        self.base = target.snapshot()
+        self.report = FuzzReport()
+        self._budget = 0
+
+    def execute(self, sequence: Sequence[Action]) -> Optional[Tuple[str, str, int]]:
+        """Run a sequence from the base state; (invariant, message, index) of the first violation."""
+        target = self.target
+        target.revert(self.base)
+        state = target.observe()
+        for index, action in enumerate(sequence):
+            outcome = target.call(action.function, action.args, action.sender)
+            self.report.transactions += 1
+            self.report.reverted += not outcome.ok
+            post = target.observe()
+            for name, invariant in self.invariants.items():
+                message = invariant(state, action, outcome, post)
+                if message:
+                    return name, message, index
+            state = post
+        return None
+
+    def _fails_with(self, sequence: List[Action], invariant: str) -> bool:
+        self.report.shrink_runs += 1
+        violation = self.execute(sequence)
+        return violation is not None and violation[0] == invariant
+
+    def shrink(self, sequence: List[Action], invariant: str) -> List[Action]:
+        """Smallest sequence found that still violates `invariant`."""
+        self._budget = self.report.shrink_runs + self.max_shrink_runs
+        violation = self.execute(sequence)
+        if violation is not None:
+            sequence = sequence[:violation[2] + 1]  # Nothing after the violation matters
+        # Simplifying an action can make others removable, so repeat until neither pass helps
+        while True:
+            shorter = self._remove_chunks(sequence, invariant)
+            simpler = self._simplify(shorter, invariant)
+            if simpler == sequence or self.report.shrink_runs >= self._budget:
+                return simpler
+            sequence = simpler
+
+    def _remove_chunks(self, sequence: List[Action], invariant: str) -> List[Action]:
+        """Drop chunks of actions, halving the chunk size when no chunk can go (ddmin-style)."""
+        chunk = max(1, len(sequence) // 2)
+        while chunk >= 1 and self.report.shrink_runs < self._budget:
+            removed = False
+            start = 0
+            while start < len(sequence) and self.report.shrink_runs < self._budget:
+                candidate = sequence[:start] + sequence[start + chunk:]
+                if candidate and self._fails_with(candidate, invariant):
+                    sequence, removed = candidate, True
+                else:
+                    start += chunk
+            if not removed:
+                chunk //= 2
+        return sequence
+
+    def _simplify(self, sequence: List[Action], invariant: str) -> List[Action]:
+        """Move integer arguments towards 0 and senders towards the first account."""
+        first = self.target.accounts[0]
+        for i in range(len(sequence)):
+            for j, arg in enumerate(sequence[i].args):
+                if not isinstance(arg, int) or isinstance(arg, bool) or arg in (0, 1):
+                    continue
+                for simpler in (0, 1, arg // 2):
+                    if self.report.shrink_runs >= self._budget:
+                        return sequence
+                    candidate = copy.deepcopy(sequence)
+                    candidate[i].args[j] = simpler
+                    if self._fails_with(candidate, invariant):
+                        sequence = candidate
+                        break
+            if sequence[i].sender != first and self.report.shrink_runs < self._budget:
+                candidate = copy.deepcopy(sequence)
+                candidate[i].sender = first
+                if self._fails_with(candidate, invariant):
+                    sequence = candidate
+        return sequence
+
+    def run(self, sequences: int, max_length: int, seed: int, time_budget: Optional[float] = None,
+            max_failures: int = 5) -> FuzzReport:
+        started = time.perf_counter()
+        seen = set()
+        for i in range(sequences):
+            if time_budget is not None and time.perf_counter() - started > time_budget:
+                break
+            sequence_seed = seed * 1_000_003 + i
+            generator = SequenceGenerator(self.target.functions, self.target.accounts, random.Random(sequence_seed))
+            sequence = generator.sequence(max_length)
+            self.report.sequences += 1
+            violation = self.execute(sequence)
+            if violation is None or violation[0] in seen:
+                continue
+            seen.add(violation[0])
+            shrunk = self.shrink(sequence, violation[0])
+            message = self.execute(shrunk)[1]
+            self.report.failures.append(Failure(violation[0], message, [str(a) for a in shrunk],
+                                                len(sequence), sequence_seed))
+            if len(self.report.failures) >= max_failures:
+                break
+        self.report.seconds = time.perf_counter() - started
+        self.target.revert(self.base)
+        return self.report
+
+
+def _fuzz_worker(target_factory, sequences: int, max_length: int, seed: int, time_budget: Optional[float]) -> FuzzReport:
+    return Fuzzer(target_factory()).run(sequences, max_length, seed, time_budget)
+
+
+def run_fuzz(target_factory: Callable[[], Any], workers: int = 0, sequences: int = 100, max_length: int = 20,
+             seed: int = 0, time_budget: Optional[float] = None) -> FuzzReport:
+    """Fuzz `sequences` sequences per worker; `workers=0` runs one fuzzer in-process.
+
+    Every worker builds its own independent chain from `target_factory`,
+    which must be picklable (a module-level callable or functools.partial).
+    """
+    started = time.perf_counter()
+    if workers <= 0:
+        report = _fuzz_worker(target_factory, sequences, max_length, seed, time_budget)
+    else:
+        ctx = mp.get_context('spawn')
+        with ctx.Pool(workers) as pool:
+            reports = pool.starmap(_fuzz_worker, [(target_factory, sequences, max_length, seed * 1000 + w, time_budget)
+                                                  for w in range(workers)])
+        report = FuzzReport()
+        for worker_report in reports:
+            report.merge(worker_report)
+    # Wall time across all workers, so transactions/sec reflects the parallel throughput
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+class InMemoryTokenTarget:
+    """Reference pausable, ownable token in plain Python, for fuzzing the fuzzer.
+
+    `bug` injects a known defect: 'pause_bypass' (transferFrom ignores the
+    pause), 'unguarded_mint' (anyone can mint) or 'supply_leak' (burn does
+    not reduce totalSupply).
+    """
+
+    functions = [
+        FunctionSpec('transfer', ['address', 'uint256']),
+        FunctionSpec('approve', ['address', 'uint256']),
+        FunctionSpec('transferFrom', ['address', 'address', 'uint256']),
+        FunctionSpec('mint', ['address', 'uint256']),
+        FunctionSpec('burn', ['uint256']),
+        FunctionSpec('pause', []),
+        FunctionSpec('unpause', []),
+    ]
+
+    def __init__(self, accounts: int = 4, initial_supply: int = 10 ** 6, bug: Optional[str] = None):
+        self.accounts = [f"0x{i + 1:040x}" for i in range(accounts)]
+        self.bug = bug
+        owner = self.accounts[0]
+        self.state = {'owner': owner, 'paused': False, 'total_supply': initial_supply,
+                      'balances': {a: 0 for a in self.accounts + [ZERO_ADDRESS]}, 'allowances': {}}
+        self.state['balances'][owner] = initial_supply
+
+    def snapshot(self):
+        return copy.deepcopy(self.state)
+
+    def revert(self, snapshot):
+        self.state = copy.deepcopy(snapshot)
+
+    def observe(self) -> Dict[str, Any]:
+        s = self.state
+        return {'owner': s['owner'], 'paused': s['paused'], 'total_supply': s['total_supply'],
+                'balances': dict(s['balances'])}
+
+    def _move(self, source: str, target: str, value: int):
+        balances = self.state['balances']
+        if target == ZERO_ADDRESS:
+            raise ValueError("transfer to the zero address")
+        if balances[source] < value:
+            raise ValueError("insufficient balance")
+        balances[source] -= value
+        balances[target] += value
+
+    def call(self, function: str, args: List[Any], sender: str) -> Outcome:
+        s = self.state
+        before = copy.deepcopy(s)
+        try:
+            owner_call = sender == s['owner'] or (self.bug == 'unguarded_mint' and function == 'mint')
+            if function in OWNER_ONLY_FUNCTIONS and not owner_call:
+                raise PermissionError("caller is not the owner")
+            if function in ('transfer', 'transferFrom', 'burn') and s['paused'] and \
+                    not (self.bug == 'pause_bypass' and function == 'transferFrom'):
+                raise RuntimeError("paused")
+            if function == 'transfer':
+                self._move(sender, *args)
+            elif function == 'approve':
+                s['allowances'][sender, args[0]] = args[1]
+            elif function == 'transferFrom':
+                source, target, value = args
+                allowance = s['allowances'].get((source, sender), 0)
+                if allowance < value:
+                    raise ValueError("insufficient allowance")
+                s['allowances'][source, sender] = allowance - value
+                self._move(source, target, value)
+            elif function == 'mint':
+                if args[0] == ZERO_ADDRESS:
+                    raise ValueError("mint to the zero address")
+                if s['total_supply'] + args[1] >= 2 ** 256:
+                    raise OverflowError("supply overflow")
+                s['balances'][args[0]] += args[1]
+                s['total_supply'] += args[1]
+            elif function == 'burn':
+                if s['balances'][sender] < args[0]:
+                    raise ValueError("burn exceeds balance")
+                s['balances'][sender] -= args[0]
+                if self.bug != 'supply_leak':
+                    s['total_supply'] -= args[0]
+            elif function in ('pause', 'unpause'):
+                s['paused'] = function == 'pause'
+            return Outcome(True)
+        except Exception as e:
+            # Reverts roll back every state change, as on chain
+            self.state = before
+            return Outcome(False, str(e))
+
+
+class EthTesterTarget:
+    """A contract deployed on a fresh eth-tester chain, reset between sequences by snapshot revert."""
+
+    def __init__(self, contract_path: str, contract_name: Optional[str] = None, accounts: int = 4,
+                 constructor_args: Sequence[Any] = ()):
+        from eth_tester import EthereumTester, PyEVMBackend
+        from web3 import Web3
+        from web3.providers.eth_tester import EthereumTesterProvider
+
+        from artifact_store import ArtifactStore
+
+        self.eth_tester = EthereumTester(PyEVMBackend())
+        self.w3 = Web3(EthereumTesterProvider(self.eth_tester))
+        interface = ArtifactStore().contract_file(contract_path, contract_name)
+        self.accounts = list(self.w3.eth.accounts[:accounts])
+        tx_hash = self.w3.eth.contract(abi=interface['abi'], bytecode=interface['bin']) \
+            .constructor(*constructor_args).transact({'from': self.accounts[0]})
+        address = self.w3.eth.get_transaction_receipt(tx_hash)['contractAddress'] \
+            if hasattr(self.w3.eth, 'get_transaction_receipt') else self.w3.eth.getTransactionReceipt(tx_hash)['contractAddress']
+        self.contract = self.w3.eth.contract(address=address, abi=interface['abi'])
+        self.functions = functions_from_abi(interface['abi'])
+        self._views = {entry['name'] for entry in interface['abi']
+                       if entry.get('type') == 'function' and entry.get('stateMutability') in ('view', 'pure')}
+
+    @classmethod
+    def from_contract(cls, eth_tester, w3, contract, accounts: Sequence[str]) -> 'EthTesterTarget':
+        """Wrap an already deployed contract, e.g. from a test fixture."""
+        target = cls.__new__(cls)
+        target.eth_tester, target.w3, target.contract = eth_tester, w3, contract
+        target.accounts = list(accounts)
+        target.functions = functions_from_abi(contract.abi)
+        target._views = {entry['name'] for entry in contract.abi
+                         if entry.get('type') == 'function' and entry.get('stateMutability') in ('view', 'pure')}
+        return target
+
+    def snapshot(self):
+        return self.eth_tester.take_snapshot()
+
+    def revert(self, snapshot):
+        self.eth_tester.revert_to_snapshot(snapshot)
+
+    def call(self, function: str, args: List[Any], sender: str) -> Outcome:
+        try:
+            getattr(self.contract.functions, function)(*args).transact({'from': sender, 'gas': 1_000_000})
+            return Outcome(True)
+        except Exception as e:
+            return Outcome(False, str(e))
+
+    def _view(self, name: str, *args):
+        return getattr(self.contract.functions, name)(*args).call() if name in self._views else None
+
+    def observe(self) -> Dict[str, Any]:
+        balances = None
+        if 'balanceOf' in self._views:
+            balances = {a: self._view('balanceOf', a) for a in self.accounts + [ZERO_ADDRESS]}
+        return {'owner': self._view('owner'), 'paused': self._view('paused'),
+                'total_supply': self._view('totalSupply'), 'balances': balances}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz token contract security properties")
+    parser.add_argument('--backend', choices=['memory', 'eth-tester'], default='memory')
+    parser.add_argument('--contract', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SimpleToken.sol'))
+    parser.add_argument('--bug', default=None, help="Defect to inject into the in-memory token")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--sequences', type=int, default=200, help="Sequences per worker")
+    parser.add_argument('--max-length', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget-seconds', type=float, default=None)
+    parser.add_argument('--output', help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    if args.backend == 'memory':
+        factory = functools.partial(InMemoryTokenTarget, bug=args.bug)
+    else:
+        factory = functools.partial(EthTesterTarget, args.contract)
+    report = run_fuzz(factory, args.workers, args.sequences, args.max_length, args.seed, args.budget_seconds)
+
+    text = json.dumps(report.to_dict(), indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    return 1 if report.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
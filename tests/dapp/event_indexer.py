@@ -0,0 +1,334 @@
+"""
+Bulk indexer for contract event logs.
+
+Logs are fetched in block-range batches. The range doubles after each
+successful request and halves when the node rejects one as too large;
+after a rejection it never grows back past half the rejected range, so a
+dense log stream settles on a size the node accepts instead of
+oscillating.
+
+Logs are then decoded with per-event plans compiled once from the ABI,
+and written to a SQLite index with an (address, topic0, block) index.
+Each batch and the indexer's progress are committed in one transaction,
+so an interrupted run resumes from the last fully indexed block.
+
+Decoding plans cover the static ABI types events normally use (uintN,
+intN, address, bool, bytesN) without any per-log ABI parsing; events with
+dynamic non-indexed types are decoded with eth_abi when it is installed.
+Addresses are sent to the node as given (web3 only accepts checksum
+addresses) and stored lowercase.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+WORD = 32
+
+# Node errors for a log query whose range holds too many results (EIP-1474 -32005 "limit exceeded")
+RESULT_LIMIT_PATTERN = re.compile(
+    r"more than \d+ results|query returned more than|limit exceeded|response size|block range|too (?:large|many)|-32005",
+    re.IGNORECASE,
+)
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    text = str(value)
+    return bytes.fromhex(text[2:] if text.startswith('0x') else text)
+
+
+def _hex(value: bytes) -> str:
+    return '0x' + value.hex()
+
+
+_KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_KECCAK_ROTATIONS = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61], [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_MASK = (1 << 64) - 1
+
+
+def _keccak_f(state: List[List[int]]):
+    for constant in _KECCAK_ROUND_CONSTANTS:
+        c = [state[x][0] ^ state[x][1] ^ state[x][2] ^ state[x][3] ^ state[x][4] for x in range(5)]
+        d = [c[x - 1] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _MASK) for x in range(5)]
+        state = [[state[x][y] ^ d[x] for y in range(5)] for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                r = _KECCAK_ROTATIONS[x][y]
+                b[y][(2 * x + 3 * y) % 5] = ((state[x][y] << r) | (state[x][y] >> (64 - r))) & _MASK if r else state[x][y]
+        state = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        state[0][0] ^= constant
+    return state
+
+
+def keccak256(data: bytes) -> bytes:
+    """Ethereum's Keccak-256 (original padding, not NIST SHA3); uses eth_utils when installed."""
+    try:
+        from eth_utils import keccak
+        return keccak(data)
+    except ImportError:
+        pass
+    # Pure Python fallback, fine for hashing event signatures
+    rate = 136
+    padded = bytearray(data) + b'\x01' + b'\x00' * ((-len(data) - 1) % rate)
+    padded[-1] |= 0x80
+    state = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            state[i % 5][i // 5] ^= int.from_bytes(block[8 * i:8 * i + 8], 'little')
+        state = _keccak_f(state)
+    return b''.join(state[i % 5][i // 5].to_bytes(8, 'little') for i in range(4))
+
+
+def _decode_static(abi_type: str, word: bytes):
+    """Decode one 32-byte ABI word of a static type."""
+    if abi_type.startswith('uint'):
+        return int.from_bytes(word, 'big')
+    if abi_type.startswith('int'):
+        return int.from_bytes(word, 'big', signed=True)
+    if abi_type == 'address':
+        return _hex(word[-20:])
+    if abi_type == 'bool':
+        return word[-1] == 1
+    if abi_type.startswith('bytes') and abi_type != 'bytes':
+        return _hex(word[:int(abi_type[5:])])
+    raise ValueError(f"Not a static ABI type: {abi_type}")
+
+
+def _is_static(abi_type: str) -> bool:
+    return (abi_type.startswith(('uint', 'int')) or abi_type in ('address', 'bool') or
+            (abi_type.startswith('bytes') and abi_type != 'bytes')) and '[' not in abi_type
+
+
+@dataclass
+class EventPlan:
+    """Precomputed decoding steps for one event signature."""
+    name: str
+    signature: str
+    topic0: bytes
+    indexed: List[Tuple[str, str]]
+    data: List[Tuple[str, str]]
+
+    @property
+    def static_data(self) -> bool:
+        return all(_is_static(abi_type) for _, abi_type in self.data)
+
+    def decode(self, topics: Sequence[bytes], data: bytes) -> Dict[str, Any]:
+        args = {}
+        for (name, abi_type), topic in zip(self.indexed, topics[1:]):
+            # Indexed dynamic values are only present as their hash
+            args[name] = _decode_static(abi_type, topic) if _is_static(abi_type) else _hex(topic)
+        if self.static_data:
+            for i, (name, abi_type) in enumerate(self.data):
+                args[name] = _decode_static(abi_type, data[i * WORD:(i + 1) * WORD])
+        else:
+            from eth_abi import decode
+            values = decode([abi_type for _, abi_type in self.data], data)
+            args.update((name, value.hex() if isinstance(value, bytes) else value)
+                        for (name, _), value in zip(self.data, values))
+        return args
+
+
+class EventDecoderCache:
+    """Decoding plans for every event in one or more ABIs, keyed by topic0."""
+
+    def __init__(self, abis: Iterable[List[Dict[str, Any]]] = (), keccak: Callable[[bytes], bytes] = keccak256):
+        self.keccak = keccak
+        self.plans: Dict[bytes, EventPlan] = {}
+        for abi in abis:
+            self.add_abi(abi)
+
+    def add_abi(self, abi: List[Dict[str, Any]]):
+        for entry in abi:
+            if entry.get('type') != 'event' or entry.get('anonymous'):
+                continue
+            inputs = entry.get('inputs', [])
+            signature = f"{entry['name']}({','.join(i['type'] for i in inputs)})"
+            topic0 = self.keccak(signature.encode())
+            self.plans[topic0] = EventPlan(
+                name=entry['name'],
+                signature=signature,
+                topic0=topic0,
+                indexed=[(i['name'], i['type']) for i in inputs if i.get('indexed')],
+                data=[(i['name'], i['type']) for i in inputs if not i.get('indexed')],
+            )
+
+    def topic(self, event_name: str) -> bytes:
+        for topic0, plan in self.plans.items():
+            if plan.name == event_name:
+                return topic0
+        raise KeyError(f"Unknown event {event_name}")
+
+    def decode(self, log: Dict[str, Any]) -> Optional[Tuple[EventPlan, Dict[str, Any]]]:
+        topics = [_to_bytes(t) for t in log['topics']]
+        plan = self.plans.get(topics[0]) if topics else None
+        if plan is None:
+            return None
+        return plan, plan.decode(topics, _to_bytes(log['data']))
+
+
+class Web3LogSource:
+    """Log source backed by a web3 connection (v5 camelCase or v6 snake_case API)."""
+
+    def __init__(self, w3):
+        self.eth = w3.eth
+
+    def block_number(self) -> int:
+        eth = self.eth
+        return eth.block_number if hasattr(eth, 'block_number') else eth.blockNumber
+
+    def get_logs(self, filter_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        get_logs = getattr(self.eth, 'get_logs', None) or self.eth.getLogs
+        return get_logs(filter_params)
+
+
+def is_result_limit_error(error: Exception) -> bool:
+    """Whether `error` is the node rejecting a log query for returning too many results."""
+    return bool(RESULT_LIMIT_PATTERN.search(" ".join(str(arg) for arg in (error, *error.args))))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    topic0 TEXT NOT NULL,
+    event TEXT,
+    args TEXT,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS logs_address_topic_block ON logs (address, topic0, block);
+CREATE TABLE IF NOT EXISTS progress (
+    scan TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+"""
+
+
+class LogIndexer:
+    """Indexes logs for a set of contract addresses and events into SQLite.
+
+    `confirmations` keeps the indexer that many blocks behind the head.
+    """
+
+    def __init__(self, path: str, source, decoders: EventDecoderCache, addresses: Sequence[str],
+                 events: Optional[Sequence[str]] = None, batch_blocks: int = 2000, max_batch_blocks: int = 100000,
+                 start_block: int = 0, confirmations: int = 0):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        # Bulk-load settings: the progress row makes the index recoverable, not the journal
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.source = source
+        self.decoders = decoders
+        self.request_addresses = list(addresses)
+        self.addresses = [a.lower() for a in addresses]
+        self.topics = [_hex(decoders.topic(e)) for e in events] if events else None
+        self.batch_blocks = batch_blocks
+        self.max_batch_blocks = max_batch_blocks
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.scan_id = hashlib.sha256(json.dumps([sorted(self.addresses), self.topics]).encode()).hexdigest()[:16]
+        self.stats = {'batches': 0, 'logs': 0, 'failed_requests': 0, 'seconds': 0.0}
+
+    @property
+    def last_indexed_block(self) -> int:
+        row = self.connection.execute("SELECT last_block FROM progress WHERE scan = ?", (self.scan_id,)).fetchone()
+        return row[0] if row else self.start_block - 1
+
+    def _fetch(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {'fromBlock': from_block, 'toBlock': to_block}
+        addresses = self.request_addresses
+        params['address'] = addresses[0] if len(addresses) == 1 else addresses
+        if self.topics:
+            params['topics'] = [self.topics]
+        return self.source.get_logs(params)
+
+    def _rows(self, logs: List[Dict[str, Any]]) -> List[tuple]:
+        rows = []
+        for log in logs:
+            decoded = self.decoders.decode(log)
+            event, args = (decoded[0].name, json.dumps(decoded[1])) if decoded else (None, None)
+            rows.append((log['blockNumber'], log['logIndex'], _hex(_to_bytes(log['transactionHash'])),
+                         str(log['address']).lower(), _hex(_to_bytes(log['topics'][0])), event, args))
+        return rows
+
+    def index(self, to_block: Optional[int] = None, max_batches: Optional[int] = None) -> int:
+        """Index from the last indexed block up to `to_block` (default: head minus confirmations)."""
+        started = time.perf_counter()
+        head = self.source.block_number() - self.confirmations if to_block is None else to_block
+        block = self.last_indexed_block + 1
+        batch, limit = self.batch_blocks, self.max_batch_blocks
+        indexed = batches = 0
+        while block <= head and (max_batches is None or batches < max_batches):
+            end = min(block + batch - 1, head)
+            try:
+                logs = self._fetch(block, end)
+            except Exception as e:
+                # Only "query returned more than N results" is worth retrying with a smaller range
+                if not is_result_limit_error(e):
+                    raise
+                self.stats['failed_requests'] += 1
+                if batch == 1:
+                    raise
+                batch = limit = max(1, batch // 2)
+                continue
+            rows = self._rows(logs)
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self.connection.execute("INSERT OR REPLACE INTO progress VALUES (?, ?)", (self.scan_id, end))
+            indexed += len(rows)
+            batches += 1
+            block = end + 1
+            batch = min(batch * 2, limit)
+        self.stats['batches'] += batches
+        self.stats['logs'] += indexed
+        self.stats['seconds'] += time.perf_counter() - started
+        return indexed
+
+    def events(self, event: Optional[str] = None, address: Optional[str] = None, from_block: int = 0,
+               to_block: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Indexed events in (block, log index) order, using the (address, topic0, block) index."""
+        clauses, params = ["block >= ?"], [from_block]
+        if to_block is not None:
+            clauses.append("block <= ?")
+            params.append(to_block)
+        if address is not None:
+            clauses.append("address = ?")
+            params.append(address.lower())
+        if event is not None:
+            clauses.append("topic0 = ?")
+            params.append(_hex(self.decoders.topic(event)))
+        query = f"SELECT block, log_index, tx_hash, address, event, args FROM logs WHERE {' AND '.join(clauses)} " \
+                f"ORDER BY block, log_index"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return [{'block': block, 'log_index': log_index, 'tx_hash': tx_hash, 'address': addr, 'event': name,
+                 'args': json.loads(args) if args else None}
+                for block, log_index, tx_hash, addr, name, args in self.connection.execute(query, params)]
+
+    def count(self, event: Optional[str] = None) -> int:
+        if event is None:
+            return self.connection.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM logs WHERE topic0 = ?",
+                                       (_hex(self.decoders.topic(event)),)).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,104 @@
+"""
+Snapshot/revert fixtures for tests against an in-memory EVM.
+
+Deploying contracts for every test is slow, and sharing one deployment
+lets tests leak state into each other (a paused token, moved balances).
+`SnapshotChain` keeps a stack of eth-tester snapshots: the class fixture
+deploys once and pushes a base snapshot, and every test reverts to it in
+setUp, which only rewinds the chain head. Tests that need extra shared
+setup can push further layers with `layer()` and nest them.
+"""
+
+import contextlib
+import time
+import unittest
+from typing import Any, Dict, List, Optional, Tuple
+
+from eth_tester import EthereumTester, PyEVMBackend
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+
+
+class SnapshotChain:
+    """Stack of named EVM snapshots for an EthereumTester."""
+
+    def __init__(self, eth_tester: EthereumTester):
+        self.eth_tester = eth_tester
+        self._layers: List[Tuple[str, Any]] = []
+        self.reverts = 0
+        self.revert_seconds = 0.0
+
+    @property
+    def labels(self) -> List[str]:
+        return [label for label, _ in self._layers]
+
+    def push(self, label: str):
+        """Snapshot the current chain state as a new top layer."""
+        if label in self.labels:
+            raise ValueError(f"Snapshot layer {label!r} already exists")
+        self._layers.append((label, self.eth_tester.take_snapshot()))
+
+    def revert(self, label: Optional[str] = None):
+        """Rewind to layer `label` (default: the top layer), discarding any layers above it."""
+        labels = self.labels
+        if not labels:
+            raise RuntimeError("No snapshot to revert to")
+        index = len(labels) - 1 if label is None else labels.index(label)
+        started = time.perf_counter()
+        self.eth_tester.revert_to_snapshot(self._layers[index][1])
+        self.revert_seconds += time.perf_counter() - started
+        self.reverts += 1
+        del self._layers[index + 1:]
+
+    def pop(self):
+        """Rewind to the top layer and drop it."""
+        self.revert()
+        self._layers.pop()
+
+    @contextlib.contextmanager
+    def layer(self, label: str):
+        """Snapshot on entry and rewind on exit, for state shared by a group of checks."""
+        self.push(label)
+        try:
+            yield self
+        finally:
+            self.revert(label)
+            self._layers.pop()
+
+
+class EVMSnapshotTestCase(unittest.TestCase):
+    """TestCase that deploys once per class and starts every test from the deployed state.
+
+    Subclasses implement `deploy_fixtures(cls)`, called once in
+    setUpClass with `cls.w3` and `cls.eth_tester` ready.
+    """
+
+    BASE_SNAPSHOT = 'deployed'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.eth_tester = EthereumTester(PyEVMBackend())
+        cls.w3 = Web3(EthereumTesterProvider(cls.eth_tester))
+        cls.snapshots = SnapshotChain(cls.eth_tester)
+        started = time.perf_counter()
+        cls.deploy_fixtures()
+        cls.deploy_seconds = time.perf_counter() - started
+        cls.snapshots.push(cls.BASE_SNAPSHOT)
+
+    @classmethod
+    def deploy_fixtures(cls):
+        raise NotImplementedError
+
+    def setUp(self):
+        super().setUp()
+        self.snapshots.revert(self.BASE_SNAPSHOT)
+
+    @classmethod
+    def fixture_timings(cls) -> Dict[str, float]:
+        reverts = max(cls.snapshots.reverts, 1)
+        return {
+            'deploy_seconds': cls.deploy_seconds,
+            'reverts': cls.snapshots.reverts,
+            'mean_revert_ms': cls.snapshots.revert_seconds / reverts * 1e3,
+        }
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from artifact_store import ArtifactError, ArtifactStore
+
+SOURCE = "pragma solidity ^0.8.0; contract SimpleToken {}"
+
+
+class FakeCompiler:
+    """Stands in for solc and counts invocations."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, source, version, settings):
+        self.calls += 1
+        return {'<stdin>:SimpleToken': {'abi': [{'type': 'constructor'}], 'bin': f'60{self.calls:02x}',
+                                        'metadata': 'dropped'}}
+
+
+class ArtifactStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.compiler = FakeCompiler()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self, **kwargs):
+        return ArtifactStore(self.tmp.name, compiler=self.compiler, **kwargs)
+
+    def test_compiles_once_across_stores(self):
+        first = self.store().contract(SOURCE, 'SimpleToken')
+        self.assertEqual(first, {'abi': [{'type': 'constructor'}], 'bin': '6001'})
+        store = self.store()
+        self.assertEqual(store.compile_source(SOURCE)['<stdin>:SimpleToken'], first)
+        store.compile_source(SOURCE)
+        self.assertEqual((self.compiler.calls, store.hits, store.misses), (1, 2, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, '.gitignore')))
+
+    def test_key_covers_source_compiler_and_settings(self):
+        store = self.store()
+        keys = {store.key(SOURCE), store.key(SOURCE + " "), self.store(solc_version='0.7.6').key(SOURCE),
+                self.store(optimize=True).key(SOURCE)}
+        self.assertEqual(len(keys), 4)
+
+    def test_contract_lookup(self):
+        store = self.store()
+        path = os.path.join(self.tmp.name, 'SimpleToken.sol')
+        with open(path, 'w') as f:
+            f.write(SOURCE)
+        self.assertEqual(store.contract_file(path)['bin'], '6001')
+        with self.assertRaises(ArtifactError):
+            store.contract(SOURCE, 'Missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
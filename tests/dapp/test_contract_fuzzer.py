@@ -0,0 +1,60 @@
+import functools
+import random
+import unittest
+
+from contract_fuzzer import (Action, Fuzzer, InMemoryTokenTarget, SequenceGenerator, functions_from_abi, run_fuzz)
+
+
+class ContractFuzzerTest(unittest.TestCase):
+
+    def test_correct_token_passes(self):
+        report = run_fuzz(InMemoryTokenTarget, sequences=150, max_length=15, seed=1)
+        self.assertEqual(report.failures, [])
+        self.assertGreater(report.transactions, 150)
+        self.assertGreater(report.reverted, 0)
+        self.assertGreater(report.transactions_per_second, 0)
+
+    def test_injected_bugs_are_found_and_shrunk(self):
+        expected = {'pause_bypass': 'paused_blocks_transfers', 'unguarded_mint': 'owner_only',
+                    'supply_leak': 'balance_conservation'}
+        for bug, invariant in expected.items():
+            with self.subTest(bug=bug):
+                report = run_fuzz(functools.partial(InMemoryTokenTarget, bug=bug), sequences=300, max_length=20)
+                self.assertEqual([f.invariant for f in report.failures], [invariant])
+                failure = report.failures[0]
+                self.assertLessEqual(len(failure.sequence), 2, failure.sequence)
+                self.assertLess(len(failure.sequence), failure.original_length)
+
+    def test_shrunk_sequence_replays(self):
+        target = InMemoryTokenTarget(bug='supply_leak')
+        fuzzer = Fuzzer(target)
+        owner, other = target.accounts[:2]
+        sequence = [Action('transfer', [other, 50], owner), Action('approve', [owner, 5], other),
+                    Action('burn', [40], other), Action('pause', [], owner)]
+        self.assertEqual(fuzzer.execute(sequence)[0], 'balance_conservation')
+        shrunk = fuzzer.shrink(sequence, 'balance_conservation')
+        self.assertEqual([(a.function, a.args) for a in shrunk], [('burn', [1])])
+        # Every run starts from the deployed state
+        self.assertEqual(target.observe()['total_supply'], 10 ** 6)
+
+    def test_worker_pool(self):
+        report = run_fuzz(functools.partial(InMemoryTokenTarget, bug='unguarded_mint'), workers=2,
+                          sequences=50, max_length=10)
+        self.assertEqual(report.sequences, 100)
+        self.assertEqual({f.invariant for f in report.failures}, {'owner_only'})
+
+    def test_generator_and_abi(self):
+        abi = [{'type': 'function', 'name': 'transfer', 'stateMutability': 'nonpayable',
+                'inputs': [{'name': 'to', 'type': 'address'}, {'name': 'value', 'type': 'uint8'}]},
+               {'type': 'function', 'name': 'balanceOf', 'stateMutability': 'view', 'inputs': []},
+               {'type': 'event', 'name': 'Transfer', 'inputs': []}]
+        functions = functions_from_abi(abi)
+        self.assertEqual([f.name for f in functions], ['transfer'])
+        generator = SequenceGenerator(functions, ['0xa', '0xb'], random.Random(0))
+        values = [generator.action().args[1] for _ in range(200)]
+        self.assertTrue(all(0 <= v <= 255 for v in values))
+        self.assertIn(255, values)
+
+
+if __name__ == '__main__':
+    unittest.main()
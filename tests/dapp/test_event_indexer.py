@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from benchmark_event_indexer import TOKEN_EVENTS_ABI, SyntheticLogSource
+from event_indexer import EventDecoderCache, LogIndexer, keccak256
+
+TOKEN = '0x' + 'ab' * 20
+
+
+class EventIndexerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'events.sqlite')
+        self.decoders = EventDecoderCache([TOKEN_EVENTS_ABI])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def indexer(self, source, **kwargs):
+        return LogIndexer(self.db, source, self.decoders, [TOKEN.upper().replace('0X', '0x')], **kwargs)
+
+    def test_keccak_and_decoding(self):
+        self.assertEqual(keccak256(b'Transfer(address,address,uint256)').hex(),
+                         'ddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef')
+        # web3 v5 style log with hex strings
+        log = {
+            'topics': ['0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef',
+                       '0x' + '00' * 12 + '11' * 20, '0x' + '00' * 12 + '22' * 20],
+            'data': '0x' + (10 ** 20).to_bytes(32, 'big').hex(),
+        }
+        plan, args = self.decoders.decode(log)
+        self.assertEqual(plan.name, 'Transfer')
+        self.assertEqual(args, {'from': '0x' + '11' * 20, 'to': '0x' + '22' * 20, 'value': 10 ** 20})
+        self.assertIsNone(self.decoders.decode({'topics': ['0x' + '00' * 32], 'data': '0x'}))
+
+    def test_index_and_query(self):
+        source = SyntheticLogSource(TOKEN, blocks=300, logs_per_block=4, pause_every=100)
+        indexer = self.indexer(source, batch_blocks=64)
+        self.assertEqual(indexer.index(), 300 * 4 + 3)
+        self.assertEqual(indexer.count('Transfer'), 1200)
+        paused = indexer.events('Paused', TOKEN)
+        self.assertEqual([e['block'] for e in paused], [0, 100, 200])
+        self.assertEqual(paused[0]['args'], {'account': '0x' + source.accounts[0].hex()})
+
+        recent = indexer.events('Transfer', from_block=295)
+        expected = [log for block in range(295, 300) for log in source._block_logs(block)
+                    if log['topics'][0] == source.transfer_topic]
+        self.assertEqual(len(recent), len(expected))
+        self.assertEqual(recent[-1]['args']['value'], int.from_bytes(expected[-1]['data'], 'big'))
+        self.assertEqual(recent[-1]['args']['to'], '0x' + expected[-1]['topics'][2][-20:].hex())
+        indexer.close()
+
+    def test_incremental_resume(self):
+        source = SyntheticLogSource(TOKEN, blocks=200, logs_per_block=2, pause_every=0)
+        indexer = self.indexer(source, batch_blocks=50)
+        indexer.index(max_batches=2)  # 50 + 100 blocks
+        self.assertEqual(indexer.last_indexed_block, 149)
+        indexer.close()
+
+        source.extend(100)
+        resumed = self.indexer(source, batch_blocks=50)
+        self.assertEqual(resumed.index(), (300 - 150) * 2)
+        self.assertEqual(resumed.count(), 600)
+        self.assertEqual(resumed.index(), 0)
+        resumed.close()
+
+    def test_batch_shrinks_to_node_result_cap(self):
+        source = SyntheticLogSource(TOKEN, blocks=1000, logs_per_block=10, pause_every=0, max_results=500)
+        indexer = self.indexer(source, batch_blocks=400)
+        self.assertEqual(indexer.index(), 10000)
+        # 400 -> 200 -> 100 -> 50 blocks, then no growth past the last accepted size
+        self.assertEqual(indexer.stats['failed_requests'], 3)
+        self.assertEqual(indexer.stats['batches'], 20)
+        indexer.close()
+
+    def test_request_keeps_checksum_addresses(self):
+        source = SyntheticLogSource(TOKEN, blocks=10, logs_per_block=1, pause_every=0)
+        requests = []
+        get_logs = source.get_logs
+        source.get_logs = lambda params: requests.append(params['address']) or get_logs(params)
+        other = '0x' + 'CD' * 20
+        indexer = LogIndexer(self.db, source, self.decoders, [TOKEN.upper().replace('0X', '0x'), other])
+        self.assertEqual(indexer.index(), 10)
+        self.assertEqual(requests[0], [TOKEN.upper().replace('0X', '0x'), other])
+        self.assertEqual(indexer.events(address=TOKEN.upper())[0]['address'], TOKEN)
+        indexer.close()
+
+    def test_other_errors_are_not_retried(self):
+        source = SyntheticLogSource(TOKEN, blocks=100, logs_per_block=1, pause_every=0)
+        def get_logs(params):
+            source.requests += 1
+            raise ConnectionError("node unreachable")
+        source.get_logs = get_logs
+        indexer = self.indexer(source, batch_blocks=64)
+        with self.assertRaises(ConnectionError):
+            indexer.index()
+        self.assertEqual(source.requests, 1)
+        self.assertEqual(indexer.stats['failed_requests'], 0)
+        indexer.close()
+
+    def test_confirmations(self):
+        source = SyntheticLogSource(TOKEN, blocks=100, logs_per_block=1, pause_every=0)
+        indexer = self.indexer(source, confirmations=10)
+        indexer.index()
+        self.assertEqual(indexer.last_indexed_block, 89)
+        indexer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()